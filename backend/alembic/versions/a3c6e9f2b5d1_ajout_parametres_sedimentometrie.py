@@ -0,0 +1,33 @@
+"""ajout parametres sedimentometrie
+
+Revision ID: a3c6e9f2b5d1
+Revises: f2a7d4c9e1b8
+Create Date: 2025-12-08
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "a3c6e9f2b5d1"
+down_revision = "f2a7d4c9e1b8"
+branch_labels = None
+depends_on = None
+
+COLONNES = (
+    "masse_seche_sedimentometrie",
+    "volume_suspension",
+    "masse_volumique_particules",
+    "correction_lecture",
+    "diametre_coupure_mm",
+)
+
+
+def upgrade() -> None:
+    # Paramètres de l'essai au densimètre (loi de Stokes, NF P94-057)
+    for colonne in COLONNES:
+        op.add_column("essais_granulometrie", sa.Column(colonne, sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    for colonne in reversed(COLONNES):
+        op.drop_column("essais_granulometrie", colonne)
@@ -0,0 +1,22 @@
+"""index pagination essais
+
+Revision ID: b8d4f1a7c3e6
+Revises: a3c6e9f2b5d1
+Create Date: 2025-12-10
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b8d4f1a7c3e6"
+down_revision = "a3c6e9f2b5d1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Pagination par curseur sur (created_at, id), parcouru en ordre inverse
+    op.create_index("ix_essais_created_at_id", "essais", ["created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_essais_created_at_id", table_name="essais")
@@ -0,0 +1,43 @@
+"""ajout recalcul jobs
+
+Revision ID: c4d2a9e1f7b3
+Revises: 8f8de5165c4a
+Create Date: 2025-12-01
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c4d2a9e1f7b3"
+down_revision = "8f8de5165c4a"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "recalcul_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True, index=True),
+        sa.Column(
+            "statut",
+            sa.Enum("EN_ATTENTE", "EN_COURS", "TERMINE", "ECHOUE", name="statutrecalcul"),
+            nullable=False,
+        ),
+        sa.Column("type_essai", sa.String(), nullable=True),
+        sa.Column("projet_id", sa.Integer(), sa.ForeignKey("projets.id"), nullable=True),
+        sa.Column("total", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("traites", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("type_courant", sa.String(), nullable=True),
+        sa.Column("dernier_id", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("erreur", sa.Text(), nullable=True),
+        sa.Column("lance_par_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("recalcul_jobs")
+    op.execute("DROP TYPE IF EXISTS statutrecalcul")
@@ -0,0 +1,47 @@
+"""index recherche essais
+
+Revision ID: c9e2a5d8f1b4
+Revises: b8d4f1a7c3e6
+Create Date: 2025-12-11
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c9e2a5d8f1b4"
+down_revision = "b8d4f1a7c3e6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "essais_recherche",
+        sa.Column("essai_id", sa.Integer(), sa.ForeignKey("essais.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("document", sa.Text(), nullable=False),
+    )
+
+    # tsvector généré + index GIN, index trigrammes pour ILIKE '%terme%'
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        "ALTER TABLE essais_recherche ADD COLUMN vecteur tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('simple', document)) STORED"
+    )
+    op.execute("CREATE INDEX ix_essais_recherche_vecteur ON essais_recherche USING gin (vecteur)")
+    op.execute("CREATE INDEX ix_essais_recherche_trgm ON essais_recherche USING gin (document gin_trgm_ops)")
+
+    # Documents des essais existants
+    op.execute(
+        """
+        INSERT INTO essais_recherche (essai_id, document)
+        SELECT e.id, concat_ws(E'\\n', e.numero_essai, e.projet_nom, e.echantillon, e.observations,
+                               p.nom, p.code_projet)
+        FROM essais e LEFT JOIN projets p ON p.id = e.projet_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_essais_recherche_trgm", table_name="essais_recherche")
+    op.drop_index("ix_essais_recherche_vecteur", table_name="essais_recherche")
+    op.drop_table("essais_recherche")
@@ -0,0 +1,51 @@
+"""compteurs jour essais
+
+Revision ID: d5a8c3f1e9b7
+Revises: c9e2a5d8f1b4
+Create Date: 2025-12-12
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "d5a8c3f1e9b7"
+down_revision = "c9e2a5d8f1b4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Types énumérés déjà créés avec la table essais
+    type_essai = postgresql.ENUM(
+        "ATTERBERG", "CBR", "PROCTOR", "GRANULOMETRIE", "AUTRE", name="typeessai", create_type=False
+    )
+    statut = postgresql.ENUM("BROUILLON", "EN_COURS", "TERMINE", "VALIDE", name="statutessai", create_type=False)
+
+    op.create_table(
+        "essais_compteurs_jour",
+        sa.Column("jour", sa.Date(), nullable=False),
+        sa.Column("type_essai", type_essai, nullable=False),
+        sa.Column("statut", statut, nullable=False),
+        sa.Column("projet_id", sa.Integer(), nullable=False),
+        sa.Column("operateur_id", sa.Integer(), nullable=False),
+        sa.Column("mois", sa.Date(), nullable=False),
+        sa.Column("nombre", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("jour", "type_essai", "statut", "projet_id", "operateur_id"),
+    )
+
+    # Compteurs des essais existants (projet_id = 0 : essai sans projet)
+    op.execute(
+        """
+        INSERT INTO essais_compteurs_jour (jour, type_essai, statut, projet_id, operateur_id, mois, nombre)
+        SELECT created_at::date, type_essai, statut, coalesce(projet_id, 0), operateur_id,
+               date_trunc('month', created_at)::date, count(*)
+        FROM essais
+        WHERE created_at IS NOT NULL
+        GROUP BY 1, 2, 3, 4, 5, 6
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("essais_compteurs_jour")
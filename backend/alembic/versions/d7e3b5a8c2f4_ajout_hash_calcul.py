@@ -0,0 +1,27 @@
+"""ajout hash calcul
+
+Revision ID: d7e3b5a8c2f4
+Revises: c4d2a9e1f7b3
+Create Date: 2025-12-02
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "d7e3b5a8c2f4"
+down_revision = "c4d2a9e1f7b3"
+branch_labels = None
+depends_on = None
+
+TABLES = ("essais_atterberg", "essais_cbr", "essais_proctor", "essais_granulometrie")
+
+
+def upgrade() -> None:
+    # Empreinte des données mesurées (mémoïsation des calculs)
+    for table in TABLES:
+        op.add_column(table, sa.Column("hash_calcul", sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_column(table, "hash_calcul")
@@ -0,0 +1,25 @@
+"""ajout ajustement proctor
+
+Revision ID: e5f1c8d3a6b9
+Revises: d7e3b5a8c2f4
+Create Date: 2025-12-03
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "e5f1c8d3a6b9"
+down_revision = "d7e3b5a8c2f4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Ajustement compact de la courbe Proctor (remplace les 100 points de courbe_proctor)
+    op.add_column("essais_proctor", sa.Column("modele_ajustement", sa.String(), nullable=True, server_default="poly2"))
+    op.add_column("essais_proctor", sa.Column("ajustement", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("essais_proctor", "ajustement")
+    op.drop_column("essais_proctor", "modele_ajustement")
@@ -0,0 +1,41 @@
+"""esquisses quantiles
+
+Revision ID: e8b4d2f6a1c3
+Revises: d5a8c3f1e9b7
+Create Date: 2025-12-19
+
+Les esquisses des résultats existants sont calculées après la migration par :
+    python -m app.services.quantiles
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "e8b4d2f6a1c3"
+down_revision = "d5a8c3f1e9b7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Type énuméré déjà créé avec la table essais
+    type_essai = postgresql.ENUM(
+        "ATTERBERG", "CBR", "PROCTOR", "GRANULOMETRIE", "AUTRE", name="typeessai", create_type=False
+    )
+
+    op.create_table(
+        "esquisses_quantiles",
+        sa.Column("projet_id", sa.Integer(), nullable=False),
+        sa.Column("type_essai", type_essai, nullable=False),
+        sa.Column("metrique", sa.String(length=64), nullable=False),
+        sa.Column("nombre", sa.Integer(), nullable=False),
+        sa.Column("minimum", sa.Float(), nullable=False),
+        sa.Column("maximum", sa.Float(), nullable=False),
+        sa.Column("centroides", sa.JSON(), nullable=False),
+        sa.PrimaryKeyConstraint("projet_id", "type_essai", "metrique"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("esquisses_quantiles")
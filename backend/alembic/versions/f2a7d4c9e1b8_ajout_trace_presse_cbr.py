@@ -0,0 +1,25 @@
+"""ajout trace presse cbr
+
+Revision ID: f2a7d4c9e1b8
+Revises: e5f1c8d3a6b9
+Create Date: 2025-12-05
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "f2a7d4c9e1b8"
+down_revision = "e5f1c8d3a6b9"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Trace brute de la presse stockée en fichier binaire (la base ne garde que la courbe réduite)
+    op.add_column("essais_cbr", sa.Column("fichier_trace", sa.String(), nullable=True))
+    op.add_column("essais_cbr", sa.Column("nombre_echantillons", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("essais_cbr", "nombre_echantillons")
+    op.drop_column("essais_cbr", "fichier_trace")
@@ -14,7 +14,8 @@ from app.api.v1.endpoints import (
     echantillons,
     notifications,
     external,
-    workflow
+    workflow,
+    recalcul
 )
 
 api_router = APIRouter()
@@ -33,4 +34,5 @@ api_router.include_router(qualite.router, prefix="/qualite", tags=["qualite"])
 api_router.include_router(echantillons.router, prefix="/echantillons", tags=["echantillons"])
 api_router.include_router(notifications.router, prefix="/notifications", tags=["notifications"])
 api_router.include_router(external.router, prefix="/external", tags=["external"])
-api_router.include_router(workflow.router, prefix="/workflow", tags=["workflow"])
\ No newline at end of file
+api_router.include_router(workflow.router, prefix="/workflow", tags=["workflow"])
+api_router.include_router(recalcul.router, prefix="/recalculs", tags=["recalcul"])
\ No newline at end of file
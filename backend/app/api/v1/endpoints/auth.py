@@ -6,7 +6,14 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.core.security import verify_password, create_access_token, get_password_hash
+from app.core import prometheus_metrics as metriques
+from app.core.security import (
+    create_access_token,
+    get_password_hash_async,
+    password_needs_rehash,
+    verify_password_async,
+)
+from app.core.cache_utilisateurs import claims_utilisateur
 from app.core.config import settings
 from app.core.deps import get_current_active_user
 from app.core.password_policy import PasswordPolicy
@@ -51,7 +58,7 @@ async def register(
         )
     
     # Créer le nouvel utilisateur
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     db_user = User(
         email=user_data.email,
         username=user_data.username,
@@ -78,7 +85,7 @@ async def login(
         (User.username == form_data.username) | (User.email == form_data.username)
     ).first()
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Nom d'utilisateur ou mot de passe incorrect",
@@ -91,11 +98,16 @@ async def login(
             detail="Utilisateur inactif"
         )
     
-    # Créer le token
-    # JWT exige que "sub" soit une string
+    # Hash calculé avec un ancien coût bcrypt : remplacé tant que le mot de passe est connu
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = await get_password_hash_async(form_data.password)
+        db.commit()
+        metriques.password_rehash_total.inc()
+    
+    # Créer le token (identifiant, plus rôle et état si les claims sont activés)
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": str(user.id)},  # Convertir en string
+        data=claims_utilisateur(user),
         expires_delta=access_token_expires
     )
     
@@ -104,8 +116,20 @@ async def login(
 
 @router.get("/me", response_model=UserSchema)
 async def get_current_user_info(
+    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Récupère les informations de l'utilisateur connecté"""
+    # Un principal issu des claims du token ne porte que l'identifiant, le rôle et le nom
+    if current_user.email is None:
+        user = db.get(User, current_user.id)
+        if user is None:
+            # Compte supprimé depuis l'émission du token
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Impossible de valider les identifiants",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return user
     return current_user
 
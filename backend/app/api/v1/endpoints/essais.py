@@ -1,17 +1,28 @@
 """
 Routes pour la gestion des essais géotechniques
+
+Routes asynchrones : les requêtes passent par la session asynchrone et ne
+bloquent pas la boucle d'événements pendant les entrées-sorties.
 """
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from app.core.database import get_db
+import copy
+import os
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, File, UploadFile, Response
+from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import get_async_db
 from app.core.deps import get_current_active_user
 from app.models.essai import Essai, TypeEssai, StatutEssai
 from app.models.user import User
 from app.schemas.essai import (
     Essai as EssaiSchema,
     EssaiCreate,
+    EssaiCreationLot,
     EssaiUpdate,
     EssaiAtterberg,
     EssaiAtterbergCreate,
@@ -26,22 +37,45 @@ from app.schemas.essai import (
     EssaiGranulometrieCreate,
     EssaiGranulometrieUpdate
 )
-from app.services.calculs import (
-    calculer_atterberg,
-    calculer_cbr,
-    calculer_proctor,
-    calculer_granulometrie
-)
-from app.services.validation import validate_essai
-from app.api.v1.endpoints.history import create_history_entry
+from app.services.calculs import courbe_granulometrique
+from app.services.chargement import charger
+from app.services.insertion import inserer_essais
+from app.services.presse_cbr import POINTS_AFFICHAGE, ingerer_csv
+from app.services.proctor import generer_courbe
+from app.services.recherche import filtrer_recherche
+from app.services.traitement import importer_donnees_specifiques, traiter_essai, traiter_mesures
+from app.services.validation import ValidationError
+from app.api.v1.endpoints.history import create_history_entry_async
+from app.utils.pagination import CurseurInvalide, apres_curseur, encoder_curseur
+from app.utils.storage import UPLOAD_DIR
 
 router = APIRouter()
 
 
+async def _lire_essai(db: AsyncSession, essai_id: int, recharger: bool = False) -> Essai:
+    """
+    Essai avec les relations de sa réponse chargées ; 404 s'il n'existe pas
+
+    recharger : relit la ligne (valeurs calculées par la base après un commit)
+    """
+    query = charger(select(Essai).where(Essai.id == essai_id), EssaiSchema, une_ligne=True)
+    if recharger:
+        query = query.execution_options(populate_existing=True)
+    essai = (await db.execute(query)).scalar_one_or_none()
+    if not essai:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Essai non trouvé"
+        )
+    return essai
+
+
 @router.get("/", response_model=List[EssaiSchema])
 async def list_essais(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Curseur de la page suivante (en-tête X-Next-Cursor)"),
     type_essai: Optional[TypeEssai] = None,
     statut: Optional[StatutEssai] = None,
     search: Optional[str] = Query(None, description="Recherche par numéro, projet ou échantillon"),
@@ -49,13 +83,22 @@ async def list_essais(
     projet_id: Optional[int] = Query(None, description="Filtrer par projet"),
     date_debut: Optional[str] = Query(None, description="Date de début (format: YYYY-MM-DD)"),
     date_fin: Optional[str] = Query(None, description="Date de fin (format: YYYY-MM-DD)"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Liste tous les essais avec filtres optionnels avancés"""
+    """
+    Liste tous les essais avec filtres optionnels avancés
+
+    Les essais sont triés du plus récent au plus ancien. Quand la page est
+    pleine, l'en-tête X-Next-Cursor donne le curseur de la page suivante :
+    passé en paramètre cursor (à la place de skip), il permet de parcourir
+    toute la liste à coût constant par page. Avec search, les essais sont
+    triés par pertinence (index plein texte) et paginés par skip.
+    """
     from datetime import datetime
     
-    query = db.query(Essai)
+    query = charger(select(Essai), EssaiSchema)
+    dialecte = db.bind.dialect.name
     
     if type_essai:
         query = query.filter(Essai.type_essai == type_essai)
@@ -83,44 +126,45 @@ async def list_essais(
         except ValueError:
             pass
     
+    if search and cursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Une recherche est triée par pertinence : utiliser skip plutôt qu'un curseur"
+        )
+    
     if search:
-        from app.models.projet import Projet
-        # Utiliser distinct() pour éviter les doublons lors du join
-        query = query.outerjoin(Projet, Essai.projet_id == Projet.id).filter(
-            or_(
-                Essai.numero_essai.ilike(f"%{search}%"),
-                Essai.projet_nom.ilike(f"%{search}%"),
-                Projet.nom.ilike(f"%{search}%"),
-                Projet.code_projet.ilike(f"%{search}%"),
-                Essai.echantillon.ilike(f"%{search}%"),
-                Essai.observations.ilike(f"%{search}%")
-            )
-        ).distinct()
+        # Index plein texte, résultats les plus pertinents d'abord
+        query, pertinence = filtrer_recherche(query, search, dialecte)
+        query = query.order_by(pertinence.desc(), Essai.created_at.desc(), Essai.id.desc())
+    else:
+        query = query.order_by(Essai.created_at.desc(), Essai.id.desc())
     
-    essais = query.order_by(Essai.created_at.desc()).offset(skip).limit(limit).all()
+    if cursor:
+        try:
+            query = apres_curseur(query, Essai, cursor, dialecte)
+        except CurseurInvalide as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    else:
+        query = query.offset(skip)
+    
+    essais = (await db.execute(query.limit(limit))).scalars().all()
+    if essais and len(essais) == limit and not search:
+        response.headers["X-Next-Cursor"] = encoder_curseur(essais[-1].created_at, essais[-1].id)
     return essais
 
 
 @router.get("/{essai_id}", response_model=EssaiSchema)
 async def get_essai(
     essai_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Récupère un essai par ID"""
-    essai = db.query(Essai).filter(Essai.id == essai_id).first()
-    if not essai:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Essai non trouvé"
-        )
+    essai = await _lire_essai(db, essai_id)
     
     # S'assurer que projet_nom est défini
-    if not essai.projet_nom and essai.projet_id:
-        from app.models.projet import Projet
-        projet = db.query(Projet).filter(Projet.id == essai.projet_id).first()
-        if projet:
-            essai.projet_nom = projet.nom
+    if not essai.projet_nom and essai.projet is not None:
+        essai.projet_nom = essai.projet.nom
     
     return essai
 
@@ -128,12 +172,14 @@ async def get_essai(
 @router.post("/", response_model=EssaiSchema, status_code=status.HTTP_201_CREATED)
 async def create_essai(
     essai_data: EssaiCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Crée un nouvel essai"""
     # Vérifier si le numéro d'essai existe déjà
-    existing = db.query(Essai).filter(Essai.numero_essai == essai_data.numero_essai).first()
+    existing = (await db.execute(
+        select(Essai.id).where(Essai.numero_essai == essai_data.numero_essai)
+    )).first()
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -150,7 +196,7 @@ async def create_essai(
     projet_nom = None
     if projet_id:
         from app.models.projet import Projet
-        projet = db.query(Projet).filter(Projet.id == projet_id).first()
+        projet = await db.get(Projet, projet_id)
         if projet:
             projet_nom = projet.nom
         else:
@@ -165,20 +211,10 @@ async def create_essai(
     )
     
     db.add(essai)
-    db.commit()
-    db.refresh(essai)
-    
-    # S'assurer que projet_nom est défini pour la réponse
-    if not essai.projet_nom and essai.projet_id:
-        from app.models.projet import Projet
-        projet = db.query(Projet).filter(Projet.id == essai.projet_id).first()
-        if projet:
-            essai.projet_nom = projet.nom
-            db.commit()
-            db.refresh(essai)
+    await db.commit()
     
     # Créer entrée d'historique
-    create_history_entry(
+    await create_history_entry_async(
         db=db,
         essai_id=essai.id,
         user_id=current_user.id,
@@ -186,23 +222,96 @@ async def create_essai(
         comment=f"Essai créé: {essai.numero_essai}"
     )
     
-    return essai
+    return await _lire_essai(db, essai.id, recharger=True)
+
+
+@router.post("/bulk", response_model=List[EssaiSchema], status_code=status.HTTP_201_CREATED)
+async def create_essais_bulk(
+    essais_data: List[EssaiCreationLot],
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Crée un lot d'essais avec leurs données spécifiques
+
+    Le lot est accepté ou refusé en entier : numéros déjà existants (une seule
+    requête pour tout le lot) ou en double, données invalides. Les données
+    spécifiques sont validées et calculées par type avec les noyaux batch (dans
+    le pool de threads), puis tout est inséré par INSERT multi-lignes dans une
+    seule transaction. Un lot de plus de settings.ESSAIS_LOT_MAX essais est refusé.
+    """
+    from app.models.projet import Projet
+    
+    if len(essais_data) > settings.ESSAIS_LOT_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Lot trop volumineux: {settings.ESSAIS_LOT_MAX} essais au plus"
+        )
+    
+    numeros = [essai_data.numero_essai for essai_data in essais_data]
+    refuses = {numero for numero, nombre in Counter(numeros).items() if nombre > 1}
+    refuses.update((await db.execute(
+        select(Essai.numero_essai).where(Essai.numero_essai.in_(numeros))
+    )).scalars())
+    if refuses:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Numéros d'essai déjà existants ou en double: {', '.join(sorted(refuses))}"
+        )
+    
+    # Noms des projets référencés : une seule requête ; un projet inconnu est ignoré
+    projet_ids = {essai_data.projet_id for essai_data in essais_data if essai_data.projet_id}
+    projets = dict((await db.execute(
+        select(Projet.id, Projet.nom).where(Projet.id.in_(projet_ids))
+    )).all()) if projet_ids else {}
+    
+    essais = []
+    for essai_data in essais_data:
+        essai_dict = essai_data.dict(exclude={"projet", "projet_id", "donnees_specifiques"})
+        projet_id = essai_data.projet_id if essai_data.projet_id in projets else None
+        essais.append(Essai(
+            **essai_dict,
+            operateur_id=current_user.id,
+            projet_id=projet_id,
+            projet_nom=projets.get(projet_id)
+        ))
+    
+    # Valider et calculer les données spécifiques, par type et par lots
+    erreurs = await run_in_threadpool(
+        importer_donnees_specifiques, essais, [essai_data.donnees_specifiques for essai_data in essais_data]
+    )
+    erreurs = [
+        {"numero_essai": essai.numero_essai, "erreur": erreur}
+        for essai, erreur in zip(essais, erreurs) if erreur is not None
+    ]
+    if erreurs:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=erreurs)
+    
+    try:
+        essai_ids = await db.run_sync(inserer_essais, essais, current_user.id)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    
+    crees = {
+        essai.id: essai
+        for essai in (await db.execute(
+            charger(select(Essai), EssaiSchema).where(Essai.id.in_(essai_ids))
+        )).scalars()
+    }
+    return [crees[essai_id] for essai_id in essai_ids]
 
 
 @router.patch("/{essai_id}/statut", response_model=EssaiSchema)
 async def update_essai_statut(
     essai_id: int,
     nouveau_statut: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Change le statut d'un essai avec contrôle des permissions"""
-    essai = db.query(Essai).filter(Essai.id == essai_id).first()
-    if not essai:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Essai non trouvé"
-        )
+    essai = await _lire_essai(db, essai_id)
     
     # Valider le statut
     try:
@@ -231,11 +340,10 @@ async def update_essai_statut(
     
     old_statut = essai.statut.value if essai.statut else None
     essai.statut = statut_enum
-    db.commit()
-    db.refresh(essai)
+    await db.commit()
     
     # Créer entrée d'historique
-    create_history_entry(
+    await create_history_entry_async(
         db=db,
         essai_id=essai.id,
         user_id=current_user.id,
@@ -246,23 +354,18 @@ async def update_essai_statut(
         comment=f"Statut changé de {old_statut} à {statut_enum.value}"
     )
     
-    return essai
+    return await _lire_essai(db, essai_id, recharger=True)
 
 
 @router.put("/{essai_id}", response_model=EssaiSchema)
 async def update_essai(
     essai_id: int,
     essai_update: EssaiUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Met à jour un essai"""
-    essai = db.query(Essai).filter(Essai.id == essai_id).first()
-    if not essai:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Essai non trouvé"
-        )
+    essai = await _lire_essai(db, essai_id)
     
     # Vérifier les permissions (seul l'opérateur ou admin peut modifier)
     from app.models.user import UserRole
@@ -275,18 +378,24 @@ async def update_essai(
     # Tracker les changements
     changes = {}
     update_data = essai_update.dict(exclude_unset=True)
+    
+    # Les mesures libres d'un essai sans table spécifique passent par son moteur
+    if essai.type_essai == TypeEssai.AUTRE and update_data.get("resultats") is not None:
+        try:
+            update_data["resultats"] = traiter_mesures(TypeEssai.AUTRE, update_data["resultats"])
+        except ValidationError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     for field, value in update_data.items():
         old_value = getattr(essai, field, None)
         if old_value != value:
             changes[field] = {"old": str(old_value) if old_value is not None else None, "new": str(value) if value is not None else None}
             setattr(essai, field, value)
     
-    db.commit()
-    db.refresh(essai)
+    await db.commit()
     
     # Créer entrée d'historique si des changements ont été faits
     if changes:
-        create_history_entry(
+        await create_history_entry_async(
             db=db,
             essai_id=essai.id,
             user_id=current_user.id,
@@ -295,17 +404,17 @@ async def update_essai(
             comment=f"Essai modifié: {', '.join(changes.keys())}"
         )
     
-    return essai
+    return await _lire_essai(db, essai_id, recharger=True)
 
 
 @router.delete("/{essai_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_essai(
     essai_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Supprime un essai"""
-    essai = db.query(Essai).filter(Essai.id == essai_id).first()
+    essai = await db.get(Essai, essai_id)
     if not essai:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -321,7 +430,7 @@ async def delete_essai(
         )
     
     # Créer entrée d'historique avant suppression
-    create_history_entry(
+    await create_history_entry_async(
         db=db,
         essai_id=essai.id,
         user_id=current_user.id,
@@ -329,34 +438,34 @@ async def delete_essai(
         comment=f"Essai {essai.numero_essai} supprimé"
     )
     
-    db.delete(essai)
-    db.commit()
+    await db.delete(essai)
+    await db.commit()
     return None
 
 
 # Routes spécifiques pour Atterberg
 @router.get("/atterberg/", response_model=List[EssaiAtterberg])
 async def get_all_atterberg(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Récupère tous les essais Atterberg"""
     from app.models.essai import EssaiAtterberg as EssaiAtterbergModel
-    atterbergs = db.query(EssaiAtterbergModel).all()
+    atterbergs = (await db.execute(select(EssaiAtterbergModel))).scalars().all()
     return atterbergs
 
 
 @router.post("/atterberg/", response_model=EssaiAtterberg, status_code=status.HTTP_201_CREATED)
 async def create_atterberg(
     atterberg_data: EssaiAtterbergCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Crée un essai Atterberg"""
     from app.models.essai import EssaiAtterberg as EssaiAtterbergModel
     
     # Vérifier que l'essai existe
-    essai = db.query(Essai).filter(Essai.id == atterberg_data.essai_id).first()
+    essai = await db.get(Essai, atterberg_data.essai_id)
     if not essai:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -365,33 +474,22 @@ async def create_atterberg(
     
     atterberg = EssaiAtterbergModel(**atterberg_data.dict())
     
-    # Valider les données
-    validation = validate_essai("atterberg", atterberg)
-    if not validation["valid"]:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Erreurs de validation: {', '.join(validation['errors'])}"
-        )
-    
-    # Calculer les résultats
-    resultats = calculer_atterberg(atterberg)
-    for key, value in resultats.items():
-        setattr(atterberg, key, value)
-    
-    # Ajouter les warnings de validation aux résultats
-    if validation["warnings"]:
-        resultats["_validation_warnings"] = validation["warnings"]
+    # Valider les données et calculer les résultats
+    try:
+        resultats = traiter_essai(TypeEssai.ATTERBERG, atterberg)
+    except ValidationError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
     db.add(atterberg)
-    db.commit()
-    db.refresh(atterberg)
+    await db.commit()
+    await db.refresh(atterberg)
     
     # Mettre à jour les résultats de l'essai
     essai.resultats = resultats
-    db.commit()
+    await db.commit()
     
     # Créer entrée d'historique
-    create_history_entry(
+    await create_history_entry_async(
         db=db,
         essai_id=essai.id,
         user_id=current_user.id,
@@ -406,13 +504,13 @@ async def create_atterberg(
 async def update_atterberg(
     atterberg_id: int,
     atterberg_update: EssaiAtterbergUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Met à jour un essai Atterberg"""
     from app.models.essai import EssaiAtterberg as EssaiAtterbergModel
     
-    atterberg = db.query(EssaiAtterbergModel).filter(EssaiAtterbergModel.id == atterberg_id).first()
+    atterberg = await db.get(EssaiAtterbergModel, atterberg_id)
     if not atterberg:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -423,19 +521,22 @@ async def update_atterberg(
     for field, value in update_data.items():
         setattr(atterberg, field, value)
     
-    # Recalculer les résultats
-    resultats = calculer_atterberg(atterberg)
-    for key, value in resultats.items():
-        setattr(atterberg, key, value)
+    # Recalculer les résultats (inutile si les données mesurées n'ont pas changé)
+    try:
+        resultats = traiter_essai(TypeEssai.ATTERBERG, atterberg, si_modifie=True)
+    except ValidationError as e:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
-    db.commit()
-    db.refresh(atterberg)
+    await db.commit()
+    await db.refresh(atterberg)
     
     # Mettre à jour les résultats de l'essai
-    essai = db.query(Essai).filter(Essai.id == atterberg.essai_id).first()
-    if essai:
-        essai.resultats = resultats
-        db.commit()
+    if resultats is not None:
+        essai = await db.get(Essai, atterberg.essai_id)
+        if essai:
+            essai.resultats = resultats
+            await db.commit()
     
     return atterberg
 
@@ -445,53 +546,43 @@ async def update_atterberg(
 
 @router.get("/cbr/", response_model=List[EssaiCBR])
 async def get_all_cbr(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Récupère tous les essais CBR"""
     from app.models.essai import EssaiCBR as EssaiCBRModel
-    cbrs = db.query(EssaiCBRModel).all()
+    cbrs = (await db.execute(select(EssaiCBRModel))).scalars().all()
     return cbrs
 
 
 @router.post("/cbr/", response_model=EssaiCBR, status_code=status.HTTP_201_CREATED)
 async def create_cbr(
     cbr_data: EssaiCBRCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Crée un essai CBR"""
     from app.models.essai import EssaiCBR as EssaiCBRModel
     
-    essai = db.query(Essai).filter(Essai.id == cbr_data.essai_id).first()
+    essai = await db.get(Essai, cbr_data.essai_id)
     if not essai:
         raise HTTPException(status_code=404, detail="Essai non trouvé")
     
     cbr = EssaiCBRModel(**cbr_data.dict())
     
-    # Valider les données
-    validation = validate_essai("cbr", cbr)
-    if not validation["valid"]:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Erreurs de validation: {', '.join(validation['errors'])}"
-        )
-    
-    resultats = calculer_cbr(cbr)
-    for key, value in resultats.items():
-        setattr(cbr, key, value)
-    
-    # Ajouter les warnings de validation aux résultats
-    if validation["warnings"]:
-        resultats["_validation_warnings"] = validation["warnings"]
+    # Valider les données et calculer les résultats
+    try:
+        resultats = traiter_essai(TypeEssai.CBR, cbr)
+    except ValidationError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
     db.add(cbr)
     essai.resultats = resultats
-    db.commit()
-    db.refresh(cbr)
+    await db.commit()
+    await db.refresh(cbr)
     
     # Créer entrée d'historique
-    create_history_entry(
+    await create_history_entry_async(
         db=db,
         essai_id=essai.id,
         user_id=current_user.id,
@@ -502,27 +593,149 @@ async def create_cbr(
     return cbr
 
 
+@router.post("/cbr/{essai_id}/presse", response_model=EssaiCBR)
+async def upload_presse_cbr(
+    essai_id: int,
+    fichier: UploadFile = File(...),
+    points: int = Query(POINTS_AFFICHAGE, ge=10, le=5000, description="Nombre de points de la courbe d'affichage"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Importe l'enregistrement CSV d'une presse CBR
+
+    Le fichier est lu en flux : les forces à 2.5mm et 5.0mm sont interpolées
+    sur la trace complète, stockée en binaire, et la courbe de pénétration
+    est réduite à `points` points. Crée les données CBR de l'essai ou
+    remplace sa courbe.
+    """
+    from app.models.essai import EssaiCBR as EssaiCBRModel
+
+    essai = (await db.execute(
+        charger(select(Essai).where(Essai.id == essai_id), "cbr", une_ligne=True)
+    )).scalar_one_or_none()
+    if not essai:
+        raise HTTPException(status_code=404, detail="Essai non trouvé")
+    if essai.type_essai != TypeEssai.CBR:
+        raise HTTPException(status_code=400, detail="L'essai n'est pas un essai CBR")
+
+    chemin_trace = UPLOAD_DIR / "cbr" / f"essai_{essai_id}.f32"
+    # Trace écrite à part, mise en place seulement une fois l'essai validé et
+    # enregistré : un import refusé ne remplace pas la trace des résultats stockés
+    chemin_import = chemin_trace.with_name(f"{chemin_trace.name}.{uuid.uuid4().hex}.import")
+    try:
+        try:
+            trace = await run_in_threadpool(ingerer_csv, fichier.file, chemin_import, points)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        finally:
+            await fichier.close()
+
+        cbr = essai.cbr or EssaiCBRModel(essai_id=essai_id)
+        cbr.points_penetration = trace["points_penetration"]
+        cbr.force_25mm = trace["force_25mm"]
+        cbr.force_50mm = trace["force_50mm"]
+        cbr.nombre_echantillons = trace["nombre_echantillons"]
+        cbr.fichier_trace = str(chemin_trace)
+
+        try:
+            resultats = traiter_essai(TypeEssai.CBR, cbr)
+        except ValidationError as e:
+            await db.rollback()
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+        db.add(cbr)
+        essai.resultats = resultats
+        await db.commit()
+        os.replace(chemin_import, chemin_trace)
+    finally:
+        chemin_import.unlink(missing_ok=True)
+    await db.refresh(cbr)
+
+    await create_history_entry_async(
+        db=db,
+        essai_id=essai.id,
+        user_id=current_user.id,
+        action="update",
+        comment=f"Enregistrement de presse CBR importé ({trace['nombre_echantillons']} échantillons)"
+    )
+
+    return cbr
+
+
+@router.get("/cbr/{essai_id}/trace")
+async def get_trace_presse_cbr(
+    essai_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Trace brute de la presse : paires (pénétration mm, force kN) en float32 little-endian"""
+    from app.models.essai import EssaiCBR as EssaiCBRModel
+
+    cbr = (await db.execute(
+        select(EssaiCBRModel).where(EssaiCBRModel.essai_id == essai_id)
+    )).scalar_one_or_none()
+    if not cbr or not cbr.fichier_trace:
+        raise HTTPException(status_code=404, detail="Aucune trace de presse pour cet essai")
+
+    return FileResponse(
+        cbr.fichier_trace,
+        media_type="application/octet-stream",
+        filename=f"essai_{essai_id}_presse.f32",
+        headers={"X-Nombre-Echantillons": str(cbr.nombre_echantillons or 0)},
+    )
+
+
+def _proctor_avec_courbe(proctor, courbe_points: int) -> EssaiProctor:
+    """Réponse Proctor avec la courbe régénérée depuis l'ajustement (0 = sans courbe)"""
+    reponse = EssaiProctor.model_validate(proctor)
+    if not courbe_points:
+        reponse.courbe_proctor = None
+    elif proctor.ajustement:
+        reponse.courbe_proctor = generer_courbe(proctor.ajustement, courbe_points)
+    return reponse
+
+
 @router.get("/proctor/", response_model=List[EssaiProctor])
 async def get_all_proctor(
-    db: Session = Depends(get_db),
+    courbe_points: int = Query(0, ge=0, le=1000, description="Résolution de la courbe Proctor (0 = sans courbe)"),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Récupère tous les essais Proctor"""
     from app.models.essai import EssaiProctor as EssaiProctorModel
-    proctors = db.query(EssaiProctorModel).all()
-    return proctors
+    proctors = (await db.execute(select(EssaiProctorModel))).scalars().all()
+    return [_proctor_avec_courbe(proctor, courbe_points) for proctor in proctors]
+
+
+@router.get("/proctor/{proctor_id}/courbe", response_model=List[Dict[str, float]])
+async def get_courbe_proctor(
+    proctor_id: int,
+    points: int = Query(100, ge=2, le=1000, description="Nombre de points de la courbe"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Courbe Proctor régénérée depuis l'ajustement stocké"""
+    from app.models.essai import EssaiProctor as EssaiProctorModel
+    proctor = await db.get(EssaiProctorModel, proctor_id)
+    if not proctor:
+        raise HTTPException(status_code=404, detail="Essai Proctor non trouvé")
+    if proctor.ajustement:
+        return generer_courbe(proctor.ajustement, points)
+    return proctor.courbe_proctor or []
 
 
 @router.post("/proctor/", response_model=EssaiProctor, status_code=status.HTTP_201_CREATED)
 async def create_proctor(
     proctor_data: EssaiProctorCreate,
-    db: Session = Depends(get_db),
+    courbe_points: int = Query(100, ge=0, le=1000, description="Résolution de la courbe Proctor (0 = sans courbe)"),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Crée un essai Proctor"""
     from app.models.essai import EssaiProctor as EssaiProctorModel
     
-    essai = db.query(Essai).filter(Essai.id == proctor_data.essai_id).first()
+    essai = await db.get(Essai, proctor_data.essai_id)
     if not essai:
         raise HTTPException(status_code=404, detail="Essai non trouvé")
     
@@ -532,32 +745,23 @@ async def create_proctor(
     proctor = EssaiProctorModel(
         essai_id=proctor_data.essai_id,
         type_proctor=proctor_data.type_proctor,
-        points_mesure=points_dict
+        points_mesure=points_dict,
+        modele_ajustement=proctor_data.modele_ajustement
     )
     
-    # Valider les données
-    validation = validate_essai("proctor", proctor)
-    if not validation["valid"]:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Erreurs de validation: {', '.join(validation['errors'])}"
-        )
-    
-    resultats = calculer_proctor(proctor)
-    for key, value in resultats.items():
-        setattr(proctor, key, value)
-    
-    # Ajouter les warnings de validation aux résultats
-    if validation["warnings"]:
-        resultats["_validation_warnings"] = validation["warnings"]
+    # Valider les données et calculer les résultats
+    try:
+        resultats = traiter_essai(TypeEssai.PROCTOR, proctor)
+    except ValidationError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
     db.add(proctor)
     essai.resultats = resultats
-    db.commit()
-    db.refresh(proctor)
+    await db.commit()
+    await db.refresh(proctor)
     
     # Créer entrée d'historique
-    create_history_entry(
+    await create_history_entry_async(
         db=db,
         essai_id=essai.id,
         user_id=current_user.id,
@@ -565,64 +769,49 @@ async def create_proctor(
         comment=f"Données Proctor ajoutées pour l'essai {essai.numero_essai}"
     )
     
-    return proctor
+    return _proctor_avec_courbe(proctor, courbe_points)
 
 
 @router.get("/granulometrie/", response_model=List[EssaiGranulometrie])
 async def get_all_granulometrie(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Récupère tous les essais de granulométrie"""
     from app.models.essai import EssaiGranulometrie as EssaiGranulometrieModel
-    granulometries = db.query(EssaiGranulometrieModel).all()
+    granulometries = (await db.execute(select(EssaiGranulometrieModel))).scalars().all()
     return granulometries
 
 
 @router.post("/granulometrie/", response_model=EssaiGranulometrie, status_code=status.HTTP_201_CREATED)
 async def create_granulometrie(
     granulometrie_data: EssaiGranulometrieCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Crée un essai de granulométrie"""
     from app.models.essai import EssaiGranulometrie as EssaiGranulometrieModel
     
-    essai = db.query(Essai).filter(Essai.id == granulometrie_data.essai_id).first()
+    essai = await db.get(Essai, granulometrie_data.essai_id)
     if not essai:
         raise HTTPException(status_code=404, detail="Essai non trouvé")
     
-    # Convertir les points en JSON
-    points_dict = [p.dict() if hasattr(p, 'dict') else p for p in granulometrie_data.points_tamisage or []]
-    
-    granulometrie = EssaiGranulometrieModel(
-        essai_id=granulometrie_data.essai_id,
-        points_tamisage=points_dict
-    )
-    
-    # Valider les données
-    validation = validate_essai("granulometrie", granulometrie)
-    if not validation["valid"]:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Erreurs de validation: {', '.join(validation['errors'])}"
-        )
-    
-    resultats = calculer_granulometrie(granulometrie)
-    for key, value in resultats.items():
-        setattr(granulometrie, key, value)
+    # Points de tamisage et lectures de sédimentométrie convertis en JSON
+    granulometrie = EssaiGranulometrieModel(**granulometrie_data.dict())
     
-    # Ajouter les warnings de validation aux résultats
-    if validation["warnings"]:
-        resultats["_validation_warnings"] = validation["warnings"]
+    # Valider les données et calculer les résultats
+    try:
+        resultats = traiter_essai(TypeEssai.GRANULOMETRIE, granulometrie)
+    except ValidationError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
     db.add(granulometrie)
     essai.resultats = resultats
-    db.commit()
-    db.refresh(granulometrie)
+    await db.commit()
+    await db.refresh(granulometrie)
     
     # Créer entrée d'historique
-    create_history_entry(
+    await create_history_entry_async(
         db=db,
         essai_id=essai.id,
         user_id=current_user.id,
@@ -632,3 +821,27 @@ async def create_granulometrie(
     
     return granulometrie
 
+
+@router.get("/granulometrie/{essai_id}/courbe")
+async def get_courbe_granulometrie(
+    essai_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Courbe granulométrique fusionnée (tamisage et sédimentométrie), monotone"""
+    from app.models.essai import EssaiGranulometrie as EssaiGranulometrieModel
+
+    granulometrie = (await db.execute(
+        select(EssaiGranulometrieModel).where(EssaiGranulometrieModel.essai_id == essai_id)
+    )).scalar_one_or_none()
+    if not granulometrie:
+        raise HTTPException(status_code=404, detail="Granulométrie non trouvée")
+
+    # Calcul sur une copie détachée : la lecture ne modifie pas l'essai stocké
+    copie = EssaiGranulometrieModel(**{
+        colonne.name: copy.deepcopy(getattr(granulometrie, colonne.name))
+        for colonne in EssaiGranulometrieModel.__table__.columns
+        if colonne.name != "id"
+    })
+    return courbe_granulometrique(copie)
+
@@ -4,7 +4,6 @@ Routes pour l'export de données (Excel, CSV)
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
 from typing import Optional, List
 from datetime import datetime
 import io
@@ -14,6 +13,8 @@ from app.core.database import get_db
 from app.core.deps import get_current_active_user
 from app.models.essai import Essai, TypeEssai, StatutEssai
 from app.models.user import User
+from app.services.chargement import charger
+from app.services.recherche import filtrer_recherche
 
 router = APIRouter()
 
@@ -37,7 +38,7 @@ def generate_csv_content(essais: List[Essai]) -> str:
             essai.numero_essai,
             essai.type_essai.value if essai.type_essai else '',
             essai.statut.value if essai.statut else '',
-            essai.projet or '',
+            essai.projet.nom if essai.projet else essai.projet_nom or '',
             essai.echantillon or '',
             essai.date_essai.isoformat() if essai.date_essai else '',
             essai.date_reception.isoformat() if essai.date_reception else '',
@@ -89,7 +90,7 @@ def generate_excel_content(essais: List[Essai]) -> bytes:
             essai.numero_essai,
             essai.type_essai.value if essai.type_essai else '',
             essai.statut.value if essai.statut else '',
-            essai.projet or '',
+            essai.projet.nom if essai.projet else essai.projet_nom or '',
             essai.echantillon or '',
             essai.date_essai.isoformat() if essai.date_essai else '',
             essai.date_reception.isoformat() if essai.date_reception else '',
@@ -129,7 +130,8 @@ async def export_essais_csv(
     current_user: User = Depends(get_current_active_user)
 ):
     """Exporte les essais en format CSV"""
-    query = db.query(Essai)
+    # Opérateur et projet chargés avec les essais
+    query = charger(db.query(Essai), "operateur", "projet")
     
     # Appliquer les filtres
     if type_essai:
@@ -137,13 +139,7 @@ async def export_essais_csv(
     if statut:
         query = query.filter(Essai.statut == statut)
     if search:
-        query = query.filter(
-            or_(
-                Essai.numero_essai.ilike(f"%{search}%"),
-                Essai.projet.ilike(f"%{search}%"),
-                Essai.echantillon.ilike(f"%{search}%")
-            )
-        )
+        query, _ = filtrer_recherche(query, search)
     if date_debut:
         query = query.filter(Essai.date_essai >= date_debut)
     if date_fin:
@@ -173,7 +169,8 @@ async def export_essais_excel(
     current_user: User = Depends(get_current_active_user)
 ):
     """Exporte les essais en format Excel"""
-    query = db.query(Essai)
+    # Opérateur et projet chargés avec les essais
+    query = charger(db.query(Essai), "operateur", "projet")
     
     # Appliquer les filtres
     if type_essai:
@@ -181,13 +178,7 @@ async def export_essais_excel(
     if statut:
         query = query.filter(Essai.statut == statut)
     if search:
-        query = query.filter(
-            or_(
-                Essai.numero_essai.ilike(f"%{search}%"),
-                Essai.projet.ilike(f"%{search}%"),
-                Essai.echantillon.ilike(f"%{search}%")
-            )
-        )
+        query, _ = filtrer_recherche(query, search)
     if date_debut:
         query = query.filter(Essai.date_essai >= date_debut)
     if date_fin:
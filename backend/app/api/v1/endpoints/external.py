@@ -9,6 +9,8 @@ from app.core.database import get_db
 from app.core.security import verify_api_key
 from app.models.essai import Essai, TypeEssai
 from app.schemas.essai import EssaiExport, EssaiImport
+from app.services.chargement import charger
+from app.services.traitement import importer_donnees_specifiques
 from app.schemas.external import (
     ExternalResponse,
     ExternalError,
@@ -30,7 +32,7 @@ async def list_essais(
     api_key: str = Depends(verify_api_key)
 ):
     """Liste les essais pour l'intégration externe"""
-    query = db.query(Essai)
+    query = charger(db.query(Essai), EssaiExport)
     
     if type_essai:
         query = query.filter(Essai.type_essai == type_essai)
@@ -55,43 +57,36 @@ async def import_essais(
         imported = []
         errors = []
         
+        # Essais déjà existants : une seule requête pour tout le lot
+        numeros = [essai_data.numero_essai for essai_data in essais]
+        existants = {
+            numero for (numero,) in db.query(Essai.numero_essai).filter(Essai.numero_essai.in_(numeros))
+        }
+        
+        nouveaux = []
         for essai_data in essais:
-            try:
-                # Vérifier si l'essai existe déjà
-                existing = db.query(Essai).filter(
-                    Essai.numero_essai == essai_data.numero_essai
-                ).first()
-                
-                if existing:
-                    errors.append(ExternalError(
-                        item_id=essai_data.numero_essai,
-                        error="Essai déjà existant"
-                    ))
-                    continue
-                
-                # Créer le nouvel essai
-                essai = Essai(**essai_data.dict())
-                db.add(essai)
-                db.flush()
-                
-                # Ajouter les données spécifiques selon le type d'essai
-                if essai_data.donnees_specifiques:
-                    if essai.type_essai == TypeEssai.ATTERBERG:
-                        essai.atterberg = EssaiAtterberg(**essai_data.donnees_specifiques)
-                    elif essai.type_essai == TypeEssai.PROCTOR:
-                        essai.proctor = EssaiProctor(**essai_data.donnees_specifiques)
-                    elif essai.type_essai == TypeEssai.CBR:
-                        essai.cbr = EssaiCBR(**essai_data.donnees_specifiques)
-                    elif essai.type_essai == TypeEssai.GRANULOMETRIE:
-                        essai.granulometrie = EssaiGranulometrie(**essai_data.donnees_specifiques)
-                
-                imported.append(essai.numero_essai)
-                
-            except Exception as e:
+            if essai_data.numero_essai in existants:
                 errors.append(ExternalError(
                     item_id=essai_data.numero_essai,
-                    error=str(e)
+                    error="Essai déjà existant"
                 ))
+                continue
+            existants.add(essai_data.numero_essai)
+            nouveaux.append(essai_data)
+        
+        # Créer les nouveaux essais ; les données spécifiques sont validées
+        # et calculées par lots, par le moteur de chaque type d'essai
+        essais_crees = [Essai(**essai_data.dict(exclude={"donnees_specifiques"})) for essai_data in nouveaux]
+        erreurs_import = importer_donnees_specifiques(
+            essais_crees, [essai_data.donnees_specifiques for essai_data in nouveaux]
+        )
+        
+        for essai, erreur in zip(essais_crees, erreurs_import):
+            if erreur is not None:
+                errors.append(ExternalError(item_id=essai.numero_essai, error=erreur))
+                continue
+            db.add(essai)
+            imported.append(essai.numero_essai)
         
         db.commit()
         
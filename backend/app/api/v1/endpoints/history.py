@@ -3,6 +3,7 @@ Routes pour l'historique des modifications (Audit Trail)
 """
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.core.deps import get_current_active_user
@@ -60,6 +61,13 @@ def create_history_entry(
     return history
 
 
+async def create_history_entry_async(db: AsyncSession, essai_id: int, user_id: int, action: str, **champs):
+    """Crée une entrée d'historique depuis une session asynchrone"""
+    return await db.run_sync(
+        lambda session: create_history_entry(session, essai_id, user_id, action, **champs)
+    )
+
+
 @router.get("/essais/{essai_id}/history", response_model=List[HistoryItem])
 async def get_essai_history(
     essai_id: int,
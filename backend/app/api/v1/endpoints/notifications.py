@@ -2,11 +2,12 @@
 Routes pour la gestion des notifications
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from datetime import datetime
 from typing import List, Optional
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.core.deps import get_current_active_user
 from app.models.notification import Notification, TypeNotification
 from app.models.user import User
@@ -19,6 +20,26 @@ from app.schemas.notification import (
 
 router = APIRouter()
 
+# Relations de NotificationRead, chargées avec la notification
+RELATIONS_NOTIFICATION = (joinedload(Notification.destinataire), joinedload(Notification.emetteur))
+
+
+async def _notification_utilisateur(db: AsyncSession, notification_id: int, user_id: int) -> Notification:
+    """Notification d'un destinataire ; 404 si elle n'existe pas ou ne lui est pas adressée"""
+    notification = (await db.execute(
+        select(Notification).options(*RELATIONS_NOTIFICATION).where(
+            Notification.id == notification_id,
+            Notification.destinataire_id == user_id
+        )
+    )).scalar_one_or_none()
+    
+    if not notification:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Notification non trouvée"
+        )
+    return notification
+
 
 @router.get("/", response_model=NotificationList)
 async def list_notifications(
@@ -26,39 +47,42 @@ async def list_notifications(
     type: Optional[TypeNotification] = Query(None, description="Filtrer par type de notification"),
     skip: int = 0,
     limit: int = 20,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Liste les notifications de l'utilisateur"""
-    query = db.query(Notification).filter(
+    conditions = [
         Notification.destinataire_id == current_user.id,
         Notification.archive == False
-    )
+    ]
     
     if non_lues is not None:
-        query = query.filter(Notification.lu == (not non_lues))
+        conditions.append(Notification.lu == (not non_lues))
     
     if type:
-        query = query.filter(Notification.type == type)
+        conditions.append(Notification.type == type)
     
-    total = query.count()
-    notifications = query.order_by(Notification.created_at.desc()).offset(skip).limit(limit).all()
+    total = await db.scalar(select(func.count(Notification.id)).where(*conditions))
+    notifications = (await db.execute(
+        select(Notification).options(*RELATIONS_NOTIFICATION).where(*conditions)
+        .order_by(Notification.created_at.desc()).offset(skip).limit(limit)
+    )).scalars().all()
     
     return {
         "total": total,
         "notifications": notifications,
-        "non_lues": db.query(Notification).filter(
+        "non_lues": await db.scalar(select(func.count(Notification.id)).where(
             Notification.destinataire_id == current_user.id,
             Notification.lu == False,
             Notification.archive == False
-        ).count()
+        ))
     }
 
 
 @router.post("/", response_model=NotificationRead)
 async def create_notification(
     notification: NotificationCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Crée une nouvelle notification"""
@@ -67,99 +91,77 @@ async def create_notification(
         emetteur_id=current_user.id
     )
     db.add(db_notification)
-    db.commit()
-    db.refresh(db_notification)
-    return db_notification
+    await db.commit()
+    return (await db.execute(
+        select(Notification).options(*RELATIONS_NOTIFICATION)
+        .where(Notification.id == db_notification.id)
+        .execution_options(populate_existing=True)
+    )).scalar_one()
 
 
 @router.put("/{notification_id}/lue", response_model=NotificationRead)
 async def marquer_comme_lue(
     notification_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Marque une notification comme lue"""
-    notification = db.query(Notification).filter(
-        Notification.id == notification_id,
-        Notification.destinataire_id == current_user.id
-    ).first()
-    
-    if not notification:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Notification non trouvée"
-        )
+    notification = await _notification_utilisateur(db, notification_id, current_user.id)
     
     notification.lu = True
     notification.date_lecture = datetime.now()
-    db.commit()
-    db.refresh(notification)
+    await db.commit()
+    await db.refresh(notification, ["updated_at"])
     return notification
 
 
 @router.put("/{notification_id}/non-lue", response_model=NotificationRead)
 async def marquer_comme_non_lue(
     notification_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Marque une notification comme non lue"""
-    notification = db.query(Notification).filter(
-        Notification.id == notification_id,
-        Notification.destinataire_id == current_user.id
-    ).first()
-    
-    if not notification:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Notification non trouvée"
-        )
+    notification = await _notification_utilisateur(db, notification_id, current_user.id)
     
     notification.lu = False
     notification.date_lecture = None
-    db.commit()
-    db.refresh(notification)
+    await db.commit()
+    await db.refresh(notification, ["updated_at"])
     return notification
 
 
 @router.put("/{notification_id}/archive", response_model=NotificationRead)
 async def archiver_notification(
     notification_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Archive une notification"""
-    notification = db.query(Notification).filter(
-        Notification.id == notification_id,
-        Notification.destinataire_id == current_user.id
-    ).first()
-    
-    if not notification:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Notification non trouvée"
-        )
+    notification = await _notification_utilisateur(db, notification_id, current_user.id)
     
     notification.archive = True
-    db.commit()
-    db.refresh(notification)
+    await db.commit()
+    await db.refresh(notification, ["updated_at"])
     return notification
 
 
 @router.put("/lire-tout")
 async def marquer_tout_comme_lu(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Marque toutes les notifications non lues comme lues"""
-    db.query(Notification).filter(
-        Notification.destinataire_id == current_user.id,
-        Notification.lu == False,
-        Notification.archive == False
-    ).update({
-        "lu": True,
-        "date_lecture": datetime.now()
-    })
+    await db.execute(
+        update(Notification).where(
+            Notification.destinataire_id == current_user.id,
+            Notification.lu == False,
+            Notification.archive == False
+        ).values(
+            lu=True,
+            date_lecture=datetime.now()
+        )
+    )
     
-    db.commit()
+    await db.commit()
     return {"message": "Toutes les notifications ont été marquées comme lues"}
@@ -8,6 +8,7 @@ from app.core.database import get_db
 from app.core.deps import get_current_active_user
 from app.models.essai import Essai
 from app.models.user import User
+from app.services.chargement import DONNEES_SPECIFIQUES, charger
 from app.utils.pdf_generator import generer_rapport_pdf
 
 router = APIRouter()
@@ -20,23 +21,16 @@ async def generer_rapport(
     current_user: User = Depends(get_current_active_user)
 ):
     """Génère et télécharge le rapport PDF d'un essai"""
-    essai = db.query(Essai).filter(Essai.id == essai_id).first()
+    # Relations utilisées par le rapport chargées avec l'essai
+    essai = charger(
+        db.query(Essai), "operateur", "projet", DONNEES_SPECIFIQUES, une_ligne=True
+    ).filter(Essai.id == essai_id).first()
     if not essai:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Essai non trouvé"
         )
     
-    # Charger les relations nécessaires
-    if essai.type_essai.value == "atterberg":
-        _ = essai.atterberg
-    elif essai.type_essai.value == "cbr":
-        _ = essai.cbr
-    elif essai.type_essai.value == "proctor":
-        _ = essai.proctor
-    elif essai.type_essai.value == "granulometrie":
-        _ = essai.granulometrie
-    
     # Générer le PDF
     pdf_buffer = generer_rapport_pdf(essai)
     
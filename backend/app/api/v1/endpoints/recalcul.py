@@ -0,0 +1,126 @@
+"""
+Routes pour le recalcul en masse des résultats d'essais (administrateurs)
+"""
+import logging
+from typing import Callable, List
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal, get_db
+from app.core.deps import get_current_active_superuser
+from app.models.projet import Projet
+from app.models.recalcul import RecalculJob, StatutRecalcul
+from app.models.user import User
+from app.schemas.recalcul import RecalculJob as RecalculJobSchema, RecalculJobCreate
+from app.services.recalcul import creer_recalcul, executer_recalcul
+
+router = APIRouter()
+logger = logging.getLogger("geolab")
+
+
+def _executer_en_tache_de_fond(job_id: int, session_factory: Callable[[], Session] = SessionLocal) -> None:
+    """
+    Exécute le travail dans le worker de l'API ; l'échec est journalisé et enregistré sur le travail
+
+    Le nombre de processus de calcul est borné par RECALCUL_PROCESSUS_API : les
+    gros recalculs passent par la ligne de commande (python -m app.services.recalcul).
+    """
+    try:
+        executer_recalcul(
+            job_id,
+            session_factory=session_factory,
+            processus=min(settings.RECALCUL_PROCESSUS, settings.RECALCUL_PROCESSUS_API)
+        )
+    except Exception as e:
+        logger.exception(f"Échec du recalcul {job_id}")
+        # Erreur avant le parcours des essais (démarrage du pool, base) : le travail reste sinon en cours
+        db = session_factory()
+        try:
+            job = db.get(RecalculJob, job_id)
+            if job is not None and job.statut != StatutRecalcul.ECHOUE:
+                job.statut = StatutRecalcul.ECHOUE
+                job.erreur = str(e)
+                db.commit()
+        finally:
+            db.close()
+
+
+@router.post("/", response_model=RecalculJobSchema, status_code=status.HTTP_202_ACCEPTED)
+async def lancer_recalcul(
+    perimetre: RecalculJobCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_superuser)
+):
+    """Lance le recalcul d'un projet, d'un type d'essai ou de toute la base"""
+    if perimetre.projet_id is not None:
+        if not db.query(Projet).filter(Projet.id == perimetre.projet_id).first():
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Projet non trouvé"
+            )
+
+    job = creer_recalcul(
+        db,
+        type_essai=perimetre.type_essai,
+        projet_id=perimetre.projet_id,
+        lance_par_id=current_user.id
+    )
+    background_tasks.add_task(_executer_en_tache_de_fond, job.id)
+    return job
+
+
+@router.get("/", response_model=List[RecalculJobSchema])
+async def list_recalculs(
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_superuser)
+):
+    """Liste les derniers travaux de recalcul"""
+    return db.query(RecalculJob).order_by(RecalculJob.id.desc()).limit(limit).all()
+
+
+@router.get("/{job_id}", response_model=RecalculJobSchema)
+async def get_recalcul(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_superuser)
+):
+    """Récupère l'état et la progression d'un travail de recalcul"""
+    job = db.query(RecalculJob).filter(RecalculJob.id == job_id).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Travail de recalcul non trouvé"
+        )
+    return job
+
+
+@router.post("/{job_id}/reprendre", response_model=RecalculJobSchema, status_code=status.HTTP_202_ACCEPTED)
+async def reprendre_recalcul(
+    job_id: int,
+    background_tasks: BackgroundTasks,
+    forcer: bool = Query(False, description="Reprendre un travail resté en cours (processus arrêté)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_superuser)
+):
+    """Reprend un travail interrompu à partir de son curseur persisté"""
+    job = db.query(RecalculJob).filter(RecalculJob.id == job_id).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Travail de recalcul non trouvé"
+        )
+    if job.statut == StatutRecalcul.TERMINE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ce travail de recalcul est déjà terminé"
+        )
+    if job.statut == StatutRecalcul.EN_COURS and not forcer:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Ce travail est en cours ; utilisez forcer=true s'il a été interrompu"
+        )
+
+    background_tasks.add_task(_executer_en_tache_de_fond, job.id)
+    return job
@@ -1,89 +1,67 @@
 """
 Routes pour les statistiques et analyses
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+import math
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract, case, and_, or_
-from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
-from statistics import mean, stdev, median
-from app.core.database import get_db
+from sqlalchemy import func, case
+from datetime import datetime
+from typing import Callable, Dict, Any, List, Optional
+from app.core.database import get_db, get_session_factory
 from app.core.deps import get_current_active_user
-from app.models.essai import Essai, TypeEssai, StatutEssai, EssaiProctor, EssaiCBR, EssaiAtterberg, EssaiGranulometrie
+from app.models.essai import Essai, TypeEssai, StatutEssai, EssaiProctor, EssaiCBR
 from app.models.user import User
-from app.models.projet import Projet
+from app.services.cache_statistiques import cache_statistiques, cle_statistiques
+from app.services.quantiles import quantiles_resultats
+from app.services.statistiques import (
+    COLONNES_DISTRIBUTION, classes_distribution, distributions_par_type,
+    statistiques_par_type, tableau_de_bord, tendances_mensuelles
+)
 from app.utils.pdf_generator import generer_rapport_statistiques
 
 router = APIRouter()
 
 
+def _en_session(session_factory: Callable[[], Session], calcul: Callable[[Session], Any]) -> Callable[[], Any]:
+    """
+    Calcul mis en cache, exécuté dans sa propre session
+
+    Le calcul peut se poursuivre après l'annulation de la requête qui l'a
+    lancé (voir cache_statistiques) : il n'utilise pas la session de celle-ci.
+    """
+    def calculer() -> Any:
+        db = session_factory()
+        try:
+            return calcul(db)
+        finally:
+            db.close()
+    return calculer
+
+
 @router.get("/dashboard")
 async def get_dashboard_stats(
-    db: Session = Depends(get_db),
+    session_factory: Callable[[], Session] = Depends(get_session_factory),
     current_user: User = Depends(get_current_active_user)
 ) -> Dict[str, Any]:
-    """Récupère les statistiques du tableau de bord"""
-    
-    # Nombre total d'essais
-    total_essais = db.query(func.count(Essai.id)).scalar()
-    
-    # Essais par type
-    essais_par_type = db.query(
-        Essai.type_essai,
-        func.count(Essai.id).label("count")
-    ).group_by(Essai.type_essai).all()
-    
-    # Essais par statut
-    essais_par_statut = db.query(
-        Essai.statut,
-        func.count(Essai.id).label("count")
-    ).group_by(Essai.statut).all()
-    
-    # Essais par mois (6 derniers mois)
-    six_mois_avant = datetime.now() - timedelta(days=180)
-    essais_par_mois = db.query(
-        extract('year', Essai.created_at).label("annee"),
-        extract('month', Essai.created_at).label("mois"),
-        func.count(Essai.id).label("count")
-    ).filter(
-        Essai.created_at >= six_mois_avant
-    ).group_by(
-        extract('year', Essai.created_at),
-        extract('month', Essai.created_at)
-    ).order_by(
-        extract('year', Essai.created_at).desc(),
-        extract('month', Essai.created_at).desc()
-    ).all()
-    
-    # Essais récents (7 derniers jours)
-    sept_jours_avant = datetime.now() - timedelta(days=7)
-    essais_recents = db.query(func.count(Essai.id)).filter(
-        Essai.created_at >= sept_jours_avant
-    ).scalar()
-    
-    return {
-        "total_essais": total_essais,
-        "essais_recents_7j": essais_recents,
-        "par_type": {t.value: c for t, c in essais_par_type},
-        "par_statut": {s.value: c for s, c in essais_par_statut},
-        "par_mois": [
-            {
-                "annee": int(a),
-                "mois": int(m),
-                "count": int(c)
-            }
-            for a, m, c in essais_par_mois
-        ]
-    }
+    """Récupère les statistiques du tableau de bord (compteurs journaliers)"""
+    return await cache_statistiques.obtenir(
+        "dashboard", cle_statistiques("dashboard"), _en_session(session_factory, tableau_de_bord)
+    )
 
 
 @router.get("/par-technicien")
 async def get_stats_par_technicien(
-    db: Session = Depends(get_db),
+    session_factory: Callable[[], Session] = Depends(get_session_factory),
     current_user: User = Depends(get_current_active_user)
 ) -> Dict[str, Any]:
     """Récupère les statistiques par technicien"""
-    
+    return await cache_statistiques.obtenir(
+        "par-technicien", cle_statistiques("par-technicien"), _en_session(session_factory, _stats_par_technicien)
+    )
+
+
+def _stats_par_technicien(db: Session) -> Dict[str, Any]:
+    """Nombre d'essais, essais validés et résultats moyens de chaque technicien"""
     stats = db.query(
         User.username,
         User.full_name,
@@ -133,100 +111,118 @@ async def get_stats_par_technicien(
         ]
     }
 
+
 @router.get("/{type_essai}")
 async def get_stats_par_type(
     type_essai: TypeEssai,
     date_debut: Optional[str] = None,
     date_fin: Optional[str] = None,
     projet_id: Optional[int] = None,
-    db: Session = Depends(get_db),
+    classes: int = Query(20, ge=1, le=200, description="Nombre de classes des histogrammes"),
+    bornes: Optional[str] = Query(
+        None, description="Bornes croissantes des classes, séparées par des virgules (remplace `classes`)"
+    ),
+    session_factory: Callable[[], Session] = Depends(get_session_factory),
     current_user: User = Depends(get_current_active_user)
 ) -> Dict[str, Any]:
-    """Récupère les statistiques détaillées par type d'essai"""
-    
-    query = db.query(Essai).filter(Essai.type_essai == type_essai)
-    
-    if date_debut:
-        query = query.filter(Essai.date_essai >= datetime.strptime(date_debut, "%Y-%m-%d"))
-    if date_fin:
-        query = query.filter(Essai.date_essai <= datetime.strptime(date_fin, "%Y-%m-%d"))
-    if projet_id:
-        query = query.filter(Essai.projet_id == projet_id)
-    
-    essais = query.all()
-    
-    if not essais:
+    """Récupère les statistiques détaillées par type d'essai (agrégées par la base)"""
+    debut = datetime.strptime(date_debut, "%Y-%m-%d") if date_debut else None
+    fin = datetime.strptime(date_fin, "%Y-%m-%d") if date_fin else None
+    limites = _lire_bornes(bornes) if bornes else None
+    
+    def calculer(db: Session) -> Optional[Dict[str, Any]]:
+        stats = statistiques_par_type(db, type_essai, debut, fin, projet_id)
+        if stats is not None:
+            # Histogrammes et percentiles ; la distribution affichée est celle du premier résultat
+            distributions = distributions_par_type(db, type_essai, debut, fin, projet_id, classes, limites)
+            stats["distributions"] = distributions
+            if distributions:
+                stats["distribution"] = classes_distribution(next(iter(distributions.values())))
+            # Calcul des tendances temporelles
+            stats["tendances"] = tendances_mensuelles(db, type_essai)
+        return stats
+    
+    cle = cle_statistiques(
+        "type", type_essai=type_essai, date_debut=debut and debut.date(), date_fin=fin and fin.date(),
+        projet_id=projet_id, classes=None if limites else classes,
+        bornes=limites and ",".join(repr(borne) for borne in limites)
+    )
+    stats = await cache_statistiques.obtenir("type", cle, _en_session(session_factory, calculer))
+    
+    if stats is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Aucun essai trouvé pour ces critères"
         )
     
-    stats = {
-        "nombre_total": len(essais),
-        "nombre_valides": len([e for e in essais if e.statut == StatutEssai.VALIDE]),
-        "distribution": [],
-        "tendances": []
-    }
-    
-    if type_essai == TypeEssai.PROCTOR:
-        densites = [e.proctor.densite_seche_max for e in essais if e.proctor and e.proctor.densite_seche_max]
-        if densites:
-            stats.update({
-                "densite_min": min(densites),
-                "densite_max": max(densites),
-                "densite_moyenne": mean(densites),
-                "densite_mediane": median(densites),
-                "densite_ecart_type": stdev(densites) if len(densites) > 1 else 0
-            })
-    
-    elif type_essai == TypeEssai.CBR:
-        cbrs = [e.cbr.cbr_final for e in essais if e.cbr and e.cbr.cbr_final]
-        if cbrs:
-            stats.update({
-                "cbr_min": min(cbrs),
-                "cbr_max": max(cbrs),
-                "cbr_moyen": mean(cbrs),
-                "cbr_median": median(cbrs),
-                "cbr_ecart_type": stdev(cbrs) if len(cbrs) > 1 else 0
-            })
-    
-    elif type_essai == TypeEssai.ATTERBERG:
-        wls = [e.atterberg.wl for e in essais if e.atterberg and e.atterberg.wl]
-        if wls:
-            stats.update({
-                "wl_min": min(wls),
-                "wl_max": max(wls),
-                "wl_moyen": mean(wls),
-                "wl_median": median(wls),
-                "wl_ecart_type": stdev(wls) if len(wls) > 1 else 0
-            })
-    
-    # Calcul des tendances temporelles
-    stats["tendances"] = db.query(
-        func.date_trunc('month', Essai.date_essai).label("mois"),
-        func.count(Essai.id).label("nombre")
-    ).filter(
-        Essai.type_essai == type_essai
-    ).group_by(
-        func.date_trunc('month', Essai.date_essai)
-    ).order_by(
-        func.date_trunc('month', Essai.date_essai)
-    ).all()
-    
     return stats
 
+
+def _lire_bornes(bornes: str) -> List[float]:
+    """Bornes des classes d'histogramme : au moins deux nombres finis strictement croissants"""
+    try:
+        limites = [float(borne) for borne in bornes.split(",")]
+    except ValueError:
+        limites = []
+    if len(limites) < 2 or not all(map(math.isfinite, limites)) or any(b <= a for a, b in zip(limites, limites[1:])):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Les bornes doivent être au moins deux nombres finis strictement croissants"
+        )
+    return limites
+
+@router.get("/{type_essai}/quantiles")
+async def get_quantiles(
+    type_essai: TypeEssai,
+    metrique: Optional[str] = Query(None, description="Colonne de résultat (la première du type par défaut)"),
+    projets: Optional[str] = Query(
+        None, description="Identifiants des projets, séparés par des virgules (tous par défaut, 0 : sans projet)"
+    ),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Dict[str, Any]:
+    """Percentiles approchés d'un résultat, fusionnés sur les esquisses (t-digest) des projets"""
+    colonnes = [colonne.key for colonne in COLONNES_DISTRIBUTION.get(type_essai, ())]
+    if not colonnes:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Aucun résultat suivi pour ce type d'essai"
+        )
+    metrique = metrique or colonnes[0]
+    if metrique not in colonnes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Résultat inconnu pour ce type d'essai (attendu : {', '.join(colonnes)})"
+        )
+    try:
+        projet_ids = [int(projet) for projet in projets.split(",")] if projets else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Les projets doivent être des identifiants séparés par des virgules"
+        )
+    
+    return {
+        "type_essai": type_essai,
+        "metrique": metrique,
+        **quantiles_resultats(db, type_essai, metrique, projet_ids),
+    }
+
 @router.get("/{type_essai}/export")
 async def export_statistiques(
     type_essai: TypeEssai,
     date_debut: Optional[str] = None,
     date_fin: Optional[str] = None,
     projet_id: Optional[int] = None,
-    db: Session = Depends(get_db),
+    session_factory: Callable[[], Session] = Depends(get_session_factory),
     current_user: User = Depends(get_current_active_user)
 ):
     """Exporte les statistiques au format PDF"""
     
-    stats = await get_stats_par_type(type_essai, date_debut, date_fin, projet_id, db, current_user)
+    stats = await get_stats_par_type(
+        type_essai, date_debut, date_fin, projet_id, classes=20, bornes=None,
+        session_factory=session_factory, current_user=current_user
+    )
     
     # Générer le PDF
     pdf_buffer = generer_rapport_statistiques(stats, type_essai)
@@ -5,6 +5,7 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.core.database import get_db
+from app.core.cache_utilisateurs import cache_utilisateurs
 from app.core.deps import get_current_active_user, require_role
 from app.models.user import User, UserRole
 from app.schemas.user import User as UserSchema, UserCreate, UserUpdate
@@ -73,14 +74,17 @@ async def update_user(
     # Mise à jour des champs
     update_data = user_update.dict(exclude_unset=True)
     if "password" in update_data:
-        from app.core.security import get_password_hash
-        update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
+        from app.core.security import get_password_hash_async
+        update_data["hashed_password"] = await get_password_hash_async(update_data.pop("password"))
     
     for field, value in update_data.items():
         setattr(user, field, value)
     
     db.commit()
     db.refresh(user)
+    
+    # Rôle, état actif ou nom modifiés : le principal en cache est périmé
+    cache_utilisateurs.invalider(user_id)
     return user
 
 
@@ -100,5 +104,6 @@ async def delete_user(
     
     db.delete(user)
     db.commit()
+    cache_utilisateurs.invalider(user_id)
     return None
 
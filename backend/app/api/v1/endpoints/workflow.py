@@ -1,7 +1,8 @@
 """
 Routes pour la gestion du workflow de validation
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 from datetime import datetime
@@ -16,14 +17,16 @@ from app.models.workflow import (
 )
 from app.models.notification import Notification, TypeNotification
 from app.models.user import User, UserRole
-from app.models.essai import Essai, StatutEssai
+from app.models.essai import Essai, StatutEssai, TypeEssai
 from app.schemas.workflow import (
     WorkflowCreate,
     WorkflowUpdate,
     WorkflowRead,
     CritereValidationCreate,
-    CritereValidationRead
+    CritereValidationRead,
+    CritereValidationUpdate
 )
+from app.services.criteres import cache_criteres, etag_correspond, lister_criteres
 
 router = APIRouter()
 
@@ -224,20 +227,24 @@ async def list_validations_en_attente(
 
 @router.get("/criteres", response_model=List[CritereValidationRead])
 async def list_criteres_validation(
-    type_essai: Optional[str] = None,
+    type_essai: Optional[TypeEssai] = None,
     niveau: Optional[NiveauValidation] = None,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Liste les critères de validation"""
-    query = db.query(CritereValidation)
-    
-    if type_essai:
-        query = query.filter(CritereValidation.type_essai == type_essai)
-    if niveau:
-        query = query.filter(CritereValidation.niveau_validation == niveau)
-    
-    return query.all()
+    """
+    Liste les critères de validation
+
+    Servis depuis le cache versionné des critères, avec un ETag : un client
+    qui renvoie l'ETag reçu dans If-None-Match obtient 304 tant que les
+    critères n'ont pas changé.
+    """
+    etag, criteres = lister_criteres(db, type_essai.value if type_essai else None, niveau)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_correspond(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return JSONResponse(content=criteres, headers=headers)
 
 
 @router.post("/criteres", response_model=CritereValidationRead)
@@ -251,4 +258,29 @@ async def create_critere_validation(
     db.add(db_critere)
     db.commit()
     db.refresh(db_critere)
+    cache_criteres.invalider()
+    return db_critere
+
+
+@router.put("/criteres/{critere_id}", response_model=CritereValidationRead)
+async def update_critere_validation(
+    critere_id: int,
+    critere_update: CritereValidationUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_superuser)
+):
+    """Met à jour un critère de validation"""
+    db_critere = db.query(CritereValidation).filter(CritereValidation.id == critere_id).first()
+    if not db_critere:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Critère de validation non trouvé"
+        )
+    
+    for field, value in critere_update.dict(exclude_unset=True).items():
+        setattr(db_critere, field, value)
+    
+    db.commit()
+    db.refresh(db_critere)
+    cache_criteres.invalider()
     return db_critere
@@ -0,0 +1,139 @@
+"""
+Cache des utilisateurs authentifiés (principaux)
+
+get_current_user est appelé par chaque requête authentifiée : le tableau de
+bord en lance une quinzaine en parallèle au chargement. Les colonnes de
+l'utilisateur (sans le hash du mot de passe) sont gardées par identifiant,
+settings.CACHE_UTILISATEURS_TTL secondes au plus, dans un cache LRU borné à
+settings.CACHE_UTILISATEURS_TAILLE entrées. Chaque requête reçoit sa propre
+instance transitoire de User, reconstruite depuis ces colonnes.
+
+La modification ou la suppression d'un utilisateur (routes /users) invalide
+son entrée dans le processus ; les autres processus la relisent au plus tard
+à l'expiration du TTL.
+
+Avec settings.JWT_CLAIMS_UTILISATEUR, le rôle, l'état actif et le nom sont
+aussi embarqués dans le token : une requête s'authentifie alors sans lecture
+de la base, même à froid. Un token émis avant l'invalidation de l'utilisateur
+dans le processus n'est plus cru sur parole ; dans les autres processus, un
+changement de rôle ou une désactivation ne s'applique qu'à l'expiration des
+tokens déjà émis (settings.ACCESS_TOKEN_EXPIRE_MINUTES).
+"""
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.models.user import User, UserRole
+
+# Colonnes du principal : tout sauf le hash du mot de passe
+COLONNES_PRINCIPAL = tuple(
+    colonne.key for colonne in User.__table__.columns if colonne.key != "hashed_password"
+)
+
+
+class CacheUtilisateurs:
+    """Colonnes des utilisateurs authentifiés par identifiant (TTL court, LRU borné)"""
+
+    def __init__(self, ttl: float, taille: int):
+        self.ttl = ttl
+        self.taille = taille
+        self.version = 0
+        self._entrees: "OrderedDict[int, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # Instant (horloge murale) de la dernière invalidation de chaque utilisateur
+        self._invalidations: Dict[int, float] = {}
+        self._lock = Lock()
+
+    def get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Colonnes de l'utilisateur si l'entrée est encore fraîche"""
+        with self._lock:
+            entree = self._entrees.get(user_id)
+            if entree is None:
+                return None
+            if time.monotonic() - entree[0] > self.ttl:
+                del self._entrees[user_id]
+                return None
+            self._entrees.move_to_end(user_id)
+            return entree[1]
+
+    def put(self, user_id: int, version: int, valeurs: Dict[str, Any]) -> None:
+        """Ajoute les colonnes lues avec la version donnée (ignorées si une invalidation a eu lieu depuis)"""
+        with self._lock:
+            if version != self.version:
+                return
+            self._entrees[user_id] = (time.monotonic(), valeurs)
+            self._entrees.move_to_end(user_id)
+            while len(self._entrees) > self.taille:
+                self._entrees.popitem(last=False)
+
+    def invalider(self, user_id: int) -> None:
+        """Oublie l'utilisateur et refuse les claims des tokens émis avant maintenant"""
+        maintenant = time.time()
+        with self._lock:
+            self.version += 1
+            self._entrees.pop(user_id, None)
+            self._invalidations[user_id] = maintenant
+            # Au-delà de la durée de vie d'un token, l'invalidation n'a plus d'effet
+            limite = maintenant - settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+            for identifiant in [i for i, instant in self._invalidations.items() if instant < limite]:
+                del self._invalidations[identifiant]
+
+    def emis_avant_invalidation(self, user_id: int, emis_le: Optional[float]) -> bool:
+        """Vrai si un token émis à cet instant précède la dernière invalidation de l'utilisateur"""
+        with self._lock:
+            instant = self._invalidations.get(user_id)
+        return instant is not None and (emis_le is None or emis_le <= instant)
+
+    def vider(self) -> None:
+        """Vide le cache et l'historique des invalidations"""
+        with self._lock:
+            self.version += 1
+            self._entrees.clear()
+            self._invalidations.clear()
+
+
+cache_utilisateurs = CacheUtilisateurs(settings.CACHE_UTILISATEURS_TTL, settings.CACHE_UTILISATEURS_TAILLE)
+
+
+def colonnes_principal(user: User) -> Dict[str, Any]:
+    """Colonnes de l'utilisateur gardées dans le cache"""
+    return {colonne: getattr(user, colonne) for colonne in COLONNES_PRINCIPAL}
+
+
+def claims_utilisateur(user: User) -> Dict[str, Any]:
+    """Claims du token d'un utilisateur ("sub", plus rôle, état et nom si activés)"""
+    claims: Dict[str, Any] = {"sub": str(user.id)}  # JWT exige que "sub" soit une string
+    if settings.JWT_CLAIMS_UTILISATEUR:
+        claims.update({
+            "role": user.role.value,
+            "actif": bool(user.is_active),
+            "username": user.username,
+            "nom": user.full_name,
+        })
+    return claims
+
+
+def principal_depuis_claims(user_id: int, payload: Dict[str, Any]) -> Optional[User]:
+    """
+    Utilisateur reconstruit depuis les claims du token, sans lecture de la base
+
+    None si les claims sont désactivés, absents ou antérieurs à une
+    invalidation de l'utilisateur. Seuls l'identifiant, le rôle, l'état et le
+    nom sont renseignés.
+    """
+    if not settings.JWT_CLAIMS_UTILISATEUR or "role" not in payload or "actif" not in payload:
+        return None
+    if cache_utilisateurs.emis_avant_invalidation(user_id, payload.get("iat")):
+        return None
+    try:
+        role = UserRole(payload["role"])
+    except ValueError:
+        return None
+    return User(
+        id=user_id,
+        username=payload.get("username"),
+        full_name=payload.get("nom"),
+        role=role,
+        is_active=bool(payload["actif"]),
+    )
@@ -3,7 +3,7 @@ Configuration de l'application
 """
 from pydantic_settings import BaseSettings
 from pydantic import Field
-from typing import List
+from typing import List, Tuple
 from functools import cached_property
 
 
@@ -17,6 +17,18 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "change-me-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Hachage des mots de passe : coût bcrypt (les hash d'un autre coût sont
+    # recalculés à la connexion), threads dédiés et file d'attente maximale
+    BCRYPT_ROUNDS: int = 12
+    HACHAGE_THREADS: int = 4
+    HACHAGE_FILE_MAX: int = 64
+    
+    # Rôle, état actif et nom embarqués dans le token (authentification sans lecture de la base)
+    JWT_CLAIMS_UTILISATEUR: bool = False
+    
+    # Cache des utilisateurs authentifiés (secondes avant relecture, nombre d'entrées)
+    CACHE_UTILISATEURS_TTL: int = 30
+    CACHE_UTILISATEURS_TAILLE: int = 1024
     
     # CORS - stocké comme chaîne dans .env, converti en liste via la propriété
     # Utilise Field avec alias pour mapper CORS_ORIGINS du .env vers CORS_ORIGINS_STR
@@ -25,16 +37,74 @@ class Settings(BaseSettings):
         alias="CORS_ORIGINS"
     )
     
+    # Rate limiting : politiques "préfixe=requêtes/secondes" séparées par des
+    # virgules (le préfixe le plus long s'applique), chemins exemptés, et
+    # nombre maximal de clés (client, politique) suivies en mémoire
+    RATE_LIMIT_POLITIQUES_STR: str = Field(
+        default="/api/v1/auth=100/60,/api/v1/export=200/60,/=1000/60",
+        alias="RATE_LIMIT_POLITIQUES"
+    )
+    RATE_LIMIT_EXEMPTIONS_STR: str = Field(
+        default="/health,/,/docs,/redoc,/openapi.json",
+        alias="RATE_LIMIT_EXEMPTIONS"
+    )
+    RATE_LIMIT_MAX_CLES: int = 100000
+    # Compteurs : memory:// (par processus), sqlite:///chemin (workers d'une
+    # machine) ou redis://hôte:port/base (toutes les machines)
+    RATE_LIMIT_STOCKAGE: str = "memory://"
+    
     # Application
     PROJECT_NAME: str = "GeoLab Manager"
     API_V1_STR: str = "/api/v1"
     
+    # Création d'essais par lot (POST /essais/bulk) : nombre maximal d'essais par requête
+    ESSAIS_LOT_MAX: int = 1000
+    
+    # Recalcul en masse des essais
+    RECALCUL_TAILLE_LOT: int = 500  # Essais par lot (yield_per et UPDATE groupés)
+    RECALCUL_PROCESSUS: int = 2  # Processus de calcul (1 = calcul dans le processus courant)
+    RECALCUL_PROCESSUS_API: int = 1  # Plafond pour les travaux lancés par l'API (dans un worker HTTP)
+    
+    # Mémoïsation des calculs (nombre d'entrées du cache LRU)
+    CACHE_CALCULS_TAILLE: int = 1024
+    
+    # Cache des critères de validation (secondes avant relecture, pour les autres processus)
+    CACHE_CRITERES_TTL: int = 300
+    
+    # Cache des réponses de statistiques (secondes avant recalcul, pour les
+    # écritures des autres processus ; nombre d'entrées du cache LRU)
+    CACHE_STATISTIQUES_TTL: int = 60
+    CACHE_STATISTIQUES_TAILLE: int = 256
+    
+    # Compression des esquisses de quantiles (t-digest) : de l'ordre du nombre de centroïdes
+    QUANTILES_COMPRESSION: int = 100
+    
+    # Modules de moteurs d'essais supplémentaires, séparés par des virgules
+    MOTEURS_ESSAIS: str = ""
+    
     @cached_property
     def CORS_ORIGINS(self) -> List[str]:
         """Parse CORS_ORIGINS depuis une chaîne séparée par des virgules"""
         origins = [origin.strip() for origin in self.CORS_ORIGINS_STR.split(',') if origin.strip()]
         return origins if origins else ["http://localhost:3000"]
     
+    @cached_property
+    def RATE_LIMIT_POLITIQUES(self) -> List[Tuple[str, int, int]]:
+        """Parse RATE_LIMIT_POLITIQUES en (préfixe, requêtes, secondes)"""
+        politiques = []
+        for politique in self.RATE_LIMIT_POLITIQUES_STR.split(','):
+            if not politique.strip():
+                continue
+            prefixe, limite = politique.strip().rsplit('=', 1)
+            requetes, secondes = limite.split('/')
+            politiques.append((prefixe.strip(), int(requetes), int(secondes)))
+        return politiques
+    
+    @cached_property
+    def RATE_LIMIT_EXEMPTIONS(self) -> List[str]:
+        """Parse RATE_LIMIT_EXEMPTIONS depuis une chaîne séparée par des virgules"""
+        return [chemin.strip() for chemin in self.RATE_LIMIT_EXEMPTIONS_STR.split(',') if chemin.strip()]
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
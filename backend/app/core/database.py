@@ -1,11 +1,21 @@
 """
 Configuration de la base de données SQLAlchemy
+
+Deux moteurs partagent la même base : le moteur synchrone (scripts, migrations,
+routes encore synchrones) et le moteur asynchrone des routes les plus
+sollicitées (essais, notifications, authentification), dont les requêtes
+n'immobilisent pas la boucle d'événements du worker.
 """
 from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
+# Pilote asynchrone de chaque dialecte
+PILOTES_ASYNCHRONES = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
@@ -18,6 +28,27 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def url_asynchrone(url: str) -> URL:
+    """URL de la base avec le pilote asynchrone du dialecte (asyncpg, aiosqlite)"""
+    url = make_url(url)
+    dialecte = url.get_backend_name()
+    if dialecte not in PILOTES_ASYNCHRONES:
+        raise ValueError(f"Aucun pilote asynchrone pour le dialecte: {dialecte}")
+    return url.set(drivername=f"{dialecte}+{PILOTES_ASYNCHRONES[dialecte]}")
+
+
+async_engine = create_async_engine(
+    url_asynchrone(settings.DATABASE_URL),
+    pool_pre_ping=True,
+    pool_size=10,
+    max_overflow=20
+)
+
+# Sans expiration au commit : un attribut lu après commit ne déclenche pas de
+# chargement implicite (interdit hors de la boucle asynchrone)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
 def get_db():
     """Dépendance pour obtenir une session de base de données"""
     db = SessionLocal()
@@ -26,3 +57,19 @@ def get_db():
     finally:
         db.close()
 
+
+def get_session_factory() -> sessionmaker:
+    """
+    Dépendance pour obtenir la fabrique de sessions
+
+    Pour les calculs qui peuvent survivre à la requête (cache des statistiques) :
+    ils ouvrent et ferment leur propre session au lieu d'utiliser celle de la
+    requête, fermée dès que celle-ci se termine ou est annulée.
+    """
+    return SessionLocal
+
+
+async def get_async_db():
+    """Dépendance pour obtenir une session de base de données asynchrone"""
+    async with AsyncSessionLocal() as db:
+        yield db
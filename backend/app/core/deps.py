@@ -4,9 +4,10 @@ Dépendances FastAPI (authentification, autorisation)
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError
-from app.core.database import get_db
+from app.core.cache_utilisateurs import cache_utilisateurs, colonnes_principal, principal_depuis_claims
+from app.core.database import get_async_db
 from app.core.security import decode_access_token
 from app.models.user import User, UserRole
 from app.schemas.user import User as UserSchema
@@ -16,9 +17,14 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/login")
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
-    """Récupère l'utilisateur actuel depuis le token JWT"""
+    """
+    Récupère l'utilisateur actuel depuis le token JWT
+
+    L'utilisateur est lu dans le cache des principaux, ou reconstruit depuis
+    les claims du token s'ils sont activés ; la base n'est lue qu'à défaut.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Impossible de valider les identifiants",
@@ -42,10 +48,20 @@ async def get_current_user(
     except (ValueError, TypeError):
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == user_id).first()
+    # Principal en cache, ou décrit par les claims du token : pas de lecture de la base
+    valeurs = cache_utilisateurs.get(user_id)
+    if valeurs is not None:
+        return User(**valeurs)
+    principal = principal_depuis_claims(user_id, payload)
+    if principal is not None:
+        return principal
+    
+    version = cache_utilisateurs.version
+    user = await db.get(User, user_id)
     if user is None:
         raise credentials_exception
     
+    cache_utilisateurs.put(user_id, version, colonnes_principal(user))
     return user
 
 
@@ -41,6 +41,54 @@ users_total = Gauge(
     ['role']
 )
 
+# Hachage des mots de passe (bcrypt, exécuté hors de la boucle d'événements)
+password_hash_queue_depth = Gauge(
+    'password_hash_queue_depth',
+    'Password hashing operations waiting for a worker thread'
+)
+
+password_hash_in_progress = Gauge(
+    'password_hash_in_progress',
+    'Password hashing operations running'
+)
+
+password_hash_duration_seconds = Histogram(
+    'password_hash_duration_seconds',
+    'Password hashing duration in seconds (queue wait excluded)',
+    ['operation'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+password_hash_rejected_total = Counter(
+    'password_hash_rejected_total',
+    'Password hashing operations rejected because the queue was full',
+    ['operation']
+)
+
+password_rehash_total = Counter(
+    'password_rehash_total',
+    'Password hashes upgraded at login after a cost change'
+)
+
+# Cache des réponses de statistiques
+statistics_cache_requests_total = Counter(
+    'statistics_cache_requests_total',
+    'Statistics cache lookups (hit, stale, miss, coalesced)',
+    ['endpoint', 'result']
+)
+
+statistics_cache_recompute_duration_seconds = Histogram(
+    'statistics_cache_recompute_duration_seconds',
+    'Statistics recomputation duration in seconds',
+    ['endpoint'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+statistics_cache_invalidations_total = Counter(
+    'statistics_cache_invalidations_total',
+    'Statistics cache invalidations after a committed write to essais'
+)
+
 
 def record_request(method: str, endpoint: str, status_code: int, duration: float):
     """Enregistre une requête HTTP"""
@@ -1,15 +1,20 @@
 """
 Utilitaires de sécurité (JWT, hashage de mots de passe, clés API)
 """
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from threading import Lock
+from typing import Any, Callable, Optional
 from jose import JWTError, jwt
 import bcrypt
 import secrets
 from fastapi import HTTPException, Security, Depends
 from fastapi.security.api_key import APIKeyHeader
-from starlette.status import HTTP_403_FORBIDDEN
+from starlette.status import HTTP_403_FORBIDDEN, HTTP_503_SERVICE_UNAVAILABLE
 from sqlalchemy.orm import Session
+from app.core import prometheus_metrics as metriques
 from app.core.config import settings
 from app.core.database import get_db
 from app.models.api_key import APIKey
@@ -34,11 +39,84 @@ def get_password_hash(password: str) -> str:
     # Bcrypt limite les mots de passe à 72 bytes
     password_bytes = _truncate_password(password)
     # Générer le salt et hasher
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Vrai si le hash n'a pas été calculé avec le coût bcrypt configuré"""
+    try:
+        _, variante, cout, _ = hashed_password.split("$", 3)
+        return variante != "2b" or int(cout) != settings.BCRYPT_ROUNDS
+    except ValueError:
+        return True
+
+
+class ExecuteurHachage:
+    """
+    Pool borné de threads pour bcrypt (~250 ms de CPU par opération)
+
+    Le hachage s'exécute hors de la boucle d'événements (bcrypt relâche le
+    GIL) ; au plus `threads` opérations tournent en parallèle. Au-delà de
+    `file_max` opérations en attente, les nouvelles sont refusées (503) plutôt
+    que d'allonger indéfiniment la file.
+    """
+
+    def __init__(self, threads: int, file_max: int):
+        self.file_max = file_max
+        self._executeur = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="bcrypt")
+        self._en_attente = 0
+        self._lock = Lock()
+
+    @property
+    def en_attente(self) -> int:
+        """Opérations soumises qui attendent un thread"""
+        return self._en_attente
+
+    async def executer(self, operation: str, fonction: Callable[..., Any], *args: Any) -> Any:
+        """Exécute fonction(*args) dans le pool et attend son résultat"""
+        with self._lock:
+            if self._en_attente >= self.file_max:
+                metriques.password_hash_rejected_total.labels(operation=operation).inc()
+                raise HTTPException(
+                    status_code=HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Trop d'authentifications en cours, veuillez réessayer",
+                    headers={"Retry-After": "1"}
+                )
+            self._en_attente += 1
+            metriques.password_hash_queue_depth.set(self._en_attente)
+
+        def tache():
+            with self._lock:
+                self._en_attente -= 1
+                metriques.password_hash_queue_depth.set(self._en_attente)
+            metriques.password_hash_in_progress.inc()
+            debut = time.perf_counter()
+            try:
+                return fonction(*args)
+            finally:
+                metriques.password_hash_in_progress.dec()
+                metriques.password_hash_duration_seconds.labels(operation=operation).observe(
+                    time.perf_counter() - debut
+                )
+
+        return await asyncio.get_running_loop().run_in_executor(self._executeur, tache)
+
+
+executeur_hachage = ExecuteurHachage(settings.HACHAGE_THREADS, settings.HACHAGE_FILE_MAX)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Vérifie un mot de passe sans bloquer la boucle d'événements"""
+    return await executeur_hachage.executer("verify", verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash un mot de passe sans bloquer la boucle d'événements"""
+    return await executeur_hachage.executer("hash", get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Crée un token JWT"""
     to_encode = data.copy()
@@ -47,7 +125,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
@@ -2,6 +2,7 @@
 Données initiales pour les critères de validation
 """
 from app.models.workflow import CritereValidation, NiveauValidation
+from app.services.criteres import cache_criteres
 
 CRITERES_VALIDATION = [
     # Critères pour les essais Atterberg
@@ -137,3 +138,4 @@ def seed_criteres_validation(db):
         critere = CritereValidation(**critere_data)
         db.add(critere)
     db.commit()
+    cache_criteres.invalider()
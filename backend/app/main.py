@@ -1,10 +1,11 @@
 """
 Application principale FastAPI pour GeoLab Manager
 """
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from app.core.config import settings
+from app.core.database import async_engine
 from app.core.logging_config import setup_logging
 from app.core.exceptions import (
     GeoLabException,
@@ -12,17 +13,19 @@ from app.core.exceptions import (
     http_exception_handler,
     general_exception_handler
 )
-from app.middleware.rate_limit import rate_limit_middleware
-from app.middleware.security import security_middleware
-from app.middleware.logging import LoggingMiddleware
+from app.middleware.asgi import GeoLabMiddleware
 from app.core.health import router as health_router
 from app.api.v1.api import api_router
+from app.services.registre import charger_moteurs
 import logging
 
 # Configuration du logging
 setup_logging()
 logger = logging.getLogger("geolab")
 
+# Moteurs de calcul des types d'essais, résolus une fois au démarrage
+charger_moteurs()
+
 app = FastAPI(
     title="GeoLab Manager API",
     description="API pour la gestion des essais géotechniques",
@@ -31,9 +34,6 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
-# Middleware de logging
-app.add_middleware(LoggingMiddleware)
-
 # Configuration CORS
 app.add_middleware(
     CORSMiddleware,
@@ -41,18 +41,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"],
     allow_headers=["*"],
-    expose_headers=["X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset", "X-Process-Time"]
+    expose_headers=["X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset", "X-Process-Time", "X-Next-Cursor"]
 )
 
-# Middleware de rate limiting
-@app.middleware("http")
-async def rate_limit(request: Request, call_next):
-    return await rate_limit_middleware(request, call_next)
-
-# Middleware de sécurité
-@app.middleware("http")
-async def security(request: Request, call_next):
-    return await security_middleware(request, call_next)
+# Logging, rate limiting et headers de sécurité (middleware ASGI, ajouté en
+# dernier : il enveloppe CORS et s'applique aussi aux réponses 429)
+app.add_middleware(GeoLabMiddleware)
 
 # Gestionnaires d'exceptions
 app.add_exception_handler(GeoLabException, exception_handler)
@@ -65,6 +59,12 @@ app.include_router(health_router, tags=["health"])
 app.include_router(api_router, prefix="/api/v1")
 
 
+@app.on_event("shutdown")
+async def fermer_connexions():
+    """Ferme les connexions du moteur asynchrone"""
+    await async_engine.dispose()
+
+
 @app.get("/")
 async def root():
     """Endpoint racine"""
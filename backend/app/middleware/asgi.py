@@ -0,0 +1,132 @@
+"""
+Middleware ASGI de l'application : logging, rate limiting et headers de sécurité
+
+Un seul middleware ASGI pur, sans BaseHTTPMiddleware : la requête n'est pas
+recopiée dans une tâche ni la réponse dans un flux intermédiaire. Les headers
+(rate limit, sécurité, X-Process-Time) sont ajoutés au message
+http.response.start, et le corps est transmis tel quel : les réponses en flux
+(exports CSV, rapports) partent au fil de leur production.
+"""
+import logging
+import time
+from typing import List, Optional, Tuple
+
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.middleware.rate_limit import verifier_rate_limit
+from app.middleware.security import NOMS_SECURITY_HEADERS, security_headers
+
+logger = logging.getLogger("geolab")
+
+# Headers posés par le middleware : une valeur déjà présente est remplacée
+NOMS_REMPLACES = NOMS_SECURITY_HEADERS | {
+    b"x-ratelimit-limit", b"x-ratelimit-remaining", b"x-ratelimit-reset", b"retry-after", b"x-process-time"
+}
+
+
+def _header(scope: Scope, nom: bytes) -> Optional[str]:
+    """Valeur d'un header de la requête (None si absent)"""
+    for cle, valeur in scope["headers"]:
+        if cle == nom:
+            return valeur.decode("latin-1")
+    return None
+
+
+class GeoLabMiddleware:
+    """Logging des requêtes, rate limiting et headers de sécurité en un passage"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        method = scope["method"]
+        path = scope["path"]
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+        journaliser = logger.isEnabledFor(logging.INFO)
+
+        # Logger la requête entrante
+        if journaliser:
+            logger.info(
+                f"Request: {method} {path}",
+                extra={
+                    "method": method,
+                    "path": path,
+                    "client_ip": client_ip,
+                    "user_agent": _header(scope, b"user-agent") or "unknown",
+                    "referer": _header(scope, b"referer")
+                }
+            )
+
+        entetes: List[Tuple[bytes, bytes]] = list(security_headers(scope["scheme"]))
+        limite = await verifier_rate_limit(scope)
+        application = self.app
+        if limite is not None:
+            is_allowed, entetes_limite = limite
+            entetes.extend(entetes_limite)
+            if not is_allowed:
+                application = Response(
+                    content='{"detail": "Rate limit exceeded. Please try again later."}',
+                    status_code=429,
+                    media_type="application/json"
+                )
+
+        status_code = 500
+
+        async def envoyer(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = [
+                    (nom, valeur) for nom, valeur in message.get("headers", ())
+                    if nom.lower() not in NOMS_REMPLACES
+                ]
+                headers.extend(entetes)
+                # Temps de traitement jusqu'à l'envoi des headers
+                headers.append((b"x-process-time", f"{time.perf_counter() - start_time:.4f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await application(scope, receive, envoyer)
+        except Exception as e:
+            # Logger l'erreur
+            logger.error(
+                f"Request failed: {method} {path}",
+                extra={
+                    "method": method,
+                    "path": path,
+                    "client_ip": client_ip,
+                    "user_id": self._user_id(scope),
+                    "process_time_ms": round((time.perf_counter() - start_time) * 1000, 2),
+                    "error": str(e)
+                },
+                exc_info=True
+            )
+            raise
+
+        # Logger la réponse (corps entièrement envoyé)
+        if journaliser:
+            logger.info(
+                f"Response: {method} {path} - {status_code}",
+                extra={
+                    "method": method,
+                    "path": path,
+                    "status_code": status_code,
+                    "client_ip": client_ip,
+                    "user_id": self._user_id(scope),
+                    "process_time_ms": round((time.perf_counter() - start_time) * 1000, 2)
+                }
+            )
+
+    @staticmethod
+    def _user_id(scope: Scope):
+        """ID de l'utilisateur authentifié, s'il a été posé dans request.state"""
+        user = scope.get("state", {}).get("user")
+        return getattr(user, "id", None)
@@ -1,138 +1,170 @@
 """
 Rate limiting middleware pour protection DDoS
+
+Compteur à fenêtre glissante : pour chaque clé (client, politique), seuls le
+numéro de la fenêtre courante et les compteurs des fenêtres courante et
+précédente sont gardés. Le nombre de requêtes sur la dernière période est
+estimé en pondérant la fenêtre précédente par la part qui chevauche encore la
+période : coût et mémoire constants par requête, quel que soit le débit.
+Les compteurs sont tenus par le stockage de settings.RATE_LIMIT_STOCKAGE
+(voir stockage_rate_limit) : en mémoire du processus par défaut (LRU borné à
+settings.RATE_LIMIT_MAX_CLES clés), dans un fichier SQLite ou un serveur Redis
+pour partager la limite entre les workers.
+
+Les limites par route sont déclarées dans settings.RATE_LIMIT_POLITIQUES.
 """
-from fastapi import Request, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
-from typing import Dict, Tuple
-from datetime import datetime, timedelta
+import logging
+import math
 import time
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+from app.middleware.stockage_rate_limit import StockageMemoire, creer_stockage
+
+logger = logging.getLogger(__name__)
+
+
+class Politique(NamedTuple):
+    """Limite de requêtes des chemins commençant par un préfixe"""
+    prefixe: str
+    max_requests: int
+    window_seconds: int
 
 
 class RateLimiter:
-    """Rate limiter simple en mémoire (pour production, utiliser Redis)"""
-    
-    def __init__(self):
-        self.requests: Dict[str, list] = {}
-        self.cleanup_interval = timedelta(minutes=5)
-        self.last_cleanup = datetime.now()
-    
-    def _cleanup_old_entries(self):
-        """Nettoie les entrées anciennes"""
-        if datetime.now() - self.last_cleanup < self.cleanup_interval:
-            return
-        
-        current_time = time.time()
-        for key in list(self.requests.keys()):
-            self.requests[key] = [
-                req_time for req_time in self.requests[key]
-                if current_time - req_time < 60  # Garder seulement les 60 dernières secondes
-            ]
-            if not self.requests[key]:
-                del self.requests[key]
-        
-        self.last_cleanup = datetime.now()
-    
-    def _get_client_identifier(self, request: Request) -> str:
-        """Identifie le client (IP ou user ID)"""
+    """Rate limiter à fenêtre glissante, compteurs tenus par un stockage interchangeable"""
+
+    def __init__(
+        self,
+        max_keys: int = 100000,
+        politiques: Optional[List[Tuple[str, int, int]]] = None,
+        stockage: Optional[Any] = None
+    ):
+        self.max_keys = max_keys
+        self.stockage = stockage if stockage is not None else StockageMemoire(max_keys)
+        # Préfixes les plus longs d'abord : le plus spécifique s'applique
+        self.politiques = sorted(
+            (Politique(*politique) for politique in (politiques or [])),
+            key=lambda politique: len(politique.prefixe),
+            reverse=True
+        )
+
+    def _get_client_identifier(self, scope) -> str:
+        """Identifie le client (IP ou user ID) d'un scope ASGI"""
         # En production, utiliser l'IP réelle (derrière proxy)
-        forwarded_for = request.headers.get("X-Forwarded-For")
-        if forwarded_for:
-            return f"ip_{forwarded_for.split(',')[0].strip()}"
-        return f"ip_{request.client.host if request.client else 'unknown'}"
-    
-    def is_allowed(
-        self, 
-        identifier: str, 
-        max_requests: int = 100, 
-        window_seconds: int = 60
+        for nom, valeur in scope["headers"]:
+            if nom == b"x-forwarded-for":
+                return f"ip_{valeur.decode('latin-1').split(',')[0].strip()}"
+        client = scope.get("client")
+        return f"ip_{client[0] if client else 'unknown'}"
+
+    def politique(self, path: str) -> Optional[Politique]:
+        """Politique du préfixe le plus long qui correspond au chemin (None : pas de limite)"""
+        for politique in self.politiques:
+            if path.startswith(politique.prefixe):
+                return politique
+        return None
+
+    async def is_allowed(
+        self,
+        identifier: str,
+        max_requests: int = 100,
+        window_seconds: int = 60,
+        now: Optional[float] = None
     ) -> Tuple[bool, int, int]:
         """
         Vérifie si la requête est autorisée
-        
+
         Returns:
             (is_allowed, remaining, reset_time)
         """
-        self._cleanup_old_entries()
-        
-        current_time = time.time()
-        cutoff_time = current_time - window_seconds
-        
-        # Filtrer les requêtes dans la fenêtre
-        if identifier not in self.requests:
-            self.requests[identifier] = []
-        
-        self.requests[identifier] = [
-            req_time for req_time in self.requests[identifier]
-            if req_time > cutoff_time
-        ]
-        
-        # Compter les requêtes
-        request_count = len(self.requests[identifier])
-        
-        if request_count >= max_requests:
-            return False, 0, int(cutoff_time + window_seconds)
-        
-        # Ajouter la requête actuelle
-        self.requests[identifier].append(current_time)
-        
-        remaining = max_requests - request_count - 1
-        reset_time = int(current_time + window_seconds)
-        
+        current_time = time.time() if now is None else now
+        fenetre = int(current_time // window_seconds)
+        debut_fenetre = fenetre * window_seconds
+        # Part de la fenêtre précédente qui chevauche encore la période glissante
+        poids = 1.0 - (current_time - debut_fenetre) / window_seconds
+
+        # La requête est comptée d'abord (un seul aller-retour atomique avec le
+        # stockage), puis décomptée si elle est refusée : deux workers ne peuvent
+        # pas accepter ensemble la dernière requête autorisée
+        courantes, precedentes = await self.stockage.compter(identifier, fenetre, window_seconds)
+        courantes -= 1
+        estimation = precedentes * poids + courantes
+
+        if estimation + 1 > max_requests:
+            await self.stockage.decompter(identifier, fenetre)
+            return False, 0, int(math.ceil(self._liberation(
+                current_time, debut_fenetre, window_seconds, max_requests, courantes, precedentes
+            )))
+
+        remaining = max(0, int(max_requests - estimation - 1))
+        reset_time = int(debut_fenetre + window_seconds)
         return True, remaining, reset_time
 
+    @staticmethod
+    def _liberation(
+        current_time: float,
+        debut_fenetre: float,
+        window_seconds: int,
+        max_requests: int,
+        courantes: int,
+        precedentes: int
+    ) -> float:
+        """Instant à partir duquel une requête refusée serait de nouveau acceptée"""
+        fin_fenetre = debut_fenetre + window_seconds
+        if courantes + 1 > max_requests:
+            # La fenêtre courante est pleine à elle seule : attendre qu'elle devienne la précédente
+            if max_requests <= 1:
+                return fin_fenetre + window_seconds
+            return fin_fenetre + window_seconds * (1.0 - (max_requests - 1) / courantes)
+        # Attendre que le poids de la fenêtre précédente ait assez décru
+        return debut_fenetre + window_seconds * (1.0 - (max_requests - 1 - courantes) / precedentes)
+
 
 # Instance globale
-rate_limiter = RateLimiter()
+rate_limiter = RateLimiter(
+    settings.RATE_LIMIT_MAX_CLES,
+    settings.RATE_LIMIT_POLITIQUES,
+    creer_stockage(settings.RATE_LIMIT_STOCKAGE, settings.RATE_LIMIT_MAX_CLES)
+)
 
 
-async def rate_limit_middleware(request: Request, call_next):
+async def verifier_rate_limit(scope) -> Optional[Tuple[bool, List[Tuple[bytes, bytes]]]]:
     """
-    Middleware de rate limiting
-    
-    Limites par défaut:
-    - 100 requêtes/minute pour les endpoints généraux
-    - 10 requêtes/minute pour l'authentification
-    - 20 requêtes/minute pour les exports
+    Rate limiting d'une requête HTTP (scope ASGI)
+
+    Les limites par préfixe de chemin sont celles de settings.RATE_LIMIT_POLITIQUES
+    (par défaut : 100 requêtes/minute pour l'authentification, 200 pour les
+    exports, 1000 pour le reste de l'API) ; chaque politique a son propre
+    compteur par client.
+
+    Returns:
+        None si la requête n'est pas limitée, sinon (is_allowed, headers de
+        rate limit à ajouter à la réponse)
     """
+    path = scope["path"]
+    politique = rate_limiter.politique(path)
     # Ignorer les health checks
-    if request.url.path in ["/health", "/", "/docs", "/redoc", "/openapi.json"]:
-        return await call_next(request)
-    
-    identifier = rate_limiter._get_client_identifier(request)
-    
-    # Limites différentes selon le type d'endpoint
-    if request.url.path.startswith("/api/v1/auth"):
-        max_requests = 100
-        window = 60
-    elif request.url.path.startswith("/api/v1/export"):
-        max_requests = 200
-        window = 60
-    else:
-        max_requests = 1000
-        window = 60
-    
-    is_allowed, remaining, reset_time = rate_limiter.is_allowed(
-        identifier, max_requests, window
-    )
-    
-    if not is_allowed:
-        response = Response(
-            content='{"detail": "Rate limit exceeded. Please try again later."}',
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            media_type="application/json"
+    if path in settings.RATE_LIMIT_EXEMPTIONS or politique is None:
+        return None
+
+    identifier = f"{rate_limiter._get_client_identifier(scope)}|{politique.prefixe}"
+    max_requests = politique.max_requests
+
+    try:
+        is_allowed, remaining, reset_time = await rate_limiter.is_allowed(
+            identifier, max_requests, politique.window_seconds
         )
-        response.headers["X-RateLimit-Limit"] = str(max_requests)
-        response.headers["X-RateLimit-Remaining"] = "0"
-        response.headers["X-RateLimit-Reset"] = str(reset_time)
-        response.headers["Retry-After"] = str(reset_time - int(time.time()))
-        return response
-    
-    response = await call_next(request)
-    
-    # Ajouter les headers de rate limit
-    response.headers["X-RateLimit-Limit"] = str(max_requests)
-    response.headers["X-RateLimit-Remaining"] = str(remaining)
-    response.headers["X-RateLimit-Reset"] = str(reset_time)
-    
-    return response
+    except Exception as e:
+        # Stockage indisponible (Redis arrêté, fichier verrouillé) : la requête passe
+        logger.error(f"Rate limiting indisponible: {e}")
+        return None
+
+    headers = [
+        (b"x-ratelimit-limit", str(max_requests).encode()),
+        (b"x-ratelimit-remaining", str(remaining).encode()),
+        (b"x-ratelimit-reset", str(reset_time).encode()),
+    ]
+    if not is_allowed:
+        headers.append((b"retry-after", str(max(1, reset_time - int(time.time()))).encode()))
+    return is_allowed, headers
@@ -1,38 +1,41 @@
 """
 Security middleware pour headers de sécurité
 """
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
+from typing import List, Tuple
 
+# Content Security Policy (CSP) - ajuster selon les besoins
+CSP = (
+    "default-src 'self'; "
+    "script-src 'self' 'unsafe-inline' 'unsafe-eval'; "
+    "style-src 'self' 'unsafe-inline'; "
+    "img-src 'self' data: https:; "
+    "font-src 'self' data:; "
+    "connect-src 'self'; "
+    "frame-ancestors 'none';"
+)
 
-async def security_middleware(request: Request, call_next):
+# Headers ASGI (nom en minuscules, valeur), encodés une fois pour toutes
+SECURITY_HEADERS: List[Tuple[bytes, bytes]] = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+    (b"permissions-policy", b"geolocation=(), microphone=(), camera=()"),
+    (b"content-security-policy", CSP.encode("latin-1")),
+]
+
+# HSTS (HTTP Strict Transport Security) - seulement en HTTPS
+HSTS_HEADER: Tuple[bytes, bytes] = (b"strict-transport-security", b"max-age=31536000; includeSubDomains")
+
+NOMS_SECURITY_HEADERS = frozenset(nom for nom, _ in SECURITY_HEADERS) | {HSTS_HEADER[0]}
+
+
+def security_headers(scheme: str) -> List[Tuple[bytes, bytes]]:
     """
-    Ajoute les headers de sécurité HTTP
+    Headers de sécurité HTTP d'une réponse
+
+    Remplacent les headers de même nom éventuellement posés par la route.
     """
-    response: Response = await call_next(request)
-    
-    # Security headers
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-    response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
-    
-    # HSTS (HTTP Strict Transport Security) - seulement en HTTPS
-    if request.url.scheme == "https":
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-    
-    # Content Security Policy (CSP) - ajuster selon les besoins
-    csp = (
-        "default-src 'self'; "
-        "script-src 'self' 'unsafe-inline' 'unsafe-eval'; "
-        "style-src 'self' 'unsafe-inline'; "
-        "img-src 'self' data: https:; "
-        "font-src 'self' data:; "
-        "connect-src 'self'; "
-        "frame-ancestors 'none';"
-    )
-    response.headers["Content-Security-Policy"] = csp
-    
-    return response
+    if scheme == "https":
+        return SECURITY_HEADERS + [HSTS_HEADER]
+    return SECURITY_HEADERS
@@ -0,0 +1,175 @@
+"""
+Stockage des compteurs du rate limiter
+
+Le rate limiter compte les requêtes de chaque clé (client, politique) par
+fenêtre de temps numérotée. Le stockage est choisi par
+settings.RATE_LIMIT_STOCKAGE :
+
+- memory:// (défaut) : dictionnaire LRU borné, propre à chaque processus ;
+- sqlite:///chemin : fichier partagé par les workers d'une même machine
+  (par exemple sous /dev/shm) ;
+- redis://hôte:port/base : compteurs partagés par toutes les machines, avec
+  tout serveur parlant le protocole Redis.
+
+Chaque appel à compter incrémente le compteur de la fenêtre et lit celui de
+la fenêtre précédente en un seul aller-retour atomique (transaction SQLite,
+MULTI/EXEC Redis) : la limite tient quel que soit le nombre de workers.
+Les appels SQLite (bloquants) s'exécutent dans un thread, avec une attente
+de verrou courte : un fichier trop disputé lève une erreur et la requête
+passe (voir verifier_rate_limit) au lieu de bloquer la boucle d'événements.
+"""
+import asyncio
+import sqlite3
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy.engine import make_url
+
+
+class StockageMemoire:
+    """Compteurs en mémoire du processus : état de taille fixe par clé, LRU borné"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        # clé -> [numéro de fenêtre, requêtes de la fenêtre, requêtes de la fenêtre précédente]
+        self.compteurs: "OrderedDict[str, List[int]]" = OrderedDict()
+        self._lock = Lock()
+
+    async def compter(self, cle: str, fenetre: int, window_seconds: int) -> Tuple[int, int]:
+        """Compte une requête ; retourne (requêtes de la fenêtre, requêtes de la précédente)"""
+        with self._lock:
+            compteur = self.compteurs.get(cle)
+            if compteur is None:
+                compteur = self.compteurs[cle] = [fenetre, 0, 0]
+                if len(self.compteurs) > self.max_keys:
+                    self.compteurs.popitem(last=False)
+            else:
+                self.compteurs.move_to_end(cle)
+                if compteur[0] != fenetre:
+                    # Fenêtre suivante : la courante devient la précédente ; au-delà, tout est expiré
+                    compteur[2] = compteur[1] if compteur[0] == fenetre - 1 else 0
+                    compteur[1] = 0
+                    compteur[0] = fenetre
+            compteur[1] += 1
+            return compteur[1], compteur[2]
+
+    async def decompter(self, cle: str, fenetre: int) -> None:
+        """Retire une requête refusée du compteur de la fenêtre"""
+        with self._lock:
+            compteur = self.compteurs.get(cle)
+            if compteur is not None and compteur[0] == fenetre and compteur[1] > 0:
+                compteur[1] -= 1
+
+
+class StockageSQLite:
+    """Compteurs dans un fichier SQLite partagé par les processus d'une machine"""
+
+    # Compteurs expirés supprimés tous les PURGE_APPELS appels
+    PURGE_APPELS = 1000
+
+    def __init__(self, chemin: str, timeout: float = 0.05):
+        # Attente maximale (secondes) du verrou du processus puis de celui du fichier
+        self.timeout = timeout
+        # Création du fichier au démarrage : attente longue tolérée entre workers
+        self._connexion = sqlite3.connect(chemin, timeout=5, isolation_level=None, check_same_thread=False)
+        self._connexion.execute("PRAGMA journal_mode=WAL")
+        self._connexion.execute("PRAGMA synchronous=NORMAL")
+        self._connexion.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit ("
+            "cle TEXT NOT NULL, fenetre INTEGER NOT NULL, compte INTEGER NOT NULL, "
+            "expire_a REAL NOT NULL, PRIMARY KEY (cle, fenetre)) WITHOUT ROWID"
+        )
+        self._connexion.execute(f"PRAGMA busy_timeout = {int(timeout * 1000)}")
+        self._appels = 0
+        self._lock = Lock()
+
+    async def compter(self, cle: str, fenetre: int, window_seconds: int) -> Tuple[int, int]:
+        """Compte une requête ; retourne (requêtes de la fenêtre, requêtes de la précédente)"""
+        return await asyncio.to_thread(self._compter, cle, fenetre, window_seconds)
+
+    async def decompter(self, cle: str, fenetre: int) -> None:
+        """Retire une requête refusée du compteur de la fenêtre"""
+        await asyncio.to_thread(self._decompter, cle, fenetre)
+
+    def _verrouiller(self) -> None:
+        if not self._lock.acquire(timeout=self.timeout):
+            raise sqlite3.OperationalError("Compteurs de rate limiting occupés")
+
+    def _compter(self, cle: str, fenetre: int, window_seconds: int) -> Tuple[int, int]:
+        maintenant = time.time()
+        self._verrouiller()
+        try:
+            curseur = self._connexion.cursor()
+            curseur.execute("BEGIN IMMEDIATE")
+            try:
+                courantes = curseur.execute(
+                    "INSERT INTO rate_limit (cle, fenetre, compte, expire_a) VALUES (?, ?, 1, ?) "
+                    "ON CONFLICT (cle, fenetre) DO UPDATE SET compte = compte + 1 RETURNING compte",
+                    (cle, fenetre, maintenant + 2 * window_seconds),
+                ).fetchone()[0]
+                precedente = curseur.execute(
+                    "SELECT compte FROM rate_limit WHERE cle = ? AND fenetre = ?", (cle, fenetre - 1)
+                ).fetchone()
+                self._appels += 1
+                if self._appels % self.PURGE_APPELS == 0:
+                    curseur.execute("DELETE FROM rate_limit WHERE expire_a < ?", (maintenant,))
+                curseur.execute("COMMIT")
+            except BaseException:
+                curseur.execute("ROLLBACK")
+                raise
+        finally:
+            self._lock.release()
+        return courantes, precedente[0] if precedente else 0
+
+    def _decompter(self, cle: str, fenetre: int) -> None:
+        self._verrouiller()
+        try:
+            self._connexion.execute(
+                "UPDATE rate_limit SET compte = compte - 1 WHERE cle = ? AND fenetre = ? AND compte > 0",
+                (cle, fenetre),
+            )
+        finally:
+            self._lock.release()
+
+
+class StockageRedis:
+    """Compteurs partagés dans un serveur parlant le protocole Redis"""
+
+    def __init__(self, url: Optional[str] = None, client: Optional[Any] = None, prefixe: str = "rate_limit"):
+        if client is None:
+            import redis.asyncio as redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefixe = prefixe
+
+    def _cle(self, cle: str, fenetre: int) -> str:
+        return f"{self.prefixe}:{cle}:{fenetre}"
+
+    async def compter(self, cle: str, fenetre: int, window_seconds: int) -> Tuple[int, int]:
+        """Compte une requête ; retourne (requêtes de la fenêtre, requêtes de la précédente)"""
+        courante = self._cle(cle, fenetre)
+        # MULTI/EXEC : incrément, expiration et lecture en un aller-retour atomique
+        async with self.client.pipeline(transaction=True) as pipeline:
+            pipeline.incr(courante)
+            pipeline.expire(courante, 2 * window_seconds)
+            pipeline.get(self._cle(cle, fenetre - 1))
+            courantes, _, precedentes = await pipeline.execute()
+        return int(courantes), int(precedentes or 0)
+
+    async def decompter(self, cle: str, fenetre: int) -> None:
+        """Retire une requête refusée du compteur de la fenêtre"""
+        await self.client.decr(self._cle(cle, fenetre))
+
+
+def creer_stockage(url: str, max_keys: int = 100000) -> Any:
+    """Stockage désigné par une URL memory://, sqlite:///chemin ou redis://hôte:port/base"""
+    schema = url.split("://", 1)[0] if "://" in url else url
+    if schema in ("memory", "memoire"):
+        return StockageMemoire(max_keys)
+    if schema == "sqlite":
+        return StockageSQLite(make_url(url).database or ":memory:")
+    if schema in ("redis", "rediss", "unix"):
+        return StockageRedis(url)
+    raise ValueError(f"Stockage de rate limiting inconnu: {url}")
@@ -4,7 +4,10 @@ from app.models.essai import Essai, EssaiAtterberg, EssaiCBR, EssaiProctor, Essa
 from app.models.history import EssaiHistory
 from app.models.template import EssaiTemplate
 from app.models.projet import Projet
+from app.models.recherche import EssaiRecherche
+from app.models.compteurs import EssaiCompteurJour
+from app.models.quantiles import EsquisseQuantiles
 from app.core.database import Base
 
-__all__ = ["User", "Essai", "EssaiAtterberg", "EssaiCBR", "EssaiProctor", "EssaiGranulometrie", "EssaiHistory", "EssaiTemplate", "Projet", "Base"]
+__all__ = ["User", "Essai", "EssaiAtterberg", "EssaiCBR", "EssaiProctor", "EssaiGranulometrie", "EssaiHistory", "EssaiTemplate", "Projet", "EssaiRecherche", "EssaiCompteurJour", "EsquisseQuantiles", "Base"]
 
@@ -0,0 +1,28 @@
+"""
+Compteurs journaliers des essais (table de cumul du tableau de bord)
+
+Une ligne par jour de création et par (type, statut, projet, opérateur) :
+le nombre d'essais correspondants. Le tableau de bord agrège cette table
+(quelques lignes par jour) au lieu de parcourir la table des essais. Les
+essais sans projet sont comptés sous projet_id = 0.
+"""
+from sqlalchemy import Column, Date, Enum, Integer
+from app.core.database import Base
+from app.models.essai import StatutEssai, TypeEssai
+
+# projet_id des essais sans projet (la clé primaire n'admet pas NULL)
+SANS_PROJET = 0
+
+
+class EssaiCompteurJour(Base):
+    """Nombre d'essais créés un jour donné, par type, statut, projet et opérateur"""
+    __tablename__ = "essais_compteurs_jour"
+
+    jour = Column(Date, primary_key=True)
+    type_essai = Column(Enum(TypeEssai), primary_key=True)
+    statut = Column(Enum(StatutEssai), primary_key=True)
+    projet_id = Column(Integer, primary_key=True, default=SANS_PROJET)
+    operateur_id = Column(Integer, primary_key=True)
+    # Premier jour du mois de `jour`
+    mois = Column(Date, nullable=False)
+    nombre = Column(Integer, nullable=False, default=0)
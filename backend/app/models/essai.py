@@ -1,7 +1,7 @@
 """
 Modèles pour les essais géotechniques
 """
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Text, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Text, JSON, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -28,6 +28,10 @@ class StatutEssai(str, enum.Enum):
 class Essai(Base):
     """Modèle de base pour un essai géotechnique"""
     __tablename__ = "essais"
+    __table_args__ = (
+        # Pagination par curseur : ORDER BY created_at DESC, id DESC
+        Index("ix_essais_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     numero_essai = Column(String, unique=True, index=True, nullable=False)
@@ -106,6 +110,9 @@ class EssaiAtterberg(Base):
     
     # Classification
     classification = Column(String, nullable=True)  # Classification selon norme
+    
+    # Empreinte des données mesurées et de la version du moteur de calcul
+    hash_calcul = Column(String(64), nullable=True)
 
 
 class EssaiCBR(Base):
@@ -126,6 +133,10 @@ class EssaiCBR(Base):
     # Données de pénétration (plusieurs points pour la courbe)
     points_penetration = Column(JSON, nullable=True)  # [{penetration_mm, force_kN}]
     
+    # Enregistrement de presse : trace brute (float32 pénétration/force) et nombre d'échantillons
+    fichier_trace = Column(String, nullable=True)
+    nombre_echantillons = Column(Integer, nullable=True)
+    
     # Forces mesurées
     force_25mm = Column(Float, nullable=True)  # Force à 2.5mm (kN)
     force_50mm = Column(Float, nullable=True)  # Force à 5.0mm (kN)
@@ -144,6 +155,9 @@ class EssaiCBR(Base):
     
     # Classification
     classe_portance = Column(String, nullable=True)  # Classification selon CBR
+    
+    # Empreinte des données mesurées et de la version du moteur de calcul
+    hash_calcul = Column(String(64), nullable=True)
 
 
 class EssaiProctor(Base):
@@ -181,8 +195,15 @@ class EssaiProctor(Base):
     densite_humide_max = Column(Float, nullable=True)  # Densité humide maximale (g/cm³)
     saturation_optimale = Column(Float, nullable=True)  # Degré de saturation à l'optimum (%)
     
-    # Courbe Proctor (données pour graphique)
+    # Ajustement de la courbe Proctor
+    modele_ajustement = Column(String, default="poly2", nullable=True)  # poly2, poly3 ou spline
+    ajustement = Column(JSON, nullable=True)  # Coefficients ou nœuds, domaine, r2, rmse, optimum
+    
+    # Courbe Proctor (ancien format, régénérée désormais depuis l'ajustement)
     courbe_proctor = Column(JSON, nullable=True)  # Points pour la courbe complète
+    
+    # Empreinte des données mesurées et de la version du moteur de calcul
+    hash_calcul = Column(String(64), nullable=True)
 
 
 class EssaiGranulometrie(Base):
@@ -206,9 +227,14 @@ class EssaiGranulometrie(Base):
     points_tamisage = Column(JSON, nullable=True)  # [{tamis, masse_retenu, pourcentage_retenu, pourcentage_passant, pourcentage_cumule}]
     
     # Sédimentométrie (si applicable)
-    points_sedimentometrie = Column(JSON, nullable=True)  # [{temps_min, hauteur_cm, diametre_mm, pourcentage_passant}]
+    points_sedimentometrie = Column(JSON, nullable=True)  # [{temps_min, hauteur_cm, lecture, diametre_mm, pourcentage_passant}]
     temperature_sedimentometrie = Column(Float, nullable=True)  # °C
     viscosite_dynamique = Column(Float, nullable=True)  # Pa.s
+    masse_seche_sedimentometrie = Column(Float, nullable=True)  # Masse sèche mise en suspension (g)
+    volume_suspension = Column(Float, nullable=True)  # Volume de la suspension (cm³), 1000 par défaut
+    masse_volumique_particules = Column(Float, nullable=True)  # ρs (g/cm³), 2.65 par défaut
+    correction_lecture = Column(Float, nullable=True)  # Correction des lectures du densimètre (g/cm³)
+    diametre_coupure_mm = Column(Float, nullable=True)  # Tamis de la fraction mise en suspension (mm), 0.08 par défaut
     
     # Résultats calculés
     d10 = Column(Float, nullable=True)  # Diamètre à 10% de passant (mm)
@@ -227,4 +253,7 @@ class EssaiGranulometrie(Base):
     pourcentage_sable = Column(Float, nullable=True)  # % de sable (0.063-2mm)
     pourcentage_limon = Column(Float, nullable=True)  # % de limon (0.002-0.063mm)
     pourcentage_argile = Column(Float, nullable=True)  # % d'argile (<0.002mm)
+    
+    # Empreinte des données mesurées et de la version du moteur de calcul
+    hash_calcul = Column(String(64), nullable=True)
 
@@ -0,0 +1,24 @@
+"""
+Esquisses de quantiles des résultats d'essais (t-digest)
+
+Une ligne par projet, type d'essai et colonne de résultat : les centroïdes
+(moyenne, poids) d'un t-digest des valeurs, avec leur nombre, minimum et
+maximum. Les esquisses de plusieurs projets se fusionnent à la lecture. Les
+essais sans projet sont regroupés sous projet_id = 0 (SANS_PROJET).
+"""
+from sqlalchemy import JSON, Column, Enum, Float, Integer, String
+from app.core.database import Base
+from app.models.essai import TypeEssai
+
+
+class EsquisseQuantiles(Base):
+    """t-digest des valeurs d'un résultat, pour un projet et un type d'essai"""
+    __tablename__ = "esquisses_quantiles"
+
+    projet_id = Column(Integer, primary_key=True)
+    type_essai = Column(Enum(TypeEssai), primary_key=True)
+    metrique = Column(String(64), primary_key=True)  # Colonne de résultat (cbr_final, densite_seche_max, ...)
+    nombre = Column(Integer, nullable=False)
+    minimum = Column(Float, nullable=False)
+    maximum = Column(Float, nullable=False)
+    centroides = Column(JSON, nullable=False)  # [[moyenne, poids], ...] triés par moyenne
@@ -0,0 +1,55 @@
+"""
+Modèle pour les travaux de recalcul en masse des essais
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+import enum
+from app.core.database import Base
+
+
+class StatutRecalcul(str, enum.Enum):
+    """Statuts d'un travail de recalcul"""
+    EN_ATTENTE = "en_attente"
+    EN_COURS = "en_cours"
+    TERMINE = "termine"
+    ECHOUE = "echoue"
+
+
+class RecalculJob(Base):
+    """Travail de recalcul des résultats d'essais (projet, type ou base entière)"""
+    __tablename__ = "recalcul_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    statut = Column(Enum(StatutRecalcul), default=StatutRecalcul.EN_ATTENTE, nullable=False)
+
+    # Périmètre (None = tous)
+    type_essai = Column(String, nullable=True)  # atterberg, cbr, proctor, granulometrie
+    projet_id = Column(Integer, ForeignKey("projets.id"), nullable=True)
+
+    # Progression
+    total = Column(Integer, default=0, nullable=False)  # Nombre d'essais à recalculer
+    traites = Column(Integer, default=0, nullable=False)  # Nombre d'essais recalculés
+
+    # Curseur persisté : type en cours et dernier identifiant traité
+    type_courant = Column(String, nullable=True)
+    dernier_id = Column(Integer, default=0, nullable=False)
+
+    erreur = Column(Text, nullable=True)
+
+    # Lanceur
+    lance_par_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    lance_par = relationship("User", foreign_keys=[lance_par_id])
+
+    # Métadonnées
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    @property
+    def progression(self) -> float:
+        """Pourcentage d'essais recalculés"""
+        if not self.total:
+            return 100.0 if self.statut == StatutRecalcul.TERMINE else 0.0
+        return round(self.traites / self.total * 100, 1)
@@ -0,0 +1,52 @@
+"""
+Index de recherche plein texte des essais
+
+Une ligne par essai : le document concatène les champs recherchés (numéro,
+projet, code projet, échantillon, observations). L'index dépend du dialecte :
+- PostgreSQL : colonne tsvector générée, index GIN sur le tsvector et index
+  GIN pg_trgm sur le document (ILIKE '%terme%' sans parcours séquentiel) ;
+- SQLite (tests, postes isolés) : table virtuelle FTS5 à tokenisation en
+  trigrammes, synchronisée par triggers.
+"""
+from sqlalchemy import Column, DDL, ForeignKey, Integer, Text, event
+from app.core.database import Base
+
+
+class EssaiRecherche(Base):
+    """Document de recherche d'un essai"""
+    __tablename__ = "essais_recherche"
+
+    essai_id = Column(Integer, ForeignKey("essais.id", ondelete="CASCADE"), primary_key=True)
+    document = Column(Text, nullable=False)
+
+
+DDL_POSTGRESQL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "ALTER TABLE essais_recherche ADD COLUMN IF NOT EXISTS vecteur tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('simple', document)) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_essais_recherche_vecteur ON essais_recherche USING gin (vecteur)",
+    "CREATE INDEX IF NOT EXISTS ix_essais_recherche_trgm ON essais_recherche USING gin (document gin_trgm_ops)",
+)
+
+DDL_SQLITE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS essais_recherche_fts USING fts5("
+    "document, content='essais_recherche', content_rowid='essai_id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS essais_recherche_ai AFTER INSERT ON essais_recherche BEGIN "
+    "INSERT INTO essais_recherche_fts(rowid, document) VALUES (new.essai_id, new.document); END",
+    "CREATE TRIGGER IF NOT EXISTS essais_recherche_ad AFTER DELETE ON essais_recherche BEGIN "
+    "INSERT INTO essais_recherche_fts(essais_recherche_fts, rowid, document) "
+    "VALUES ('delete', old.essai_id, old.document); END",
+    "CREATE TRIGGER IF NOT EXISTS essais_recherche_au AFTER UPDATE ON essais_recherche BEGIN "
+    "INSERT INTO essais_recherche_fts(essais_recherche_fts, rowid, document) "
+    "VALUES ('delete', old.essai_id, old.document); "
+    "INSERT INTO essais_recherche_fts(rowid, document) VALUES (new.essai_id, new.document); END",
+)
+
+for instruction in DDL_POSTGRESQL:
+    event.listen(EssaiRecherche.__table__, "after_create", DDL(instruction).execute_if(dialect="postgresql"))
+for instruction in DDL_SQLITE:
+    event.listen(EssaiRecherche.__table__, "after_create", DDL(instruction).execute_if(dialect="sqlite"))
+event.listen(
+    EssaiRecherche.__table__, "before_drop",
+    DDL("DROP TABLE IF EXISTS essais_recherche_fts").execute_if(dialect="sqlite"),
+)
@@ -2,7 +2,7 @@
 Schémas Pydantic pour les essais géotechniques
 """
 from pydantic import BaseModel, model_validator
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
 from app.models.essai import TypeEssai, StatutEssai
 
@@ -23,6 +23,11 @@ class EssaiCreate(EssaiBase):
     projet_id: Optional[int] = None  # ID du projet (nouveau système)
 
 
+class EssaiCreationLot(EssaiCreate):
+    """Essai d'une création par lot, avec ses données spécifiques imbriquées"""
+    donnees_specifiques: Optional[Dict[str, Any]] = None
+
+
 class EssaiUpdate(BaseModel):
     """Schéma pour mettre à jour un essai"""
     statut: Optional[StatutEssai] = None
@@ -58,27 +63,23 @@ class EssaiInDB(EssaiBase):
                     data['projet'] = data['projet'].nom
             return data
         
-        # Si data est un objet SQLAlchemy
+        # Si data est un objet SQLAlchemy : seuls les champs du schéma sont lus,
+        # pour ne pas déclencher le chargement des autres relations
         if hasattr(data, '__dict__'):
-            # Créer un dict à partir de l'objet
             data_dict = {}
-            for key in dir(data):
-                if not key.startswith('_') and not callable(getattr(data, key, None)):
-                    try:
-                        value = getattr(data, key, None)
-                        # Gérer la relation projet spécialement
-                        if key == 'projet' and value and not isinstance(value, str):
-                            if hasattr(value, 'nom'):
-                                data_dict['projet'] = value.nom
-                                # Mettre à jour projet_nom si nécessaire
-                                if not hasattr(data, 'projet_nom') or not getattr(data, 'projet_nom', None):
-                                    data_dict['projet_nom'] = value.nom
-                            else:
-                                data_dict['projet'] = None
-                        else:
-                            data_dict[key] = value
-                    except:
-                        pass
+            for key in cls.model_fields:
+                try:
+                    value = getattr(data, key, None)
+                except Exception:
+                    continue
+                # Gérer la relation projet spécialement
+                if key == 'projet' and value is not None and not isinstance(value, str):
+                    data_dict['projet'] = getattr(value, 'nom', None)
+                    # Mettre à jour projet_nom si nécessaire
+                    if data_dict['projet'] and not getattr(data, 'projet_nom', None):
+                        data_dict['projet_nom'] = data_dict['projet']
+                elif key not in data_dict:
+                    data_dict[key] = value
             
             # Utiliser projet_nom pour projet si projet n'est pas défini
             if 'projet' not in data_dict or not data_dict['projet']:
@@ -222,6 +223,7 @@ class EssaiCBR(EssaiCBRBase):
     cbr_final: Optional[float] = None
     module_ev2: Optional[float] = None
     classe_portance: Optional[str] = None
+    nombre_echantillons: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -257,6 +259,9 @@ class EssaiProctorBase(BaseModel):
     
     # Points de mesure
     points_mesure: Optional[List[PointProctor]] = None
+    
+    # Modèle d'ajustement de la courbe
+    modele_ajustement: Optional[Literal["poly2", "poly3", "spline"]] = "poly2"
 
 
 class EssaiProctorCreate(EssaiProctorBase):
@@ -277,6 +282,7 @@ class EssaiProctor(EssaiProctorBase):
     densite_seche_max: Optional[float] = None
     densite_humide_max: Optional[float] = None
     saturation_optimale: Optional[float] = None
+    ajustement: Optional[Dict[str, Any]] = None
     courbe_proctor: Optional[List[Dict[str, float]]] = None
 
     class Config:
@@ -294,11 +300,12 @@ class PointTamisage(BaseModel):
 
 
 class PointSedimentometrie(BaseModel):
-    """Point de sédimentométrie"""
+    """Point de sédimentométrie (diamètre et passant calculés depuis la lecture du densimètre)"""
     temps_min: float
     hauteur_cm: float
+    lecture: Optional[float] = None
     diametre_mm: Optional[float] = None
-    pourcentage_passant: float
+    pourcentage_passant: Optional[float] = None
 
 
 class EssaiGranulometrieBase(BaseModel):
@@ -318,6 +325,11 @@ class EssaiGranulometrieBase(BaseModel):
     points_sedimentometrie: Optional[List[PointSedimentometrie]] = None
     temperature_sedimentometrie: Optional[float] = None
     viscosite_dynamique: Optional[float] = None
+    masse_seche_sedimentometrie: Optional[float] = None
+    volume_suspension: Optional[float] = None
+    masse_volumique_particules: Optional[float] = None
+    correction_lecture: Optional[float] = None
+    diametre_coupure_mm: Optional[float] = None
 
 
 class EssaiGranulometrieCreate(EssaiGranulometrieBase):
@@ -0,0 +1,43 @@
+"""Schémas Pydantic pour les travaux de recalcul"""
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, field_validator
+
+from app.models.recalcul import StatutRecalcul
+from app.services.registre import types_recalculables
+
+
+class RecalculJobCreate(BaseModel):
+    """Périmètre d'un recalcul (None = tous)"""
+    type_essai: Optional[str] = None
+    projet_id: Optional[int] = None
+
+    @field_validator('type_essai')
+    @classmethod
+    def type_recalculable(cls, v):
+        """Le type doit avoir un moteur enregistré avec une table de résultats"""
+        if v is not None and v not in types_recalculables():
+            raise ValueError(f"Type d'essai non recalculable: {v} (attendu: {', '.join(types_recalculables())})")
+        return v
+
+
+class RecalculJob(BaseModel):
+    """État et progression d'un travail de recalcul"""
+    id: int
+    statut: StatutRecalcul
+    type_essai: Optional[str] = None
+    projet_id: Optional[int] = None
+    total: int
+    traites: int
+    progression: float
+    type_courant: Optional[str] = None
+    dernier_id: int
+    erreur: Optional[str] = None
+    lance_par_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -1,6 +1,6 @@
 """Schémas Pydantic pour le workflow de validation"""
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
 
 from pydantic import BaseModel
 
@@ -55,7 +55,8 @@ class CritereValidationBase(BaseModel):
     """Champs de base pour un critère de validation"""
     type_essai: str
     niveau_validation: NiveauValidation
-    criteres: Dict[str, Any]
+    # Liste de points à vérifier (données initiales) ou critères structurés
+    criteres: Union[List[Any], Dict[str, Any]]
 
 
 class CritereValidationCreate(CritereValidationBase):
@@ -63,6 +64,13 @@ class CritereValidationCreate(CritereValidationBase):
     pass
 
 
+class CritereValidationUpdate(BaseModel):
+    """Schéma pour mettre à jour un critère"""
+    type_essai: Optional[str] = None
+    niveau_validation: Optional[NiveauValidation] = None
+    criteres: Optional[Union[List[Any], Dict[str, Any]]] = None
+
+
 class CritereValidationRead(CritereValidationBase):
     """Schéma de lecture d'un critère"""
     id: int
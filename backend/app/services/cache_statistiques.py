@@ -0,0 +1,165 @@
+"""
+Cache des réponses de statistiques
+
+Les statistiques (tableau de bord, par technicien, par type d'essai) sont
+gardées par route et filtres normalisés. Un compteur de version, incrémenté
+après chaque transaction validée qui a écrit dans les essais ou leurs tables
+de données spécifiques, rend toutes les entrées du processus obsolètes ; les
+écritures des autres processus sont vues au plus tard après
+settings.CACHE_STATISTIQUES_TTL secondes.
+
+Une entrée obsolète est recalculée par une seule requête : les requêtes
+concurrentes reçoivent la valeur précédente en attendant (stale-while-
+revalidate), ou attendent le calcul en cours si la clé n'a encore aucune
+valeur. Le calcul (SQL synchrone) s'exécute dans le pool de threads, dans une
+tâche propre : l'annulation de la requête qui l'a lancé n'interrompt ni le
+calcul ni les requêtes qui l'attendent. Chaque requête reçoit une copie de
+la valeur.
+"""
+import asyncio
+import copy
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, NamedTuple, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core import prometheus_metrics as metriques
+from app.core.config import settings
+from app.models.essai import Essai
+from app.services.registre import moteurs
+
+
+class EntreeStatistiques(NamedTuple):
+    """Réponse calculée, avec l'instant et la version du calcul"""
+    calculee_a: float
+    version: int
+    valeur: Any
+
+
+def cle_statistiques(route: str, **filtres: Any) -> str:
+    """Clé de cache : route et filtres renseignés, triés, valeurs d'énumération normalisées"""
+    parties = [route]
+    for nom in sorted(filtres):
+        valeur = filtres[nom]
+        if valeur is None or valeur == "":
+            continue
+        parties.append(f"{nom}={getattr(valeur, 'value', valeur)}")
+    return "|".join(parties)
+
+
+class CacheStatistiques:
+    """Réponses de statistiques par clé (LRU borné, TTL, version, calcul unique par clé)"""
+
+    def __init__(self, ttl: float, taille: int):
+        self.ttl = ttl
+        self.taille = taille
+        self.version = 0
+        self._entrees: "OrderedDict[str, EntreeStatistiques]" = OrderedDict()
+        self._en_cours: Dict[str, "asyncio.Future[Any]"] = {}
+        self._lock = Lock()
+
+    def _fraiche(self, entree: EntreeStatistiques) -> bool:
+        return entree.version == self.version and time.monotonic() - entree.calculee_a <= self.ttl
+
+    async def obtenir(self, route: str, cle: str, calculer: Callable[[], Any]) -> Any:
+        """
+        Valeur en cache pour la clé, calculée par `calculer` (synchrone) si elle est absente ou obsolète
+
+        Chaque appelant reçoit sa propre copie de la valeur : il peut la modifier
+        (export PDF, ...) sans altérer l'entrée du cache.
+        """
+        entree = self._entrees.get(cle)
+        if entree is not None and self._fraiche(entree):
+            self._entrees.move_to_end(cle)
+            metriques.statistics_cache_requests_total.labels(endpoint=route, result="hit").inc()
+            return copy.deepcopy(entree.valeur)
+
+        calcul = self._en_cours.get(cle)
+        if calcul is not None:
+            if entree is not None:
+                metriques.statistics_cache_requests_total.labels(endpoint=route, result="stale").inc()
+                return copy.deepcopy(entree.valeur)
+            metriques.statistics_cache_requests_total.labels(endpoint=route, result="coalesced").inc()
+        else:
+            metriques.statistics_cache_requests_total.labels(endpoint=route, result="miss").inc()
+            # Tâche indépendante de la requête qui la lance : l'annulation de celle-ci
+            # (client déconnecté) n'interrompt ni le calcul ni les requêtes en attente
+            calcul = self._en_cours[cle] = asyncio.ensure_future(self._recalculer(route, cle, calculer))
+            # Une erreur n'est relevée que par les requêtes en attente, s'il y en a
+            calcul.add_done_callback(lambda futur: futur.cancelled() or futur.exception())
+        return copy.deepcopy(await asyncio.shield(calcul))
+
+    async def _recalculer(self, route: str, cle: str, calculer: Callable[[], Any]) -> Any:
+        version = self.version
+        debut = time.perf_counter()
+        try:
+            valeur = await run_in_threadpool(calculer)
+            # Une invalidation survenue pendant le calcul laisse l'entrée obsolète
+            self._entrees[cle] = EntreeStatistiques(time.monotonic(), version, valeur)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille:
+                self._entrees.popitem(last=False)
+            return valeur
+        finally:
+            del self._en_cours[cle]
+            metriques.statistics_cache_recompute_duration_seconds.labels(endpoint=route).observe(
+                time.perf_counter() - debut
+            )
+
+    def invalider(self) -> None:
+        """Rend toutes les entrées obsolètes (gardées pour être servies pendant leur recalcul)"""
+        with self._lock:
+            self.version += 1
+        metriques.statistics_cache_invalidations_total.inc()
+
+    def vider(self) -> None:
+        """Vide le cache"""
+        with self._lock:
+            self.version += 1
+            self._entrees.clear()
+
+
+cache_statistiques = CacheStatistiques(settings.CACHE_STATISTIQUES_TTL, settings.CACHE_STATISTIQUES_TAILLE)
+
+
+def _tables_essais() -> Set[str]:
+    """Tables dont une écriture change les statistiques : essais et données spécifiques"""
+    return {Essai.__tablename__} | {
+        moteur.modele.__tablename__ for moteur in moteurs() if moteur.modele is not None
+    }
+
+
+@event.listens_for(Session, "after_flush")
+def _noter_objets_modifies(session: Session, contexte: Any) -> None:
+    """Note les essais ou données spécifiques créés, modifiés ou supprimés par le flush"""
+    if session.info.get("statistiques_modifiees"):
+        return
+    tables = _tables_essais()
+    for objets in (session.new, session.dirty, session.deleted):
+        if any(getattr(type(objet), "__tablename__", None) in tables for objet in objets):
+            session.info["statistiques_modifiees"] = True
+            return
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _noter_instructions(etat: ORMExecuteState) -> None:
+    """Note les INSERT / UPDATE / DELETE groupés sur les essais (hors flush)"""
+    if etat.is_insert or etat.is_update or etat.is_delete:
+        table = getattr(etat.statement, "table", None)
+        if table is not None and table.name in _tables_essais():
+            etat.session.info["statistiques_modifiees"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalider_apres_validation(session: Session) -> None:
+    if session.info.pop("statistiques_modifiees", False):
+        cache_statistiques.invalider()
+
+
+@event.listens_for(Session, "after_rollback")
+def _oublier_apres_annulation(session: Session) -> None:
+    session.info.pop("statistiques_modifiees", None)
@@ -1,14 +1,89 @@
 """
 Services de calcul automatique pour les essais géotechniques
+
+Chaque type d'essai dispose d'un noyau batch (``calculer_<type>_batch``) qui
+empile les mesures de N essais dans des tableaux NumPy et calcule tous les
+résultats en une seule passe vectorisée. Les fonctions ``calculer_<type>``
+conservent leur signature historique et délèguent au noyau batch avec un lot
+d'un seul essai : les résultats sont strictement identiques.
 """
-from typing import Dict, Any, List
+import math
+from typing import Dict, Any, List, Sequence, Tuple
+import numpy as np
 from app.models.essai import EssaiAtterberg, EssaiCBR, EssaiProctor, EssaiGranulometrie
+from app.services.granulometrie import CourbeGranulometrique, POURCENTAGES_CARACTERISTIQUES, diametre_tamis
+from app.services.proctor import MODELE_PAR_DEFAUT, ajuster_lot
+from app.services.sedimentometrie import DIAMETRE_COUPURE, essais_avec_lectures, points_sedimentometrie_lot
 
 
-def calculer_atterberg(atterberg: EssaiAtterberg) -> Dict[str, Any]:
+# Version du moteur de calcul : à incrémenter à chaque changement de formule,
+# elle invalide les résultats mémoïsés et les empreintes persistées
+VERSION_MOTEUR_CALCUL = 5
+
+
+def _colonne(objets: Sequence[Any], champ: str) -> np.ndarray:
+    """Empile un attribut numérique optionnel des objets (NaN si absent)"""
+    valeurs = [getattr(objet, champ, None) for objet in objets]
+    return np.array([np.nan if v is None else v for v in valeurs], dtype=float)
+
+
+def _valeur(point: Dict[str, Any], champ: str) -> float:
+    """Lit un champ numérique optionnel d'un point de mesure (NaN si absent)"""
+    valeur = point.get(champ)
+    return np.nan if valeur is None else valeur
+
+
+def _log_exact(valeurs: np.ndarray, masque: np.ndarray) -> np.ndarray:
+    """
+    Logarithme népérien des valeurs masquées, calculé avec ``math.log``
+
+    Les nombres de coups prennent peu de valeurs distinctes : on calcule le
+    logarithme une fois par valeur unique pour rester bit à bit identique au
+    calcul scalaire historique (``np.log`` peut différer d'un ULP).
     """
-    Calcule les limites d'Atterberg selon NF P94-051
-    
+    resultat = np.zeros_like(valeurs)
+    uniques, inverse = np.unique(valeurs[masque], return_inverse=True)
+    resultat[masque] = np.array([math.log(v) for v in uniques], dtype=float)[inverse]
+    return resultat
+
+
+def _interpoler_par_ligne(
+    lignes: np.ndarray,
+    x: np.ndarray,
+    y: np.ndarray,
+    cible: float,
+    nombre_lignes: int,
+    tolerance: float = 0.1
+) -> np.ndarray:
+    """
+    Valeur interpolée en x = cible sur chaque ligne (NaN si la ligne ne couvre pas la cible)
+
+    Points triés par ligne puis par x. Les lignes sont décalées en x d'une
+    valeur supérieure à l'étendue des données : un seul np.interp sert
+    toutes les lignes. Une cible hors de la ligne mais à moins de la
+    tolérance d'une extrémité prend la valeur de cette extrémité.
+    """
+    resultat = np.full(nombre_lignes, np.nan)
+    numeros = np.arange(nombre_lignes)
+    debuts = np.searchsorted(lignes, numeros, side="left")
+    fins = np.searchsorted(lignes, numeros, side="right") - 1
+    presentes = np.flatnonzero(fins >= debuts)
+    minimums, maximums = x[debuts[presentes]], x[fins[presentes]]
+    couvertes = (cible >= minimums - tolerance) & (cible <= maximums + tolerance)
+    presentes = presentes[couvertes]
+    if not len(presentes):
+        return resultat
+
+    decalage = float(np.ptp(x)) + 2 * tolerance + 1.0
+    cibles = np.clip(cible, minimums[couvertes], maximums[couvertes]) + presentes * decalage
+    resultat[presentes] = np.interp(cibles, x + lignes * decalage, y)
+    return resultat
+
+
+def calculer_atterberg_batch(atterbergs: Sequence[EssaiAtterberg]) -> List[Dict[str, Any]]:
+    """
+    Calcule les limites d'Atterberg de N essais selon NF P94-051
+
     Formules normatives:
     - WL (Limite de liquidité) = interpolation à 25 coups (méthode Casagrande)
     - WP (Limite de plasticité) = moyenne des teneurs en eau
@@ -16,484 +91,620 @@ def calculer_atterberg(atterberg: EssaiAtterberg) -> Dict[str, Any]:
     - IC (Indice de consistance) = (WL - W) / IP
     - IR (Indice de retrait) = WR - WP
     """
-    resultats = {}
-    
-    # Limite de liquidité (WL) - Interpolation à partir de plusieurs points
-    points_wl = []
-    if atterberg.wl_nombre_coups_1 and atterberg.wl_teneur_eau_1:
-        points_wl.append((atterberg.wl_nombre_coups_1, atterberg.wl_teneur_eau_1))
-    if atterberg.wl_nombre_coups_2 and atterberg.wl_teneur_eau_2:
-        points_wl.append((atterberg.wl_nombre_coups_2, atterberg.wl_teneur_eau_2))
-    if atterberg.wl_nombre_coups_3 and atterberg.wl_teneur_eau_3:
-        points_wl.append((atterberg.wl_nombre_coups_3, atterberg.wl_teneur_eau_3))
-    
-    if len(points_wl) >= 2:
-        # Interpolation linéaire en échelle logarithmique (méthode standard)
-        # WL = a * log(N) + b où N est le nombre de coups
-        import math
-        try:
-            # Transformation logarithmique
-            log_points = [(math.log(n), w) for n, w in points_wl if n > 0]
-            if len(log_points) >= 2:
-                # Régression linéaire simple
-                n_vals = [p[0] for p in log_points]
-                w_vals = [p[1] for p in log_points]
-                n_mean = sum(n_vals) / len(n_vals)
-                w_mean = sum(w_vals) / len(w_vals)
-                
-                # Calcul des coefficients
-                numerator = sum((n_vals[i] - n_mean) * (w_vals[i] - w_mean) for i in range(len(n_vals)))
-                denominator = sum((n_vals[i] - n_mean) ** 2 for i in range(len(n_vals)))
-                
-                if denominator != 0:
-                    a = numerator / denominator
-                    b = w_mean - a * n_mean
-                    # WL à 25 coups
-                    wl = a * math.log(25) + b
-                    resultats["wl"] = round(wl, 2)
-                else:
-                    # Si un seul point, utiliser la formule d'ajustement
-                    if len(points_wl) == 1:
-                        n, w = points_wl[0]
-                        wl = w * (25 / n) ** 0.12
-                        resultats["wl"] = round(wl, 2)
-        except:
-            # Fallback: méthode simple
-            if len(points_wl) == 1:
-                n, w = points_wl[0]
-                wl = w * (25 / n) ** 0.12
-                resultats["wl"] = round(wl, 2)
-    
+    n = len(atterbergs)
+    if n == 0:
+        return []
+
+    # Limite de liquidité (WL) - Régression linéaire w = a * log(N) + b sur les
+    # points renseignés (nombre de coups et teneur en eau non nuls)
+    coups = np.column_stack([_colonne(atterbergs, f"wl_nombre_coups_{i}") for i in (1, 2, 3)])
+    teneurs = np.column_stack([_colonne(atterbergs, f"wl_teneur_eau_{i}") for i in (1, 2, 3)])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        presents = ~np.isnan(coups) & ~np.isnan(teneurs) & (coups != 0) & (teneurs != 0)
+        utilisables = presents & (coups > 0)
+        nombre_points = presents.sum(axis=1)
+        nombre_log = utilisables.sum(axis=1)
+
+        log_n = _log_exact(coups, utilisables)
+        w = np.where(utilisables, teneurs, 0.0)
+        # Sommes explicites colonne par colonne : même ordre d'addition que sum()
+        n_moyen = (log_n[:, 0] + log_n[:, 1] + log_n[:, 2]) / nombre_log
+        w_moyen = (w[:, 0] + w[:, 1] + w[:, 2]) / nombre_log
+        ecarts_n = np.where(utilisables, log_n - n_moyen[:, None], 0.0)
+        ecarts_w = np.where(utilisables, w - w_moyen[:, None], 0.0)
+        produits = ecarts_n * ecarts_w
+        carres = np.square(ecarts_n)
+        numerateur = produits[:, 0] + produits[:, 1] + produits[:, 2]
+        denominateur = carres[:, 0] + carres[:, 1] + carres[:, 2]
+
+        a = numerateur / denominateur
+        b = w_moyen - a * n_moyen
+        wl = a * math.log(25) + b
+    wl_valide = (nombre_points >= 2) & (nombre_log >= 2) & (denominateur != 0)
+
     # Limite de plasticité (WP) - Moyenne des essais
-    points_wp = []
-    if atterberg.wp_teneur_eau_1 is not None:
-        points_wp.append(atterberg.wp_teneur_eau_1)
-    if atterberg.wp_teneur_eau_2 is not None:
-        points_wp.append(atterberg.wp_teneur_eau_2)
-    if atterberg.wp_teneur_eau_3 is not None:
-        points_wp.append(atterberg.wp_teneur_eau_3)
-    
-    if points_wp:
-        resultats["wp"] = round(sum(points_wp) / len(points_wp), 2)
-    
-    # Limite de retrait (WR)
-    if (atterberg.wr_teneur_eau is not None and 
-        atterberg.volume_initial is not None and 
-        atterberg.volume_final is not None and 
-        atterberg.masse_seche is not None):
-        # WR = teneur en eau correspondant au retrait maximum
-        # Calcul simplifié: WR = teneur en eau mesurée
-        resultats["wr"] = round(atterberg.wr_teneur_eau, 2)
-    
-    # Indice de plasticité (IP)
-    if "wl" in resultats and "wp" in resultats:
-        resultats["ip"] = round(resultats["wl"] - resultats["wp"], 2)
-    
-    # Indice de retrait (IR)
-    if "wr" in resultats and "wp" in resultats:
-        resultats["ir"] = round(resultats["wr"] - resultats["wp"], 2)
-    
-    # Classification selon la norme
-    if "ip" in resultats and "wl" in resultats:
-        ip = resultats["ip"]
-        wl = resultats["wl"]
-        if ip < 0:
-            classification = "Non plastique"
-        elif ip <= 7:
-            classification = "Peu plastique"
-        elif ip <= 17:
-            classification = "Plastique"
-        else:
-            classification = "Très plastique"
-        
-        # Classification selon WL
-        if wl < 35:
-            classification += " - Faible liquidité"
-        elif wl <= 50:
-            classification += " - Liquidité moyenne"
-        else:
-            classification += " - Forte liquidité"
-        
-        resultats["classification"] = classification
-    
-    return resultats
+    wp_teneurs = np.column_stack([_colonne(atterbergs, f"wp_teneur_eau_{i}") for i in (1, 2, 3)])
+    wp_presents = ~np.isnan(wp_teneurs)
+    wp_nombre = wp_presents.sum(axis=1)
+    wp_valeurs = np.where(wp_presents, wp_teneurs, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        wp = (wp_valeurs[:, 0] + wp_valeurs[:, 1] + wp_valeurs[:, 2]) / wp_nombre
 
+    resultats_lot = []
+    for i, atterberg in enumerate(atterbergs):
+        resultats = {}
 
-def calculer_cbr(cbr: EssaiCBR) -> Dict[str, Any]:
+        if wl_valide[i]:
+            resultats["wl"] = round(float(wl[i]), 2)
+
+        if wp_nombre[i]:
+            resultats["wp"] = round(float(wp[i]), 2)
+
+        # Limite de retrait (WR)
+        if (atterberg.wr_teneur_eau is not None and
+            atterberg.volume_initial is not None and
+            atterberg.volume_final is not None and
+            atterberg.masse_seche is not None):
+            # WR = teneur en eau correspondant au retrait maximum
+            # Calcul simplifié: WR = teneur en eau mesurée
+            resultats["wr"] = round(atterberg.wr_teneur_eau, 2)
+
+        # Indice de plasticité (IP)
+        if "wl" in resultats and "wp" in resultats:
+            resultats["ip"] = round(resultats["wl"] - resultats["wp"], 2)
+
+        # Indice de retrait (IR)
+        if "wr" in resultats and "wp" in resultats:
+            resultats["ir"] = round(resultats["wr"] - resultats["wp"], 2)
+
+        # Classification selon la norme
+        if "ip" in resultats and "wl" in resultats:
+            resultats["classification"] = _classifier_atterberg(resultats["ip"], resultats["wl"])
+
+        resultats_lot.append(resultats)
+
+    return resultats_lot
+
+
+def _classifier_atterberg(ip: float, wl: float) -> str:
+    """Classification de plasticité selon IP et WL"""
+    if ip < 0:
+        classification = "Non plastique"
+    elif ip <= 7:
+        classification = "Peu plastique"
+    elif ip <= 17:
+        classification = "Plastique"
+    else:
+        classification = "Très plastique"
+
+    # Classification selon WL
+    if wl < 35:
+        classification += " - Faible liquidité"
+    elif wl <= 50:
+        classification += " - Liquidité moyenne"
+    else:
+        classification += " - Forte liquidité"
+
+    return classification
+
+
+def calculer_atterberg(atterberg: EssaiAtterberg) -> Dict[str, Any]:
+    """Calcule les limites d'Atterberg d'un essai (voir calculer_atterberg_batch)"""
+    return calculer_atterberg_batch([atterberg])[0]
+
+
+def calculer_cbr_batch(cbrs: Sequence[EssaiCBR]) -> List[Dict[str, Any]]:
     """
-    Calcule les valeurs CBR selon NF P94-078
-    
+    Calcule les valeurs CBR de N essais selon NF P94-078
+
     Formules normatives:
     - CBR = (Force mesurée / Force standard) * 100
     - Force standard à 2.5mm = 13.24 kN (NF P94-078)
     - Force standard à 5.0mm = 19.96 kN (NF P94-078)
     - CBR retenu = max(CBR_2.5mm, CBR_5.0mm) si différence < 2%, sinon refaire l'essai
+
+    Les forces à 2.5mm et 5.0mm sont interpolées linéairement sur la courbe de
+    pénétration (triée) dès que la courbe couvre la pénétration, à la tolérance
+    de 0.1mm près aux extrémités ; elles sont reportées sur les objets
+    (force_25mm, force_50mm), comme le fait le calcul unitaire.
     """
-    resultats = {}
-    
-    # Calculer CBR à partir de la courbe de pénétration si disponible
-    if cbr.points_penetration:
-        # Extraire les forces à 2.5mm et 5.0mm de la courbe
-        for point in cbr.points_penetration:
+    n = len(cbrs)
+    if n == 0:
+        return []
+
+    # Aplatir les courbes de pénétration de tous les essais
+    lignes, penetrations, forces = [], [], []
+    for i, cbr in enumerate(cbrs):
+        for point in cbr.points_penetration or []:
             if isinstance(point, dict):
-                penetration = point.get("penetration_mm", 0)
-                force = point.get("force_kN", 0)
-                if abs(penetration - 2.5) < 0.1:  # Tolérance de 0.1mm
-                    cbr.force_25mm = force
-                if abs(penetration - 5.0) < 0.1:
-                    cbr.force_50mm = force
-    
-    # CBR à 2.5mm
-    if cbr.force_25mm is not None:
-        force_standard_25 = 13.24  # kN (NF P94-078)
-        cbr_25 = (cbr.force_25mm / force_standard_25) * 100
-        resultats["cbr_25mm"] = round(cbr_25, 2)
-    
-    # CBR à 5.0mm
-    if cbr.force_50mm is not None:
-        force_standard_50 = 19.96  # kN (NF P94-078)
-        cbr_50 = (cbr.force_50mm / force_standard_50) * 100
-        resultats["cbr_50mm"] = round(cbr_50, 2)
-    
-    # CBR final selon la norme
-    if "cbr_25mm" in resultats and "cbr_50mm" in resultats:
-        cbr_25 = resultats["cbr_25mm"]
-        cbr_50 = resultats["cbr_50mm"]
-        difference = abs(cbr_25 - cbr_50)
-        
-        if difference < 2.0:  # Si différence < 2%, prendre le maximum
-            resultats["cbr_final"] = round(max(cbr_25, cbr_50), 2)
-        else:
-            # Si différence >= 2%, prendre CBR à 2.5mm (selon norme)
-            resultats["cbr_final"] = round(cbr_25, 2)
-            resultats["note"] = "Différence > 2%, CBR à 2.5mm retenu"
-    elif "cbr_25mm" in resultats:
-        resultats["cbr_final"] = resultats["cbr_25mm"]
-    elif "cbr_50mm" in resultats:
-        resultats["cbr_final"] = resultats["cbr_50mm"]
-    
-    # Classification de portance selon CBR
-    if "cbr_final" in resultats:
-        cbr_val = resultats["cbr_final"]
-        if cbr_val < 2:
-            classe = "C1 - Très faible"
-        elif cbr_val < 5:
-            classe = "C2 - Faible"
-        elif cbr_val < 8:
-            classe = "C3 - Moyenne"
-        elif cbr_val < 15:
-            classe = "C4 - Bonne"
-        else:
-            classe = "C5 - Très bonne"
-        resultats["classe_portance"] = classe
-    
-    # Calcul du module EV2 si les données sont disponibles
-    if cbr.points_penetration:
-        # Module EV2 approximatif (nécessite courbe complète)
-        resultats["note_module"] = "Calcul EV2 nécessite courbe complète charge-déformation"
-    
-    return resultats
+                lignes.append(i)
+                penetrations.append(point.get("penetration_mm", 0))
+                forces.append(point.get("force_kN", 0))
 
+    if lignes:
+        lignes_arr = np.array(lignes, dtype=np.int64)
+        penetrations_arr = np.array(penetrations, dtype=float)
+        forces_arr = np.array(forces, dtype=float)
+        valides = np.flatnonzero(~np.isnan(penetrations_arr) & ~np.isnan(forces_arr))
+        ordre = valides[np.lexsort((penetrations_arr[valides], lignes_arr[valides]))]
+        lignes_arr, penetrations_arr, forces_arr = lignes_arr[ordre], penetrations_arr[ordre], forces_arr[ordre]
+        for champ, cible in (("force_25mm", 2.5), ("force_50mm", 5.0)):
+            lues = _interpoler_par_ligne(lignes_arr, penetrations_arr, forces_arr, cible, n)
+            for i in np.flatnonzero(~np.isnan(lues)):
+                setattr(cbrs[i], champ, float(lues[i]))
 
-def calculer_proctor(proctor: EssaiProctor) -> Dict[str, Any]:
+    force_standard_25 = 13.24  # kN (NF P94-078)
+    force_standard_50 = 19.96  # kN (NF P94-078)
+    cbr_25 = (_colonne(cbrs, "force_25mm") / force_standard_25) * 100
+    cbr_50 = (_colonne(cbrs, "force_50mm") / force_standard_50) * 100
+
+    resultats_lot = []
+    for i, cbr in enumerate(cbrs):
+        resultats = {}
+
+        if not np.isnan(cbr_25[i]):
+            resultats["cbr_25mm"] = round(float(cbr_25[i]), 2)
+        if not np.isnan(cbr_50[i]):
+            resultats["cbr_50mm"] = round(float(cbr_50[i]), 2)
+
+        # CBR final selon la norme
+        if "cbr_25mm" in resultats and "cbr_50mm" in resultats:
+            valeur_25 = resultats["cbr_25mm"]
+            valeur_50 = resultats["cbr_50mm"]
+            difference = abs(valeur_25 - valeur_50)
+
+            if difference < 2.0:  # Si différence < 2%, prendre le maximum
+                resultats["cbr_final"] = round(max(valeur_25, valeur_50), 2)
+            else:
+                # Si différence >= 2%, prendre CBR à 2.5mm (selon norme)
+                resultats["cbr_final"] = round(valeur_25, 2)
+                resultats["note"] = "Différence > 2%, CBR à 2.5mm retenu"
+        elif "cbr_25mm" in resultats:
+            resultats["cbr_final"] = resultats["cbr_25mm"]
+        elif "cbr_50mm" in resultats:
+            resultats["cbr_final"] = resultats["cbr_50mm"]
+
+        # Classification de portance selon CBR
+        if "cbr_final" in resultats:
+            resultats["classe_portance"] = _classifier_portance(resultats["cbr_final"])
+
+        # Calcul du module EV2 si les données sont disponibles
+        if cbr.points_penetration:
+            # Module EV2 approximatif (nécessite courbe complète)
+            resultats["note_module"] = "Calcul EV2 nécessite courbe complète charge-déformation"
+
+        resultats_lot.append(resultats)
+
+    return resultats_lot
+
+
+def _classifier_portance(cbr_val: float) -> str:
+    """Classe de portance selon la valeur de CBR retenue"""
+    if cbr_val < 2:
+        return "C1 - Très faible"
+    elif cbr_val < 5:
+        return "C2 - Faible"
+    elif cbr_val < 8:
+        return "C3 - Moyenne"
+    elif cbr_val < 15:
+        return "C4 - Bonne"
+    return "C5 - Très bonne"
+
+
+def calculer_cbr(cbr: EssaiCBR) -> Dict[str, Any]:
+    """Calcule les valeurs CBR d'un essai (voir calculer_cbr_batch)"""
+    return calculer_cbr_batch([cbr])[0]
+
+
+def calculer_proctor_batch(proctors: Sequence[EssaiProctor]) -> List[Dict[str, Any]]:
     """
-    Calcule l'optimum Proctor selon NF P94-093
-    
-    Utilise une interpolation polynomiale pour trouver le maximum de la courbe Proctor
+    Calcule l'optimum Proctor de N essais selon NF P94-093
+
+    Ajuste le modèle choisi pour chaque essai (modele_ajustement : poly2 par
+    défaut, poly3 ou spline) pour trouver le maximum de la courbe Proctor.
+    La préparation des points et la recherche du maximum sont vectorisées sur
+    le lot ; les polynômes sont ajustés par groupes de même taille.
     """
-    resultats = {}
-    
-    if not proctor.points_mesure or len(proctor.points_mesure) < 3:
-        return resultats
-    
-    # Extraire et calculer les points complets
-    points = []
-    for point in proctor.points_mesure:
-        if isinstance(point, dict):
-            teneur_eau = point.get("teneur_eau")
-            densite_humide = point.get("densite_humide")
-            densite_seche = point.get("densite_seche")
-            masse_humide = point.get("masse_humide")
-            masse_seche = point.get("masse_seche")
-            volume = point.get("volume")
-            
-            # Calculer la densité sèche si non fournie
-            if densite_seche is None:
-                if densite_humide is not None and teneur_eau is not None:
-                    densite_seche = densite_humide / (1 + teneur_eau / 100)
-                elif masse_seche is not None and volume is not None and volume > 0:
-                    densite_seche = masse_seche / volume
-                elif masse_humide is not None and teneur_eau is not None and volume is not None and volume > 0:
-                    masse_seche_calc = masse_humide / (1 + teneur_eau / 100)
-                    densite_seche = masse_seche_calc / volume
-            
-            if teneur_eau is not None and densite_seche is not None:
-                points.append((teneur_eau, densite_seche))
-    
-    if len(points) < 3:
-        return resultats
-    
-    # Trier par teneur en eau
-    points.sort(key=lambda x: x[0])
-    
-    # Trouver le maximum (approximation simple)
-    max_densite = max(points, key=lambda x: x[1])
-    resultats["densite_seche_max"] = round(max_densite[1], 2)
-    resultats["opm"] = round(max_densite[0], 2)
-    
-    # Interpolation polynomiale pour plus de précision
-    if len(points) >= 4:
-        try:
-            import numpy as np
-            x = np.array([p[0] for p in points])
-            y = np.array([p[1] for p in points])
-            
-            # Ajustement polynomial de degré 2 (courbe Proctor)
-            coeffs = np.polyfit(x, y, 2)
-            # y = ax² + bx + c, maximum à x = -b/(2a)
-            if coeffs[0] < 0:  # Parabole concave (normal pour Proctor)
-                opm_opt = -coeffs[1] / (2 * coeffs[0])
-                densite_opt = np.polyval(coeffs, opm_opt)
-                
-                # Vérifier que l'optimum est dans la plage des mesures
-                if points[0][0] <= opm_opt <= points[-1][0]:
-                    resultats["opm"] = round(float(opm_opt), 2)
-                    resultats["densite_seche_max"] = round(float(densite_opt), 2)
-                
-                # Générer la courbe Proctor complète pour graphique
-                x_curve = np.linspace(points[0][0] - 1, points[-1][0] + 1, 100)
-                y_curve = np.polyval(coeffs, x_curve)
-                resultats["courbe_proctor"] = [
-                    {"teneur_eau": float(x_curve[i]), "densite_seche": float(y_curve[i])}
-                    for i in range(len(x_curve))
-                ]
-        except ImportError:
-            pass  # numpy non disponible
-    
-    # Calculer la densité humide maximale
-    if "opm" in resultats and "densite_seche_max" in resultats:
+    n = len(proctors)
+    if n == 0:
+        return []
+    resultats_lot = [{} for _ in range(n)]
+
+    # Aplatir les points de mesure des essais ayant au moins 3 points
+    lignes, colonnes = [], []
+    for i, proctor in enumerate(proctors):
+        if not proctor.points_mesure or len(proctor.points_mesure) < 3:
+            continue
+        for point in proctor.points_mesure:
+            if isinstance(point, dict):
+                lignes.append(i)
+                colonnes.append((
+                    _valeur(point, "teneur_eau"),
+                    _valeur(point, "densite_humide"),
+                    _valeur(point, "densite_seche"),
+                    _valeur(point, "masse_humide"),
+                    _valeur(point, "masse_seche"),
+                    _valeur(point, "volume"),
+                ))
+    if not lignes:
+        return resultats_lot
+
+    lignes_arr = np.array(lignes, dtype=np.int64)
+    teneur_eau, densite_humide, densite_seche, masse_humide, masse_seche, volume = (
+        np.array(colonnes, dtype=float).T
+    )
+    fournies = ~np.isnan(densite_seche)
+
+    # Calculer la densité sèche si non fournie
+    with np.errstate(invalid="ignore", divide="ignore"):
+        manquante = np.isnan(densite_seche)
+        volume_ok = ~np.isnan(volume) & (volume > 0)
+        depuis_humide = manquante & ~np.isnan(densite_humide) & ~np.isnan(teneur_eau)
+        depuis_masse_seche = manquante & ~depuis_humide & ~np.isnan(masse_seche) & volume_ok
+        depuis_masse_humide = (manquante & ~depuis_humide & ~depuis_masse_seche &
+                               ~np.isnan(masse_humide) & ~np.isnan(teneur_eau) & volume_ok)
+        densite_seche = np.where(depuis_humide, densite_humide / (1 + teneur_eau / 100), densite_seche)
+        densite_seche = np.where(depuis_masse_seche, masse_seche / volume, densite_seche)
+        densite_seche = np.where(depuis_masse_humide, (masse_humide / (1 + teneur_eau / 100)) / volume, densite_seche)
+
+    # Ne garder que les points complets des essais ayant au moins 3 points complets
+    complets = ~np.isnan(teneur_eau) & ~np.isnan(densite_seche)
+    nombre_complets = np.bincount(lignes_arr[complets], minlength=n)
+    garder = complets & (nombre_complets[lignes_arr] >= 3)
+    if not garder.any():
+        return resultats_lot
+    source = np.flatnonzero(garder)
+    lignes_arr, x, y = lignes_arr[source], teneur_eau[source], densite_seche[source]
+
+    # Trier par teneur en eau à l'intérieur de chaque essai (tri stable)
+    ordre = np.argsort(x, kind="stable")
+    ordre = ordre[np.argsort(lignes_arr[ordre], kind="stable")]
+    lignes_arr, x, y, source = lignes_arr[ordre], x[ordre], y[ordre], source[ordre]
+    essais, debuts, effectifs = np.unique(lignes_arr, return_index=True, return_counts=True)
+
+    # Trouver le maximum (approximation simple) : premier point de densité maximale
+    y_max = np.maximum.reduceat(y, debuts)
+    indices = np.arange(len(y))
+    premiers_max = np.minimum.reduceat(np.where(y == y_max[np.repeat(np.arange(len(essais)), effectifs)], indices, len(y)), debuts)
+    for k, i in enumerate(essais):
+        # Valeurs d'origine (entiers compris) pour un arrondi identique au calcul unitaire
+        point = source[premiers_max[k]]
+        densite = colonnes[point][2] if fournies[point] else float(densite_seche[point])
+        resultats_lot[i]["densite_seche_max"] = round(densite, 2)
+        resultats_lot[i]["opm"] = round(colonnes[point][0], 2)
+
+    # Ajustement du modèle choisi (parabole par défaut) pour affiner l'optimum ;
+    # l'ajustement est stocké sous forme compacte, la courbe est régénérée à la lecture
+    modeles = [
+        getattr(proctors[i], "modele_ajustement", None) or MODELE_PAR_DEFAUT
+        for i in essais
+    ]
+    ajustements = ajuster_lot(x, y, debuts, effectifs, modeles)
+    for k, ajustement in enumerate(ajustements):
+        if ajustement is None:
+            continue
+        resultats = resultats_lot[essais[k]]
+        optimum = ajustement["optimum"]
+        # Optimum retenu s'il est dans la plage des mesures
+        if optimum is not None:
+            resultats["opm"] = round(optimum["teneur_eau"], 2)
+            resultats["densite_seche_max"] = round(optimum["densite_seche"], 2)
+        resultats["ajustement"] = ajustement
+
+    for k, i in enumerate(essais):
+        resultats = resultats_lot[i]
         opm = resultats["opm"]
         densite_seche_max = resultats["densite_seche_max"]
+
+        # Calculer la densité humide maximale
         # Densité humide = densité sèche * (1 + teneur en eau/100)
         resultats["densite_humide_max"] = round(densite_seche_max * (1 + opm / 100), 2)
-    
-    # Calculer le degré de saturation à l'optimum (si masse volumique des grains connue)
-    # S = (w * ρs) / (e * ρw) où e = (ρs/ρd) - 1
-    # Approximation: S ≈ w * ρs / ((ρs/ρd - 1) * ρw)
-    # Pour simplifier, on peut utiliser ρs = 2.65 g/cm³ (valeur moyenne)
-    if "opm" in resultats and "densite_seche_max" in resultats:
+
+        # Calculer le degré de saturation à l'optimum (si masse volumique des grains connue)
+        # S = (w * ρs) / (e * ρw) où e = (ρs/ρd) - 1
+        # Pour simplifier, on utilise ρs = 2.65 g/cm³ (valeur moyenne)
         rho_s = 2.65  # Masse volumique des grains (g/cm³) - valeur par défaut
         rho_w = 1.0   # Masse volumique de l'eau (g/cm³)
-        w = resultats["opm"] / 100
-        rho_d = resultats["densite_seche_max"]
-        e = (rho_s / rho_d) - 1  # Indice des vides
+        w = opm / 100
+        e = (rho_s / densite_seche_max) - 1  # Indice des vides
         if e > 0:
             S = (w * rho_s) / (e * rho_w) * 100
             resultats["saturation_optimale"] = round(min(S, 100), 1)  # Limité à 100%
-    
-    return resultats
 
+    return resultats_lot
 
-def calculer_granulometrie(granulometrie: EssaiGranulometrie) -> Dict[str, Any]:
+
+def calculer_proctor(proctor: EssaiProctor) -> Dict[str, Any]:
+    """Calcule l'optimum Proctor d'un essai (voir calculer_proctor_batch)"""
+    return calculer_proctor_batch([proctor])[0]
+
+
+def _normaliser_tamisage(granulometrie: EssaiGranulometrie) -> None:
+    """Complète les pourcentages retenus, cumulés et passants des points de tamisage"""
+    masse_totale = granulometrie.masse_totale_seche or 1000  # Valeur par défaut
+
+    points_complets = []
+    masse_cumulee = 0
+
+    for point in granulometrie.points_tamisage:
+        if isinstance(point, dict):
+            masse_retenu = point.get("masse_retenu", 0)
+            pourcentage_retenu = point.get("pourcentage_retenu")
+            pourcentage_passant = point.get("pourcentage_passant")
+            pourcentage_cumule = point.get("pourcentage_cumule")
+
+            # Calculer si manquant
+            if pourcentage_retenu is None and masse_retenu is not None:
+                pourcentage_retenu = (masse_retenu / masse_totale) * 100
+
+            masse_cumulee += masse_retenu
+            if pourcentage_cumule is None:
+                pourcentage_cumule = (masse_cumulee / masse_totale) * 100
+
+            if pourcentage_passant is None:
+                pourcentage_passant = 100 - pourcentage_cumule
+
+            point["masse_retenu"] = masse_retenu
+            point["pourcentage_retenu"] = round(pourcentage_retenu, 2)
+            point["pourcentage_cumule"] = round(pourcentage_cumule, 2)
+            point["pourcentage_passant"] = round(pourcentage_passant, 2)
+
+            points_complets.append(point)
+
+    granulometrie.points_tamisage = points_complets
+
+
+def _points_courbes_lot(
+    granulometries: Sequence[EssaiGranulometrie]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
     """
-    Calcule les paramètres granulométriques selon NF P94-056
-    
+    Points (essai, diamètre, passant) des courbes fusionnées tamisage + sédimentométrie
+
+    Complète les pourcentages des points de tamisage, puis calcule les lectures
+    de sédimentométrie en ramenant leurs pourcentages à l'échantillon total par
+    le passant du tamisage au diamètre de coupure. Retourne aussi le nombre de
+    points de sédimentométrie de chaque essai.
+    """
+    n = len(granulometries)
+    lignes, diametres, passants = [], [], []
+    for i, granulometrie in enumerate(granulometries):
+        if granulometrie.points_tamisage:
+            _normaliser_tamisage(granulometrie)
+
+        for point in granulometrie.points_tamisage or []:
+            if isinstance(point, dict):
+                tamis = point.get("tamis")
+                pourcentage = point.get("pourcentage_passant")
+                if tamis and pourcentage is not None:
+                    diametre = diametre_tamis(tamis)
+                    if diametre:
+                        lignes.append(i)
+                        diametres.append(diametre)
+                        passants.append(pourcentage)
+
+    lignes_tamis = np.array(lignes, dtype=np.int64)
+    diametres_tamis = np.array(diametres, dtype=float)
+    passants_tamis = np.array(passants, dtype=float)
+
+    # Passant du tamisage au diamètre de coupure des essais dont les lectures sont à calculer
+    facteurs = np.ones(n)
+    avec_lectures = essais_avec_lectures(granulometries)
+    tamises = avec_lectures & (np.bincount(lignes_tamis, minlength=n) > 0)
+    if tamises.any():
+        garder = tamises[lignes_tamis]
+        positions = np.cumsum(tamises) - 1
+        courbe_tamis = CourbeGranulometrique(
+            positions[lignes_tamis[garder]], diametres_tamis[garder], passants_tamis[garder]
+        )
+        coupures = _colonne(granulometries, "diametre_coupure_mm")[tamises]
+        coupures = np.where(np.isnan(coupures), DIAMETRE_COUPURE, coupures)
+        facteurs[tamises] = courbe_tamis.passant_par_courbe(coupures) / 100
+
+    lignes_sed, diametres_sed, passants_sed = points_sedimentometrie_lot(granulometries, facteurs)
+    return (
+        np.concatenate((lignes_tamis, lignes_sed)),
+        np.concatenate((diametres_tamis, diametres_sed)),
+        np.concatenate((passants_tamis, passants_sed)),
+        np.bincount(lignes_sed, minlength=n),
+    )
+
+
+def calculer_granulometrie_batch(granulometries: Sequence[EssaiGranulometrie]) -> List[Dict[str, Any]]:
+    """
+    Calcule les paramètres granulométriques de N essais selon NF P94-056 et NF P94-057
+
     Formules normatives:
-    - D10, D30, D60, D16, D50, D84: diamètres correspondant aux pourcentages de passant
+    - D10, D30, D60, D16, D50, D84: diamètres correspondant aux pourcentages de passant,
+      interpolés en log-diamètre sur la courbe fusionnée (tamisage et sédimentométrie)
+      rendue monotone
     - CU (Coefficient d'uniformité) = D60 / D10
     - CC (Coefficient de courbure) = (D30)² / (D10 * D60)
+    - Limon et argile lus sur la courbe à 63 µm et 2 µm quand la
+      sédimentométrie descend jusqu'à 2 µm
     - Classification granulométrique selon norme
+
+    Les pourcentages des points de tamisage et les diamètres et pourcentages
+    des lectures de sédimentométrie sont complétés sur les objets, comme le
+    fait le calcul unitaire.
     """
-    resultats = {}
-    
-    # Calculer les pourcentages cumulés si non fournis
-    if granulometrie.points_tamisage:
-        masse_totale = granulometrie.masse_totale_seche or 1000  # Valeur par défaut
-        
-        # Calculer les pourcentages si nécessaire
-        points_complets = []
-        masse_cumulee = 0
-        
-        for point in granulometrie.points_tamisage:
-            if isinstance(point, dict):
-                masse_retenu = point.get("masse_retenu", 0)
-                pourcentage_retenu = point.get("pourcentage_retenu")
-                pourcentage_passant = point.get("pourcentage_passant")
-                pourcentage_cumule = point.get("pourcentage_cumule")
-                
-                # Calculer si manquant
-                if pourcentage_retenu is None and masse_retenu is not None:
-                    pourcentage_retenu = (masse_retenu / masse_totale) * 100
-                
-                masse_cumulee += masse_retenu
-                if pourcentage_cumule is None:
-                    pourcentage_cumule = (masse_cumulee / masse_totale) * 100
-                
-                if pourcentage_passant is None:
-                    pourcentage_passant = 100 - pourcentage_cumule
-                
-                point["masse_retenu"] = masse_retenu
-                point["pourcentage_retenu"] = round(pourcentage_retenu, 2)
-                point["pourcentage_cumule"] = round(pourcentage_cumule, 2)
-                point["pourcentage_passant"] = round(pourcentage_passant, 2)
-                
-                points_complets.append(point)
-        
-        granulometrie.points_tamisage = points_complets
-    
-    # Extraire et trier les points
-    points = []
-    for point in granulometrie.points_tamisage or []:
-        if isinstance(point, dict):
-            tamis = point.get("tamis")
-            pourcentage = point.get("pourcentage_passant")
-            if tamis and pourcentage is not None:
-                diametre = convertir_tamis_en_diametre(tamis)
-                if diametre:
-                    points.append((diametre, pourcentage))
-    
-    # Ajouter les points de sédimentométrie si disponibles
-    if granulometrie.points_sedimentometrie:
-        for point in granulometrie.points_sedimentometrie:
-            if isinstance(point, dict):
-                diametre = point.get("diametre_mm")
-                pourcentage = point.get("pourcentage_passant")
-                if diametre and pourcentage is not None:
-                    points.append((diametre, pourcentage))
-    
-    if len(points) < 2:
-        return resultats
-    
-    # Trier par diamètre décroissant (logarithmique pour meilleure interpolation)
-    points.sort(key=lambda x: x[0], reverse=True)
-    
-    # Interpolation logarithmique pour trouver les diamètres caractéristiques
-    resultats["d10"] = round(interpoler_diametre(points, 10), 3) if interpoler_diametre(points, 10) else None
-    resultats["d16"] = round(interpoler_diametre(points, 16), 3) if interpoler_diametre(points, 16) else None
-    resultats["d30"] = round(interpoler_diametre(points, 30), 3) if interpoler_diametre(points, 30) else None
-    resultats["d50"] = round(interpoler_diametre(points, 50), 3) if interpoler_diametre(points, 50) else None
-    resultats["d60"] = round(interpoler_diametre(points, 60), 3) if interpoler_diametre(points, 60) else None
-    resultats["d84"] = round(interpoler_diametre(points, 84), 3) if interpoler_diametre(points, 84) else None
-    
-    # Calculer les coefficients
-    if resultats.get("d10") and resultats.get("d60"):
-        resultats["cu"] = round(resultats["d60"] / resultats["d10"], 2)
-    
-    if resultats.get("d10") and resultats.get("d30") and resultats.get("d60"):
-        resultats["cc"] = round((resultats["d30"] ** 2) / (resultats["d10"] * resultats["d60"]), 2)
-    
-    # Calculer les pourcentages granulométriques
-    if granulometrie.points_tamisage:
-        pourcentage_gravier = 0
-        pourcentage_sable = 0
-        pourcentage_limon = 0
-        pourcentage_argile = 0
-        
+    n = len(granulometries)
+    if n == 0:
+        return []
+    resultats_lot = [{} for _ in range(n)]
+
+    lignes_arr, diametres_arr, passants_arr, nombre_sed = _points_courbes_lot(granulometries)
+    nombre_points = np.bincount(lignes_arr, minlength=n)
+    calculables = nombre_points >= 2
+    if not calculables.any():
+        return resultats_lot
+
+    # Une seule interpolation en log-diamètre pour toutes les courbes du lot
+    garder = calculables[lignes_arr]
+    essais = np.flatnonzero(calculables)
+    positions = np.cumsum(calculables) - 1
+    courbe = CourbeGranulometrique(
+        positions[lignes_arr[garder]], diametres_arr[garder], passants_arr[garder]
+    )
+    diametres_car = courbe.diametres_caracteristiques()
+
+    # Fractions granulométriques : somme des refus par classe de diamètre
+    fractions = _fractions_lot(granulometries, essais)
+
+    # Fractions fines lues sur la courbe fusionnée
+    fines = {}
+    mesurees = np.flatnonzero(
+        (nombre_sed[essais] > 0) & (courbe.log_diametres[courbe.debuts] <= np.log10(LIMITE_ARGILE))
+    )
+    if len(mesurees):
+        passant_limon = courbe.passant_par_courbe(np.full(courbe.nombre, LIMITE_LIMON))
+        passant_argile = courbe.passant_par_courbe(np.full(courbe.nombre, LIMITE_ARGILE))
+        fines = {
+            k: (float(passant_limon[k] - passant_argile[k]), float(passant_argile[k]))
+            for k in mesurees.tolist()
+        }
+
+    for k, i in enumerate(essais):
+        resultats = resultats_lot[i]
+        for j, pourcentage in enumerate(POURCENTAGES_CARACTERISTIQUES):
+            resultats[f"d{pourcentage}"] = round(float(diametres_car[k, j]), 3)
+
+        # Calculer les coefficients
+        if resultats.get("d10") and resultats.get("d60"):
+            resultats["cu"] = round(resultats["d60"] / resultats["d10"], 2)
+
+        if resultats.get("d10") and resultats.get("d30") and resultats.get("d60"):
+            resultats["cc"] = round((resultats["d30"] ** 2) / (resultats["d10"] * resultats["d60"]), 2)
+
+        if k in fractions:
+            gravier, sable, limon, argile = fractions[k]
+            if k in fines:
+                limon, argile = fines[k]
+            resultats["pourcentage_gravier"] = round(gravier, 1)
+            resultats["pourcentage_sable"] = round(sable, 1)
+            resultats["pourcentage_limon"] = round(limon, 1)
+            resultats["pourcentage_argile"] = round(argile, 1)
+
+        # Classification granulométrique selon NF P94-056
+        if resultats.get("d50"):
+            resultats["classe_granulometrique"] = _classifier_granulometrie(
+                resultats["d50"], resultats.get("cu"), resultats.get("cc")
+            )
+
+    return resultats_lot
+
+
+def courbe_granulometrique(granulometrie: EssaiGranulometrie) -> List[Dict[str, float]]:
+    """Courbe fusionnée tamisage + sédimentométrie, monotone, par diamètres croissants"""
+    lignes, diametres, passants, _ = _points_courbes_lot([granulometrie])
+    if len(lignes) == 0:
+        return []
+    return CourbeGranulometrique(lignes, diametres, passants).points()
+
+
+def _fractions_lot(granulometries: Sequence[EssaiGranulometrie], essais: np.ndarray) -> Dict[int, tuple]:
+    """
+    Pourcentages de gravier, sable, limon et argile des essais calculables
+
+    Les refus de tamisage sont cumulés par classe de diamètre ; la
+    sédimentométrie est traitée à part, sur la courbe fusionnée.
+    """
+    positions, cles, poids, reels = [], [], [], []
+    for k, i in enumerate(essais):
+        granulometrie = granulometries[i]
+        if not granulometrie.points_tamisage:
+            continue
+        positions.append(k)
         for point in granulometrie.points_tamisage:
             if isinstance(point, dict):
-                diametre = convertir_tamis_en_diametre(point.get("tamis", ""))
-                pourcentage_retenu = point.get("pourcentage_retenu", 0)
-                
+                diametre = diametre_tamis(point.get("tamis", ""))
                 if diametre:
-                    if diametre > 2.0:  # Gravier
-                        pourcentage_gravier += pourcentage_retenu
-                    elif diametre > 0.063:  # Sable
-                        pourcentage_sable += pourcentage_retenu
-                    elif diametre > 0.002:  # Limon
-                        pourcentage_limon += pourcentage_retenu
-                    else:  # Argile
-                        pourcentage_argile += pourcentage_retenu
-        
-        # Ajouter les fines de sédimentométrie
-        if granulometrie.points_sedimentometrie:
-            for point in granulometrie.points_sedimentometrie:
-                if isinstance(point, dict):
-                    diametre = point.get("diametre_mm", 0)
-                    pourcentage = point.get("pourcentage_passant", 0)
-                    if diametre <= 0.002:
-                        pourcentage_argile += pourcentage
-        
-        resultats["pourcentage_gravier"] = round(pourcentage_gravier, 1)
-        resultats["pourcentage_sable"] = round(pourcentage_sable, 1)
-        resultats["pourcentage_limon"] = round(pourcentage_limon, 1)
-        resultats["pourcentage_argile"] = round(pourcentage_argile, 1)
-    
-    # Classification granulométrique selon NF P94-056
-    if resultats.get("d50"):
-        d50 = resultats["d50"]
-        if d50 > 20:
-            classe = "G - Grave"
-        elif d50 > 2:
-            classe = "S - Sable"
-        elif d50 > 0.063:
-            classe = "L - Limon"
+                    retenu = point.get("pourcentage_retenu", 0)
+                    cles.append(4 * k + _classe_diametre(diametre))
+                    poids.append(retenu)
+                    reels.append(isinstance(retenu, float))
+
+    # bincount cumule les poids dans l'ordre d'apparition, comme la boucle d'origine
+    cles_arr = np.array(cles, dtype=np.int64)
+    sommes = np.bincount(
+        cles_arr, weights=np.array(poids, dtype=float), minlength=4 * len(essais)
+    ).reshape(-1, 4)
+    # Une somme d'entiers reste entière, comme avec l'accumulateur Python
+    flottantes = np.bincount(
+        cles_arr, weights=np.array(reels, dtype=float), minlength=4 * len(essais)
+    ).reshape(-1, 4) > 0
+    return {
+        k: tuple(
+            somme if flottante else int(somme)
+            for somme, flottante in zip(sommes[k].tolist(), flottantes[k].tolist())
+        )
+        for k in positions
+    }
+
+
+# Limites des classes fines (mm)
+LIMITE_LIMON = 0.063
+LIMITE_ARGILE = 0.002
+
+
+def _classe_diametre(diametre: float) -> int:
+    """Indice de classe : 0 gravier, 1 sable, 2 limon, 3 argile"""
+    if diametre > 2.0:  # Gravier
+        return 0
+    elif diametre > 0.063:  # Sable
+        return 1
+    elif diametre > 0.002:  # Limon
+        return 2
+    return 3  # Argile
+
+
+def _classifier_granulometrie(d50: float, cu: float = None, cc: float = None) -> str:
+    """Classe granulométrique selon D50, affinée par CU et CC"""
+    if d50 > 20:
+        classe = "G - Grave"
+    elif d50 > 2:
+        classe = "S - Sable"
+    elif d50 > 0.063:
+        classe = "L - Limon"
+    else:
+        classe = "A - Argile"
+
+    # Affiner selon CU et CC
+    if cu and cc:
+        if cu > 4 and 1 <= cc <= 3:
+            classe += " bien gradué"
         else:
-            classe = "A - Argile"
-        
-        # Affiner selon CU et CC
-        if resultats.get("cu") and resultats.get("cc"):
-            cu = resultats["cu"]
-            cc = resultats["cc"]
-            if cu > 4 and 1 <= cc <= 3:
-                classe += " bien gradué"
-            else:
-                classe += " mal gradué"
-        
-        resultats["classe_granulometrique"] = classe
-    
-    return resultats
+            classe += " mal gradué"
+
+    return classe
+
+
+def calculer_granulometrie(granulometrie: EssaiGranulometrie) -> Dict[str, Any]:
+    """Calcule les paramètres granulométriques d'un essai (voir calculer_granulometrie_batch)"""
+    return calculer_granulometrie_batch([granulometrie])[0]
+
+
+def calculer_autre_batch(essais: Sequence[Any]) -> List[Dict[str, Any]]:
+    """
+    Résultats de N essais sans moteur spécifique (type autre)
+
+    Aucune formule : les mesures libres (attribut ``mesures``) sont reprises
+    comme résultats, les nombres entiers restant entiers.
+    """
+    return [
+        {
+            nom: valeur
+            for nom, valeur in (getattr(essai, "mesures", None) or {}).items()
+            if valeur is not None
+        }
+        for essai in essais
+    ]
+
+
+def calculer_autre(essai: Any) -> Dict[str, Any]:
+    """Résultats d'un essai sans moteur spécifique (voir calculer_autre_batch)"""
+    return calculer_autre_batch([essai])[0]
 
 
 def convertir_tamis_en_diametre(tamis: str) -> float:
     """Convertit une référence de tamis en diamètre en mm"""
-    # Table de conversion standard (ISO/NF)
-    tamis_table = {
-        "80mm": 80, "63mm": 63, "50mm": 50, "40mm": 40, "31.5mm": 31.5,
-        "25mm": 25, "20mm": 20, "16mm": 16, "12.5mm": 12.5, "10mm": 10,
-        "8mm": 8, "6.3mm": 6.3, "5mm": 5, "4mm": 4, "3.15mm": 3.15,
-        "2.5mm": 2.5, "2mm": 2, "1.6mm": 1.6, "1.25mm": 1.25, "1mm": 1,
-        "0.8mm": 0.8, "0.63mm": 0.63, "0.5mm": 0.5, "0.4mm": 0.4, "0.315mm": 0.315,
-        "0.25mm": 0.25, "0.2mm": 0.2, "0.16mm": 0.16, "0.125mm": 0.125, "0.1mm": 0.1,
-        "0.08mm": 0.08, "0.063mm": 0.063, "0.05mm": 0.05, "0.04mm": 0.04
-    }
-    
-    # Essayer de trouver une correspondance
-    tamis_lower = tamis.lower().strip()
-    if tamis_lower in tamis_table:
-        return tamis_table[tamis_lower]
-    
-    # Essayer d'extraire un nombre
-    import re
-    match = re.search(r'(\d+\.?\d*)', tamis)
-    if match:
-        return float(match.group(1))
-    
-    return None
-
-
-def interpoler_diametre(points: List[tuple], pourcentage: float) -> float:
-    """Interpole le diamètre pour un pourcentage de passant donné"""
-    if not points:
-        return None
-    
-    # Trouver les deux points encadrant le pourcentage
-    for i in range(len(points) - 1):
-        d1, p1 = points[i]
-        d2, p2 = points[i + 1]
-        
-        if p1 >= pourcentage >= p2 or p1 <= pourcentage <= p2:
-            # Interpolation linéaire
-            if p2 != p1:
-                d = d1 + (d2 - d1) * (pourcentage - p1) / (p2 - p1)
-                return d
-            else:
-                return d1
-    
-    # Extrapolation si nécessaire
-    if pourcentage > points[0][1]:
-        return points[0][0]
-    if pourcentage < points[-1][1]:
-        return points[-1][0]
-    
-    return None
-
+    return diametre_tamis(tamis)
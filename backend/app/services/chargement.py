@@ -0,0 +1,70 @@
+"""
+Stratégies de chargement des relations d'un essai
+
+Les relations de Essai sont paresseuses : lues ligne par ligne sur une liste,
+elles coûtent une requête par essai et par relation. options_chargement
+choisit, pour une requête donnée, quelles relations charger d'avance et
+comment :
+- operateur, projet (plusieurs-vers-un) : joinedload, sans multiplier les lignes ;
+- données spécifiques d'un type connu : joinedload de la seule relation du type ;
+- données spécifiques de types mélangés : selectinload de chaque relation
+  (une requête IN par relation, quel que soit le nombre d'essais).
+"""
+from typing import Any, Iterable, List, Optional
+
+from pydantic import BaseModel
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.models.essai import Essai
+from app.services.registre import moteurs, obtenir_moteur
+
+RELATIONS_SIMPLES = ("operateur", "projet")
+
+# Champ pseudo-relationnel : données spécifiques de l'essai, selon son type
+DONNEES_SPECIFIQUES = "donnees_specifiques"
+
+
+def champs_requis(schema: type) -> List[str]:
+    """Champs d'un schéma de réponse qui correspondent à des relations de Essai"""
+    if isinstance(schema, type) and issubclass(schema, BaseModel):
+        relations = Essai.__mapper__.relationships.keys()
+        return [champ for champ in schema.model_fields if champ in relations]
+    return []
+
+
+def options_chargement(
+    champs: Iterable[str],
+    type_essai: Optional[Any] = None,
+    une_ligne: bool = False
+) -> List[Any]:
+    """
+    Options de chargement des relations nécessaires
+
+    champs : noms de relations de Essai (operateur, projet, cbr, ...) ou
+    DONNEES_SPECIFIQUES pour la relation du type de l'essai ; type_essai :
+    type commun à toutes les lignes, s'il est connu ; une_ligne : la requête
+    lit un seul essai (toutes les relations en une jointure).
+    """
+    champs = set(champs)
+    options = [joinedload(getattr(Essai, relation)) for relation in RELATIONS_SIMPLES if relation in champs]
+
+    specifiques = {moteur.relation for moteur in moteurs() if moteur.relation in champs}
+    if DONNEES_SPECIFIQUES in champs:
+        if type_essai is not None:
+            relation = obtenir_moteur(type_essai).relation
+            if relation is not None:
+                specifiques.add(relation)
+        else:
+            specifiques.update(moteur.relation for moteur in moteurs() if moteur.relation is not None)
+
+    chargeur = joinedload if type_essai is not None or une_ligne else selectinload
+    options.extend(chargeur(getattr(Essai, relation)) for relation in sorted(specifiques))
+    return options
+
+
+def charger(query: Any, *champs: Any, type_essai: Optional[Any] = None, une_ligne: bool = False) -> Any:
+    """Ajoute à une requête d'essais le chargement des relations des champs (ou schémas) donnés"""
+    noms: List[str] = []
+    for champ in champs:
+        noms.extend(champs_requis(champ) if isinstance(champ, type) else [champ])
+    return query.options(*options_chargement(noms, type_essai, une_ligne))
@@ -0,0 +1,141 @@
+"""
+Tenue des compteurs journaliers des essais (table essais_compteurs_jour)
+
+Les compteurs sont ajustés à chaque flush de session : +1 sur la clé (jour
+de création, type, statut, projet, opérateur) d'un essai créé, -1 sur celle
+d'un essai supprimé, et déplacement d'une clé à l'autre quand le statut, le
+type, le projet ou l'opérateur change. Les clés sont lues en SQL (avant le
+flush pour les anciennes valeurs, après pour les nouvelles), sans charger
+les essais. Les ajustements sont appliqués par INSERT ... ON CONFLICT DO
+UPDATE. reconstruire_compteurs recalcule la table depuis les essais.
+"""
+from collections import Counter
+from datetime import date
+from typing import Any, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import Date, delete, event, func, select
+from sqlalchemy import inspect as inspecter
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models.compteurs import SANS_PROJET, EssaiCompteurJour
+from app.models.essai import Essai
+
+# Champs de l'essai qui déterminent sa clé de comptage
+CHAMPS_CLE = ("created_at", "type_essai", "statut", "projet_id", "operateur_id")
+
+# Essais lus par instruction
+TAILLE_LOT_COMPTEURS = 1000
+
+# INSERT ... ON CONFLICT de chaque dialecte
+INSERTIONS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+Cle = Tuple[date, Any, Any, int, int]
+
+
+def _cles(connexion: Connection, condition: Optional[Any] = None) -> "Counter[Cle]":
+    """Nombre d'essais par clé (jour, type, statut, projet, opérateur), pour les essais sélectionnés"""
+    jour = func.date(Essai.created_at, type_=Date)
+    requete = (
+        select(jour, Essai.type_essai, Essai.statut, Essai.projet_id, Essai.operateur_id, func.count(Essai.id))
+        .where(Essai.created_at.isnot(None))
+        .group_by(jour, Essai.type_essai, Essai.statut, Essai.projet_id, Essai.operateur_id)
+    )
+    if condition is not None:
+        requete = requete.where(condition)
+    cles: "Counter[Cle]" = Counter()
+    for jour_essai, type_essai, statut, projet_id, operateur_id, nombre in connexion.execute(requete):
+        cles[(jour_essai, type_essai, statut, projet_id or SANS_PROJET, operateur_id)] += nombre
+    return cles
+
+
+def _cles_essais(connexion: Connection, essai_ids: Iterable[int]) -> "Counter[Cle]":
+    """Nombre d'essais par clé, pour les essais donnés"""
+    identifiants = sorted(set(essai_ids))
+    cles: "Counter[Cle]" = Counter()
+    for debut in range(0, len(identifiants), TAILLE_LOT_COMPTEURS):
+        cles.update(_cles(connexion, Essai.id.in_(identifiants[debut:debut + TAILLE_LOT_COMPTEURS])))
+    return cles
+
+
+def ajuster_compteurs(connexion: Connection, deltas: "Counter[Cle]") -> None:
+    """Ajoute les variations aux compteurs et supprime les compteurs tombés à zéro"""
+    lignes = [
+        {
+            "jour": jour, "type_essai": type_essai, "statut": statut, "projet_id": projet_id,
+            "operateur_id": operateur_id, "mois": jour.replace(day=1), "nombre": delta,
+        }
+        for (jour, type_essai, statut, projet_id, operateur_id), delta in deltas.items()
+        if delta
+    ]
+    if not lignes:
+        return
+    inserer = INSERTIONS[connexion.dialect.name]
+    for debut in range(0, len(lignes), TAILLE_LOT_COMPTEURS):
+        instruction = inserer(EssaiCompteurJour).values(lignes[debut:debut + TAILLE_LOT_COMPTEURS])
+        connexion.execute(instruction.on_conflict_do_update(
+            index_elements=[colonne.name for colonne in EssaiCompteurJour.__table__.primary_key],
+            set_={"nombre": EssaiCompteurJour.nombre + instruction.excluded.nombre}
+        ))
+    jours = {ligne["jour"] for ligne in lignes if ligne["nombre"] < 0}
+    if jours:
+        connexion.execute(
+            delete(EssaiCompteurJour).where(EssaiCompteurJour.jour.in_(jours), EssaiCompteurJour.nombre <= 0)
+        )
+
+
+def compter_essais(connexion: Connection, essai_ids: Iterable[int]) -> None:
+    """
+    Ajoute aux compteurs des essais insérés hors session (INSERT groupés)
+
+    Les clés sont lues en SQL comme au flush : le jour suit le fuseau de la
+    session de base, quel que soit le fuseau des valeurs retournées au pilote.
+    """
+    ajuster_compteurs(connexion, _cles_essais(connexion, essai_ids))
+
+
+def reconstruire_compteurs(connexion: Connection) -> int:
+    """Recalcule tous les compteurs depuis la table des essais ; retourne le nombre de compteurs"""
+    connexion.execute(delete(EssaiCompteurJour))
+    cles = _cles(connexion)
+    ajuster_compteurs(connexion, cles)
+    return len(cles)
+
+
+def _cle_modifiee(objet: Any) -> bool:
+    etat = inspecter(objet)
+    return any(etat.attrs[champ].history.has_changes() for champ in CHAMPS_CLE)
+
+
+def _essais_modifies(session: Session) -> Set[int]:
+    return {
+        objet.id for objet in session.dirty
+        if isinstance(objet, Essai) and objet.id is not None and _cle_modifiee(objet)
+    }
+
+
+@event.listens_for(Session, "before_flush")
+def _lire_cles_avant(session: Session, contexte: Any, instances: Any) -> None:
+    """Clés des essais modifiés ou supprimés telles qu'enregistrées avant le flush"""
+    identifiants = _essais_modifies(session) | {
+        objet.id for objet in session.deleted if isinstance(objet, Essai) and objet.id is not None
+    }
+    # Toujours réécrit : un flush précédent annulé ne laisse pas de clés périmées
+    session.info["compteurs_avant"] = _cles_essais(session.connection(), identifiants) if identifiants else None
+
+
+@event.listens_for(Session, "after_flush")
+def _maintenir_compteurs(session: Session, contexte: Any) -> None:
+    """Reporte sur les compteurs les essais créés, modifiés ou supprimés par le flush"""
+    avant = session.info.pop("compteurs_avant", None)
+    identifiants: List[int] = [objet.id for objet in session.new if isinstance(objet, Essai)]
+    identifiants.extend(_essais_modifies(session))
+    if not identifiants and not avant:
+        return
+
+    connexion = session.connection()
+    deltas = _cles_essais(connexion, identifiants) if identifiants else Counter()
+    if avant:
+        deltas.subtract(avant)
+    ajuster_compteurs(connexion, deltas)
@@ -0,0 +1,94 @@
+"""
+Cache versionné des critères de validation du workflow
+
+Les critères (table criteres_validation, données initiales quasi fixes) sont
+relus par les écrans de validation à chaque rafraîchissement. Chaque liste
+(type d'essai, niveau) est gardée sérialisée avec son ETag, empreinte du
+seul contenu : tous les processus donnent le même ETag à une même liste. Un
+compteur de version, incrémenté à chaque création ou modification de
+critère, invalide toutes les entrées du processus. Les autres processus relisent la base au
+plus tard après settings.CACHE_CRITERES_TTL secondes.
+"""
+import hashlib
+import json
+import time
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.workflow import CritereValidation, NiveauValidation
+from app.schemas.workflow import CritereValidationRead
+
+Cle = Tuple[Optional[str], Optional[str]]
+
+
+class CacheCriteres:
+    """Listes de critères sérialisées par (type d'essai, niveau), avec leur ETag"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.version = 0
+        self._entrees: Dict[Cle, Tuple[float, str, List[Dict[str, Any]]]] = {}
+        self._lock = Lock()
+
+    def get(self, cle: Cle) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        """Retourne (ETag, critères) si l'entrée est encore fraîche"""
+        with self._lock:
+            entree = self._entrees.get(cle)
+            if entree is None or time.monotonic() - entree[0] > self.ttl:
+                return None
+            return entree[1], entree[2]
+
+    def put(self, cle: Cle, version: int, criteres: List[Dict[str, Any]]) -> str:
+        """Ajoute une liste lue avec la version donnée et retourne son ETag"""
+        contenu = json.dumps(criteres, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        etag = f'"{hashlib.sha256(contenu.encode("utf-8")).hexdigest()[:32]}"'
+        with self._lock:
+            # Une invalidation survenue pendant la lecture rend la liste obsolète
+            if version == self.version:
+                self._entrees[cle] = (time.monotonic(), etag, criteres)
+        return etag
+
+    def invalider(self) -> None:
+        """Incrémente la version et vide le cache"""
+        with self._lock:
+            self.version += 1
+            self._entrees.clear()
+
+
+cache_criteres = CacheCriteres(settings.CACHE_CRITERES_TTL)
+
+
+def lister_criteres(
+    db: Session,
+    type_essai: Optional[str] = None,
+    niveau: Optional[NiveauValidation] = None
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """Critères de validation filtrés (sérialisés en JSON) et leur ETag"""
+    cle = (type_essai or None, niveau.value if niveau else None)
+    entree = cache_criteres.get(cle)
+    if entree is not None:
+        return entree
+
+    version = cache_criteres.version
+    query = db.query(CritereValidation)
+    if type_essai:
+        query = query.filter(CritereValidation.type_essai == type_essai)
+    if niveau:
+        query = query.filter(CritereValidation.niveau_validation == niveau)
+
+    criteres = [
+        CritereValidationRead.model_validate(critere).model_dump(mode="json")
+        for critere in query.order_by(CritereValidation.id)
+    ]
+    return cache_criteres.put(cle, version, criteres), criteres
+
+
+def etag_correspond(if_none_match: Optional[str], etag: str) -> bool:
+    """Vrai si l'en-tête If-None-Match désigne l'ETag courant"""
+    if not if_none_match:
+        return False
+    etags = [valeur.strip() for valeur in if_none_match.split(",")]
+    return "*" in etags or etag in etags or f"W/{etag}" in etags
@@ -0,0 +1,141 @@
+"""
+Registre des tamis et courbes granulométriques
+
+Le registre des tamis normalisés (ISO/NF) est construit une fois à l'import ;
+les références non normalisées passent par une expression régulière
+précompilée dont les résultats sont mis en cache. La courbe granulométrique
+interpole en log-diamètre avec np.interp et calcule tous les diamètres
+caractéristiques de plusieurs essais en un seul appel.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Diamètres des tamis normalisés (mm), indexés par leur référence
+TAMIS_NORMALISES: Dict[str, float] = {
+    "80mm": 80, "63mm": 63, "50mm": 50, "40mm": 40, "31.5mm": 31.5,
+    "25mm": 25, "20mm": 20, "16mm": 16, "12.5mm": 12.5, "10mm": 10,
+    "8mm": 8, "6.3mm": 6.3, "5mm": 5, "4mm": 4, "3.15mm": 3.15,
+    "2.5mm": 2.5, "2mm": 2, "1.6mm": 1.6, "1.25mm": 1.25, "1mm": 1,
+    "0.8mm": 0.8, "0.63mm": 0.63, "0.5mm": 0.5, "0.4mm": 0.4, "0.315mm": 0.315,
+    "0.25mm": 0.25, "0.2mm": 0.2, "0.16mm": 0.16, "0.125mm": 0.125, "0.1mm": 0.1,
+    "0.08mm": 0.08, "0.063mm": 0.063, "0.05mm": 0.05, "0.04mm": 0.04
+}
+
+_NOMBRE = re.compile(r'(\d+\.?\d*)')
+
+# Pourcentages de passant des diamètres caractéristiques (D10, D16, ...)
+POURCENTAGES_CARACTERISTIQUES = (10, 16, 30, 50, 60, 84)
+
+
+@lru_cache(maxsize=512)
+def _analyser_reference(tamis: str) -> Optional[float]:
+    """Extrait le diamètre d'une référence non normalisée (ex. "Tamis 2 mm")"""
+    match = _NOMBRE.search(tamis)
+    if match:
+        return float(match.group(1))
+    return None
+
+
+def diametre_tamis(tamis: str) -> Optional[float]:
+    """Diamètre en mm d'une référence de tamis (None si illisible)"""
+    diametre = TAMIS_NORMALISES.get(tamis)
+    if diametre is not None:
+        return diametre
+    diametre = TAMIS_NORMALISES.get(tamis.lower().strip())
+    if diametre is not None:
+        return diametre
+    return _analyser_reference(tamis)
+
+
+class CourbeGranulometrique:
+    """
+    Une ou plusieurs courbes granulométriques (pourcentage passant / diamètre)
+
+    Les points de chaque courbe sont triés par diamètre croissant et le passant
+    est rendu monotone (maximum cumulé). Les courbes sont concaténées avec un
+    décalage de passant propre à chacune, ce qui permet d'interroger toutes les
+    courbes avec un seul np.interp. Hors de la plage mesurée, les diamètres sont
+    bornés aux extrémités de la courbe.
+    """
+
+    def __init__(self, courbes: np.ndarray, diametres: np.ndarray, passants: np.ndarray):
+        """
+        courbes: indice de courbe de chaque point (0..n-1, toutes représentées)
+        diametres, passants: points de mesure (diamètres > 0)
+        """
+        courbes = np.asarray(courbes, dtype=np.int64)
+        diametres = np.asarray(diametres, dtype=float)
+        passants = np.asarray(passants, dtype=float)
+
+        ordre = np.lexsort((diametres, courbes))
+        self.courbes = courbes[ordre]
+        self.diametres_tries = diametres[ordre]
+        self.log_diametres = np.log10(self.diametres_tries)
+        passants = passants[ordre]
+
+        self.nombre = int(self.courbes[-1]) + 1 if len(self.courbes) else 0
+        self.debuts = np.searchsorted(self.courbes, np.arange(self.nombre), side="left")
+        self.fins = np.searchsorted(self.courbes, np.arange(self.nombre), side="right") - 1
+
+        # Décalage supérieur à l'étendue des passants : les courbes ne se chevauchent pas
+        self._decalage = float(np.ptp(passants)) + 1.0 if len(passants) else 1.0
+        decalages = self.courbes * self._decalage
+        decales = passants + decalages
+        self._passants_decales = np.maximum.accumulate(decales)
+        # Passants monotones relus sur les points records (sans erreur d'arrondi du décalage)
+        records = np.where(decales >= self._passants_decales, np.arange(len(decales)), 0)
+        self.passants = passants[np.maximum.accumulate(records)] if len(decales) else passants
+
+    @classmethod
+    def depuis_points(cls, points: Sequence[Tuple[float, float]]) -> "CourbeGranulometrique":
+        """Courbe unique à partir de points (diamètre mm, pourcentage passant)"""
+        diametres = [d for d, _ in points]
+        passants = [p for _, p in points]
+        return cls(np.zeros(len(points), dtype=np.int64), diametres, passants)
+
+    def diametres(self, pourcentages: Sequence[float]) -> np.ndarray:
+        """Diamètres (mm) aux pourcentages de passant donnés : tableau (courbes, pourcentages)"""
+        pourcentages = np.asarray(pourcentages, dtype=float)
+        minimums = self.passants[self.debuts][:, None]
+        maximums = self.passants[self.fins][:, None]
+        cibles = np.clip(pourcentages[None, :], minimums, maximums)
+        cibles = cibles + (np.arange(self.nombre) * self._decalage)[:, None]
+        return 10 ** np.interp(cibles, self._passants_decales, self.log_diametres)
+
+    def passant(self, diametres: Sequence[float]) -> np.ndarray:
+        """Pourcentages passant aux diamètres donnés : tableau (courbes, diamètres)"""
+        log_d = np.log10(np.asarray(diametres, dtype=float))
+        resultat = np.empty((self.nombre, len(log_d)))
+        for k in range(self.nombre):
+            segment = slice(self.debuts[k], self.fins[k] + 1)
+            resultat[k] = np.interp(log_d, self.log_diametres[segment], self.passants[segment])
+        return resultat
+
+    def passant_par_courbe(self, diametres: Sequence[float]) -> np.ndarray:
+        """Pourcentage passant de chaque courbe à son propre diamètre (un diamètre par courbe)"""
+        log_d = np.log10(np.asarray(diametres, dtype=float))
+        log_d = np.clip(log_d, self.log_diametres[self.debuts], self.log_diametres[self.fins])
+        # Même décalage que pour les passants, appliqué aux log-diamètres
+        decalage = float(np.ptp(self.log_diametres)) + 1.0 if len(self.log_diametres) else 1.0
+        return np.interp(
+            log_d + np.arange(self.nombre) * decalage,
+            self.log_diametres + self.courbes * decalage,
+            self.passants
+        )
+
+    def points(self, courbe: int = 0) -> List[Dict[str, float]]:
+        """Points de la courbe monotone (diamètres croissants)"""
+        segment = slice(self.debuts[courbe], self.fins[courbe] + 1)
+        return [
+            {"diametre_mm": diametre, "pourcentage_passant": passant}
+            for diametre, passant in zip(
+                self.diametres_tries[segment].tolist(), self.passants[segment].tolist()
+            )
+        ]
+
+    def diametres_caracteristiques(self) -> np.ndarray:
+        """D10, D16, D30, D50, D60 et D84 de chaque courbe"""
+        return self.diametres(POURCENTAGES_CARACTERISTIQUES)
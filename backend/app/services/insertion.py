@@ -0,0 +1,110 @@
+"""
+Insertion d'un lot d'essais en une transaction
+
+Les essais d'un lot (avec leurs données spécifiques déjà validées et
+calculées) sont écrits par INSERT multi-lignes : les essais d'abord, puis les
+données spécifiques de chaque type, l'historique, les documents de recherche,
+les compteurs du tableau de bord et les esquisses de quantiles. Aucun objet n'est ajouté à la session :
+les instructions sont exécutées sur sa connexion, dans sa transaction, et
+validées par l'appelant.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import inspect as inspecter
+from sqlalchemy import insert, null
+from sqlalchemy.orm import Session
+
+from app.models.essai import Essai
+from app.models.history import EssaiHistory
+from app.services.compteurs import compter_essais
+from app.services.quantiles import ajouter_valeurs, valeurs_resultats
+from app.services.recherche import indexer_essais
+from app.services.registre import moteurs
+
+# Lignes par instruction INSERT : borne le nombre de paramètres liés
+TAILLE_LOT_INSERTION = 500
+
+
+def _ligne(objet: Any, exclus: Sequence[str] = ()) -> Dict[str, Any]:
+    """
+    Valeurs des colonnes d'un objet transitoire, pour un INSERT multi-lignes
+
+    Toutes les lignes d'un même INSERT portent les mêmes colonnes : une valeur
+    absente est remplacée par le défaut de la colonne (Python ou serveur), à
+    défaut par NULL.
+    """
+    valeurs = {}
+    for attribut in inspecter(type(objet)).column_attrs:
+        colonne = attribut.columns[0]
+        if colonne.primary_key or attribut.key in exclus:
+            continue
+        valeur = getattr(objet, attribut.key, None)
+        if valeur is None:
+            if colonne.default is not None and colonne.default.is_scalar:
+                valeur = colonne.default.arg
+            elif colonne.server_default is not None:
+                valeur = colonne.server_default.arg
+            else:
+                valeur = null()
+        valeurs[attribut.key] = valeur
+    return valeurs
+
+
+def _inserer(db: Session, modele: type, lignes: List[Dict[str, Any]], retour: Optional[tuple] = None) -> List[Any]:
+    """INSERT ... VALUES (...), (...) par tranches de TAILLE_LOT_INSERTION lignes"""
+    retournees = []
+    for debut in range(0, len(lignes), TAILLE_LOT_INSERTION):
+        instruction = insert(modele).values(lignes[debut:debut + TAILLE_LOT_INSERTION])
+        if retour:
+            retournees.extend(db.execute(instruction.returning(*retour)).all())
+        else:
+            db.execute(instruction)
+    return retournees
+
+
+def inserer_essais(db: Session, essais: Sequence[Essai], user_id: int) -> List[int]:
+    """
+    Insère un lot d'essais transitoires, leurs données spécifiques et leur historique
+
+    Les données spécifiques sont lues sur la relation du moteur de chaque type
+    (renseignée par importer_donnees_specifiques). Retourne les identifiants
+    des essais, dans l'ordre du lot. Ne valide pas la transaction.
+    """
+    if not essais:
+        return []
+
+    # L'ordre des lignes de RETURNING n'est pas garanti : les identifiants
+    # sont rapprochés par numéro d'essai (unique)
+    lignes = [_ligne(essai) for essai in essais]
+    retournees = _inserer(db, Essai, lignes, (Essai.id, Essai.numero_essai))
+    identifiants = dict((ligne[1], ligne[0]) for ligne in retournees)
+    essai_ids = [identifiants[essai.numero_essai] for essai in essais]
+
+    resultats = []
+    for moteur in moteurs():
+        if moteur.relation is None:
+            continue
+        donnees = []
+        for essai, essai_id in zip(essais, essai_ids):
+            objet = essai.__dict__.get(moteur.relation)
+            if objet is not None:
+                donnees.append({**_ligne(objet, exclus=("essai_id",)), "essai_id": essai_id})
+                resultats.append((essai.projet_id, objet))
+        if donnees:
+            _inserer(db, moteur.modele, donnees)
+
+    _inserer(db, EssaiHistory, [
+        {
+            "essai_id": essai_id,
+            "user_id": user_id,
+            "action": "create",
+            "comment": f"Essai créé: {essai.numero_essai}",
+        }
+        for essai, essai_id in zip(essais, essai_ids)
+    ])
+
+    # Les INSERT ne passent pas par le flush : index de recherche, compteurs et esquisses tenus ici
+    indexer_essais(db.connection(), essai_ids)
+    compter_essais(db.connection(), essai_ids)
+    ajouter_valeurs(db.connection(), valeurs_resultats(resultats))
+    return essai_ids
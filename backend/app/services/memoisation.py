@@ -0,0 +1,130 @@
+"""
+Mémoïsation des calculs d'essais par empreinte du contenu
+
+L'empreinte d'un essai est le SHA-256 d'une sérialisation canonique de ses
+données mesurées (points, nombres de coups, masses) et de la version du moteur
+de calcul. Les résultats récents sont gardés dans un cache LRU borné ; la
+colonne hash_calcul persiste l'empreinte des données telles que stockées après
+calcul, ce qui permet de sauter entièrement un recalcul sur données inchangées.
+Les résultats sont copiés en profondeur à l'entrée et à la sortie du cache :
+les valeurs imbriquées (ajustement Proctor, courbes) reportées sur un essai
+ne sont jamais partagées avec l'entrée du cache ni avec un autre essai.
+"""
+import copy
+import hashlib
+import json
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.services.calculs import VERSION_MOTEUR_CALCUL
+from app.services.registre import obtenir_moteur
+
+
+class CacheCalculs:
+    """Cache LRU borné et thread-safe des résultats de calcul"""
+
+    def __init__(self, taille_max: int = 1024):
+        self.taille_max = taille_max
+        self._entrees: "OrderedDict[str, Tuple[Dict[str, Any], Dict[str, Any]]]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, empreinte: str) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Retourne (résultats, champs complétés) ou None"""
+        with self._lock:
+            entree = self._entrees.get(empreinte)
+            if entree is None:
+                self.misses += 1
+                return None
+            self._entrees.move_to_end(empreinte)
+            self.hits += 1
+            return entree
+
+    def put(self, empreinte: str, resultats: Dict[str, Any], completes: Dict[str, Any]) -> None:
+        """Ajoute une entrée en évinçant la moins récemment utilisée"""
+        with self._lock:
+            self._entrees[empreinte] = (resultats, completes)
+            self._entrees.move_to_end(empreinte)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+
+    def clear(self) -> None:
+        """Vide le cache"""
+        with self._lock:
+            self._entrees.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entrees)
+
+
+cache_calculs = CacheCalculs(settings.CACHE_CALCULS_TAILLE)
+
+
+def empreinte_entrees(type_essai: str, entrees: Dict[str, Any]) -> str:
+    """Empreinte canonique (SHA-256) de données mesurées et de la version du moteur"""
+    contenu = json.dumps(
+        {"type": type_essai, "version": VERSION_MOTEUR_CALCUL, "entrees": entrees},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(contenu.encode("utf-8")).hexdigest()
+
+
+def empreinte_calcul(type_essai: str, objet: Any) -> str:
+    """Empreinte des données mesurées d'un essai"""
+    return empreinte_entrees(
+        type_essai,
+        {champ: getattr(objet, champ, None) for champ in obtenir_moteur(type_essai).champs_entree}
+    )
+
+
+def calculer_memoise(type_essai: str, objet: Any) -> Dict[str, Any]:
+    """
+    Calcule les résultats d'un essai en passant par le cache LRU
+
+    Comme le calcul direct, complète les données saisies de l'objet ; renseigne
+    aussi objet.hash_calcul avec l'empreinte des données complétées.
+    """
+    moteur = obtenir_moteur(type_essai)
+    empreinte = empreinte_calcul(type_essai, objet)
+    entree = cache_calculs.get(empreinte)
+
+    if entree is None:
+        resultats = moteur.calculer(objet)
+        completes = {
+            champ: copy.deepcopy(getattr(objet, champ))
+            for champ in moteur.champs_completes
+        }
+        memorises = copy.deepcopy(resultats)
+        cache_calculs.put(empreinte, memorises, completes)
+        # Le calcul est idempotent : les données complétées donnent les mêmes résultats
+        empreinte_completee = empreinte_calcul(type_essai, objet)
+        if empreinte_completee != empreinte:
+            cache_calculs.put(empreinte_completee, memorises, completes)
+        objet.hash_calcul = empreinte_completee
+        return resultats
+
+    resultats, completes = entree
+    for champ, valeur in completes.items():
+        setattr(objet, champ, copy.deepcopy(valeur))
+    objet.hash_calcul = empreinte_calcul(type_essai, objet) if completes else empreinte
+    return copy.deepcopy(resultats)
+
+
+def recalculer_si_necessaire(type_essai: str, objet: Any) -> Optional[Dict[str, Any]]:
+    """
+    Recalcule un essai dont les données ont pu changer
+
+    Retourne None sans rien calculer si l'empreinte persistée correspond aux
+    données actuelles : les résultats stockés sont déjà à jour.
+    """
+    if objet.hash_calcul is not None and objet.hash_calcul == empreinte_calcul(type_essai, objet):
+        return None
+    return calculer_memoise(type_essai, objet)
@@ -0,0 +1,279 @@
+"""
+Ingestion des enregistrements de presse CBR
+
+Les presses exportent des milliers d'échantillons (pénétration, force) par
+essai. Le fichier CSV est lu en flux, par blocs d'octets : chaque bloc est
+analysé avec np.loadtxt, ses échantillons sont ajoutés à la trace brute
+(fichier binaire float32, paires pénétration/force) et les forces à 2.5 mm et
+5.0 mm sont interpolées exactement au premier franchissement. La courbe
+d'affichage est ensuite réduite par l'algorithme LTTB (largest triangle three
+buckets) en relisant la trace par projection mémoire : la mémoire utilisée ne
+dépend pas de la taille du fichier.
+"""
+import os
+import re
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Taille des blocs lus dans le fichier de la presse (octets)
+TAILLE_BLOC = 1 << 20
+
+# Nombre de points de la courbe d'affichage
+POINTS_AFFICHAGE = 500
+
+# Pénétrations normatives (mm) et tolérance de lecture aux extrémités de la trace
+PENETRATIONS_NORMATIVES = {"force_25mm": 2.5, "force_50mm": 5.0}
+TOLERANCE_PENETRATION = 0.1
+
+# Format de la trace brute : paires (pénétration mm, force kN) en float32 little-endian
+FORMAT_TRACE = np.dtype("<f4")
+
+_MOTS_PENETRATION = ("penetration", "pénétration", "deplacement", "déplacement", "enfoncement", "course")
+_MOTS_FORCE = ("force", "charge", "effort")
+_UNITE_NEWTON = re.compile(r"[(\[]\s*n\s*[)\]]")
+_LETTRE = re.compile(r"[^\W\d_]")
+
+
+def _decoder(ligne: bytes) -> str:
+    """Décode une ligne d'en-tête (UTF-8, sinon Latin-1 des exports Windows)"""
+    try:
+        return ligne.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return ligne.decode("latin-1")
+
+
+def _analyser_entete(premiere_ligne: str) -> Tuple[str, bool, int, int, float]:
+    """
+    Séparateur, présence d'un en-tête, colonnes (pénétration, force) et facteur de force
+
+    Sans en-tête, les deux premières colonnes sont la pénétration et la force
+    en kN. Une force annoncée en N est convertie en kN.
+    """
+    separateur = max((";", "\t", ","), key=premiere_ligne.count)
+    colonnes = [colonne.strip().lower() for colonne in premiere_ligne.split(separateur)]
+    if not any(_LETTRE.search(colonne) for colonne in colonnes):
+        return separateur, False, 0, 1, 1.0
+
+    def trouver(mots):
+        for indice, colonne in enumerate(colonnes):
+            if any(mot in colonne for mot in mots):
+                return indice
+        return None
+
+    penetration = trouver(_MOTS_PENETRATION)
+    force = trouver(_MOTS_FORCE)
+    if penetration is None or force is None:
+        raise ValueError(
+            "En-tête non reconnu: colonnes de pénétration et de force introuvables "
+            f"({premiere_ligne.strip()})"
+        )
+    facteur = 1e-3 if _UNITE_NEWTON.search(colonnes[force]) else 1.0
+    return separateur, True, penetration, force, facteur
+
+
+class IngestionPresse:
+    """
+    Accumulateur d'une trace de presse lue bloc par bloc
+
+    Seul le dernier échantillon du bloc précédent est conservé entre deux
+    blocs : il sert à interpoler un franchissement à cheval sur deux blocs.
+    """
+
+    def __init__(self, sortie: BinaryIO):
+        self.sortie = sortie
+        self.nombre_echantillons = 0
+        self.penetration_max = -np.inf
+        self.force_max = -np.inf
+        self.forces: Dict[str, Optional[float]] = {champ: None for champ in PENETRATIONS_NORMATIVES}
+        self._precedent: Optional[Tuple[float, float]] = None
+
+    def ajouter(self, penetrations: np.ndarray, forces: np.ndarray) -> None:
+        """Ajoute un bloc d'échantillons (dans l'ordre d'acquisition)"""
+        if not len(penetrations):
+            return
+        np.column_stack((penetrations, forces)).astype(FORMAT_TRACE).tofile(self.sortie)
+
+        for champ, cible in PENETRATIONS_NORMATIVES.items():
+            if self.forces[champ] is None:
+                self.forces[champ] = self._franchissement(penetrations, forces, cible)
+
+        self.nombre_echantillons += len(penetrations)
+        self.penetration_max = max(self.penetration_max, float(penetrations.max()))
+        self.force_max = max(self.force_max, float(forces.max()))
+        self._precedent = (float(penetrations[-1]), float(forces[-1]))
+
+    def _franchissement(self, penetrations: np.ndarray, forces: np.ndarray, cible: float) -> Optional[float]:
+        """Force interpolée au premier passage de la pénétration cible dans le bloc"""
+        if self._precedent is None:
+            # Trace commençant au-delà de la cible : lecture directe dans la tolérance
+            if penetrations[0] >= cible:
+                return float(forces[0]) if penetrations[0] - cible <= TOLERANCE_PENETRATION else None
+            x, y = penetrations, forces
+        else:
+            x = np.concatenate(([self._precedent[0]], penetrations))
+            y = np.concatenate(([self._precedent[1]], forces))
+
+        passages = np.flatnonzero((x[:-1] < cible) & (x[1:] >= cible))
+        if not len(passages):
+            return None
+        j = passages[0]
+        x0, x1, y0, y1 = float(x[j]), float(x[j + 1]), float(y[j]), float(y[j + 1])
+        return y0 + (cible - x0) * (y1 - y0) / (x1 - x0)
+
+    def terminer(self) -> None:
+        """Lecture dans la tolérance d'une cible juste au-delà de la fin de la trace"""
+        if self._precedent is None:
+            return
+        derniere_penetration, derniere_force = self._precedent
+        for champ, cible in PENETRATIONS_NORMATIVES.items():
+            if self.forces[champ] is None and 0 <= cible - derniere_penetration <= TOLERANCE_PENETRATION:
+                self.forces[champ] = derniere_force
+
+
+def _lire_blocs(flux: BinaryIO, taille_bloc: int):
+    """Découpe le flux en blocs de lignes complètes (octets)"""
+    reste = b""
+    while True:
+        bloc = flux.read(taille_bloc)
+        if not bloc:
+            break
+        bloc = reste + bloc
+        coupure = bloc.rfind(b"\n")
+        if coupure < 0:
+            reste = bloc
+            continue
+        reste = bloc[coupure + 1:]
+        yield bloc[:coupure + 1]
+    if reste.strip():
+        yield reste
+
+
+def indices_lttb(x: np.ndarray, y: np.ndarray, seuil: int) -> np.ndarray:
+    """
+    Indices des points retenus par LTTB (largest triangle three buckets)
+
+    Le premier et le dernier point sont conservés ; entre les deux, chaque
+    seau garde le point formant le plus grand triangle avec le point retenu
+    précédemment et la moyenne du seau suivant. x et y peuvent être des
+    projections mémoire : seuls deux seaux sont lus à la fois.
+    """
+    n = len(x)
+    if seuil >= n or seuil < 3:
+        return np.arange(n)
+
+    bornes = np.linspace(1, n - 1, seuil - 1).astype(np.int64)
+    indices = np.empty(seuil, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+
+    retenu = 0
+    xa, ya = float(x[0]), float(y[0])
+    for k in range(seuil - 2):
+        debut, fin = bornes[k], bornes[k + 1]
+        if k + 2 < len(bornes):
+            xc = float(np.mean(x[fin:bornes[k + 2]], dtype=float))
+            yc = float(np.mean(y[fin:bornes[k + 2]], dtype=float))
+        else:
+            xc, yc = float(x[n - 1]), float(y[n - 1])
+        xs = np.asarray(x[debut:fin], dtype=float)
+        ys = np.asarray(y[debut:fin], dtype=float)
+        aires = np.abs((xa - xc) * (ys - ya) - (xa - xs) * (yc - ya))
+        retenu = debut + int(np.argmax(aires))
+        indices[k + 1] = retenu
+        xa, ya = float(x[retenu]), float(y[retenu])
+    return indices
+
+
+def lire_trace(chemin: Path) -> np.ndarray:
+    """Trace brute projetée en mémoire : tableau (échantillons, 2) pénétration/force"""
+    if os.path.getsize(chemin) == 0:
+        return np.empty((0, 2), dtype=FORMAT_TRACE)
+    return np.memmap(chemin, dtype=FORMAT_TRACE, mode="r").reshape(-1, 2)
+
+
+def courbe_affichage(chemin: Path, forces: Dict[str, Optional[float]], points: int = POINTS_AFFICHAGE) -> List[Dict[str, float]]:
+    """
+    Courbe de pénétration réduite pour l'affichage et le calcul
+
+    Les forces interpolées aux pénétrations normatives y sont insérées :
+    l'interpolation de calculer_cbr sur la courbe réduite retrouve exactement
+    les forces lues sur la trace complète.
+    """
+    trace = lire_trace(chemin)
+    indices = indices_lttb(trace[:, 0], trace[:, 1], points)
+    echantillons = np.asarray(trace[indices], dtype=float)
+    courbe = [
+        {"penetration_mm": round(penetration, 4), "force_kN": round(force, 4)}
+        for penetration, force in echantillons.tolist()
+    ]
+    for champ, cible in PENETRATIONS_NORMATIVES.items():
+        if forces.get(champ) is not None:
+            courbe.append({"penetration_mm": cible, "force_kN": forces[champ]})
+    courbe.sort(key=lambda point: point["penetration_mm"])
+    return courbe
+
+
+def ingerer_csv(
+    flux: BinaryIO,
+    chemin_trace: Path,
+    points: int = POINTS_AFFICHAGE,
+    taille_bloc: int = TAILLE_BLOC
+) -> Dict[str, Any]:
+    """
+    Lit un export CSV de presse et écrit sa trace brute dans chemin_trace
+
+    Séparateurs acceptés : « ; », tabulation ou « , » ; avec « ; » ou une
+    tabulation, la virgule décimale est acceptée. La trace est écrite dans un
+    fichier temporaire renommé en fin de lecture. Lève ValueError si le
+    fichier est illisible ou ne contient aucun échantillon.
+    """
+    chemin_trace = Path(chemin_trace)
+    chemin_trace.parent.mkdir(parents=True, exist_ok=True)
+    temporaire = chemin_trace.with_name(chemin_trace.name + ".tmp")
+
+    try:
+        with temporaire.open("wb") as sortie:
+            ingestion = IngestionPresse(sortie)
+            configuration = None
+            for bloc in _lire_blocs(flux, taille_bloc):
+                if configuration is None:
+                    fin_ligne = bloc.find(b"\n")
+                    premiere = bloc if fin_ligne < 0 else bloc[:fin_ligne]
+                    configuration = _analyser_entete(_decoder(premiere))
+                    if configuration[1]:
+                        bloc = b"" if fin_ligne < 0 else bloc[fin_ligne + 1:]
+                separateur, _, colonne_penetration, colonne_force, facteur = configuration
+                if separateur != ",":
+                    bloc = bloc.replace(b",", b".")
+                lignes = [ligne for ligne in bloc.decode("latin-1").splitlines() if ligne.strip()]
+                if not lignes:
+                    continue
+                try:
+                    valeurs = np.loadtxt(
+                        lignes,
+                        delimiter=separateur,
+                        usecols=(colonne_penetration, colonne_force),
+                        ndmin=2,
+                        comments="#",
+                    )
+                except ValueError as e:
+                    raise ValueError(f"Ligne de mesure illisible après l'échantillon {ingestion.nombre_echantillons}: {e}")
+                ingestion.ajouter(valeurs[:, 0], valeurs[:, 1] * facteur)
+            ingestion.terminer()
+
+        if ingestion.nombre_echantillons == 0:
+            raise ValueError("Aucun échantillon de mesure dans le fichier")
+        os.replace(temporaire, chemin_trace)
+    finally:
+        if temporaire.exists():
+            temporaire.unlink()
+
+    return {
+        "nombre_echantillons": ingestion.nombre_echantillons,
+        "penetration_max": ingestion.penetration_max,
+        "force_max": ingestion.force_max,
+        **ingestion.forces,
+        "points_penetration": courbe_affichage(chemin_trace, ingestion.forces, points),
+    }
+
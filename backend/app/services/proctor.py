@@ -0,0 +1,217 @@
+"""
+Moteur d'ajustement des courbes Proctor
+
+Trois modèles sont proposés :
+- poly2 : parabole des moindres carrés (au moins 4 points)
+- poly3 : polynôme de degré 3 des moindres carrés (au moins 5 points)
+- spline : spline cubique monotone par morceaux (PCHIP, au moins 3 points)
+
+Un ajustement est stocké sous forme compacte (coefficients ou nœuds et pentes,
+domaine, qualité d'ajustement) ; la courbe d'affichage est régénérée à la
+demande avec la résolution voulue et mise en cache.
+"""
+import json
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+MODELES_AJUSTEMENT = ("poly2", "poly3", "spline")
+MODELE_PAR_DEFAUT = "poly2"
+
+# Nombre minimal de points de mesure par modèle
+POINTS_MINIMUM = {"poly2": 4, "poly3": 5, "spline": 3}
+
+DEGRES = {"poly2": 2, "poly3": 3}
+
+# Marge de teneur en eau (%) de part et d'autre des mesures pour les polynômes
+MARGE_COURBE = 1.0
+
+
+def _moindres_carres(x: np.ndarray, y: np.ndarray, degre: int) -> np.ndarray:
+    """
+    Ajustements polynomiaux d'un groupe de courbes de même taille
+
+    x, y : tableaux (courbes, points). Même méthode que np.polyfit (matrice
+    de Vandermonde normalisée par colonne, pseudo-inverse), appliquée à toutes
+    les courbes du groupe en une fois.
+    """
+    vandermonde = x[:, :, None] ** np.arange(degre, -1, -1)
+    echelle = np.sqrt(np.square(vandermonde).sum(axis=1))
+    echelle[echelle == 0] = 1.0
+    pseudo_inverse = np.linalg.pinv(vandermonde / echelle[:, None, :], rcond=x.shape[1] * np.finfo(float).eps)
+    return np.einsum("gkn,gn->gk", pseudo_inverse, y) / echelle
+
+
+def _pentes_pchip(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Pentes de Fritsch-Carlson aux nœuds (interpolation monotone par morceaux)"""
+    h = np.diff(x)
+    delta = np.diff(y) / h
+    if len(x) == 2:
+        return np.array([delta[0], delta[0]])
+
+    pentes = np.zeros_like(y)
+    w1 = 2 * h[1:] + h[:-1]
+    w2 = h[1:] + 2 * h[:-1]
+    meme_signe = (np.sign(delta[:-1]) * np.sign(delta[1:])) > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        interieures = (w1 + w2) / (w1 / delta[:-1] + w2 / delta[1:])
+    pentes[1:-1] = np.where(meme_signe, interieures, 0.0)
+
+    def extremite(h0, h1, d0, d1):
+        pente = ((2 * h0 + h1) * d0 - h0 * d1) / (h0 + h1)
+        if np.sign(pente) != np.sign(d0):
+            return 0.0
+        if np.sign(d0) != np.sign(d1) and abs(pente) > abs(3 * d0):
+            return 3 * d0
+        return pente
+
+    pentes[0] = extremite(h[0], h[1], delta[0], delta[1])
+    pentes[-1] = extremite(h[-1], h[-2], delta[-1], delta[-2])
+    return pentes
+
+
+def _evaluer_spline(noeuds: np.ndarray, valeurs: np.ndarray, pentes: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """Évalue une spline d'Hermite cubique (x borné au domaine des nœuds)"""
+    x = np.clip(x, noeuds[0], noeuds[-1])
+    k = np.clip(np.searchsorted(noeuds, x, side="right") - 1, 0, len(noeuds) - 2)
+    h = noeuds[k + 1] - noeuds[k]
+    t = (x - noeuds[k]) / h
+    t2, t3 = t * t, t * t * t
+    return (
+        (2 * t3 - 3 * t2 + 1) * valeurs[k]
+        + (t3 - 2 * t2 + t) * h * pentes[k]
+        + (-2 * t3 + 3 * t2) * valeurs[k + 1]
+        + (t3 - t2) * h * pentes[k + 1]
+    )
+
+
+def _qualite(y: np.ndarray, y_ajuste: np.ndarray) -> Dict[str, float]:
+    """Coefficient de détermination et erreur quadratique moyenne"""
+    residus = float(np.square(y - y_ajuste).sum())
+    total = float(np.square(y - y.mean()).sum())
+    r2 = 1 - residus / total if total > 0 else (1.0 if residus == 0 else 0.0)
+    return {"r2": round(r2, 4), "rmse": round(float(np.sqrt(residus / len(y))), 5)}
+
+
+def _optimum_polynome(coefficients: np.ndarray, x_min: float, x_max: float) -> Optional[float]:
+    """Teneur en eau du maximum local d'un polynôme dans le domaine mesuré"""
+    derivee = np.polyder(coefficients)
+    seconde = np.polyder(derivee)
+    candidats = [
+        racine.real for racine in np.atleast_1d(np.roots(derivee))
+        if abs(racine.imag) < 1e-12 and x_min <= racine.real <= x_max
+        and np.polyval(seconde, racine.real) < 0
+    ]
+    return float(candidats[0]) if candidats else None
+
+
+def _ajustement_polynome(modele: str, coefficients: np.ndarray, x: np.ndarray, y: np.ndarray) -> Dict[str, Any]:
+    """Ajustement compact d'un polynôme avec son optimum"""
+    x_min, x_max = float(x[0]), float(x[-1])
+    optimum = None
+    teneur = _optimum_polynome(coefficients, x_min, x_max)
+    if teneur is not None:
+        optimum = {"teneur_eau": teneur, "densite_seche": float(np.polyval(coefficients, teneur))}
+    return {
+        "modele": modele,
+        "coefficients": coefficients.tolist(),
+        "domaine": [x_min, x_max],
+        **_qualite(y, np.polyval(coefficients, x)),
+        "optimum": optimum,
+    }
+
+
+def _ajustement_spline(x: np.ndarray, y: np.ndarray) -> Dict[str, Any]:
+    """Ajustement compact d'une spline monotone (mesures de même teneur moyennées)"""
+    noeuds, inverse = np.unique(x, return_inverse=True)
+    valeurs = np.bincount(inverse, weights=y) / np.bincount(inverse)
+    pentes = _pentes_pchip(noeuds, valeurs) if len(noeuds) >= 2 else np.zeros(1)
+    # Une spline monotone par morceaux n'a d'extremum qu'à ses nœuds
+    sommet = int(np.argmax(valeurs))
+    optimum = None
+    if 0 < sommet < len(noeuds) - 1:
+        optimum = {"teneur_eau": float(noeuds[sommet]), "densite_seche": float(valeurs[sommet])}
+    ajuste = _evaluer_spline(noeuds, valeurs, pentes, x) if len(noeuds) >= 2 else np.full_like(y, valeurs[0])
+    return {
+        "modele": "spline",
+        "noeuds": noeuds.tolist(),
+        "valeurs": valeurs.tolist(),
+        "pentes": pentes.tolist(),
+        "domaine": [float(noeuds[0]), float(noeuds[-1])],
+        **_qualite(y, ajuste),
+        "optimum": optimum,
+    }
+
+
+def ajuster_lot(
+    x: np.ndarray,
+    y: np.ndarray,
+    debuts: np.ndarray,
+    effectifs: np.ndarray,
+    modeles: Sequence[str]
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Ajuste le modèle demandé sur chaque courbe d'un lot
+
+    x, y : points concaténés, triés par teneur en eau dans chaque courbe.
+    Retourne un ajustement par courbe (None si trop peu de points). Les
+    polynômes de même degré et de même nombre de points sont ajustés ensemble.
+    """
+    ajustements: List[Optional[Dict[str, Any]]] = [None] * len(debuts)
+
+    groupes: Dict[tuple, List[int]] = {}
+    for k, modele in enumerate(modeles):
+        if effectifs[k] < POINTS_MINIMUM[modele]:
+            continue
+        if modele == "spline":
+            segment = slice(debuts[k], debuts[k] + effectifs[k])
+            ajustements[k] = _ajustement_spline(x[segment], y[segment])
+        else:
+            groupes.setdefault((modele, int(effectifs[k])), []).append(k)
+
+    for (modele, taille), courbes in groupes.items():
+        indices = debuts[courbes][:, None] + np.arange(taille)
+        coefficients = _moindres_carres(x[indices], y[indices], DEGRES[modele])
+        for j, k in enumerate(courbes):
+            ajustements[k] = _ajustement_polynome(modele, coefficients[j], x[indices[j]], y[indices[j]])
+
+    return ajustements
+
+
+def evaluer(ajustement: Dict[str, Any], x: np.ndarray) -> np.ndarray:
+    """Densité sèche ajustée aux teneurs en eau données"""
+    x = np.asarray(x, dtype=float)
+    if ajustement["modele"] == "spline":
+        noeuds = np.asarray(ajustement["noeuds"], dtype=float)
+        valeurs = np.asarray(ajustement["valeurs"], dtype=float)
+        if len(noeuds) < 2:
+            return np.full_like(x, valeurs[0])
+        return _evaluer_spline(noeuds, valeurs, np.asarray(ajustement["pentes"], dtype=float), x)
+    return np.polyval(np.asarray(ajustement["coefficients"], dtype=float), x)
+
+
+@lru_cache(maxsize=256)
+def _courbe_en_cache(cle: str, points: int) -> List[Dict[str, float]]:
+    """Courbe calculée pour un ajustement sérialisé (clé du cache)"""
+    ajustement = json.loads(cle)
+    x_min, x_max = ajustement["domaine"]
+    if ajustement["modele"] != "spline":
+        x_min, x_max = x_min - MARGE_COURBE, x_max + MARGE_COURBE
+    x = np.linspace(x_min, x_max, points)
+    y = evaluer(ajustement, x)
+    return [
+        {"teneur_eau": teneur, "densite_seche": densite}
+        for teneur, densite in zip(x.tolist(), y.tolist())
+    ]
+
+
+def generer_courbe(ajustement: Optional[Dict[str, Any]], points: int = 100) -> Optional[List[Dict[str, float]]]:
+    """
+    Courbe Proctor d'affichage à la résolution demandée
+
+    La liste retournée est partagée par le cache : elle ne doit pas être modifiée.
+    """
+    if not ajustement or points < 2:
+        return None
+    return _courbe_en_cache(json.dumps(ajustement, sort_keys=True), points)
@@ -0,0 +1,384 @@
+"""
+Quantiles approchés des résultats d'essais (t-digest par projet)
+
+Chaque colonne de résultat suivie (COLONNES_DISTRIBUTION : densité sèche
+max, CBR, wl, ip, d50) a une esquisse t-digest par projet et type d'essai
+(table esquisses_quantiles). Les valeurs des données spécifiques créées sont
+fusionnées dans l'esquisse de leur projet au flush de la session (ou à
+l'insertion d'un lot). Un t-digest ne sait pas retirer une valeur : quand un
+résultat est recalculé ou supprimé, ou qu'un essai change de projet, les
+esquisses des projets touchés sont reconstruites depuis leurs seules lignes.
+Les esquisses des projets demandés sont fusionnées à la lecture : une
+requête de quantiles coûte la taille des esquisses, pas le nombre d'essais.
+
+Reconstruction complète (après une migration ou un recalcul hors application) :
+    python -m app.services.quantiles
+"""
+import argparse
+import math
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import delete, event, func, select
+from sqlalchemy import inspect as inspecter
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.compteurs import SANS_PROJET
+from app.models.essai import Essai, TypeEssai
+from app.models.quantiles import EsquisseQuantiles
+from app.services.compteurs import INSERTIONS, TAILLE_LOT_COMPTEURS
+from app.services.statistiques import COLONNES_DISTRIBUTION, PERCENTILES
+
+# (projet_id, type d'essai, colonne de résultat)
+Cle = Tuple[int, TypeEssai, str]
+
+
+class TDigest:
+    """
+    t-digest fusionnable (fonction d'échelle k1, fusion des centroïdes triés)
+
+    Les centroïdes sont d'autant plus fins qu'ils sont proches des extrémités
+    de la distribution : les percentiles extrêmes restent précis. Le nombre de
+    centroïdes est de l'ordre de la compression, quel que soit le nombre de
+    valeurs.
+    """
+
+    def __init__(
+        self,
+        compression: float = settings.QUANTILES_COMPRESSION,
+        moyennes: Sequence[float] = (),
+        poids: Sequence[float] = (),
+        minimum: float = math.inf,
+        maximum: float = -math.inf
+    ):
+        self.compression = compression
+        self.moyennes = np.asarray(moyennes, dtype=float)
+        self.poids = np.asarray(poids, dtype=float)
+        self.minimum = minimum
+        self.maximum = maximum
+
+    @classmethod
+    def depuis_esquisse(cls, esquisse: Any) -> "TDigest":
+        """t-digest d'une ligne d'esquisses_quantiles"""
+        centroides = np.asarray(esquisse.centroides, dtype=float).reshape(-1, 2)
+        return cls(
+            moyennes=centroides[:, 0], poids=centroides[:, 1],
+            minimum=esquisse.minimum, maximum=esquisse.maximum
+        )
+
+    @property
+    def nombre(self) -> int:
+        return int(round(self.poids.sum()))
+
+    def centroides(self) -> List[List[float]]:
+        return np.column_stack((self.moyennes, self.poids)).tolist()
+
+    def ajouter(self, valeurs: Iterable[float]) -> None:
+        """Ajoute des valeurs (les valeurs non finies sont ignorées)"""
+        valeurs = np.asarray(list(valeurs), dtype=float)
+        valeurs = valeurs[np.isfinite(valeurs)]
+        if valeurs.size == 0:
+            return
+        self.minimum = min(self.minimum, float(valeurs.min()))
+        self.maximum = max(self.maximum, float(valeurs.max()))
+        self._compresser(
+            np.concatenate((self.moyennes, valeurs)), np.concatenate((self.poids, np.ones(valeurs.size)))
+        )
+
+    def fusionner(self, autre: "TDigest") -> None:
+        """Ajoute les centroïdes d'un autre t-digest"""
+        if autre.poids.size == 0:
+            return
+        self.minimum = min(self.minimum, autre.minimum)
+        self.maximum = max(self.maximum, autre.maximum)
+        self._compresser(
+            np.concatenate((self.moyennes, autre.moyennes)), np.concatenate((self.poids, autre.poids))
+        )
+
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1)
+
+    def _compresser(self, moyennes: np.ndarray, poids: np.ndarray) -> None:
+        ordre = np.argsort(moyennes, kind="stable")
+        moyennes, poids = moyennes[ordre], poids[ordre]
+        total = float(poids.sum())
+
+        # Un centroïde absorbe ses voisins tant que k(q) progresse de moins de 1
+        fusion_moyennes, fusion_poids = [float(moyennes[0])], [float(poids[0])]
+        cumul = 0.0
+        limite = self._k(0.0) + 1
+        for moyenne, poids_valeur in zip(moyennes[1:].tolist(), poids[1:].tolist()):
+            if self._k((cumul + fusion_poids[-1] + poids_valeur) / total) <= limite:
+                fusion_poids[-1] += poids_valeur
+                fusion_moyennes[-1] += (moyenne - fusion_moyennes[-1]) * poids_valeur / fusion_poids[-1]
+            else:
+                cumul += fusion_poids[-1]
+                limite = self._k(cumul / total) + 1
+                fusion_moyennes.append(moyenne)
+                fusion_poids.append(poids_valeur)
+        self.moyennes = np.asarray(fusion_moyennes)
+        self.poids = np.asarray(fusion_poids)
+
+    def quantiles(self, rangs: Sequence[float]) -> List[float]:
+        """Quantiles approchés (rangs entre 0 et 1), interpolés entre les centres des centroïdes"""
+        if self.poids.size == 0:
+            return []
+        total = self.poids.sum()
+        centres = np.cumsum(self.poids) - self.poids / 2
+        positions = np.concatenate(([0.0], centres, [total]))
+        valeurs = np.concatenate(([self.minimum], self.moyennes, [self.maximum]))
+        return np.interp(np.asarray(rangs, dtype=float) * total, positions, valeurs).tolist()
+
+
+def _valeur_suivie(valeur: Any) -> bool:
+    """Résultat à compter : renseigné, fini et non nul (zéro : résultat non calculé)"""
+    return valeur is not None and math.isfinite(valeur) and valeur != 0
+
+
+def _types_suivis() -> Dict[type, TypeEssai]:
+    """Type d'essai de chaque modèle de données spécifiques dont des résultats sont suivis"""
+    return {colonnes[0].class_: type_essai for type_essai, colonnes in COLONNES_DISTRIBUTION.items()}
+
+
+def _ecrire_esquisses(connexion: Connection, esquisses: Dict[Cle, TDigest]) -> None:
+    """Enregistre (ou remplace) des esquisses"""
+    lignes = [
+        {
+            "projet_id": projet_id, "type_essai": type_essai, "metrique": metrique,
+            "nombre": esquisse.nombre, "minimum": esquisse.minimum, "maximum": esquisse.maximum,
+            "centroides": esquisse.centroides(),
+        }
+        for (projet_id, type_essai, metrique), esquisse in esquisses.items()
+    ]
+    if not lignes:
+        return
+    inserer = INSERTIONS[connexion.dialect.name]
+    for debut in range(0, len(lignes), TAILLE_LOT_COMPTEURS):
+        instruction = inserer(EsquisseQuantiles).values(lignes[debut:debut + TAILLE_LOT_COMPTEURS])
+        connexion.execute(instruction.on_conflict_do_update(
+            index_elements=[colonne.name for colonne in EsquisseQuantiles.__table__.primary_key],
+            set_={
+                nom: instruction.excluded[nom] for nom in ("nombre", "minimum", "maximum", "centroides")
+            }
+        ))
+
+
+def _lire_esquisses(connexion: Connection, condition: Any, verrouiller: bool = False) -> Dict[Cle, TDigest]:
+    requete = select(EsquisseQuantiles).where(condition)
+    if verrouiller:
+        # Deux écritures concurrentes sur une même esquisse se succèdent (sans effet sous SQLite)
+        requete = requete.with_for_update()
+    return {
+        (esquisse.projet_id, esquisse.type_essai, esquisse.metrique): TDigest.depuis_esquisse(esquisse)
+        for esquisse in connexion.execute(requete).all()
+    }
+
+
+def ajouter_valeurs(connexion: Connection, valeurs: Dict[Cle, List[float]]) -> None:
+    """Fusionne des valeurs de résultats dans les esquisses de leur clé"""
+    valeurs = {cle: liste for cle, liste in valeurs.items() if liste}
+    if not valeurs:
+        return
+    esquisses = _lire_esquisses(
+        connexion,
+        EsquisseQuantiles.projet_id.in_({cle[0] for cle in valeurs})
+        & EsquisseQuantiles.type_essai.in_({cle[1] for cle in valeurs}),
+        verrouiller=True,
+    )
+    modifiees = {}
+    for cle, liste in valeurs.items():
+        esquisse = esquisses.get(cle) or TDigest()
+        esquisse.ajouter(liste)
+        modifiees[cle] = esquisse
+    _ecrire_esquisses(connexion, modifiees)
+
+
+def valeurs_resultats(objets: Iterable[Tuple[Optional[int], Any]]) -> Dict[Cle, List[float]]:
+    """Valeurs suivies de données spécifiques, par clé, à partir de (projet_id, objet)"""
+    types = _types_suivis()
+    valeurs: Dict[Cle, List[float]] = defaultdict(list)
+    for projet_id, objet in objets:
+        type_essai = types.get(type(objet))
+        if type_essai is None:
+            continue
+        for colonne in COLONNES_DISTRIBUTION[type_essai]:
+            valeur = getattr(objet, colonne.key, None)
+            if _valeur_suivie(valeur):
+                valeurs[(projet_id or SANS_PROJET, type_essai, colonne.key)].append(valeur)
+    return valeurs
+
+
+def reconstruire_esquisses(
+    connexion: Connection,
+    type_essai: Optional[TypeEssai] = None,
+    projet_id: Optional[int] = None
+) -> int:
+    """
+    Recalcule les esquisses depuis les résultats stockés
+
+    Limité à un type d'essai et / ou un projet (SANS_PROJET : essais sans
+    projet) s'ils sont donnés. Retourne le nombre d'esquisses écrites.
+    """
+    projet = func.coalesce(Essai.projet_id, SANS_PROJET)
+    esquisses: Dict[Cle, TDigest] = {}
+    for type_suivi, colonnes in COLONNES_DISTRIBUTION.items():
+        if type_essai is not None and type_suivi != type_essai:
+            continue
+        modele = colonnes[0].class_
+        requete = select(projet, *colonnes).join(Essai, Essai.id == modele.essai_id)
+        suppression = delete(EsquisseQuantiles).where(EsquisseQuantiles.type_essai == type_suivi)
+        if projet_id is not None:
+            requete = requete.where(projet == projet_id)
+            suppression = suppression.where(EsquisseQuantiles.projet_id == projet_id)
+        connexion.execute(suppression)
+
+        valeurs: Dict[Cle, List[float]] = defaultdict(list)
+        for ligne in connexion.execute(requete):
+            for colonne, valeur in zip(colonnes, ligne[1:]):
+                if _valeur_suivie(valeur):
+                    valeurs[(ligne[0], type_suivi, colonne.key)].append(valeur)
+        for cle, liste in valeurs.items():
+            esquisses[cle] = TDigest()
+            esquisses[cle].ajouter(liste)
+    _ecrire_esquisses(connexion, esquisses)
+    return len(esquisses)
+
+
+def quantiles_resultats(
+    db: Session,
+    type_essai: TypeEssai,
+    metrique: str,
+    projet_ids: Optional[Sequence[int]] = None
+) -> Dict[str, Any]:
+    """
+    Percentiles approchés (P5 à P95) d'un résultat, sur les projets donnés (tous par défaut)
+
+    Les esquisses des projets sont fusionnées : le coût ne dépend que de leur
+    nombre et de leur taille.
+    """
+    condition = (EsquisseQuantiles.type_essai == type_essai) & (EsquisseQuantiles.metrique == metrique)
+    if projet_ids is not None:
+        condition &= EsquisseQuantiles.projet_id.in_(projet_ids)
+    esquisses = _lire_esquisses(db.connection(), condition)
+
+    fusion = TDigest()
+    for esquisse in esquisses.values():
+        fusion.fusionner(esquisse)
+    if fusion.nombre == 0:
+        return {"nombre": 0, "minimum": None, "maximum": None, "percentiles": {}}
+    return {
+        "nombre": fusion.nombre,
+        "minimum": fusion.minimum,
+        "maximum": fusion.maximum,
+        "percentiles": {
+            f"p{rang}": valeur
+            for rang, valeur in zip(PERCENTILES, fusion.quantiles([rang / 100 for rang in PERCENTILES]))
+        },
+    }
+
+
+def _projets_types(connexion: Connection, essai_ids: Iterable[int]) -> Set[Tuple[int, TypeEssai]]:
+    """(projet, type) des essais donnés, pour les types suivis"""
+    identifiants = sorted(set(essai_ids))
+    cles = set()
+    for debut in range(0, len(identifiants), TAILLE_LOT_COMPTEURS):
+        requete = select(func.coalesce(Essai.projet_id, SANS_PROJET), Essai.type_essai).where(
+            Essai.id.in_(identifiants[debut:debut + TAILLE_LOT_COMPTEURS])
+        )
+        cles.update(
+            (projet_id, type_essai) for projet_id, type_essai in connexion.execute(requete)
+            if type_essai in COLONNES_DISTRIBUTION
+        )
+    return cles
+
+
+def _essais_a_reconstruire(session: Session) -> Set[int]:
+    """Essais dont une valeur déjà comptée change ou disparaît avec le flush"""
+    types = _types_suivis()
+    identifiants = set()
+    for objet in session.dirty:
+        etat = inspecter(objet)
+        if isinstance(objet, Essai):
+            if objet.id is not None and any(
+                etat.attrs[champ].history.has_changes() for champ in ("projet_id", "type_essai")
+            ):
+                identifiants.add(objet.id)
+        elif type(objet) in types and objet.essai_id is not None:
+            champs = [colonne.key for colonne in COLONNES_DISTRIBUTION[types[type(objet)]]] + ["essai_id"]
+            if any(etat.attrs[champ].history.has_changes() for champ in champs):
+                identifiants.add(objet.essai_id)
+                # Rattaché à un autre essai : l'ancien perd aussi la valeur
+                identifiants.update(etat.attrs["essai_id"].history.deleted or ())
+    for objet in session.deleted:
+        if isinstance(objet, Essai):
+            identifiants.add(objet.id)
+        elif type(objet) in types and objet.essai_id is not None:
+            identifiants.add(objet.essai_id)
+    return {identifiant for identifiant in identifiants if identifiant is not None}
+
+
+@event.listens_for(Session, "before_flush")
+def _lire_projets_avant(session: Session, contexte: Any, instances: Any) -> None:
+    """Projets et types des essais modifiés ou supprimés, tels qu'enregistrés avant le flush"""
+    identifiants = _essais_a_reconstruire(session)
+    # Toujours réécrit : un flush précédent annulé ne laisse pas de clés périmées
+    session.info["quantiles_avant"] = (
+        (identifiants, _projets_types(session.connection(), identifiants)) if identifiants else None
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _maintenir_esquisses(session: Session, contexte: Any) -> None:
+    """Reporte sur les esquisses les résultats créés, modifiés ou supprimés par le flush"""
+    avant = session.info.pop("quantiles_avant", None)
+    types = _types_suivis()
+    nouveaux = [objet for objet in session.new if type(objet) in types and objet.essai_id is not None]
+    if not nouveaux and not avant:
+        return
+
+    connexion = session.connection()
+    a_reconstruire: Set[Tuple[int, TypeEssai]] = set()
+    if avant:
+        identifiants, cles = avant
+        # Anciens projets (lus avant le flush) et nouveaux
+        a_reconstruire = cles | _projets_types(connexion, identifiants)
+    for projet_id, type_essai in sorted(a_reconstruire, key=lambda cle: (cle[0], cle[1].value)):
+        reconstruire_esquisses(connexion, type_essai, projet_id)
+
+    projets = {}
+    essai_ids = sorted({objet.essai_id for objet in nouveaux})
+    for debut in range(0, len(essai_ids), TAILLE_LOT_COMPTEURS):
+        projets.update(connexion.execute(
+            select(Essai.id, Essai.projet_id).where(Essai.id.in_(essai_ids[debut:debut + TAILLE_LOT_COMPTEURS]))
+        ).all())
+    # Les esquisses reconstruites contiennent déjà les nouvelles valeurs
+    ajouter_valeurs(connexion, valeurs_resultats(
+        (projets.get(objet.essai_id), objet) for objet in nouveaux
+        if ((projets.get(objet.essai_id) or SANS_PROJET), types[type(objet)]) not in a_reconstruire
+    ))
+
+
+def main(arguments: Optional[List[str]] = None) -> None:
+    """Point d'entrée en ligne de commande : reconstruction des esquisses"""
+    parser = argparse.ArgumentParser(description="Reconstruction des esquisses de quantiles")
+    parser.add_argument("--type", choices=[type_essai.value for type_essai in COLONNES_DISTRIBUTION])
+    parser.add_argument("--projet", type=int, help=f"Identifiant du projet ({SANS_PROJET} : essais sans projet)")
+    args = parser.parse_args(arguments)
+
+    db = SessionLocal()
+    try:
+        nombre = reconstruire_esquisses(
+            db.connection(), TypeEssai(args.type) if args.type else None, args.projet
+        )
+        db.commit()
+    finally:
+        db.close()
+    print(f"✅ {nombre} esquisses reconstruites")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+Recalcul en masse des résultats d'essais
+
+Quand une formule de calculs.py est corrigée, les colonnes calculées déjà
+stockées (wl, cbr_final, opm, d60, ...) et Essai.resultats doivent être
+rafraîchies. Un travail de recalcul parcourt les essais concernés par
+fenêtres ordonnées sur l'identifiant, lues en flux avec yield_per, recalcule
+chaque lot sur un pool de processus avec les noyaux batch, puis réécrit les
+lignes par UPDATE groupés. Le curseur (type en cours, dernier identifiant) est
+persisté après chaque lot : un travail interrompu reprend là où il s'est arrêté.
+Les lignes dont l'empreinte (hash_calcul) est à jour ne sont pas recalculées.
+Les esquisses de quantiles d'un type sont reconstruites quand il est terminé.
+
+Utilisation en ligne de commande :
+    python -m app.services.recalcul --type cbr --projet 3 --processus 4
+    python -m app.services.recalcul --reprendre 12
+"""
+import argparse
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.essai import Essai, TypeEssai
+from app.models.recalcul import RecalculJob, StatutRecalcul
+from app.services.memoisation import empreinte_calcul
+from app.services.quantiles import reconstruire_esquisses
+from app.services.registre import charger_moteurs, obtenir_moteur, types_recalculables
+
+logger = logging.getLogger("geolab")
+
+# Nombre de lots lus par requête : borne la mémoire entre deux écritures
+LOTS_PAR_FENETRE = 8
+
+
+def recalculer_lot(type_essai: str, lignes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Recalcule un lot de lignes d'un même type (exécuté dans un processus du pool)
+
+    Les lignes sont des dictionnaires de colonnes : le calcul opère sur des
+    objets légers, sans session ni mapper SQLAlchemy côté processus. Les lignes
+    dont l'empreinte persistée correspond aux données et à la version du
+    moteur sont déjà à jour : elles sont sautées et absentes du retour.
+    """
+    moteur = obtenir_moteur(type_essai)
+    objets = [
+        objet for objet in (SimpleNamespace(**ligne) for ligne in lignes)
+        if objet.hash_calcul != empreinte_calcul(type_essai, objet)
+    ]
+    mises_a_jour = []
+    for objet, resultats in zip(objets, moteur.calculer_lot(objets)):
+        valeurs = {colonne: resultats.get(colonne) for colonne in moteur.colonnes_resultats}
+        for champ in moteur.champs_completes:
+            valeurs[champ] = getattr(objet, champ)
+        valeurs["hash_calcul"] = empreinte_calcul(type_essai, objet)
+        mises_a_jour.append({
+            "id": objet.id,
+            "essai_id": objet.essai_id,
+            "valeurs": valeurs,
+            "resultats": resultats,
+        })
+    return mises_a_jour
+
+
+def creer_recalcul(
+    db: Session,
+    type_essai: Optional[str] = None,
+    projet_id: Optional[int] = None,
+    lance_par_id: Optional[int] = None
+) -> RecalculJob:
+    """Crée un travail de recalcul pour un projet, un type ou toute la base"""
+    if type_essai is not None and type_essai not in types_recalculables():
+        raise ValueError(f"Type d'essai non recalculable: {type_essai}")
+
+    job = RecalculJob(
+        type_essai=type_essai,
+        projet_id=projet_id,
+        lance_par_id=lance_par_id,
+        statut=StatutRecalcul.EN_ATTENTE,
+        total=0,
+        traites=0,
+        dernier_id=0,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _types_du_job(job: RecalculJob) -> List[str]:
+    """Types à parcourir, à partir du type en cours pour une reprise"""
+    # Ordre d'enregistrement des moteurs : le curseur persisté s'y réfère
+    types = [job.type_essai] if job.type_essai else list(types_recalculables())
+    if job.type_courant in types:
+        return types[types.index(job.type_courant):]
+    return types
+
+
+def _compter(db: Session, job: RecalculJob, types: List[str]) -> int:
+    """Nombre d'essais concernés par le travail"""
+    total = 0
+    for type_essai in types:
+        modele = obtenir_moteur(type_essai).modele
+        requete = select(func.count(modele.id)).join(Essai, Essai.id == modele.essai_id)
+        if job.projet_id is not None:
+            requete = requete.where(Essai.projet_id == job.projet_id)
+        total += db.execute(requete).scalar_one()
+    return total
+
+
+def _ecrire_lot(
+    db: Session,
+    modele: Any,
+    mises_a_jour: List[Dict[str, Any]],
+    resultats_precedents: Dict[int, Optional[Dict[str, Any]]]
+) -> None:
+    """Réécrit un lot par UPDATE groupés (table spécifique puis essais)"""
+    if not mises_a_jour:
+        return
+    db.execute(
+        update(modele),
+        [{"id": maj["id"], **maj["valeurs"]} for maj in mises_a_jour]
+    )
+
+    lignes_essais = []
+    for maj in mises_a_jour:
+        resultats = dict(maj["resultats"])
+        # Les avertissements de validation ne dépendent pas des formules : on les conserve
+        precedents = resultats_precedents.get(maj["essai_id"]) or {}
+        if "_validation_warnings" in precedents:
+            resultats["_validation_warnings"] = precedents["_validation_warnings"]
+        lignes_essais.append({"id": maj["essai_id"], "resultats": resultats})
+    db.execute(update(Essai), lignes_essais)
+
+
+def _recalculer_type(
+    db: Session,
+    job: RecalculJob,
+    type_essai: str,
+    taille_lot: int,
+    pool: Optional[ProcessPoolExecutor],
+    progression: Optional[Callable[[RecalculJob], None]]
+) -> None:
+    """Recalcule tous les essais d'un type au-delà du curseur du travail"""
+    moteur = obtenir_moteur(type_essai)
+    modele = moteur.modele
+    colonnes_entree = [
+        colonne for colonne in modele.__table__.columns
+        if colonne.name not in moteur.colonnes_resultats
+    ]
+
+    while True:
+        requete = (
+            select(*colonnes_entree, Essai.resultats)
+            .join(Essai, Essai.id == modele.essai_id)
+            .where(modele.id > job.dernier_id)
+            .order_by(modele.id)
+            .limit(taille_lot * LOTS_PAR_FENETRE)
+            .execution_options(yield_per=taille_lot)
+        )
+        if job.projet_id is not None:
+            requete = requete.where(Essai.projet_id == job.projet_id)
+
+        # Lecture en flux : chaque lot part au calcul pendant la lecture du suivant
+        lots = []
+        for partition in db.execute(requete).partitions():
+            lignes = [dict(ligne._mapping) for ligne in partition]
+            precedents = {ligne["essai_id"]: ligne.pop("resultats") for ligne in lignes}
+            if pool is not None:
+                calcul = pool.submit(recalculer_lot, type_essai, lignes)
+            else:
+                calcul = recalculer_lot(type_essai, lignes)
+            lots.append((calcul, precedents, lignes[-1]["id"], len(lignes)))
+
+        if not lots:
+            # Les UPDATE groupés ne passent pas par le flush : esquisses reconstruites ici
+            reconstruire_esquisses(db.connection(), TypeEssai(type_essai), job.projet_id)
+            db.commit()
+            return
+
+        for calcul, precedents, dernier_id, nombre in lots:
+            mises_a_jour = calcul.result() if pool is not None else calcul
+            _ecrire_lot(db, modele, mises_a_jour, precedents)
+            job.dernier_id = dernier_id
+            job.traites += nombre
+            db.commit()
+            if progression:
+                progression(job)
+
+
+def executer_recalcul(
+    job_id: int,
+    session_factory: Callable[[], Session] = SessionLocal,
+    taille_lot: Optional[int] = None,
+    processus: Optional[int] = None,
+    progression: Optional[Callable[[RecalculJob], None]] = None
+) -> None:
+    """
+    Exécute (ou reprend) un travail de recalcul
+
+    Avec processus <= 1, les lots sont calculés dans le processus courant.
+    En cas d'erreur, le travail passe au statut échoué en gardant son
+    curseur : une nouvelle exécution reprend au lot suivant le dernier écrit.
+    """
+    taille_lot = taille_lot or settings.RECALCUL_TAILLE_LOT
+    processus = settings.RECALCUL_PROCESSUS if processus is None else processus
+
+    db = session_factory()
+    charger_moteurs()
+    # Chaque processus du pool charge les mêmes moteurs supplémentaires
+    pool = ProcessPoolExecutor(max_workers=processus, initializer=charger_moteurs) if processus > 1 else None
+    try:
+        job = db.get(RecalculJob, job_id)
+        if job is None:
+            raise ValueError(f"Travail de recalcul {job_id} introuvable")
+
+        types = _types_du_job(job)
+        if job.started_at is None:
+            job.started_at = datetime.now(timezone.utc)
+            job.total = _compter(db, job, types)
+        job.statut = StatutRecalcul.EN_COURS
+        job.erreur = None
+        db.commit()
+
+        try:
+            for type_essai in types:
+                if job.type_courant != type_essai:
+                    job.type_courant = type_essai
+                    job.dernier_id = 0
+                    db.commit()
+                _recalculer_type(db, job, type_essai, taille_lot, pool, progression)
+        except Exception as e:
+            db.rollback()
+            job.statut = StatutRecalcul.ECHOUE
+            job.erreur = str(e)
+            db.commit()
+            logger.exception(f"Recalcul {job_id} interrompu après {job.traites} essais")
+            raise
+
+        job.statut = StatutRecalcul.TERMINE
+        job.finished_at = datetime.now(timezone.utc)
+        db.commit()
+        logger.info(f"Recalcul {job_id} terminé: {job.traites} essais recalculés")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        db.close()
+
+
+def main(arguments: Optional[List[str]] = None) -> None:
+    """Point d'entrée en ligne de commande"""
+    charger_moteurs()
+    parser = argparse.ArgumentParser(description="Recalcul en masse des résultats d'essais")
+    parser.add_argument("--type", choices=types_recalculables(), help="Type d'essai (tous par défaut)")
+    parser.add_argument("--projet", type=int, help="Identifiant du projet (tous par défaut)")
+    parser.add_argument("--reprendre", type=int, metavar="JOB_ID", help="Reprendre un travail interrompu")
+    parser.add_argument("--taille-lot", type=int, default=settings.RECALCUL_TAILLE_LOT)
+    parser.add_argument("--processus", type=int, default=settings.RECALCUL_PROCESSUS)
+    args = parser.parse_args(arguments)
+
+    if args.reprendre is not None:
+        job_id = args.reprendre
+    else:
+        db = SessionLocal()
+        try:
+            job_id = creer_recalcul(db, type_essai=args.type, projet_id=args.projet).id
+        finally:
+            db.close()
+
+    def afficher(job: RecalculJob) -> None:
+        print(f"\rRecalcul {job.id}: {job.traites}/{job.total} ({job.type_courant})", end="", flush=True)
+
+    executer_recalcul(job_id, taille_lot=args.taille_lot, processus=args.processus, progression=afficher)
+    print(f"\n✅ Recalcul {job_id} terminé")
+
+
+if __name__ == "__main__":
+    main()
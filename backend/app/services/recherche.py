@@ -0,0 +1,149 @@
+"""
+Recherche plein texte des essais
+
+Le document de recherche de chaque essai (table essais_recherche) est tenu à
+jour à chaque flush de session : création ou modification d'un essai,
+renommage d'un projet, suppression. La recherche passe par l'index du
+dialecte (tsvector + pg_trgm sous PostgreSQL, FTS5 trigrammes sous SQLite)
+et fournit un score de pertinence pour le tri.
+"""
+import re
+from typing import Any, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import Float, Integer, delete, event, func, insert, literal, literal_column, or_, select, text
+from sqlalchemy import inspect as inspecter
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models.essai import Essai
+from app.models.projet import Projet
+from app.models.recherche import EssaiRecherche
+
+# Champs de l'essai repris dans le document (avec le nom et le code du projet)
+CHAMPS_ESSAI = ("numero_essai", "projet_nom", "echantillon", "observations", "projet_id")
+CHAMPS_PROJET = ("nom", "code_projet")
+
+# Essais réindexés par instruction
+TAILLE_LOT_INDEX = 1000
+
+# Longueur minimale d'un terme pour l'index trigrammes
+LONGUEUR_TRIGRAMME = 3
+
+
+def _documents(connexion: Connection, condition: Any) -> List[dict]:
+    """Documents de recherche des essais sélectionnés par la condition"""
+    requete = (
+        select(
+            Essai.id, Essai.numero_essai, Essai.projet_nom, Essai.echantillon, Essai.observations,
+            Projet.nom, Projet.code_projet,
+        )
+        .select_from(Essai)
+        .outerjoin(Projet, Projet.id == Essai.projet_id)
+        .where(condition)
+    )
+    return [
+        {"essai_id": ligne[0], "document": "\n".join(valeur for valeur in ligne[1:] if valeur)}
+        for ligne in connexion.execute(requete)
+    ]
+
+
+def indexer_essais(connexion: Connection, essai_ids: Iterable[int]) -> int:
+    """(Ré)écrit les documents de recherche des essais donnés"""
+    identifiants = sorted(set(essai_ids))
+    for debut in range(0, len(identifiants), TAILLE_LOT_INDEX):
+        lot = identifiants[debut:debut + TAILLE_LOT_INDEX]
+        connexion.execute(delete(EssaiRecherche).where(EssaiRecherche.essai_id.in_(lot)))
+        documents = _documents(connexion, Essai.id.in_(lot))
+        if documents:
+            connexion.execute(insert(EssaiRecherche), documents)
+    return len(identifiants)
+
+
+def reindexer_tout(connexion: Connection) -> int:
+    """Reconstruit l'index de recherche de tous les essais"""
+    identifiants = connexion.execute(select(Essai.id)).scalars().all()
+    return indexer_essais(connexion, identifiants)
+
+
+def _modifie(objet: Any, champs: Tuple[str, ...]) -> bool:
+    etat = inspecter(objet)
+    return any(etat.attrs[champ].history.has_changes() for champ in champs)
+
+
+@event.listens_for(Session, "after_flush")
+def _maintenir_index(session: Session, contexte: Any) -> None:
+    """Met à jour les documents des essais créés, modifiés ou supprimés par le flush"""
+    a_indexer: Set[int] = set()
+    projets: Set[int] = set()
+    supprimes: Set[int] = set()
+
+    for objet in session.new:
+        if isinstance(objet, Essai):
+            a_indexer.add(objet.id)
+    for objet in session.dirty:
+        if isinstance(objet, Essai) and _modifie(objet, CHAMPS_ESSAI):
+            a_indexer.add(objet.id)
+        elif isinstance(objet, Projet) and _modifie(objet, CHAMPS_PROJET):
+            projets.add(objet.id)
+    for objet in session.deleted:
+        if isinstance(objet, Essai):
+            supprimes.add(objet.id)
+
+    if not (a_indexer or projets or supprimes):
+        return
+
+    connexion = session.connection()
+    if supprimes:
+        connexion.execute(delete(EssaiRecherche).where(EssaiRecherche.essai_id.in_(supprimes)))
+    if projets:
+        a_indexer.update(connexion.execute(select(Essai.id).where(Essai.projet_id.in_(projets))).scalars())
+    if a_indexer - supprimes:
+        indexer_essais(connexion, a_indexer - supprimes)
+
+
+def _tsquery_prefixes(terme: str) -> str:
+    """Requête tsquery : tous les mots du terme, en préfixe"""
+    return " & ".join(f"{mot}:*" for mot in re.findall(r"\w+", terme.lower()))
+
+
+def filtrer_recherche(query: Any, terme: str, dialecte: Optional[str] = None) -> Tuple[Any, Any]:
+    """
+    Restreint une requête d'essais à ceux qui correspondent au terme
+
+    Retourne la requête filtrée et l'expression du score de pertinence
+    (plus élevé = plus pertinent). Un essai correspond si l'un de ses champs
+    contient le terme ; sous PostgreSQL, aussi si tous ses mots apparaissent
+    en préfixe de mots du document. Le dialecte est lu sur la session de la
+    requête ; il est à fournir pour une instruction select().
+    """
+    terme = terme.strip()
+    motif = f"%{terme}%"
+    dialecte = dialecte or query.session.get_bind().dialect.name
+
+    if dialecte == "postgresql":
+        vecteur = literal_column("essais_recherche.vecteur")
+        query = query.join(EssaiRecherche, EssaiRecherche.essai_id == Essai.id)
+        similarite = func.word_similarity(terme, EssaiRecherche.document)
+        prefixes = _tsquery_prefixes(terme)
+        if not prefixes:
+            return query.filter(EssaiRecherche.document.ilike(motif)), similarite
+        tsquery = func.to_tsquery("simple", prefixes)
+        query = query.filter(or_(vecteur.op("@@")(tsquery), EssaiRecherche.document.ilike(motif)))
+        return query, func.ts_rank(vecteur, tsquery) + similarite
+
+    if dialecte == "sqlite" and len(terme) >= LONGUEUR_TRIGRAMME:
+        correspondances = (
+            text(
+                "SELECT rowid AS essai_id, bm25(essais_recherche_fts) AS score "
+                "FROM essais_recherche_fts WHERE essais_recherche_fts MATCH :phrase"
+            )
+            .bindparams(phrase='"' + terme.replace('"', '""') + '"')
+            .columns(essai_id=Integer, score=Float)
+            .subquery("correspondances")
+        )
+        query = query.join(correspondances, correspondances.c.essai_id == Essai.id)
+        # bm25 : plus petit = plus pertinent
+        return query, -correspondances.c.score
+
+    query = query.join(EssaiRecherche, EssaiRecherche.essai_id == Essai.id)
+    return query.filter(EssaiRecherche.document.ilike(motif)), literal(0)
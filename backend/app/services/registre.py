@@ -0,0 +1,182 @@
+"""
+Registre des moteurs de calcul par type d'essai
+
+Chaque type d'essai enregistre un moteur : modèle des données spécifiques,
+validateur, noyau de calcul unitaire et noyau batch, ainsi que les champs
+dont dépend le calcul et les colonnes qu'il produit. Les routes, le recalcul
+en masse et les imports passent tous par obtenir_moteur : une simple lecture
+de dictionnaire, sans import par requête.
+
+Un nouveau type d'essai (œdomètre, boîte de cisaillement, ...) se branche
+dans un module qui appelle enregistrer_moteur ; les modules listés dans
+settings.MOTEURS_ESSAIS sont importés une fois au démarrage par
+charger_moteurs (la valeur correspondante de TypeEssai reste à ajouter).
+"""
+import importlib
+import logging
+from functools import partial
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.models.essai import EssaiAtterberg, EssaiCBR, EssaiProctor, EssaiGranulometrie
+from app.services.calculs import (
+    calculer_atterberg, calculer_atterberg_batch,
+    calculer_cbr, calculer_cbr_batch,
+    calculer_proctor, calculer_proctor_batch,
+    calculer_granulometrie, calculer_granulometrie_batch,
+    calculer_autre, calculer_autre_batch,
+)
+from app.services.validation import (
+    validate_atterberg,
+    validate_cbr,
+    validate_proctor,
+    validate_granulometrie,
+    validate_autre,
+    validate_many,
+)
+
+logger = logging.getLogger("geolab")
+
+
+class MoteurEssai(NamedTuple):
+    """Moteur de calcul d'un type d'essai"""
+    type_essai: str
+    valider: Callable[[Any], Dict[str, Any]]
+    calculer: Callable[[Any], Dict[str, Any]]
+    calculer_lot: Callable[[Sequence[Any]], List[Dict[str, Any]]]
+    # Modèle des données spécifiques et relation correspondante sur Essai (None : mesures libres)
+    modele: Optional[type] = None
+    relation: Optional[str] = None
+    # Données mesurées dont dépendent les résultats (empreinte de mémoïsation)
+    champs_entree: Tuple[str, ...] = ()
+    # Données saisies complétées par le calcul (forces lues sur la courbe, pourcentages, ...)
+    champs_completes: Tuple[str, ...] = ()
+    # Colonnes produites par le calcul : remises à None si le calcul ne les fournit plus
+    colonnes_resultats: Tuple[str, ...] = ()
+    # Validation d'un lot en une passe (à défaut, valider essai par essai)
+    valider_lot: Optional[Callable[[Sequence[Any]], List[Dict[str, Any]]]] = None
+
+
+_MOTEURS: Dict[str, MoteurEssai] = {}
+_modules_charges = False
+
+
+def enregistrer_moteur(moteur: MoteurEssai) -> MoteurEssai:
+    """Enregistre (ou remplace) le moteur d'un type d'essai"""
+    _MOTEURS[moteur.type_essai] = moteur
+    return moteur
+
+
+def obtenir_moteur(type_essai: Any) -> MoteurEssai:
+    """Moteur d'un type d'essai (valeur de TypeEssai ou chaîne) ; ValueError si inconnu"""
+    cle = getattr(type_essai, "value", type_essai)
+    moteur = _MOTEURS.get(cle)
+    if moteur is None:
+        raise ValueError(f"Aucun moteur de calcul pour le type d'essai: {cle}")
+    return moteur
+
+
+def moteurs() -> List[MoteurEssai]:
+    """Moteurs enregistrés, dans l'ordre d'enregistrement"""
+    return list(_MOTEURS.values())
+
+
+def valider_lot(moteur: MoteurEssai, objets: Sequence[Any]) -> List[Dict[str, Any]]:
+    """Valide un lot d'objets avec le moteur, en une passe s'il le permet"""
+    if moteur.valider_lot is not None:
+        return moteur.valider_lot(objets)
+    return [moteur.valider(objet) for objet in objets]
+
+
+def types_recalculables() -> Tuple[str, ...]:
+    """Types dont les résultats sont stockés dans une table spécifique"""
+    return tuple(moteur.type_essai for moteur in _MOTEURS.values() if moteur.modele is not None)
+
+
+def charger_moteurs() -> None:
+    """Importe une fois les modules de moteurs supplémentaires configurés"""
+    global _modules_charges
+    if _modules_charges:
+        return
+    for module in settings.MOTEURS_ESSAIS.split(","):
+        module = module.strip()
+        if module:
+            importlib.import_module(module)
+            logger.info(f"Moteurs d'essais chargés depuis {module}")
+    _modules_charges = True
+
+
+enregistrer_moteur(MoteurEssai(
+    type_essai="atterberg",
+    valider=validate_atterberg,
+    valider_lot=partial(validate_many, "atterberg"),
+    calculer=calculer_atterberg,
+    calculer_lot=calculer_atterberg_batch,
+    modele=EssaiAtterberg,
+    relation="atterberg",
+    champs_entree=(
+        "wl_nombre_coups_1", "wl_teneur_eau_1",
+        "wl_nombre_coups_2", "wl_teneur_eau_2",
+        "wl_nombre_coups_3", "wl_teneur_eau_3",
+        "wp_teneur_eau_1", "wp_teneur_eau_2", "wp_teneur_eau_3",
+        "wr_teneur_eau", "volume_initial", "volume_final", "masse_seche",
+    ),
+    colonnes_resultats=("wl", "wp", "wr", "ip", "ir", "classification"),
+))
+
+enregistrer_moteur(MoteurEssai(
+    type_essai="cbr",
+    valider=validate_cbr,
+    valider_lot=partial(validate_many, "cbr"),
+    calculer=calculer_cbr,
+    calculer_lot=calculer_cbr_batch,
+    modele=EssaiCBR,
+    relation="cbr",
+    champs_entree=("points_penetration", "force_25mm", "force_50mm"),
+    champs_completes=("force_25mm", "force_50mm"),
+    colonnes_resultats=("cbr_25mm", "cbr_50mm", "cbr_final", "classe_portance"),
+))
+
+enregistrer_moteur(MoteurEssai(
+    type_essai="proctor",
+    valider=validate_proctor,
+    valider_lot=partial(validate_many, "proctor"),
+    calculer=calculer_proctor,
+    calculer_lot=calculer_proctor_batch,
+    modele=EssaiProctor,
+    relation="proctor",
+    champs_entree=("points_mesure", "modele_ajustement"),
+    colonnes_resultats=(
+        "opm", "densite_seche_max", "densite_humide_max", "saturation_optimale",
+        "ajustement", "courbe_proctor",
+    ),
+))
+
+enregistrer_moteur(MoteurEssai(
+    type_essai="granulometrie",
+    valider=validate_granulometrie,
+    valider_lot=partial(validate_many, "granulometrie"),
+    calculer=calculer_granulometrie,
+    calculer_lot=calculer_granulometrie_batch,
+    modele=EssaiGranulometrie,
+    relation="granulometrie",
+    champs_entree=(
+        "points_tamisage", "points_sedimentometrie", "masse_totale_seche",
+        "temperature_sedimentometrie", "viscosite_dynamique", "masse_seche_sedimentometrie",
+        "volume_suspension", "masse_volumique_particules", "correction_lecture", "diametre_coupure_mm",
+    ),
+    champs_completes=("points_tamisage", "points_sedimentometrie"),
+    colonnes_resultats=(
+        "d10", "d16", "d30", "d50", "d60", "d84", "cu", "cc",
+        "pourcentage_gravier", "pourcentage_sable", "pourcentage_limon", "pourcentage_argile",
+        "classe_granulometrique",
+    ),
+))
+
+enregistrer_moteur(MoteurEssai(
+    type_essai="autre",
+    valider=validate_autre,
+    calculer=calculer_autre,
+    calculer_lot=calculer_autre_batch,
+    champs_entree=("mesures",),
+))
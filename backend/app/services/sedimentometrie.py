@@ -0,0 +1,187 @@
+"""
+Sédimentométrie (NF P94-057) : loi de Stokes sur les lectures du densimètre
+
+Chaque lecture (temps, profondeur effective, masse volumique lue) donne un
+diamètre équivalent par la loi de Stokes et un pourcentage de passant de la
+fraction mise en suspension. Ce pourcentage est ramené à l'échantillon total
+par le passant du tamisage au diamètre de coupure, ce qui permet de fusionner
+tamisage et sédimentométrie en une seule courbe granulométrique. Toutes les
+lectures d'un lot d'essais sont calculées en une passe vectorisée.
+
+Les points sans lecture de densimètre sont des points déjà calculés
+(diametre_mm, pourcentage_passant) et sont repris tels quels.
+"""
+from typing import Any, List, Sequence, Tuple
+
+import numpy as np
+
+GRAVITE = 9.81  # m/s²
+TEMPERATURE_REFERENCE = 20.0  # °C
+MASSE_VOLUMIQUE_PARTICULES = 2.65  # g/cm³
+VOLUME_SUSPENSION = 1000.0  # cm³
+DIAMETRE_COUPURE = 0.08  # mm, tamis de la fraction mise en suspension
+
+# Au-delà, une lecture est abrégée : R = 1000 (ρ - 1)
+LECTURE_ABREGEE_MIN = 2.0
+
+
+def viscosite_eau(temperature: np.ndarray) -> np.ndarray:
+    """Viscosité dynamique de l'eau (Pa.s) selon la température (°C), loi de Vogel"""
+    return 2.414e-5 * 10 ** (247.8 / (np.asarray(temperature, dtype=float) + 273.15 - 140.0))
+
+
+def masse_volumique_eau(temperature: np.ndarray) -> np.ndarray:
+    """Masse volumique de l'eau (g/cm³) selon la température (°C), formule de Thiesen"""
+    t = np.asarray(temperature, dtype=float)
+    return 1 - (t + 288.9414) / (508929.2 * (t + 68.12963)) * (t - 3.9863) ** 2
+
+
+def diametres_stokes(
+    temps_min: np.ndarray,
+    profondeur_cm: np.ndarray,
+    viscosite: np.ndarray,
+    masse_volumique_particules: np.ndarray,
+    masse_volumique_liquide: np.ndarray
+) -> np.ndarray:
+    """
+    Diamètres équivalents (mm) : D = √(18 η Hr / ((ρs - ρw) g t))
+
+    Unités d'entrée : minutes, cm, Pa.s, g/cm³.
+    """
+    ecart_masse_volumique = (masse_volumique_particules - masse_volumique_liquide) * 1000  # kg/m³
+    diametres_m = np.sqrt(
+        18 * viscosite * (profondeur_cm / 100) / (ecart_masse_volumique * GRAVITE * temps_min * 60)
+    )
+    return diametres_m * 1000
+
+
+def pourcentages_fraction(
+    masse_volumique_lue: np.ndarray,
+    volume: np.ndarray,
+    masse_seche: np.ndarray,
+    masse_volumique_particules: np.ndarray,
+    masse_volumique_liquide: np.ndarray
+) -> np.ndarray:
+    """
+    Pourcentages de la fraction en suspension plus fins que le diamètre équivalent
+
+    P = 100 · (V / m) · ρs / (ρs - ρw) · (ρ lue corrigée - ρw)
+    """
+    return (
+        100 * (volume / masse_seche)
+        * masse_volumique_particules / (masse_volumique_particules - masse_volumique_liquide)
+        * (masse_volumique_lue - masse_volumique_liquide)
+    )
+
+
+def _parametre(granulometries: Sequence[Any], champ: str, defaut: float) -> np.ndarray:
+    """Paramètre d'essai optionnel de chaque essai (défaut si absent)"""
+    valeurs = [getattr(granulometrie, champ, None) for granulometrie in granulometries]
+    return np.array([defaut if v is None else v for v in valeurs], dtype=float)
+
+
+def _lecture_calculable(granulometrie: Any, point: dict) -> bool:
+    """Une lecture est recalculée si le densimètre, le temps, la profondeur et la masse sont connus"""
+    return (
+        point.get("lecture") is not None
+        and (point.get("temps_min") or 0) > 0
+        and (point.get("hauteur_cm") or 0) > 0
+        and (getattr(granulometrie, "masse_seche_sedimentometrie", None) or 0) > 0
+    )
+
+
+def essais_avec_lectures(granulometries: Sequence[Any]) -> np.ndarray:
+    """Masque des essais ayant au moins une lecture de densimètre à calculer"""
+    return np.array([
+        any(
+            isinstance(point, dict) and _lecture_calculable(granulometrie, point)
+            for point in granulometrie.points_sedimentometrie or []
+        )
+        for granulometrie in granulometries
+    ], dtype=bool)
+
+
+def points_sedimentometrie_lot(
+    granulometries: Sequence[Any],
+    facteurs: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Points (essai, diamètre mm, pourcentage passant) de sédimentométrie d'un lot
+
+    facteurs : passant du tamisage au diamètre de coupure (fraction de 1) de
+    chaque essai, par lequel les pourcentages de la suspension sont ramenés à
+    l'échantillon total. Le diamètre et le pourcentage calculés sont reportés
+    sur les points de lecture (nouvelles listes, pour que la modification
+    soit détectée par la session).
+    """
+    lignes: List[int] = []
+    temps: List[float] = []
+    profondeurs: List[float] = []
+    lectures: List[float] = []
+    calcules: List[Tuple[int, int]] = []
+    lignes_fournies: List[int] = []
+    diametres_fournis: List[float] = []
+    passants_fournis: List[float] = []
+
+    for i, granulometrie in enumerate(granulometries):
+        for j, point in enumerate(granulometrie.points_sedimentometrie or []):
+            if not isinstance(point, dict):
+                continue
+            if _lecture_calculable(granulometrie, point):
+                lignes.append(i)
+                temps.append(point["temps_min"])
+                profondeurs.append(point["hauteur_cm"])
+                lectures.append(point["lecture"])
+                calcules.append((i, j))
+            else:
+                diametre = point.get("diametre_mm")
+                pourcentage = point.get("pourcentage_passant")
+                if diametre and diametre > 0 and pourcentage is not None:
+                    lignes_fournies.append(i)
+                    diametres_fournis.append(diametre)
+                    passants_fournis.append(pourcentage)
+
+    diametres = np.empty(0)
+    passants = np.empty(0)
+    if lignes:
+        essai = np.array(lignes, dtype=np.int64)
+        temperature = _parametre(granulometries, "temperature_sedimentometrie", TEMPERATURE_REFERENCE)[essai]
+        viscosite = _parametre(granulometries, "viscosite_dynamique", np.nan)[essai]
+        viscosite = np.where(np.isnan(viscosite), viscosite_eau(temperature), viscosite)
+        masse_volumique_particules = _parametre(
+            granulometries, "masse_volumique_particules", MASSE_VOLUMIQUE_PARTICULES
+        )[essai]
+        masse_volumique_liquide = masse_volumique_eau(temperature)
+
+        lues = np.array(lectures, dtype=float)
+        lues = np.where(lues > LECTURE_ABREGEE_MIN, 1 + lues / 1000, lues)
+        lues = lues + _parametre(granulometries, "correction_lecture", 0.0)[essai]
+
+        diametres = diametres_stokes(
+            np.array(temps, dtype=float), np.array(profondeurs, dtype=float),
+            viscosite, masse_volumique_particules, masse_volumique_liquide
+        )
+        passants = pourcentages_fraction(
+            lues,
+            _parametre(granulometries, "volume_suspension", VOLUME_SUSPENSION)[essai],
+            _parametre(granulometries, "masse_seche_sedimentometrie", np.nan)[essai],
+            masse_volumique_particules,
+            masse_volumique_liquide,
+        )
+        passants = np.clip(passants * facteurs[essai], 0.0, 100.0)
+
+        # Valeurs arrondies comme stockées : un recalcul relit les mêmes points
+        diametres = np.round(diametres, 6)
+        passants = np.round(passants, 2)
+        nouveaux = {}
+        for (i, j), diametre, passant in zip(calcules, diametres.tolist(), passants.tolist()):
+            points = nouveaux.setdefault(i, list(granulometries[i].points_sedimentometrie))
+            points[j] = {**points[j], "diametre_mm": diametre, "pourcentage_passant": passant}
+        for i, points in nouveaux.items():
+            granulometries[i].points_sedimentometrie = points
+
+    return (
+        np.concatenate((np.array(lignes, dtype=np.int64), np.array(lignes_fournies, dtype=np.int64))),
+        np.concatenate((diametres, np.array(diametres_fournis, dtype=float))),
+        np.concatenate((passants, np.array(passants_fournis, dtype=float))),
+    )
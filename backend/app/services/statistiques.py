@@ -0,0 +1,277 @@
+"""
+Statistiques des essais calculées par la base
+
+Les statistiques d'un type d'essai (effectifs, min, max, moyenne, médiane,
+écart-type du résultat principal) sont agrégées en SQL : seule la ligne
+d'agrégats revient de la base, quel que soit le nombre d'essais filtrés.
+Sous PostgreSQL, la médiane et l'écart-type sont calculés par
+percentile_cont et stddev_samp ; ailleurs (SQLite), l'écart-type est déduit
+des sommes et la médiane est lue par une seconde requête qui ne retourne que
+la ou les deux valeurs centrales.
+
+Les distributions (histogramme et percentiles P5 à P95 des résultats
+d'un type) sont calculées par NumPy sur la seule projection des colonnes de
+résultats, en une requête, sans construire d'objets ORM.
+
+Le tableau de bord est lu sur les compteurs journaliers
+(essais_compteurs_jour) en une requête.
+"""
+import math
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import and_, case, extract, func, select
+from sqlalchemy.orm import Session
+
+from app.models.compteurs import EssaiCompteurJour
+from app.models.essai import (
+    Essai, EssaiAtterberg, EssaiCBR, EssaiGranulometrie, EssaiProctor, StatutEssai, TypeEssai
+)
+
+
+class Metrique(NamedTuple):
+    """Résultat principal d'un type d'essai et noms de ses statistiques dans la réponse"""
+    colonne: Any
+    prefixe: str
+    moyenne: str
+    mediane: str
+
+
+METRIQUES = {
+    TypeEssai.PROCTOR: Metrique(EssaiProctor.densite_seche_max, "densite", "moyenne", "mediane"),
+    TypeEssai.CBR: Metrique(EssaiCBR.cbr_final, "cbr", "moyen", "median"),
+    TypeEssai.ATTERBERG: Metrique(EssaiAtterberg.wl, "wl", "moyen", "median"),
+}
+
+# Résultats dont la distribution est calculée, par type (colonnes d'une même table)
+COLONNES_DISTRIBUTION = {
+    TypeEssai.PROCTOR: (EssaiProctor.densite_seche_max,),
+    TypeEssai.CBR: (EssaiCBR.cbr_final,),
+    TypeEssai.ATTERBERG: (EssaiAtterberg.wl, EssaiAtterberg.ip),
+    TypeEssai.GRANULOMETRIE: (EssaiGranulometrie.d50,),
+}
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def conditions_essais(
+    type_essai: TypeEssai,
+    date_debut: Optional[datetime] = None,
+    date_fin: Optional[datetime] = None,
+    projet_id: Optional[int] = None
+) -> List[Any]:
+    """Conditions de filtrage des essais d'un type (période d'essai, projet)"""
+    conditions = [Essai.type_essai == type_essai]
+    if date_debut:
+        conditions.append(Essai.date_essai >= date_debut)
+    if date_fin:
+        conditions.append(Essai.date_essai <= date_fin)
+    if projet_id:
+        conditions.append(Essai.projet_id == projet_id)
+    return conditions
+
+
+def _mediane(db: Session, metrique: Metrique, conditions: List[Any], nombre: int) -> float:
+    """Médiane par tri en base : seules la ou les deux valeurs centrales sont lues"""
+    valeurs = db.execute(
+        select(metrique.colonne)
+        .join(Essai, Essai.id == metrique.colonne.class_.essai_id)
+        .where(and_(*conditions), metrique.colonne.isnot(None), metrique.colonne != 0)
+        .order_by(metrique.colonne)
+        .offset((nombre - 1) // 2)
+        .limit(2 - nombre % 2)
+    ).scalars().all()
+    return sum(valeurs) / len(valeurs)
+
+
+def statistiques_par_type(
+    db: Session,
+    type_essai: TypeEssai,
+    date_debut: Optional[datetime] = None,
+    date_fin: Optional[datetime] = None,
+    projet_id: Optional[int] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Effectifs et statistiques du résultat principal des essais d'un type
+
+    Les valeurs nulles ou à zéro (résultat non calculé) sont ignorées.
+    Retourne None si aucun essai ne correspond aux critères.
+    """
+    conditions = conditions_essais(type_essai, date_debut, date_fin, projet_id)
+    metrique = METRIQUES.get(type_essai)
+    postgresql = db.get_bind().dialect.name == "postgresql"
+
+    colonnes = [
+        func.count(Essai.id),
+        func.count(case((Essai.statut == StatutEssai.VALIDE, 1))),
+    ]
+    if metrique is not None:
+        valeur = func.nullif(metrique.colonne, 0)
+        colonnes += [func.count(valeur), func.min(valeur), func.max(valeur), func.avg(valeur)]
+        if postgresql:
+            colonnes += [func.stddev_samp(valeur), func.percentile_cont(0.5).within_group(valeur)]
+        else:
+            colonnes += [func.sum(valeur), func.sum(valeur * valeur)]
+
+    instruction = select(*colonnes).select_from(Essai)
+    if metrique is not None:
+        modele = metrique.colonne.class_
+        instruction = instruction.outerjoin(modele, modele.essai_id == Essai.id)
+
+    ligne = db.execute(instruction.where(and_(*conditions))).one()
+    if not ligne[0]:
+        return None
+
+    stats: Dict[str, Any] = {
+        "nombre_total": ligne[0],
+        "nombre_valides": ligne[1],
+        "distribution": [],
+        "tendances": []
+    }
+    if metrique is None or not ligne[2]:
+        return stats
+
+    nombre, minimum, maximum, moyenne = ligne[2], ligne[3], ligne[4], ligne[5]
+    if postgresql:
+        ecart_type, mediane = ligne[6] or 0, ligne[7]
+    else:
+        somme, somme_carres = ligne[6], ligne[7]
+        variance = (somme_carres - somme * somme / nombre) / (nombre - 1) if nombre > 1 else 0
+        ecart_type = math.sqrt(max(variance, 0))
+        mediane = _mediane(db, metrique, conditions, nombre)
+
+    prefixe = metrique.prefixe
+    stats.update({
+        f"{prefixe}_min": float(minimum),
+        f"{prefixe}_max": float(maximum),
+        f"{prefixe}_{metrique.moyenne}": float(moyenne),
+        f"{prefixe}_{metrique.mediane}": float(mediane),
+        f"{prefixe}_ecart_type": float(ecart_type)
+    })
+    return stats
+
+
+def distributions_par_type(
+    db: Session,
+    type_essai: TypeEssai,
+    date_debut: Optional[datetime] = None,
+    date_fin: Optional[datetime] = None,
+    projet_id: Optional[int] = None,
+    classes: int = 20,
+    bornes: Optional[Sequence[float]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Histogramme et percentiles des résultats des essais d'un type, par colonne
+
+    Les colonnes de résultats sont lues en une requête et traitées par NumPy.
+    L'histogramme a `classes` classes de même largeur entre le minimum et le
+    maximum, ou les bornes données (valeurs hors bornes non comptées). Les
+    valeurs nulles ou à zéro sont ignorées, comme pour statistiques_par_type.
+    """
+    colonnes = COLONNES_DISTRIBUTION.get(type_essai)
+    if not colonnes:
+        return {}
+    modele = colonnes[0].class_
+    lignes = db.execute(
+        select(*colonnes)
+        .join(Essai, Essai.id == modele.essai_id)
+        .where(and_(*conditions_essais(type_essai, date_debut, date_fin, projet_id)))
+    ).all()
+    # None devient NaN : une passe vectorisée par colonne
+    valeurs = np.array(lignes, dtype=float).reshape(len(lignes), len(colonnes))
+
+    distributions = {}
+    for indice, colonne in enumerate(colonnes):
+        serie = valeurs[:, indice]
+        serie = serie[np.isfinite(serie) & (serie != 0)]
+        if serie.size == 0:
+            distributions[colonne.key] = {"nombre": 0, "bornes": [], "effectifs": [], "percentiles": {}}
+            continue
+        effectifs, limites = np.histogram(serie, bins=bornes if bornes else classes)
+        distributions[colonne.key] = {
+            "nombre": int(serie.size),
+            "bornes": limites.tolist(),
+            "effectifs": effectifs.tolist(),
+            "percentiles": {
+                f"p{rang}": float(valeur)
+                for rang, valeur in zip(PERCENTILES, np.percentile(serie, PERCENTILES))
+            },
+        }
+    return distributions
+
+
+def classes_distribution(distribution: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Classes d'un histogramme pour l'affichage : plage, effectif et part du total"""
+    bornes = distribution["bornes"]
+    total = sum(distribution["effectifs"]) or 1
+    return [
+        {
+            "range": f"{debut:.4g} – {fin:.4g}",
+            "debut": debut,
+            "fin": fin,
+            "count": effectif,
+            "percentage": effectif / total,
+        }
+        for debut, fin, effectif in zip(bornes, bornes[1:], distribution["effectifs"])
+    ]
+
+
+def tendances_mensuelles(db: Session, type_essai: TypeEssai) -> List[Tuple[datetime, int]]:
+    """Nombre d'essais d'un type par mois (premier jour du mois, nombre), du plus ancien au plus récent"""
+    annee = extract("year", Essai.date_essai)
+    mois = extract("month", Essai.date_essai)
+    lignes = db.execute(
+        select(annee, mois, func.count(Essai.id))
+        .where(Essai.type_essai == type_essai, Essai.date_essai.isnot(None))
+        .group_by(annee, mois)
+        .order_by(annee, mois)
+    ).all()
+    return [(datetime(int(a), int(m), 1), int(nombre)) for a, m, nombre in lignes]
+
+
+def tableau_de_bord(db: Session, aujourd_hui: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Statistiques du tableau de bord, lues sur les compteurs journaliers
+
+    Une seule requête : les compteurs sont sommés par (type, statut, mois),
+    avec les sommes des 7 et 180 derniers jours ; le total et les
+    répartitions en sont déduits.
+    """
+    aujourd_hui = aujourd_hui or date.today()
+    sept_jours_avant = aujourd_hui - timedelta(days=7)
+    six_mois_avant = aujourd_hui - timedelta(days=180)
+    compteur = EssaiCompteurJour
+    lignes = db.execute(
+        select(
+            compteur.type_essai,
+            compteur.statut,
+            compteur.mois,
+            func.sum(compteur.nombre),
+            func.sum(case((compteur.jour >= sept_jours_avant, compteur.nombre), else_=0)),
+            func.sum(case((compteur.jour >= six_mois_avant, compteur.nombre), else_=0)),
+        ).group_by(compteur.type_essai, compteur.statut, compteur.mois)
+    ).all()
+
+    total = recents = 0
+    par_type: Dict[str, int] = {}
+    par_statut: Dict[str, int] = {}
+    par_mois: Dict[date, int] = {}
+    for type_essai, statut, mois, nombre, nombre_7j, nombre_6m in lignes:
+        total += nombre
+        recents += nombre_7j
+        par_type[type_essai.value] = par_type.get(type_essai.value, 0) + nombre
+        par_statut[statut.value] = par_statut.get(statut.value, 0) + nombre
+        if nombre_6m:
+            par_mois[mois] = par_mois.get(mois, 0) + nombre_6m
+
+    return {
+        "total_essais": total,
+        "essais_recents_7j": recents,
+        "par_type": par_type,
+        "par_statut": par_statut,
+        "par_mois": [
+            {"annee": mois.year, "mois": mois.month, "count": nombre}
+            for mois, nombre in sorted(par_mois.items(), reverse=True)
+        ]
+    }
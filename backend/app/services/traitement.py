@@ -0,0 +1,122 @@
+"""
+Traitement des données d'un essai : validation, calcul, report des résultats
+
+Point de passage unique des routes de saisie, de l'import externe (par lots)
+et de la mise à jour des mesures libres : le moteur du type d'essai est résolu dans
+le registre, les données sont validées puis calculées (avec mémoïsation), et
+les colonnes de résultats sont reportées sur l'objet.
+"""
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from app.services.memoisation import calculer_memoise, empreinte_calcul
+from app.services.registre import obtenir_moteur, valider_lot
+from app.services.validation import ValidationError
+
+
+def traiter_essai(type_essai: Any, objet: Any, si_modifie: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Valide et calcule les données spécifiques d'un essai
+
+    Lève ValidationError si les données sont invalides. Retourne les résultats
+    (avec les avertissements de validation) à stocker dans Essai.resultats.
+    Avec si_modifie, retourne None sans rien faire quand l'empreinte persistée
+    montre que les résultats stockés sont à jour.
+    """
+    moteur = obtenir_moteur(type_essai)
+    if si_modifie and getattr(objet, "hash_calcul", None) == empreinte_calcul(moteur.type_essai, objet):
+        return None
+
+    validation = moteur.valider(objet)
+    if not validation["valid"]:
+        raise ValidationError(f"Erreurs de validation: {', '.join(validation['errors'])}")
+
+    resultats = calculer_memoise(moteur.type_essai, objet)
+    for colonne in moteur.colonnes_resultats:
+        setattr(objet, colonne, resultats.get(colonne))
+
+    # Ajouter les warnings de validation aux résultats
+    if validation["warnings"]:
+        resultats["_validation_warnings"] = validation["warnings"]
+    return resultats
+
+
+def traiter_mesures(type_essai: Any, mesures: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Valide et calcule des mesures libres (essai sans table spécifique)"""
+    mesures = {
+        nom: valeur for nom, valeur in (mesures or {}).items()
+        if not nom.startswith("_")
+    }
+    return traiter_essai(type_essai, SimpleNamespace(mesures=mesures, hash_calcul=None))
+
+
+def traiter_lot(type_essai: Any, objets: Sequence[Any]) -> List[Union[Dict[str, Any], ValidationError]]:
+    """
+    Valide un lot d'essais d'un même type en une passe, puis calcule les
+    essais valides avec le noyau batch du moteur
+
+    Retourne pour chaque objet ses résultats, ou une ValidationError (non
+    levée) s'il est invalide.
+    """
+    moteur = obtenir_moteur(type_essai)
+    validations = valider_lot(moteur, objets)
+    valides = [objet for objet, validation in zip(objets, validations) if validation["valid"]]
+    calculs = iter(moteur.calculer_lot(valides) if valides else ())
+
+    resultats: List[Union[Dict[str, Any], ValidationError]] = []
+    for objet, validation in zip(objets, validations):
+        if not validation["valid"]:
+            resultats.append(ValidationError(f"Erreurs de validation: {', '.join(validation['errors'])}"))
+            continue
+        resultat = next(calculs)
+        for colonne in moteur.colonnes_resultats:
+            setattr(objet, colonne, resultat.get(colonne))
+        objet.hash_calcul = empreinte_calcul(moteur.type_essai, objet)
+        if validation["warnings"]:
+            resultat["_validation_warnings"] = validation["warnings"]
+        resultats.append(resultat)
+    return resultats
+
+
+def importer_donnees_specifiques(
+    essais: Sequence[Any],
+    donnees: Sequence[Optional[Dict[str, Any]]]
+) -> List[Optional[str]]:
+    """
+    Crée les données spécifiques importées d'un lot d'essais et calcule leurs résultats
+
+    Les essais sont regroupés par type : chaque groupe est validé en une passe
+    (validate_many) et calculé avec le noyau batch. Pour un type sans table
+    spécifique, les données sont des mesures libres. Retourne pour chaque
+    essai None, ou le message d'erreur qui empêche son import.
+    """
+    erreurs: List[Optional[str]] = [None] * len(essais)
+    groupes: Dict[str, List[Tuple[int, Any]]] = {}
+    for i, (essai, donnees_essai) in enumerate(zip(essais, donnees)):
+        if not donnees_essai:
+            continue
+        try:
+            moteur = obtenir_moteur(essai.type_essai)
+            if moteur.modele is None:
+                objet = SimpleNamespace(
+                    mesures={nom: valeur for nom, valeur in donnees_essai.items() if not nom.startswith("_")},
+                    hash_calcul=None,
+                )
+            else:
+                objet = moteur.modele(**donnees_essai)
+        except (TypeError, ValueError) as e:
+            erreurs[i] = str(e)
+            continue
+        groupes.setdefault(moteur.type_essai, []).append((i, objet))
+
+    for type_essai, membres in groupes.items():
+        moteur = obtenir_moteur(type_essai)
+        resultats = traiter_lot(type_essai, [objet for _, objet in membres])
+        for (i, objet), resultat in zip(membres, resultats):
+            if isinstance(resultat, ValidationError):
+                erreurs[i] = str(resultat)
+                continue
+            if moteur.relation is not None:
+                setattr(essais[i], moteur.relation, objet)
+            essais[i].resultats = resultat
+    return erreurs
@@ -1,263 +1,370 @@
 """
 Service de validation automatique selon les normes géotechniques
+
+Les contrôles de plage sont déclarés comme données (REGLES_VALIDATION) :
+champ, bornes, sévérité et modèle de message. Ils sont compilés une fois à
+l'import en contrôles vectorisés, appliqués en une passe NumPy sur un lot
+d'essais par validate_many ; les messages ne sont formatés que pour les
+valeurs hors plage.
 """
-from typing import Dict, List, Any, Optional
+import math
+import operator
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
 from app.models.essai import EssaiAtterberg, EssaiCBR, EssaiProctor, EssaiGranulometrie
 
+ERREUR = "errors"
+AVERTISSEMENT = "warnings"
+
 
 class ValidationError(Exception):
     """Exception pour les erreurs de validation"""
     pass
 
 
+class Regle(NamedTuple):
+    """
+    Contrôle de plage d'un champ
+
+    champ : attribut de l'essai (« wl ») ou clé des points d'une liste
+    (« points_mesure[].teneur_eau » ; « a|b » : première clé renseignée).
+    La valeur est signalée si elle sort de [minimum, maximum] (borne basse
+    exclue avec minimum_exclu). Avec agregat="somme", c'est la somme des
+    valeurs des points de chaque essai qui est contrôlée. Les valeurs nulles
+    ne sont contrôlées qu'avec controler_zero. Les règles d'un même champ
+    s'excluent dans leur ordre de déclaration (comme if / elif).
+    """
+    champ: str
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    severite: str = ERREUR
+    message: str = "{champ} invalide: {valeur}"
+    minimum_exclu: bool = False
+    controler_zero: bool = False
+    agregat: Optional[str] = None
+
+
+class Comparaison(NamedTuple):
+    """Cohérence entre deux champs renseignés : signalée si « champ operateur reference » est vrai"""
+    champ: str
+    operateur: str
+    reference: str
+    severite: str = ERREUR
+    message: str = "{champ} ({valeur}) incohérent avec {reference_champ} ({reference})"
+
+
+OPERATEURS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+
+def _coups(numero: int) -> Regle:
+    return Regle(
+        f"wl_nombre_coups_{numero}", 15, 35, AVERTISSEMENT,
+        f"Nombre de coups essai {numero} ({{valeur}}) hors de la plage recommandée (15-35)",
+    )
+
+
+def _teneur_wl(numero: int) -> Regle:
+    return Regle(
+        f"wl_teneur_eau_{numero}", 0, 200, ERREUR,
+        "Teneur en eau invalide: {valeur}% (doit être entre 0 et 200%)", controler_zero=True,
+    )
+
+
+def _teneur_wp(numero: int) -> Regle:
+    return Regle(
+        f"wp_teneur_eau_{numero}", 0, 100, ERREUR,
+        "Teneur en eau WP invalide: {valeur}% (doit être entre 0 et 100%)", controler_zero=True,
+    )
+
+
+REGLES_VALIDATION: Dict[str, Tuple[Any, ...]] = {
+    # NF P94-051
+    "atterberg": (
+        _coups(1), _coups(2), _coups(3),
+        _teneur_wl(1), _teneur_wl(2), _teneur_wl(3),
+        _teneur_wp(1), _teneur_wp(2), _teneur_wp(3),
+        Comparaison(
+            "wl", "<", "wp", ERREUR,
+            "La limite de liquidité ({valeur}%) doit être supérieure à la limite de plasticité ({reference}%)",
+        ),
+        Regle("ip", 0, None, ERREUR, "L'indice de plasticité ({valeur}%) ne peut pas être négatif"),
+        Regle("ip", None, 100, AVERTISSEMENT, "Indice de plasticité très élevé: {valeur}%"),
+    ),
+    # NF P94-078
+    "cbr": (
+        Regle(
+            "points_penetration[].penetration_mm", 0, 12.5, ERREUR,
+            "Pénétration invalide: {valeur}mm (doit être entre 0 et 12.5mm)",
+        ),
+        Regle("points_penetration[].force_kn", 0, 50, AVERTISSEMENT, "Force élevée: {valeur}kN (vérifier la cohérence)"),
+        Regle("cbr_25mm", 0, 100, ERREUR, "CBR à 2.5mm invalide: {valeur}%"),
+        Regle("cbr_50mm", 0, 100, ERREUR, "CBR à 5.0mm invalide: {valeur}%"),
+        Comparaison(
+            "cbr_25mm", ">", "cbr_50mm", AVERTISSEMENT,
+            "Le CBR à 2.5mm est supérieur au CBR à 5.0mm (vérifier la cohérence)",
+        ),
+        Regle("teneur_eau_finale", 0, 100, ERREUR, "Teneur en eau finale invalide: {valeur}%"),
+    ),
+    # NF P94-093
+    "proctor": (
+        Regle(
+            "points_mesure[].teneur_eau", 0, 50, ERREUR,
+            "Teneur en eau invalide: {valeur}% (doit être entre 0 et 50%)",
+        ),
+        Regle(
+            "points_mesure[].densite_seche", 0, 3.0, ERREUR,
+            "Densité sèche invalide: {valeur}g/cm³ (doit être entre 0 et 3.0g/cm³)",
+        ),
+        Regle("opm", 0, 50, ERREUR, "OPM invalide: {valeur}%"),
+        Regle("densite_seche_max", 1.0, 3.0, AVERTISSEMENT, "Densité sèche max inhabituelle: {valeur}g/cm³"),
+    ),
+    # NF P94-056
+    "granulometrie": (
+        Regle("masse_totale_seche", 0, None, ERREUR, "La masse totale sèche doit être positive", minimum_exclu=True),
+        Regle("masse_totale_seche", 100, None, AVERTISSEMENT, "Masse totale très faible, vérifier la précision"),
+        Regle("points_tamisage[].pourcentage_retenu|pourcentage_cumule", 0, 100, ERREUR, "Pourcentage invalide: {valeur}%"),
+        Regle(
+            "points_tamisage[].pourcentage_retenu|pourcentage_cumule", 95, 105, AVERTISSEMENT,
+            "La somme des pourcentages ({valeur}%) s'écarte significativement de 100%",
+            controler_zero=True, agregat="somme",
+        ),
+        Regle("d10", 0, None, ERREUR, "D10 doit être positif", minimum_exclu=True),
+        Comparaison("d60", "<", "d10", ERREUR, "D60 doit être supérieur à D10"),
+    ),
+}
+
+
+def _nombres(brutes: List[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """Valeurs en float (NaN si absentes) et masque des valeurs non numériques"""
+    try:
+        return np.array(brutes, dtype=float), np.zeros(len(brutes), dtype=bool)
+    except (TypeError, ValueError):
+        nombres = np.full(len(brutes), np.nan)
+        invalides = np.zeros(len(brutes), dtype=bool)
+        for k, valeur in enumerate(brutes):
+            try:
+                nombres[k] = np.nan if valeur is None else float(valeur)
+            except (TypeError, ValueError):
+                invalides[k] = True
+        return nombres, invalides
+
+
+def _extraire(objets: Sequence[Any], champ: str) -> Tuple[np.ndarray, List[Any]]:
+    """(ligne de chaque valeur, valeurs brutes) d'un champ simple ou d'un champ de points"""
+    liste, separateur, cles = champ.partition("[].")
+    if not separateur:
+        return np.arange(len(objets)), [getattr(objet, champ, None) for objet in objets]
+
+    cles = cles.split("|")
+    lignes: List[int] = []
+    brutes: List[Any] = []
+    for i, objet in enumerate(objets):
+        for point in getattr(objet, liste, None) or []:
+            if isinstance(point, dict):
+                lignes.append(i)
+                brutes.append(next((point[cle] for cle in cles if point.get(cle)), point.get(cles[-1])))
+    return np.array(lignes, dtype=np.int64), brutes
+
+
+Controle = Callable[[Sequence[Any], List[Dict[str, Any]]], None]
+
+
+def _compiler_regles(regles: Sequence[Regle]) -> List[Controle]:
+    """Regroupe les règles par champ : une extraction et un contrôle vectorisé par champ"""
+    par_champ: Dict[Tuple[str, Optional[str]], List[Regle]] = {}
+    for regle in regles:
+        par_champ.setdefault((regle.champ, regle.agregat), []).append(regle)
+
+    def controle(champ: str, agregat: Optional[str], regles_champ: List[Regle]) -> Controle:
+        if agregat not in (None, "somme"):
+            raise ValueError(f"Agrégat de règle inconnu: {agregat}")
+
+        def appliquer(objets: Sequence[Any], resultats: List[Dict[str, Any]]) -> None:
+            lignes, brutes = _extraire(objets, champ)
+            nombres, invalides = _nombres(brutes)
+            for k in np.flatnonzero(invalides).tolist():
+                resultats[lignes[k]][ERREUR].append(f"{champ}: valeur non numérique ({brutes[k]})")
+
+            if agregat == "somme":
+                sommes = np.bincount(lignes, weights=np.nan_to_num(nombres), minlength=len(objets))
+                lignes = np.flatnonzero(np.bincount(lignes, minlength=len(objets)))
+                nombres = sommes[lignes]
+                brutes = [round(valeur, 2) for valeur in nombres.tolist()]
+
+            libre = ~np.isnan(nombres)
+            for regle in regles_champ:
+                a_controler = libre if regle.controler_zero else libre & (nombres != 0)
+                with np.errstate(invalid="ignore"):
+                    hors_plage = np.zeros(len(nombres), dtype=bool)
+                    if regle.minimum is not None:
+                        hors_plage |= (nombres <= regle.minimum) if regle.minimum_exclu else (nombres < regle.minimum)
+                    if regle.maximum is not None:
+                        hors_plage |= nombres > regle.maximum
+                signales = a_controler & hors_plage
+                for k in np.flatnonzero(signales).tolist():
+                    resultats[lignes[k]][regle.severite].append(
+                        regle.message.format(champ=champ, valeur=brutes[k])
+                    )
+                libre = libre & ~signales
+
+        return appliquer
+
+    return [controle(champ, agregat, regles_champ) for (champ, agregat), regles_champ in par_champ.items()]
+
+
+def _compiler_comparaison(comparaison: Comparaison) -> Controle:
+    """Contrôle vectorisé de cohérence entre deux champs renseignés (non nuls)"""
+    comparer = OPERATEURS[comparaison.operateur]
+
+    def appliquer(objets: Sequence[Any], resultats: List[Dict[str, Any]]) -> None:
+        _, valeurs = _extraire(objets, comparaison.champ)
+        _, references = _extraire(objets, comparaison.reference)
+        a, _ = _nombres(valeurs)
+        b, _ = _nombres(references)
+        with np.errstate(invalid="ignore"):
+            signales = (np.nan_to_num(a) != 0) & (np.nan_to_num(b) != 0) & comparer(a, b)
+        for i in np.flatnonzero(signales).tolist():
+            resultats[i][comparaison.severite].append(comparaison.message.format(
+                champ=comparaison.champ, valeur=valeurs[i],
+                reference_champ=comparaison.reference, reference=references[i],
+            ))
+
+    return appliquer
+
+
+def compiler_regles(regles: Sequence[Any]) -> List[Controle]:
+    """Compile des règles déclarées en contrôles vectorisés, dans l'ordre de déclaration"""
+    controles: List[Controle] = []
+    plages: List[Regle] = []
+    for regle in regles:
+        if isinstance(regle, Comparaison):
+            controles.extend(_compiler_regles(plages))
+            plages = []
+            controles.append(_compiler_comparaison(regle))
+        else:
+            plages.append(regle)
+    controles.extend(_compiler_regles(plages))
+    return controles
+
+
+_CONTROLES: Dict[str, List[Controle]] = {
+    type_essai: compiler_regles(regles) for type_essai, regles in REGLES_VALIDATION.items()
+}
+
+
+def validate_many(essai_type: str, essais: Sequence[Any]) -> List[Dict[str, Any]]:
+    """
+    Valide un lot d'essais d'un même type en une passe
+
+    Retourne, pour chaque essai et dans l'ordre, un dictionnaire avec:
+    - valid: bool
+    - warnings: List[str]
+    - errors: List[str]
+    """
+    essai_type = getattr(essai_type, "value", essai_type)
+    controles = _CONTROLES.get(essai_type)
+    if controles is None:
+        validator = VALIDATEURS.get(essai_type)
+        if validator is not None:
+            return [validator(essai) for essai in essais]
+        controles = []
+
+    resultats = [{"valid": True, "warnings": [], "errors": []} for _ in essais]
+    if essais:
+        for controle in controles:
+            controle(essais, resultats)
+    for resultat in resultats:
+        resultat["valid"] = not resultat["errors"]
+    return resultats
+
+
 def validate_atterberg(atterberg: EssaiAtterberg) -> Dict[str, Any]:
     """
     Valide les données d'un essai Atterberg selon NF P94-051
-    
+
     Retourne un dictionnaire avec:
     - valid: bool
     - warnings: List[str]
     - errors: List[str]
     """
-    result = {
-        "valid": True,
-        "warnings": [],
-        "errors": []
-    }
-    
-    # Validation de la limite de liquidité (WL)
-    if atterberg.wl_nombre_coups_1:
-        if not (15 <= atterberg.wl_nombre_coups_1 <= 35):
-            result["warnings"].append(
-                f"Nombre de coups essai 1 ({atterberg.wl_nombre_coups_1}) hors de la plage recommandée (15-35)"
-            )
-    
-    if atterberg.wl_nombre_coups_2:
-        if not (15 <= atterberg.wl_nombre_coups_2 <= 35):
-            result["warnings"].append(
-                f"Nombre de coups essai 2 ({atterberg.wl_nombre_coups_2}) hors de la plage recommandée (15-35)"
-            )
-    
-    if atterberg.wl_nombre_coups_3:
-        if not (15 <= atterberg.wl_nombre_coups_3 <= 35):
-            result["warnings"].append(
-                f"Nombre de coups essai 3 ({atterberg.wl_nombre_coups_3}) hors de la plage recommandée (15-35)"
-            )
-    
-    # Validation des teneurs en eau
-    teneurs_eau_wl = [
-        atterberg.wl_teneur_eau_1,
-        atterberg.wl_teneur_eau_2,
-        atterberg.wl_teneur_eau_3
-    ]
-    teneurs_eau_wl = [t for t in teneurs_eau_wl if t is not None]
-    
-    if len(teneurs_eau_wl) > 0:
-        for te in teneurs_eau_wl:
-            if te < 0 or te > 200:
-                result["errors"].append(f"Teneur en eau invalide: {te}% (doit être entre 0 et 200%)")
-                result["valid"] = False
-    
-    # Validation de la limite de plasticité (WP)
-    teneurs_eau_wp = [
-        atterberg.wp_teneur_eau_1,
-        atterberg.wp_teneur_eau_2,
-        atterberg.wp_teneur_eau_3
-    ]
-    teneurs_eau_wp = [t for t in teneurs_eau_wp if t is not None]
-    
-    if len(teneurs_eau_wp) > 0:
-        for te in teneurs_eau_wp:
-            if te < 0 or te > 100:
-                result["errors"].append(f"Teneur en eau WP invalide: {te}% (doit être entre 0 et 100%)")
-                result["valid"] = False
-    
-    # Validation de la cohérence WL > WP
-    if atterberg.wl and atterberg.wp:
-        if atterberg.wl < atterberg.wp:
-            result["errors"].append(
-                f"La limite de liquidité ({atterberg.wl}%) doit être supérieure à la limite de plasticité ({atterberg.wp}%)"
-            )
-            result["valid"] = False
-    
-    # Validation de l'indice de plasticité
-    if atterberg.ip:
-        if atterberg.ip < 0:
-            result["errors"].append(f"L'indice de plasticité ({atterberg.ip}%) ne peut pas être négatif")
-            result["valid"] = False
-        elif atterberg.ip > 100:
-            result["warnings"].append(f"Indice de plasticité très élevé: {atterberg.ip}%")
-    
-    return result
+    return validate_many("atterberg", [atterberg])[0]
 
 
 def validate_cbr(cbr: EssaiCBR) -> Dict[str, Any]:
     """
     Valide les données d'un essai CBR selon NF P94-078
     """
-    result = {
-        "valid": True,
-        "warnings": [],
-        "errors": []
-    }
-    
-    # Validation des valeurs de pénétration
-    if cbr.points_penetration:
-        for point in cbr.points_penetration:
-            if isinstance(point, dict):
-                force = point.get("force_kn", 0)
-                penetration = point.get("penetration_mm", 0)
-                
-                if penetration < 0 or penetration > 12.5:
-                    result["errors"].append(
-                        f"Pénétration invalide: {penetration}mm (doit être entre 0 et 12.5mm)"
-                    )
-                    result["valid"] = False
-                
-                if force < 0 or force > 50:
-                    result["warnings"].append(
-                        f"Force élevée: {force}kN (vérifier la cohérence)"
-                    )
-    
-    # Validation des CBR calculés
-    if cbr.cbr_25mm:
-        if cbr.cbr_25mm < 0 or cbr.cbr_25mm > 100:
-            result["errors"].append(f"CBR à 2.5mm invalide: {cbr.cbr_25mm}%")
-            result["valid"] = False
-    
-    if cbr.cbr_50mm:
-        if cbr.cbr_50mm < 0 or cbr.cbr_50mm > 100:
-            result["errors"].append(f"CBR à 5.0mm invalide: {cbr.cbr_50mm}%")
-            result["valid"] = False
-    
-    # Validation de la cohérence CBR
-    if cbr.cbr_25mm and cbr.cbr_50mm:
-        if cbr.cbr_25mm > cbr.cbr_50mm:
-            result["warnings"].append(
-                "Le CBR à 2.5mm est supérieur au CBR à 5.0mm (vérifier la cohérence)"
-            )
-    
-    # Validation de la teneur en eau
-    if cbr.teneur_eau_finale:
-        if cbr.teneur_eau_finale < 0 or cbr.teneur_eau_finale > 100:
-            result["errors"].append(f"Teneur en eau finale invalide: {cbr.teneur_eau_finale}%")
-            result["valid"] = False
-    
-    return result
+    return validate_many("cbr", [cbr])[0]
 
 
 def validate_proctor(proctor: EssaiProctor) -> Dict[str, Any]:
     """
     Valide les données d'un essai Proctor selon NF P94-093
     """
-    result = {
-        "valid": True,
-        "warnings": [],
-        "errors": []
-    }
-    
-    # Validation des points de mesure
-    if proctor.points_mesure:
-        for point in proctor.points_mesure:
-            if isinstance(point, dict):
-                teneur_eau = point.get("teneur_eau", 0)
-                densite_seche = point.get("densite_seche", 0)
-                
-                if teneur_eau < 0 or teneur_eau > 50:
-                    result["errors"].append(
-                        f"Teneur en eau invalide: {teneur_eau}% (doit être entre 0 et 50%)"
-                    )
-                    result["valid"] = False
-                
-                if densite_seche < 0 or densite_seche > 3.0:
-                    result["errors"].append(
-                        f"Densité sèche invalide: {densite_seche}g/cm³ (doit être entre 0 et 3.0g/cm³)"
-                    )
-                    result["valid"] = False
-    
-    # Validation de l'OPM
-    if proctor.optimum_proctor:
-        if proctor.optimum_proctor < 0 or proctor.optimum_proctor > 50:
-            result["errors"].append(f"OPM invalide: {proctor.optimum_proctor}%")
-            result["valid"] = False
-    
-    # Validation de la densité sèche max
-    if proctor.densite_seche_max:
-        if proctor.densite_seche_max < 1.0 or proctor.densite_seche_max > 3.0:
-            result["warnings"].append(
-                f"Densité sèche max inhabituelle: {proctor.densite_seche_max}g/cm³"
-            )
-    
-    return result
+    return validate_many("proctor", [proctor])[0]
 
 
 def validate_granulometrie(granulometrie: EssaiGranulometrie) -> Dict[str, Any]:
     """
     Valide les données d'un essai de granulométrie selon NF P94-056
     """
+    return validate_many("granulometrie", [granulometrie])[0]
+
+
+def validate_autre(essai: Any) -> Dict[str, Any]:
+    """
+    Valide les mesures libres d'un essai sans moteur spécifique
+
+    Les mesures doivent être des valeurs simples (nombres finis, textes,
+    booléens) : elles sont stockées telles quelles dans les résultats.
+    """
     result = {
         "valid": True,
         "warnings": [],
         "errors": []
     }
-    
-    # Validation de la masse totale
-    if granulometrie.masse_totale_seche:
-        if granulometrie.masse_totale_seche <= 0:
-            result["errors"].append("La masse totale sèche doit être positive")
-            result["valid"] = False
-        elif granulometrie.masse_totale_seche < 100:
-            result["warnings"].append("Masse totale très faible, vérifier la précision")
-    
-    # Validation des points de tamisage
-    if granulometrie.points_tamisage:
-        total_pourcentage = 0
-        for point in granulometrie.points_tamisage:
-            if isinstance(point, dict):
-                pourcentage = point.get("pourcentage_retenu", 0) or point.get("pourcentage_cumule", 0)
-                total_pourcentage += pourcentage
-                
-                if pourcentage < 0 or pourcentage > 100:
-                    result["errors"].append(f"Pourcentage invalide: {pourcentage}%")
-                    result["valid"] = False
-        
-        if abs(total_pourcentage - 100) > 5:
-            result["warnings"].append(
-                f"La somme des pourcentages ({total_pourcentage}%) s'écarte significativement de 100%"
-            )
-    
-    # Validation des diamètres caractéristiques
-    if granulometrie.d10:
-        if granulometrie.d10 <= 0:
-            result["errors"].append("D10 doit être positif")
+
+    mesures = getattr(essai, "mesures", None) or {}
+    if not isinstance(mesures, dict):
+        result["errors"].append("Les mesures doivent être un objet clé/valeur")
+        result["valid"] = False
+        return result
+
+    for nom, valeur in mesures.items():
+        if isinstance(valeur, (dict, list)):
+            result["errors"].append(f"Mesure {nom}: valeur composée non acceptée")
             result["valid"] = False
-    
-    if granulometrie.d60 and granulometrie.d10:
-        if granulometrie.d60 < granulometrie.d10:
-            result["errors"].append("D60 doit être supérieur à D10")
+        elif isinstance(valeur, float) and not math.isfinite(valeur):
+            result["errors"].append(f"Mesure {nom}: valeur non finie")
             result["valid"] = False
-    
+
+    if not mesures:
+        result["warnings"].append("Aucune mesure renseignée")
+
     return result
 
 
+VALIDATEURS = {
+    "atterberg": validate_atterberg,
+    "cbr": validate_cbr,
+    "proctor": validate_proctor,
+    "granulometrie": validate_granulometrie,
+    "autre": validate_autre
+}
+
+
 def validate_essai(essai_type: str, essai_data: Any) -> Dict[str, Any]:
     """
     Valide un essai selon son type
     """
-    validators = {
-        "atterberg": validate_atterberg,
-        "cbr": validate_cbr,
-        "proctor": validate_proctor,
-        "granulometrie": validate_granulometrie
-    }
-    
-    validator = validators.get(essai_type)
+    validator = VALIDATEURS.get(essai_type)
     if not validator:
         return {
             "valid": True,
             "warnings": [],
             "errors": []
         }
-    
-    return validator(essai_data)
 
+    return validator(essai_data)
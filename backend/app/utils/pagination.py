@@ -0,0 +1,59 @@
+"""
+Pagination par curseur (keyset) sur (created_at, id)
+
+Le curseur est opaque pour le client : base64 url-safe d'un couple
+(instant de création, identifiant) du dernier élément d'une page. La page
+suivante est lue par « (created_at, id) < curseur » sur l'index composite
+ix_essais_created_at_id, à coût constant quelle que soit sa profondeur.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+from sqlalchemy import func, tuple_
+
+
+class CurseurInvalide(ValueError):
+    """Curseur de pagination illisible"""
+    pass
+
+
+def encoder_curseur(created_at: Optional[datetime], identifiant: int) -> str:
+    """Curseur opaque désignant un élément (ordre created_at desc, id desc)"""
+    contenu = json.dumps([created_at.isoformat() if created_at else None, identifiant], separators=(",", ":"))
+    return base64.urlsafe_b64encode(contenu.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decoder_curseur(curseur: str) -> Tuple[Optional[datetime], int]:
+    """(created_at, id) d'un curseur ; CurseurInvalide s'il est illisible"""
+    try:
+        contenu = base64.urlsafe_b64decode(curseur + "=" * (-len(curseur) % 4))
+        instant, identifiant = json.loads(contenu)
+        if not isinstance(identifiant, int):
+            raise ValueError(identifiant)
+        return (datetime.fromisoformat(instant) if instant else None), identifiant
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        raise CurseurInvalide("Curseur de pagination invalide")
+
+
+def apres_curseur(query: Any, modele: Any, curseur: str, dialecte: Optional[str] = None) -> Any:
+    """
+    Restreint une requête ordonnée par (created_at desc, id desc) aux
+    éléments qui suivent le curseur
+
+    SQLite stocke CURRENT_TIMESTAMP sans fraction de seconde et compare les
+    dates comme du texte : les instants y sont comparés normalisés. Le
+    dialecte est à fournir pour une instruction select() (sans session).
+    """
+    created_at, identifiant = decoder_curseur(curseur)
+    if created_at is None:
+        return query.filter(modele.created_at.is_(None), modele.id < identifiant)
+
+    colonne = modele.created_at
+    borne: Any = created_at
+    if (dialecte or query.session.get_bind().dialect.name) == "sqlite":
+        colonne = func.julianday(colonne)
+        borne = func.julianday(created_at.isoformat(sep=" "))
+    return query.filter(tuple_(colonne, modele.id) < tuple_(borne, identifiant))
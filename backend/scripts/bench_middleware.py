@@ -0,0 +1,159 @@
+"""
+Benchmark du middleware : ancienne pile BaseHTTPMiddleware contre middleware ASGI
+
+Deux applications identiques (route /health et export CSV en flux) sont
+mesurées en process, en appelant directement leur interface ASGI : l'une
+derrière les trois anciennes couches (logging en BaseHTTPMiddleware, rate
+limiting et headers de sécurité en @app.middleware("http")), l'autre derrière
+GeoLabMiddleware. Pour l'export, le temps jusqu'au premier morceau et le temps
+total sont mesurés : l'ancienne pile recopie le flux dans une file d'attente
+entre tâches.
+
+Utilisation (depuis backend/) :
+    python scripts/bench_middleware.py
+    python scripts/bench_middleware.py --requetes 5000 --lignes 2000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Limite hors d'atteinte : toutes les requêtes mesurées passent le rate limiting
+os.environ["RATE_LIMIT_POLITIQUES"] = "/=1000000000/60"
+
+from fastapi import FastAPI, Request  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+from starlette.responses import StreamingResponse  # noqa: E402
+
+from app.middleware.asgi import GeoLabMiddleware  # noqa: E402
+from app.middleware.rate_limit import rate_limiter  # noqa: E402
+from app.middleware.security import CSP  # noqa: E402
+
+logger = logging.getLogger("geolab")
+
+
+def application(lignes: int) -> FastAPI:
+    """Application minimale : health check et export CSV en flux"""
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "healthy"}
+
+    @app.get("/api/v1/export/essais/csv")
+    async def export_csv():
+        async def contenu():
+            for i in range(lignes):
+                yield f'"ESS-{i:06d}";"proctor";"valide";"{i * 0.37:.2f}"\n'.encode()
+        return StreamingResponse(contenu(), media_type="text/csv")
+
+    return app
+
+
+class AncienLogging(BaseHTTPMiddleware):
+    """Ancien middleware de logging (BaseHTTPMiddleware)"""
+
+    async def dispatch(self, request: Request, call_next):
+        start_time = time.time()
+        logger.info(f"Request: {request.method} {request.url.path}")
+        response = await call_next(request)
+        process_time = time.time() - start_time
+        logger.info(f"Response: {request.method} {request.url.path} - {response.status_code}")
+        response.headers["X-Process-Time"] = f"{process_time:.4f}"
+        return response
+
+
+def ancienne_pile(app: FastAPI) -> FastAPI:
+    """Les trois couches remplacées, dans l'ordre de l'ancien main.py"""
+    app.add_middleware(AncienLogging)
+
+    @app.middleware("http")
+    async def rate_limit(request: Request, call_next):
+        politique = rate_limiter.politique(request.url.path)
+        identifier = f"{rate_limiter._get_client_identifier(request.scope)}|{politique.prefixe}"
+        _, remaining, reset_time = await rate_limiter.is_allowed(
+            identifier, politique.max_requests, politique.window_seconds
+        )
+        response = await call_next(request)
+        response.headers["X-RateLimit-Limit"] = str(politique.max_requests)
+        response.headers["X-RateLimit-Remaining"] = str(remaining)
+        response.headers["X-RateLimit-Reset"] = str(reset_time)
+        return response
+
+    @app.middleware("http")
+    async def security(request: Request, call_next):
+        response = await call_next(request)
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        response.headers["X-Frame-Options"] = "DENY"
+        response.headers["X-XSS-Protection"] = "1; mode=block"
+        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+        response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
+        response.headers["Content-Security-Policy"] = CSP
+        return response
+
+    return app
+
+
+async def requete(app, path: str):
+    """Une requête GET ; retourne (durée jusqu'au premier morceau du corps, durée totale)"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 50000), "server": ("localhost", 8000),
+    }
+    recu = asyncio.Event()
+    premier = None
+    debut = time.perf_counter()
+
+    async def receive():
+        if recu.is_set():
+            # Client toujours connecté : attendre l'annulation en fin de réponse
+            await asyncio.Event().wait()
+        recu.set()
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal premier
+        if message["type"] == "http.response.body" and premier is None and message.get("body"):
+            premier = time.perf_counter() - debut
+
+    await app(scope, receive, send)
+    return premier, time.perf_counter() - debut
+
+
+async def mesurer(app, path: str, requetes: int):
+    """Moyennes (µs) du premier morceau et du total sur plusieurs requêtes"""
+    for _ in range(min(100, requetes)):
+        await requete(app, path)
+    premiers = total = 0.0
+    for _ in range(requetes):
+        premier, duree = await requete(app, path)
+        premiers += premier or 0.0
+        total += duree
+    return premiers / requetes * 1e6, total / requetes * 1e6
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark du middleware ASGI")
+    parser.add_argument("--requetes", type=int, default=2000, help="Requêtes mesurées par scénario")
+    parser.add_argument("--lignes", type=int, default=1000, help="Lignes de l'export CSV en flux")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    piles = {
+        "BaseHTTPMiddleware x3": ancienne_pile(application(args.lignes)),
+        "GeoLabMiddleware (ASGI)": GeoLabMiddleware(application(args.lignes)),
+    }
+    print(f"{'':<26}{'/health µs':>12}{'export 1er morceau µs':>24}{'export total µs':>18}")
+    for nom, app in piles.items():
+        _, health = await mesurer(app, "/health", args.requetes)
+        premier, total = await mesurer(app, "/api/v1/export/essais/csv", max(1, args.requetes // 10))
+        print(f"{nom:<26}{health:>12.1f}{premier:>24.1f}{total:>18.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+"""
+Microbenchmark du rate limiter : coût d'un appel à is_allowed
+
+Le coût par requête doit rester constant quel que soit le nombre de requêtes
+déjà comptées pour un client, et quel que soit le nombre de clients suivis
+(au-delà de la borne du LRU, les plus anciens sont évincés). Le dernier
+scénario compare les stockages (mémoire, fichier SQLite, Redis si --redis).
+
+Utilisation (depuis backend/) :
+    python scripts/bench_rate_limit.py
+    python scripts/bench_rate_limit.py --appels 200000
+    python scripts/bench_rate_limit.py --redis redis://localhost:6379/0
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.middleware.rate_limit import RateLimiter  # noqa: E402
+from app.middleware.stockage_rate_limit import creer_stockage  # noqa: E402
+
+
+async def mesurer(limiter: RateLimiter, cles: list, appels: int) -> float:
+    """Durée moyenne d'un appel (µs), les clés étant utilisées à tour de rôle"""
+    nombre = len(cles)
+    debut = time.perf_counter()
+    for i in range(appels):
+        await limiter.is_allowed(cles[i % nombre], 10 ** 9, 60)
+    return (time.perf_counter() - debut) / appels * 1e6
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Microbenchmark du rate limiter")
+    parser.add_argument("--appels", type=int, default=100000, help="Appels mesurés par scénario")
+    parser.add_argument("--redis", help="URL d'un serveur Redis à mesurer aussi")
+    args = parser.parse_args()
+
+    print("Requêtes déjà comptées pour le client   µs/appel")
+    for deja in (10, 1000, 100000, 1000000):
+        limiter = RateLimiter()
+        await mesurer(limiter, ["ip_10.0.0.1"], deja)
+        print(f"{deja:>38}   {await mesurer(limiter, ['ip_10.0.0.1'], args.appels):8.3f}")
+
+    print("\nClients distincts (LRU de 10000 clés)    µs/appel   clés suivies")
+    for clients in (10, 1000, 10000, 100000):
+        limiter = RateLimiter(max_keys=10000)
+        cles = [f"ip_10.{i // 65536}.{i // 256 % 256}.{i % 256}" for i in range(clients)]
+        duree = await mesurer(limiter, cles, max(args.appels, clients))
+        print(f"{clients:>38}   {duree:8.3f}   {len(limiter.stockage.compteurs):>12}")
+
+    print("\nStockage (1000 clients)                  µs/appel")
+    with tempfile.TemporaryDirectory() as dossier:
+        stockages = ["memory://", f"sqlite:///{os.path.join(dossier, 'rate_limit.db')}"]
+        if args.redis:
+            stockages.append(args.redis)
+        cles = [f"ip_10.0.{i // 256}.{i % 256}" for i in range(1000)]
+        for url in stockages:
+            limiter = RateLimiter(stockage=creer_stockage(url))
+            appels = args.appels if url == "memory://" else max(1000, args.appels // 10)
+            print(f"{url.split('://')[0]:>38}   {await mesurer(limiter, cles, appels):8.3f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
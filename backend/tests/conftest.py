@@ -1,12 +1,18 @@
 """
 Configuration pytest pour les tests
 """
+from contextlib import contextmanager
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from app.core.database import Base, get_db
+from sqlalchemy.pool import NullPool
+from app.core.cache_utilisateurs import cache_utilisateurs
+from app.core.database import Base, get_async_db, get_db, get_session_factory, url_asynchrone
 from app.main import app
+from app.services.cache_statistiques import cache_statistiques
 from app.core.config import settings
 
 # Base de données de test
@@ -16,6 +22,10 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Même base pour les routes asynchrones ; sans pool : chaque test a sa propre boucle
+async_engine = create_async_engine(url_asynchrone(SQLALCHEMY_DATABASE_URL), poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
 @pytest.fixture(scope="function")
 def db():
@@ -38,7 +48,15 @@ def client(db):
         finally:
             pass
     
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as async_db:
+            yield async_db
+    
+    cache_utilisateurs.vider()
+    cache_statistiques.vider()
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_session_factory] = lambda: TestingSessionLocal
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
@@ -55,3 +73,33 @@ def test_user_data():
         "role": "technicien"
     }
 
+
+
+@pytest.fixture
+def compter_requetes():
+    """
+    Vérifie le nombre de requêtes SQL émises dans un bloc
+
+        with compter_requetes(3) as requetes:
+            client.get("/api/v1/essais/")
+    """
+    @contextmanager
+    def compter(maximum: int):
+        requetes = []
+
+        def enregistrer(conn, cursor, statement, parameters, context, executemany):
+            requetes.append(statement)
+
+        moteurs = (engine, async_engine.sync_engine)
+        for moteur in moteurs:
+            event.listen(moteur, "before_cursor_execute", enregistrer)
+        try:
+            yield requetes
+        finally:
+            for moteur in moteurs:
+                event.remove(moteur, "before_cursor_execute", enregistrer)
+        assert len(requetes) <= maximum, (
+            f"{len(requetes)} requêtes (maximum {maximum}):\n" + "\n".join(requetes)
+        )
+
+    return compter
@@ -0,0 +1,112 @@
+"""
+Tests pour le cache des réponses de statistiques
+"""
+import asyncio
+import threading
+
+from app.core.database import get_db
+from app.core.deps import get_current_active_user
+from app.main import app
+from app.models.essai import Essai, EssaiCBR, TypeEssai
+from app.models.user import User, UserRole
+from app.services.cache_statistiques import CacheStatistiques, cle_statistiques
+
+
+def test_calcul_unique_et_valeur_perimee_servie_pendant_le_recalcul():
+    """Test: un seul calcul par clé ; pendant un recalcul, la valeur précédente est servie"""
+    cache = CacheStatistiques(ttl=60, taille=8)
+    calculs = []
+    liberer = threading.Event()
+
+    def calculer():
+        calculs.append(len(calculs) + 1)
+        liberer.wait(5)
+        return len(calculs)
+
+    async def scenario():
+        # Clé absente : les requêtes concurrentes attendent le même calcul
+        valeurs = await asyncio.gather(
+            *(cache.obtenir("dashboard", "dashboard", calculer) for _ in range(5)),
+            asyncio.get_running_loop().run_in_executor(None, liberer.set)
+        )
+        assert valeurs[:5] == [1] * 5 and calculs == [1]
+        assert await cache.obtenir("dashboard", "dashboard", calculer) == 1
+
+        # Entrée obsolète : une requête recalcule, les autres reçoivent l'ancienne valeur
+        cache.invalider()
+        liberer.clear()
+        recalcul = asyncio.ensure_future(cache.obtenir("dashboard", "dashboard", calculer))
+        await asyncio.sleep(0.05)
+        assert await cache.obtenir("dashboard", "dashboard", calculer) == 1
+        liberer.set()
+        assert await recalcul == 2
+        assert await cache.obtenir("dashboard", "dashboard", calculer) == 2
+        assert calculs == [1, 2]
+
+    asyncio.run(scenario())
+    assert cle_statistiques("type", projet_id=None, type_essai=TypeEssai.CBR, date_fin="") == "type|type_essai=cbr"
+
+
+def test_annulation_du_premier_appelant_et_copies():
+    """Test: la requête qui lance le calcul peut être annulée sans priver les autres ; valeurs copiées"""
+    cache = CacheStatistiques(ttl=60, taille=8)
+    liberer = threading.Event()
+
+    def calculer():
+        liberer.wait(5)
+        return {"par_type": {"cbr": 1}}
+
+    async def scenario():
+        premier = asyncio.ensure_future(cache.obtenir("dashboard", "dashboard", calculer))
+        await asyncio.sleep(0.05)
+        second = asyncio.ensure_future(cache.obtenir("dashboard", "dashboard", calculer))
+        await asyncio.sleep(0.05)
+        premier.cancel()
+        await asyncio.sleep(0.05)
+        liberer.set()
+        valeur = await second
+        assert premier.cancelled()
+        assert valeur == {"par_type": {"cbr": 1}}
+
+        valeur["par_type"]["cbr"] = 99
+        assert await cache.obtenir("dashboard", "dashboard", calculer) == {"par_type": {"cbr": 1}}
+
+    asyncio.run(scenario())
+
+
+def test_invalidation_apres_validation_d_un_essai(client, db, compter_requetes):
+    """Test: réponse servie sans requête SQL, recalculée après l'enregistrement d'un essai"""
+    user = User(email="cache@example.com", username="cache", hashed_password="x", role=UserRole.ADMIN)
+    db.add(user)
+    db.commit()
+    app.dependency_overrides[get_current_active_user] = lambda: user
+
+    assert client.get("/api/v1/statistiques/dashboard").json()["total_essais"] == 0
+    with compter_requetes(0):
+        assert client.get("/api/v1/statistiques/dashboard").json()["total_essais"] == 0
+
+    db.add(Essai(numero_essai="C-1", type_essai=TypeEssai.CBR, operateur_id=user.id))
+    db.commit()
+    assert client.get("/api/v1/statistiques/dashboard").json()["total_essais"] == 1
+
+
+def test_calculs_dans_leur_propre_session(client, db):
+    """Test: les statistiques mises en cache n'utilisent pas la session de la requête"""
+    user = User(email="session@example.com", username="session", hashed_password="x", role=UserRole.ADMIN)
+    db.add(user)
+    db.flush()
+    essai = Essai(numero_essai="S-1", type_essai=TypeEssai.CBR, operateur_id=user.id)
+    essai.cbr = EssaiCBR(cbr_final=30.0)
+    db.add(essai)
+    db.commit()
+    app.dependency_overrides[get_current_active_user] = lambda: user
+
+    def session_de_requete():
+        raise AssertionError("session de la requête utilisée par un calcul mis en cache")
+        yield
+
+    app.dependency_overrides[get_db] = session_de_requete
+    assert client.get("/api/v1/statistiques/dashboard").json()["total_essais"] == 1
+    assert client.get("/api/v1/statistiques/par-technicien").status_code == 200
+    assert client.get("/api/v1/statistiques/cbr").json()["nombre_total"] == 1
+    assert client.get("/api/v1/statistiques/cbr/export").status_code == 200
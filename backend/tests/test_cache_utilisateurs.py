@@ -0,0 +1,84 @@
+"""
+Tests pour le cache des utilisateurs authentifiés (get_current_user)
+"""
+import pytest
+
+from app.core.cache_utilisateurs import CacheUtilisateurs, claims_utilisateur
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.models.user import User, UserRole
+
+
+@pytest.fixture
+def utilisateurs(db):
+    """Un administrateur et un technicien, avec leurs en-têtes d'authentification"""
+    admin = User(email="admin@example.com", username="admin", hashed_password="x", role=UserRole.ADMIN)
+    technicien = User(email="tech@example.com", username="tech", hashed_password="x", role=UserRole.TECHNICIEN)
+    db.add_all([admin, technicien])
+    db.commit()
+    return {
+        nom: {"Authorization": f"Bearer {create_access_token(claims_utilisateur(user))}"}
+        for nom, user in (("admin", admin), ("technicien", technicien))
+    }
+
+
+def lectures_utilisateurs(requetes):
+    return [requete for requete in requetes if "FROM users" in requete]
+
+
+def test_principal_en_cache_et_invalidation(client, utilisateurs, compter_requetes):
+    """Test: une seule lecture de l'utilisateur, relue après modification de son rôle"""
+    with compter_requetes(10) as requetes:
+        for _ in range(5):
+            assert client.get("/api/v1/auth/me", headers=utilisateurs["technicien"]).status_code == 200
+    assert len(lectures_utilisateurs(requetes)) == 1
+
+    assert client.get("/api/v1/users/", headers=utilisateurs["technicien"]).status_code == 403
+    reponse = client.put("/api/v1/users/2", json={"role": "admin"}, headers=utilisateurs["admin"])
+    assert reponse.status_code == 200
+    assert client.get("/api/v1/users/", headers=utilisateurs["technicien"]).status_code == 200
+
+    client.put("/api/v1/users/2", json={"is_active": False}, headers=utilisateurs["admin"])
+    assert client.get("/api/v1/auth/me", headers=utilisateurs["technicien"]).status_code == 400
+
+
+def test_claims_du_token_sans_lecture_de_la_base(client, db, utilisateurs, compter_requetes, monkeypatch):
+    """Test: avec les claims, aucune lecture ; un token antérieur à une invalidation est relu"""
+    monkeypatch.setattr(settings, "JWT_CLAIMS_UTILISATEUR", True)
+    technicien = db.get(User, 2)
+    entetes = {"Authorization": f"Bearer {create_access_token(claims_utilisateur(technicien))}"}
+
+    with compter_requetes(10) as requetes:
+        assert client.get("/api/v1/notifications/", headers=entetes).status_code == 200
+    assert lectures_utilisateurs(requetes) == []
+
+    admin = {"Authorization": f"Bearer {create_access_token(claims_utilisateur(db.get(User, 1)))}"}
+    assert client.put("/api/v1/users/2", json={"is_active": False}, headers=admin).status_code == 200
+    assert client.get("/api/v1/notifications/", headers=entetes).status_code == 400
+
+
+def test_cache_borne_et_versionne():
+    """Test: éviction LRU au-delà de la taille, lecture concurrente d'une invalidation ignorée"""
+    cache = CacheUtilisateurs(ttl=60, taille=2)
+    for user_id in (1, 2):
+        cache.put(user_id, cache.version, {"id": user_id})
+    cache.get(1)
+    cache.put(3, cache.version, {"id": 3})
+    assert cache.get(2) is None and cache.get(1) == {"id": 1}
+
+    version = cache.version
+    cache.invalider(1)
+    cache.put(1, version, {"id": 1})
+    assert cache.get(1) is None
+    assert cache.emis_avant_invalidation(1, 0) and not cache.emis_avant_invalidation(2, 0)
+
+
+def test_me_apres_suppression_du_compte(client, db, utilisateurs, monkeypatch):
+    """Test: avec les claims, /me d'un compte supprimé après l'émission du token répond 401"""
+    monkeypatch.setattr(settings, "JWT_CLAIMS_UTILISATEUR", True)
+    technicien = db.get(User, 2)
+    entetes = {"Authorization": f"Bearer {create_access_token(claims_utilisateur(technicien))}"}
+    db.delete(technicien)
+    db.commit()
+
+    assert client.get("/api/v1/auth/me", headers=entetes).status_code == 401
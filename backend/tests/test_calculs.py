@@ -0,0 +1,239 @@
+"""
+Tests pour les calculs d'essais (noyaux batch et calcul unitaire)
+"""
+import app.main  # noqa: F401 - configure tous les mappers
+from app.models.essai import EssaiAtterberg, EssaiCBR, EssaiProctor, EssaiGranulometrie
+from app.services.calculs import (
+    calculer_atterberg, calculer_atterberg_batch,
+    calculer_cbr, calculer_cbr_batch,
+    calculer_proctor, calculer_proctor_batch,
+    calculer_granulometrie, calculer_granulometrie_batch,
+)
+
+
+def _atterbergs():
+    return [
+        EssaiAtterberg(
+            wl_nombre_coups_1=15, wl_teneur_eau_1=52.0,
+            wl_nombre_coups_2=25, wl_teneur_eau_2=48.0,
+            wl_nombre_coups_3=35, wl_teneur_eau_3=45.5,
+            wp_teneur_eau_1=22.0, wp_teneur_eau_2=24.0,
+        ),
+        EssaiAtterberg(wl_nombre_coups_1=20, wl_teneur_eau_1=30.0, wp_teneur_eau_1=18.0),
+        EssaiAtterberg(),
+    ]
+
+
+def test_atterberg_batch_identique_au_calcul_unitaire():
+    """Test: le lot donne les mêmes résultats que les calculs unitaires"""
+    unitaires = [calculer_atterberg(a) for a in _atterbergs()]
+    assert calculer_atterberg_batch(_atterbergs()) == unitaires
+    assert unitaires[0]["ip"] == round(unitaires[0]["wl"] - 23.0, 2)
+    assert unitaires[0]["classification"] == "Très plastique - Liquidité moyenne"
+    assert "wl" not in unitaires[1]
+    assert unitaires[2] == {}
+
+
+def test_cbr_batch_lit_les_forces_sur_la_courbe():
+    """Test: forces à 2.5mm et 5.0mm extraites de la courbe pour chaque essai"""
+    cbrs = [
+        EssaiCBR(points_penetration=[
+            {"penetration_mm": 2.5, "force_kN": 6.62},
+            {"penetration_mm": 5.0, "force_kN": 9.98},
+        ]),
+        EssaiCBR(force_25mm=1.0),
+    ]
+    resultats = calculer_cbr_batch(cbrs)
+    assert cbrs[0].force_25mm == 6.62 and cbrs[0].force_50mm == 9.98
+    assert resultats[0]["cbr_25mm"] == 50.0
+    assert resultats[0]["cbr_final"] == 50.0
+    assert resultats[1]["classe_portance"] == "C3 - Moyenne"
+    assert calculer_cbr(EssaiCBR(force_25mm=1.0)) == resultats[1]
+
+
+def test_proctor_batch_ajustement_parabolique():
+    """Test: optimum et courbe Proctor calculés sur un lot"""
+    points = [
+        {"teneur_eau": w, "densite_seche": round(1.9 - 0.004 * (w - 12) ** 2, 4)}
+        for w in (8, 10, 12, 14, 16)
+    ]
+    proctors = [EssaiProctor(points_mesure=points), EssaiProctor(points_mesure=points[:2])]
+    resultats = calculer_proctor_batch(proctors)
+    assert resultats[0]["opm"] == 12.0
+    assert resultats[0]["densite_seche_max"] == 1.9
+    assert resultats[0]["ajustement"]["modele"] == "poly2"
+    assert resultats[0]["ajustement"]["r2"] == 1.0
+    assert resultats[1] == {}
+    assert calculer_proctor(EssaiProctor(points_mesure=points)) == resultats[0]
+
+
+def test_granulometrie_batch_identique_au_calcul_unitaire():
+    """Test: diamètres caractéristiques et fractions calculés sur un lot"""
+    def essais():
+        return [
+            EssaiGranulometrie(masse_totale_seche=1000.0, points_tamisage=[
+                {"tamis": "20mm", "masse_retenu": 100.0},
+                {"tamis": "5mm", "masse_retenu": 300.0},
+                {"tamis": "2mm", "masse_retenu": 200.0},
+                {"tamis": "0.5mm", "masse_retenu": 250.0},
+                {"tamis": "0.08mm", "masse_retenu": 100.0},
+            ]),
+            EssaiGranulometrie(points_tamisage=[{"tamis": "2mm", "masse_retenu": 10.0}]),
+        ]
+
+    resultats = calculer_granulometrie_batch(essais())
+    assert resultats == [calculer_granulometrie(e) for e in essais()]
+    assert resultats[0]["d60"] == 5.0
+    assert resultats[0]["pourcentage_gravier"] == 40.0
+    assert resultats[0]["pourcentage_sable"] == 55.0
+    assert resultats[1] == {}
+
+
+def test_calcul_memoise_et_empreinte_persistee():
+    """Test: résultats mémoïsés et recalcul sauté sur données inchangées"""
+    from app.services.memoisation import cache_calculs, calculer_memoise, recalculer_si_necessaire
+
+    cache_calculs.clear()
+    points = [{"penetration_mm": 2.5, "force_kN": 6.62}]
+    premier = EssaiCBR(points_penetration=points)
+    second = EssaiCBR(points_penetration=[dict(p) for p in points])
+
+    resultats = calculer_memoise("cbr", premier)
+    assert calculer_memoise("cbr", second) == resultats
+    assert cache_calculs.hits == 1
+    # Les champs complétés par le calcul sont restitués depuis le cache
+    assert second.force_25mm == 6.62
+    assert second.hash_calcul == premier.hash_calcul
+
+    assert recalculer_si_necessaire("cbr", second) is None
+    second.force_50mm = 9.98
+    assert recalculer_si_necessaire("cbr", second)["cbr_50mm"] == 50.0
+
+
+def test_calcul_memoise_sans_valeurs_partagees():
+    """Test: les valeurs imbriquées (ajustement) d'un essai ne sont pas partagées avec le cache"""
+    from app.services.memoisation import cache_calculs, calculer_memoise
+
+    cache_calculs.clear()
+    points = [
+        {"teneur_eau": w, "densite_seche": round(1.9 - 0.004 * (w - 12) ** 2, 4)}
+        for w in (8, 10, 12, 14, 16)
+    ]
+    premier = calculer_memoise("proctor", EssaiProctor(points_mesure=points))
+    premier["ajustement"]["r2"] = -1.0
+    second = calculer_memoise("proctor", EssaiProctor(points_mesure=[dict(p) for p in points]))
+    assert cache_calculs.hits == 1
+    assert second["ajustement"]["r2"] == 1.0
+    second["ajustement"]["modele"] = "modifié"
+    assert calculer_memoise("proctor", EssaiProctor(points_mesure=points))["ajustement"]["modele"] == "poly2"
+
+
+def test_courbe_granulometrique_interpolation_log():
+    """Test: diamètres interpolés en log-diamètre, plusieurs courbes à la fois"""
+    from app.services.granulometrie import CourbeGranulometrique, diametre_tamis
+
+    assert diametre_tamis("2mm") == 2
+    assert diametre_tamis(" 0.08MM ") == 0.08
+    assert diametre_tamis("Tamis 2 mm") == 2.0
+    assert diametre_tamis("inconnu") is None
+
+    courbe = CourbeGranulometrique([0, 0, 1, 1], [1.0, 10.0, 0.1, 1.0], [20.0, 80.0, 0.0, 100.0])
+    diametres = courbe.diametres([50, 100])
+    # Milieu de la courbe en échelle logarithmique : racine du produit des bornes
+    assert round(float(diametres[0, 0]), 6) == round(10 ** 0.5, 6)
+    # Au-delà du passant maximal, le diamètre est borné à l'extrémité
+    assert round(float(diametres[0, 1]), 6) == 10.0
+    assert round(float(diametres[1, 0]), 6) == round(10 ** -0.5, 6)
+    assert round(float(courbe.passant([10 ** 0.5])[0, 0]), 6) == 50.0
+
+
+def test_ajustements_proctor_et_courbe_regeneree():
+    """Test: modèles poly3 et spline, courbe régénérée à la résolution demandée"""
+    from app.services.proctor import evaluer, generer_courbe
+
+    points = [
+        {"teneur_eau": w, "densite_seche": d}
+        for w, d in ((6, 1.80), (8, 1.86), (10, 1.90), (12, 1.88), (14, 1.83))
+    ]
+    poly3, spline = calculer_proctor_batch([
+        EssaiProctor(points_mesure=points, modele_ajustement="poly3"),
+        EssaiProctor(points_mesure=points, modele_ajustement="spline"),
+    ])
+    assert poly3["ajustement"]["modele"] == "poly3"
+    assert len(poly3["ajustement"]["coefficients"]) == 4
+    assert 8 < poly3["opm"] < 12
+    # La spline monotone passe par les mesures : maximum au point mesuré
+    assert spline["opm"] == 10 and spline["densite_seche_max"] == 1.9
+    assert spline["ajustement"]["r2"] == 1.0
+    assert round(float(evaluer(spline["ajustement"], [12])[0]), 6) == 1.88
+
+    courbe = generer_courbe(poly3["ajustement"], 25)
+    assert len(courbe) == 25
+    assert courbe[0]["teneur_eau"] == 5.0 and courbe[-1]["teneur_eau"] == 15.0
+    assert generer_courbe(None) is None
+
+
+def test_sedimentometrie_stokes_et_courbe_fusionnee():
+    """Test: lectures du densimètre (loi de Stokes) fusionnées avec le tamisage"""
+    from app.services.calculs import courbe_granulometrique
+    from app.services.sedimentometrie import viscosite_eau
+
+    def essai():
+        return EssaiGranulometrie(
+            masse_totale_seche=1000,
+            points_tamisage=[
+                {"tamis": "2mm", "masse_retenu": 100},
+                {"tamis": "0.08mm", "masse_retenu": 300},
+            ],
+            masse_seche_sedimentometrie=50.0,
+            temperature_sedimentometrie=20.0,
+            points_sedimentometrie=[
+                {"temps_min": t, "hauteur_cm": 15.0, "lecture": r}
+                for t, r in ((0.5, 20.0), (2, 16.0), (30, 10.0), (240, 7.0), (1440, 4.5))
+            ],
+        )
+
+    granulometrie = essai()
+    resultats = calculer_granulometrie(granulometrie)
+    lectures = granulometrie.points_sedimentometrie
+
+    # D = √(18 η Hr / ((ρs - ρw) g t)) à 20°C
+    attendu = (18 * float(viscosite_eau(20.0)) * 0.15 / ((2.65 - 0.998207) * 1000 * 9.81 * 30 * 60)) ** 0.5 * 1000
+    assert abs(lectures[2]["diametre_mm"] - attendu) < 1e-5
+    assert 1.0e-3 < float(viscosite_eau(20.0)) < 1.01e-3
+
+    # Ramenés à l'échantillon total par le passant à 80 µm (60 %)
+    assert all(point["pourcentage_passant"] < 60 for point in lectures)
+    assert lectures[-1]["diametre_mm"] < 0.002
+
+    courbe = courbe_granulometrique(essai())
+    passants = [point["pourcentage_passant"] for point in courbe]
+    assert passants == sorted(passants)
+
+    # L'argile est le passant à 2 µm sur la courbe, pas une somme de passants
+    assert lectures[-2]["pourcentage_passant"] > resultats["pourcentage_argile"] > lectures[-1]["pourcentage_passant"]
+    assert calculer_granulometrie_batch([essai(), essai()]) == [resultats, resultats]
+
+
+def test_registre_moteurs_et_traitement_commun():
+    """Test: chaque type d'essai a un moteur ; la validation et le calcul passent par le registre"""
+    import pytest
+    from app.models.essai import Essai, TypeEssai
+    from app.services.registre import obtenir_moteur
+    from app.services.traitement import importer_donnees_specifiques, traiter_mesures
+    from app.services.validation import ValidationError
+
+    for type_essai in TypeEssai:
+        assert obtenir_moteur(type_essai).type_essai == type_essai.value
+
+    # Type autre : mesures libres reprises comme résultats, sans les clés internes
+    resultats = traiter_mesures(TypeEssai.AUTRE, {"densite": 2.1, "note": "ok", "_validation_warnings": []})
+    assert resultats == {"densite": 2.1, "note": "ok"}
+    with pytest.raises(ValidationError):
+        traiter_mesures(TypeEssai.AUTRE, {"serie": [1, 2]})
+
+    # Import : données spécifiques créées, validées et calculées par le moteur du type
+    essai = Essai(type_essai=TypeEssai.CBR)
+    assert importer_donnees_specifiques([essai], [{"force_25mm": 6.6, "force_50mm": 10.0}]) == [None]
+    assert essai.cbr.cbr_50mm == calculer_cbr(EssaiCBR(force_25mm=6.6, force_50mm=10.0))["cbr_50mm"]
+    assert essai.resultats["cbr_final"] == essai.cbr.cbr_final
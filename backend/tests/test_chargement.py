@@ -0,0 +1,48 @@
+"""
+Tests pour le chargement des relations des essais (nombre de requêtes par route)
+"""
+import pytest
+
+from app.core.deps import get_current_active_user
+from app.main import app
+from app.models.essai import Essai, EssaiCBR, TypeEssai
+from app.models.projet import Projet
+from app.models.user import User, UserRole
+
+
+@pytest.fixture
+def essais_cbr(db):
+    """Essais CBR de deux projets, avec leurs données spécifiques"""
+    user = User(email="admin@example.com", username="admin", hashed_password="x", role=UserRole.ADMIN)
+    db.add(user)
+    db.flush()
+    projets = [Projet(nom=f"Projet {i}", code_projet=f"P-{i}", created_by_id=user.id) for i in range(2)]
+    db.add_all(projets)
+    db.flush()
+    for i in range(12):
+        essai = Essai(
+            numero_essai=f"CBR-{i}", type_essai=TypeEssai.CBR,
+            operateur_id=user.id, projet_id=projets[i % 2].id,
+        )
+        db.add(essai)
+        db.flush()
+        db.add(EssaiCBR(essai_id=essai.id, cbr_final=10.0 + i))
+    db.commit()
+    app.dependency_overrides[get_current_active_user] = lambda: user
+    return user
+
+
+def test_liste_et_exports_a_nombre_de_requetes_constant(client, essais_cbr, compter_requetes):
+    """Test: les relations sont chargées d'avance, pas une requête par essai"""
+    with compter_requetes(2):
+        reponse = client.get("/api/v1/essais/?limit=100")
+    assert reponse.status_code == 200
+    assert {essai["projet"] for essai in reponse.json()} == {"Projet 0", "Projet 1"}
+
+    with compter_requetes(2):
+        reponse = client.get("/api/v1/export/essais/csv")
+    assert reponse.status_code == 200
+    assert "Projet 1" in reponse.text
+
+    with compter_requetes(2):
+        assert client.get("/api/v1/rapports/1/pdf").status_code == 200
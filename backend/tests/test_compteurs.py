@@ -0,0 +1,89 @@
+"""
+Tests pour les compteurs journaliers des essais et le tableau de bord
+"""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import literal
+
+from app.core.deps import get_current_active_user
+from app.main import app
+from app.models.compteurs import SANS_PROJET, EssaiCompteurJour
+from app.models.essai import Essai, StatutEssai, TypeEssai
+from app.models.projet import Projet
+from app.models.user import User, UserRole
+from app.services.compteurs import reconstruire_compteurs
+from app.services.insertion import inserer_essais
+
+
+def _compteurs(db):
+    return {
+        (c.jour, c.type_essai, c.statut, c.projet_id, c.operateur_id): c.nombre
+        for c in db.query(EssaiCompteurJour).all()
+    }
+
+
+def test_compteurs_tenus_au_flush(client, db, compter_requetes):
+    """Test: création, changement de statut et suppression reportés ; même état qu'une reconstruction"""
+    user = User(email="compteurs@example.com", username="compteurs", hashed_password="x", role=UserRole.ADMIN)
+    db.add(user)
+    db.flush()
+    projet = Projet(nom="Projet", code_projet="P-1", created_by_id=user.id)
+    db.add(projet)
+    db.flush()
+    maintenant = datetime.now()
+    essais = [
+        Essai(
+            numero_essai=f"E-{i}", type_essai=TypeEssai.CBR if i % 2 else TypeEssai.PROCTOR,
+            operateur_id=user.id, projet_id=projet.id if i < 4 else None,
+            created_at=maintenant - timedelta(days=40 * (i % 3)),
+        )
+        for i in range(6)
+    ]
+    db.add_all(essais)
+    db.commit()
+
+    essais[0].statut = StatutEssai.VALIDE
+    essais[1].projet_id = None
+    db.commit()
+    db.delete(essais[5])
+    db.commit()
+
+    tenus = _compteurs(db)
+    assert sum(tenus.values()) == 5
+    assert tenus[(maintenant.date(), TypeEssai.PROCTOR, StatutEssai.VALIDE, projet.id, user.id)] == 1
+    assert any(cle[3] == SANS_PROJET for cle in tenus)
+    reconstruire_compteurs(db.connection())
+    assert _compteurs(db) == tenus
+
+    app.dependency_overrides[get_current_active_user] = lambda: user
+    with compter_requetes(1):
+        reponse = client.get("/api/v1/statistiques/dashboard")
+    tableau = reponse.json()
+    assert tableau["total_essais"] == 5
+    assert tableau["essais_recents_7j"] == 2
+    assert tableau["par_type"] == {"proctor": 3, "cbr": 2}
+    assert tableau["par_statut"] == {"brouillon": 4, "valide": 1}
+    assert sum(mois["count"] for mois in tableau["par_mois"]) == 5
+    assert (tableau["par_mois"][0]["annee"], tableau["par_mois"][0]["mois"]) == (maintenant.year, maintenant.month)
+
+
+def test_compteurs_du_lot_au_jour_de_la_base(db):
+    """Test: lot inséré près de minuit avec un décalage non UTC : même jour que le flush et la reconstruction"""
+    user = User(email="minuit@example.com", username="minuit", hashed_password="x", role=UserRole.ADMIN)
+    db.add(user)
+    db.commit()
+    # 00:30 à UTC+2 : le 10 mars pour la base (UTC), le 11 pour la valeur lue par le pilote
+    essai = Essai(numero_essai="M-1", type_essai=TypeEssai.CBR, operateur_id=user.id)
+    essai.created_at = literal("2024-03-11 00:30:00+02:00")
+    (essai_id,) = inserer_essais(db, [essai], user.id)
+    db.commit()
+
+    tenus = _compteurs(db)
+    assert list(tenus) == [(date(2024, 3, 10), TypeEssai.CBR, StatutEssai.BROUILLON, SANS_PROJET, user.id)]
+    reconstruire_compteurs(db.connection())
+    assert _compteurs(db) == tenus
+
+    # Un changement de statut déplace le compteur sans laisser de reste
+    db.get(Essai, essai_id).statut = StatutEssai.VALIDE
+    db.commit()
+    assert _compteurs(db) == {(date(2024, 3, 10), TypeEssai.CBR, StatutEssai.VALIDE, SANS_PROJET, user.id): 1}
@@ -0,0 +1,83 @@
+"""
+Tests pour la création d'essais par lot (POST /essais/bulk)
+"""
+import pytest
+from sqlalchemy import func
+
+from app.core.config import settings
+from app.core.deps import get_current_active_user
+from app.main import app
+from app.models.compteurs import EssaiCompteurJour
+from app.models.essai import Essai, EssaiProctor, TypeEssai
+from app.models.history import EssaiHistory
+from app.models.projet import Projet
+from app.models.quantiles import EsquisseQuantiles
+from app.models.user import User, UserRole
+
+POINTS = [
+    {"teneur_eau": w, "densite_seche": d}
+    for w, d in ((6, 1.80), (8, 1.86), (10, 1.90), (12, 1.88), (14, 1.83))
+]
+
+
+@pytest.fixture
+def operateur(db):
+    """Opérateur authentifié et projet existant"""
+    user = User(email="op@example.com", username="op", hashed_password="x", role=UserRole.TECHNICIEN)
+    db.add(user)
+    db.flush()
+    db.add(Projet(nom="Barrage", code_projet="B-1", created_by_id=user.id))
+    db.add(Essai(numero_essai="EXISTANT", type_essai=TypeEssai.CBR, operateur_id=user.id))
+    db.commit()
+    app.dependency_overrides[get_current_active_user] = lambda: user
+    return user
+
+
+def test_creation_lot_en_une_transaction(client, db, operateur, compter_requetes):
+    """Test: essais, données spécifiques, historique, compteurs et esquisses insérés en un nombre constant de requêtes"""
+    lot = [
+        {"numero_essai": f"PR-{i}", "type_essai": "proctor", "projet_id": 1,
+         "donnees_specifiques": {"points_mesure": POINTS}}
+        for i in range(25)
+    ]
+    lot.append({"numero_essai": "AU-1", "type_essai": "autre", "donnees_specifiques": {"masse": 1.5}})
+
+    with compter_requetes(14):
+        reponse = client.post("/api/v1/essais/bulk", json=lot)
+    assert reponse.status_code == 201
+    essais = reponse.json()
+    assert [essai["numero_essai"] for essai in essais] == [item["numero_essai"] for item in lot]
+    assert essais[0]["projet"] == "Barrage"
+    assert essais[0]["resultats"]["opm"] == pytest.approx(10.4, abs=0.5)
+    assert essais[-1]["resultats"] == {"masse": 1.5}
+
+    assert db.query(EssaiProctor).count() == 25
+    assert db.query(EssaiProctor).first().type_proctor == "normal"
+    assert db.query(EssaiHistory).filter(EssaiHistory.action == "create").count() == 26
+    assert db.query(func.sum(EssaiCompteurJour.nombre)).scalar() == 27
+    esquisse = db.query(EsquisseQuantiles).one()
+    assert (esquisse.projet_id, esquisse.metrique, esquisse.nombre) == (1, "densite_seche_max", 25)
+    assert client.get("/api/v1/essais/?search=PR-7").json()[0]["numero_essai"] == "PR-7"
+
+
+def test_creation_lot_refusee_en_entier(client, db, operateur):
+    """Test: un numéro existant, en double ou des données invalides refusent tout le lot"""
+    reponse = client.post("/api/v1/essais/bulk", json=[
+        {"numero_essai": "EXISTANT", "type_essai": "cbr"},
+        {"numero_essai": "NOUVEAU", "type_essai": "cbr"},
+        {"numero_essai": "NOUVEAU", "type_essai": "cbr"},
+    ])
+    assert reponse.status_code == 400
+    assert "EXISTANT, NOUVEAU" in reponse.json()["detail"]
+
+    reponse = client.post("/api/v1/essais/bulk", json=[
+        {"numero_essai": "PR-1", "type_essai": "proctor", "donnees_specifiques": {"points_mesure": POINTS}},
+        {"numero_essai": "CBR-1", "type_essai": "cbr", "donnees_specifiques": {"inconnu": 1}},
+    ])
+    assert reponse.status_code == 400
+    assert [erreur["numero_essai"] for erreur in reponse.json()["detail"]] == ["CBR-1"]
+    assert db.query(Essai).count() == 1
+
+    trop = [{"numero_essai": f"T-{i}", "type_essai": "cbr"} for i in range(settings.ESSAIS_LOT_MAX + 1)]
+    assert client.post("/api/v1/essais/bulk", json=trop).status_code == 413
+    assert db.query(Essai).count() == 1
@@ -0,0 +1,49 @@
+"""
+Tests pour le cache versionné des critères de validation
+"""
+from app.core.deps import get_current_active_user
+from app.db.seeds.criteres_validation import seed_criteres_validation
+from app.main import app
+from app.models.user import User, UserRole
+from app.models.workflow import CritereValidation, NiveauValidation
+from app.services.criteres import cache_criteres, etag_correspond, lister_criteres
+
+
+def test_criteres_servis_depuis_le_cache_et_invalides(db):
+    """Test: la liste est mise en cache avec son ETag, et relue après invalidation"""
+    seed_criteres_validation(db)
+    etag, criteres = lister_criteres(db, "atterberg", NiveauValidation.TECHNICIEN)
+    assert len(criteres) == 1
+
+    # ETag du seul contenu : inchangé par une invalidation (même ETag sur tous les workers)
+    cache_criteres.invalider()
+    assert lister_criteres(db, "atterberg", NiveauValidation.TECHNICIEN) == (etag, criteres)
+
+    # Modification directe en base : le cache sert encore l'ancienne liste
+    critere = db.query(CritereValidation).filter(CritereValidation.id == criteres[0]["id"]).first()
+    critere.criteres = ["Nouveau critère"]
+    db.commit()
+    assert lister_criteres(db, "atterberg", NiveauValidation.TECHNICIEN) == (etag, criteres)
+    assert etag_correspond(f'W/{etag}, "autre"', etag)
+
+    cache_criteres.invalider()
+    nouvel_etag, relus = lister_criteres(db, "atterberg", NiveauValidation.TECHNICIEN)
+    assert nouvel_etag != etag
+    assert relus[0]["criteres"] == ["Nouveau critère"]
+    assert not etag_correspond(etag, nouvel_etag)
+
+
+def test_type_essai_inconnu_refuse_sans_entree_en_cache(client, db):
+    """Test: un type d'essai inconnu est refusé (422) avant d'atteindre le cache"""
+    user = User(email="criteres@example.com", username="criteres", hashed_password="x", role=UserRole.TECHNICIEN)
+    db.add(user)
+    db.commit()
+    app.dependency_overrides[get_current_active_user] = lambda: user
+    seed_criteres_validation(db)
+    cache_criteres.invalider()
+
+    assert client.get("/api/v1/workflow/criteres", params={"type_essai": "atterbergg"}).status_code == 422
+    assert cache_criteres._entrees == {}
+    reponse = client.get("/api/v1/workflow/criteres", params={"type_essai": "atterberg"})
+    assert reponse.status_code == 200
+    assert {critere["type_essai"] for critere in reponse.json()} == {"atterberg"}
@@ -0,0 +1,48 @@
+"""
+Tests pour le hachage des mots de passe hors de la boucle d'événements
+"""
+import asyncio
+
+import bcrypt
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.security import ExecuteurHachage, password_needs_rehash, verify_password
+from app.models.user import User, UserRole
+
+
+def test_rehash_a_la_connexion(client, db, monkeypatch):
+    """Test: un hash d'un ancien coût est remplacé à la connexion réussie"""
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 5)
+    ancien = bcrypt.hashpw(b"Secret#2024", bcrypt.gensalt(rounds=4)).decode()
+    db.add(User(email="u@example.com", username="u", hashed_password=ancien, role=UserRole.TECHNICIEN))
+    db.commit()
+    assert password_needs_rehash(ancien)
+
+    reponse = client.post("/api/v1/auth/login", data={"username": "u", "password": "mauvais"})
+    assert reponse.status_code == 401
+    db.expire_all()
+    assert db.query(User).one().hashed_password == ancien
+
+    reponse = client.post("/api/v1/auth/login", data={"username": "u", "password": "Secret#2024"})
+    assert reponse.status_code == 200
+    db.expire_all()
+    nouveau = db.query(User).one().hashed_password
+    assert nouveau.startswith("$2b$05$") and not password_needs_rehash(nouveau)
+    assert verify_password("Secret#2024", nouveau)
+
+
+def test_executeur_borne():
+    """Test: exécution hors de la boucle, refus (503) quand la file est pleine"""
+    async def scenario():
+        executeur = ExecuteurHachage(threads=1, file_max=1)
+        assert await executeur.executer("hash", sum, [1, 2]) == 3
+        assert executeur.en_attente == 0
+
+        plein = ExecuteurHachage(threads=1, file_max=0)
+        with pytest.raises(HTTPException) as erreur:
+            await plein.executer("verify", sum, [1])
+        assert erreur.value.status_code == 503
+
+    asyncio.run(scenario())
@@ -0,0 +1,79 @@
+"""
+Tests pour le middleware ASGI (logging, rate limiting, headers de sécurité)
+"""
+import asyncio
+
+from starlette.responses import StreamingResponse
+
+from app.core.deps import get_current_active_user
+from app.main import app
+from app.middleware.asgi import GeoLabMiddleware
+from app.middleware.rate_limit import Politique, rate_limiter
+from app.middleware.stockage_rate_limit import StockageMemoire
+from app.models.user import User, UserRole
+
+
+def test_headers_de_securite_et_rate_limit(client, db, monkeypatch):
+    """Test: headers posés sur les réponses, y compris les exports en flux et les 429"""
+    reponse = client.get("/health")
+    assert reponse.status_code == 200
+    assert reponse.headers["X-Frame-Options"] == "DENY"
+    assert "X-Process-Time" in reponse.headers
+    # Health check exempté
+    assert "X-RateLimit-Limit" not in reponse.headers
+
+    user = User(email="export@example.com", username="export", hashed_password="x", role=UserRole.ADMIN)
+    db.add(user)
+    db.commit()
+    app.dependency_overrides[get_current_active_user] = lambda: user
+    monkeypatch.setattr(rate_limiter, "politiques", [Politique("/api/v1/export", 2, 60)])
+    monkeypatch.setattr(rate_limiter, "stockage", StockageMemoire())
+
+    reponse = client.get("/api/v1/export/essais/csv")
+    assert reponse.status_code == 200
+    assert reponse.headers["Content-Type"].startswith("text/csv")
+    assert reponse.headers["Content-Security-Policy"].startswith("default-src 'self'")
+    assert reponse.headers["X-RateLimit-Limit"] == "2"
+    assert reponse.headers["X-RateLimit-Remaining"] == "1"
+
+    client.get("/api/v1/export/essais/csv")
+    reponse = client.get("/api/v1/export/essais/csv")
+    assert reponse.status_code == 429
+    assert reponse.headers["X-RateLimit-Remaining"] == "0"
+    assert int(reponse.headers["Retry-After"]) >= 1
+    assert reponse.headers["X-Content-Type-Options"] == "nosniff"
+
+
+def test_flux_transmis_morceau_par_morceau():
+    """Test: chaque morceau d'une réponse en flux est envoyé dès sa production"""
+    envoyes = []
+    produits = []
+
+    async def morceaux():
+        for i in range(3):
+            produits.append(i)
+            # Le morceau précédent est déjà parti quand le suivant est produit
+            assert sum(message["type"] == "http.response.body" for message in envoyes) == i
+            yield f"ligne {i}\n".encode()
+
+    async def receive():
+        await asyncio.sleep(10)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        envoyes.append(message)
+
+    scope = {
+        "type": "http", "method": "GET", "path": "/flux", "scheme": "http",
+        "headers": [], "client": ("127.0.0.1", 1234),
+    }
+    reponse = StreamingResponse(morceaux(), media_type="text/csv", headers={"X-Frame-Options": "SAMEORIGIN"})
+    middleware = GeoLabMiddleware(reponse)
+    asyncio.run(middleware(scope, receive, send))
+
+    assert produits == [0, 1, 2]
+    debut = envoyes[0]
+    assert debut["type"] == "http.response.start"
+    # Header de sécurité posé par la route remplacé, pas dupliqué
+    assert [valeur for nom, valeur in debut["headers"] if nom == b"x-frame-options"] == [b"DENY"]
+    assert [message.get("body") for message in envoyes[1:4]] == [b"ligne 0\n", b"ligne 1\n", b"ligne 2\n"]
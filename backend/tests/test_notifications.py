@@ -0,0 +1,43 @@
+"""
+Tests pour les routes des notifications (session asynchrone)
+"""
+import pytest
+
+from app.core.deps import get_current_active_user
+from app.main import app
+from app.models.notification import Notification, TypeNotification
+from app.models.user import User, UserRole
+
+
+@pytest.fixture
+def destinataire(db):
+    """Utilisateur authentifié avec deux notifications non lues"""
+    user = User(email="dest@example.com", username="dest", hashed_password="x", role=UserRole.TECHNICIEN)
+    db.add(user)
+    db.flush()
+    for i in range(2):
+        db.add(Notification(
+            type=list(TypeNotification)[0], titre=f"Titre {i}", message="Message", destinataire_id=user.id
+        ))
+    db.commit()
+    app.dependency_overrides[get_current_active_user] = lambda: user
+    return user
+
+
+def test_lister_et_marquer_les_notifications(client, destinataire, compter_requetes):
+    """Test: liste avec destinataire chargé, marquage individuel puis global"""
+    with compter_requetes(4):
+        reponse = client.get("/api/v1/notifications/")
+    assert reponse.status_code == 200
+    contenu = reponse.json()
+    assert contenu["total"] == 2 and contenu["non_lues"] == 2
+    assert contenu["notifications"][0]["destinataire"]["username"] == "dest"
+
+    reponse = client.put("/api/v1/notifications/1/lue")
+    assert reponse.status_code == 200
+    assert reponse.json()["lu"] is True
+    assert client.get("/api/v1/notifications/?non_lues=true").json()["total"] == 1
+
+    assert client.put("/api/v1/notifications/lire-tout").status_code == 200
+    assert client.get("/api/v1/notifications/").json()["non_lues"] == 0
+    assert client.put("/api/v1/notifications/99/archive").status_code == 404
@@ -0,0 +1,36 @@
+"""
+Tests pour la pagination par curseur des essais
+"""
+import pytest
+
+from app.models.essai import Essai, TypeEssai
+from app.models.user import User, UserRole
+from app.utils.pagination import CurseurInvalide, apres_curseur, decoder_curseur, encoder_curseur
+
+
+def test_parcours_par_curseur_sans_doublon(db):
+    """Test: des essais créés dans la même seconde sont parcourus une seule fois, dans l'ordre"""
+    user = User(email="admin@example.com", username="admin", hashed_password="x", role=UserRole.ADMIN)
+    db.add(user)
+    db.flush()
+    db.add_all([Essai(numero_essai=f"E-{i}", type_essai=TypeEssai.CBR, operateur_id=user.id) for i in range(10)])
+    db.commit()
+
+    requete = db.query(Essai).order_by(Essai.created_at.desc(), Essai.id.desc())
+    vus, curseur = [], None
+    while True:
+        page = (apres_curseur(requete, Essai, curseur) if curseur else requete).limit(3).all()
+        vus += [essai.id for essai in page]
+        if len(page) < 3:
+            break
+        curseur = encoder_curseur(page[-1].created_at, page[-1].id)
+
+    assert vus == [essai.id for essai in requete.all()]
+    assert len(set(vus)) == 10
+
+
+def test_curseur_invalide():
+    """Test: un curseur illisible est refusé"""
+    assert decoder_curseur(encoder_curseur(None, 4)) == (None, 4)
+    with pytest.raises(CurseurInvalide):
+        decoder_curseur("pas-un-curseur")
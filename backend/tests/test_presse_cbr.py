@@ -0,0 +1,86 @@
+"""
+Tests pour l'ingestion des enregistrements de presse CBR
+"""
+import io
+
+import numpy as np
+
+import app.main  # noqa: F401 - configure tous les mappers
+from app.models.essai import EssaiCBR
+from app.services.calculs import calculer_cbr
+from app.services.presse_cbr import indices_lttb, ingerer_csv, lire_trace
+
+
+def _csv_presse(n: int) -> bytes:
+    """Export de presse : virgule décimale, force en N, pas de pénétration irrégulier"""
+    penetrations = np.linspace(0.0, 10.0, n) + 0.0013
+    forces = 1000 * (3 * penetrations - 0.12 * penetrations ** 2)
+    lignes = ["Temps (s);Déplacement (mm);Force (N)"]
+    lignes += [f"{0.01 * i:.2f};{p:.4f};{f:.2f}".replace(".", ",") for i, (p, f) in enumerate(zip(penetrations, forces))]
+    return ("\n".join(lignes) + "\n").encode("latin-1")
+
+
+def test_ingestion_par_blocs_interpole_exactement(tmp_path):
+    """Test: forces interpolées entre deux échantillons, même à cheval sur deux blocs"""
+    contenu = _csv_presse(2001)
+    chemin = tmp_path / "trace.f32"
+    resultat = ingerer_csv(io.BytesIO(contenu), chemin, points=50, taille_bloc=97)
+
+    assert resultat["nombre_echantillons"] == 2001
+    assert lire_trace(chemin).shape == (2001, 2)
+
+    # Référence : interpolation sur les échantillons relus intégralement
+    valeurs = np.loadtxt(
+        io.StringIO(contenu.decode("latin-1").replace(",", ".")),
+        delimiter=";", skiprows=1, usecols=(1, 2),
+    )
+    attendue = np.interp(2.5, valeurs[:, 0], valeurs[:, 1]) / 1000
+    assert abs(resultat["force_25mm"] - attendue) < 1e-12
+
+    # La courbe réduite redonne les mêmes forces au calcul CBR
+    cbr = EssaiCBR(points_penetration=resultat["points_penetration"])
+    calculer_cbr(cbr)
+    assert cbr.force_25mm == resultat["force_25mm"]
+    assert cbr.force_50mm == resultat["force_50mm"]
+
+
+def test_lttb_conserve_les_extremites_et_les_pics():
+    """Test: LTTB garde le premier, le dernier point et un pic isolé"""
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[437] = 50.0
+    indices = indices_lttb(x, y, 20)
+    assert len(indices) == 20
+    assert indices[0] == 0 and indices[-1] == 999
+    assert 437 in indices
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_import_refuse_conserve_la_trace_enregistree(client, db, tmp_path, monkeypatch):
+    """Test: un import rejeté par la validation ne remplace pas la trace stockée"""
+    from app.api.v1.endpoints import essais as routes_essais
+    from app.core.deps import get_current_active_user
+    from app.main import app
+    from app.models.essai import Essai, TypeEssai
+    from app.models.user import User, UserRole
+
+    monkeypatch.setattr(routes_essais, "UPLOAD_DIR", tmp_path)
+    user = User(email="presse@example.com", username="presse", hashed_password="x", role=UserRole.ADMIN)
+    db.add(user)
+    db.flush()
+    essai = Essai(numero_essai="P-1", type_essai=TypeEssai.CBR, operateur_id=user.id)
+    db.add(essai)
+    db.commit()
+    app.dependency_overrides[get_current_active_user] = lambda: user
+
+    url = f"/api/v1/essais/cbr/{essai.id}/presse"
+    reponse = client.post(url, files={"fichier": ("presse.csv", _csv_presse(500))})
+    assert reponse.status_code == 200
+    trace = tmp_path / "cbr" / f"essai_{essai.id}.f32"
+    octets = trace.read_bytes()
+
+    hors_plage = _csv_presse(500).replace(b";0,0013;", b";20,0000;", 1)
+    reponse = client.post(url, files={"fichier": ("presse.csv", hors_plage)})
+    assert reponse.status_code == 400
+    assert trace.read_bytes() == octets
+    assert [f.name for f in (tmp_path / "cbr").iterdir()] == [trace.name]
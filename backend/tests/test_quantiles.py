@@ -0,0 +1,88 @@
+"""
+Tests pour les esquisses de quantiles (t-digest) des résultats d'essais
+"""
+from statistics import median
+
+import numpy as np
+import pytest
+
+from app.core.deps import get_current_active_user
+from app.main import app
+from app.models.compteurs import SANS_PROJET
+from app.models.essai import Essai, EssaiCBR, TypeEssai
+from app.models.projet import Projet
+from app.models.quantiles import EsquisseQuantiles
+from app.models.user import User, UserRole
+from app.services.quantiles import TDigest, reconstruire_esquisses
+
+
+def _esquisses(db):
+    return {
+        (e.projet_id, e.type_essai, e.metrique): (e.nombre, e.minimum, e.maximum, e.centroides)
+        for e in db.query(EsquisseQuantiles).all()
+    }
+
+
+def test_tdigest_precision_et_fusion():
+    """Test: percentiles proches des exacts, taille bornée, fusion équivalente à un seul t-digest"""
+    valeurs = np.random.default_rng(7).lognormal(2.5, 0.6, 20000)
+    gauche, droite = TDigest(), TDigest()
+    for debut in range(0, valeurs.size, 500):
+        (gauche if debut % 1000 else droite).ajouter(valeurs[debut:debut + 500])
+    gauche.fusionner(droite)
+
+    assert gauche.nombre == valeurs.size
+    assert len(gauche.centroides()) <= 2 * gauche.compression
+    assert (gauche.minimum, gauche.maximum) == (valeurs.min(), valeurs.max())
+    rangs = [0.05, 0.25, 0.5, 0.75, 0.95]
+    exacts = np.percentile(valeurs, [100 * rang for rang in rangs])
+    assert gauche.quantiles(rangs) == pytest.approx(exacts, rel=0.01)
+
+
+def test_esquisses_tenues_au_flush(client, db):
+    """Test: création, recalcul, changement de projet et suppression ; même état qu'une reconstruction"""
+    user = User(email="quantiles@example.com", username="quantiles", hashed_password="x", role=UserRole.ADMIN)
+    db.add(user)
+    db.flush()
+    projets = [Projet(nom=f"Projet {i}", code_projet=f"Q-{i}", created_by_id=user.id) for i in range(2)]
+    db.add_all(projets)
+    db.flush()
+    cbr = [12.0, 35.5, 8.2, 21.0, 17.4, 40.1, 5.6, 28.3, 14.9]
+    essais = []
+    for i, valeur in enumerate(cbr):
+        essai = Essai(
+            numero_essai=f"Q-{i}", type_essai=TypeEssai.CBR, operateur_id=user.id,
+            projet_id=projets[i % 2].id if i < 8 else None,
+        )
+        essai.cbr = EssaiCBR(cbr_final=valeur)
+        essais.append(essai)
+    db.add_all(essais)
+    db.commit()
+
+    app.dependency_overrides[get_current_active_user] = lambda: user
+    quantiles = client.get("/api/v1/statistiques/cbr/quantiles").json()
+    assert quantiles["metrique"] == "cbr_final"
+    assert quantiles["nombre"] == len(cbr)
+    assert (quantiles["minimum"], quantiles["maximum"]) == (min(cbr), max(cbr))
+    assert quantiles["percentiles"]["p50"] == pytest.approx(median(cbr))
+
+    projet = client.get(f"/api/v1/statistiques/cbr/quantiles?projets={projets[0].id}").json()
+    assert projet["nombre"] == 4
+    assert projet["percentiles"]["p50"] == pytest.approx(median(cbr[0:8:2]))
+    assert client.get(f"/api/v1/statistiques/cbr/quantiles?projets={SANS_PROJET}").json()["nombre"] == 1
+
+    essais[0].cbr.cbr_final = 50.0
+    essais[1].projet_id = projets[0].id
+    db.commit()
+    db.delete(essais[2].cbr)
+    db.commit()
+
+    tenues = _esquisses(db)
+    assert tenues[(projets[0].id, TypeEssai.CBR, "cbr_final")][:3] == (4, 5.6, 50.0)
+    assert tenues[(projets[1].id, TypeEssai.CBR, "cbr_final")][0] == 3
+    reconstruire_esquisses(db.connection())
+    assert _esquisses(db) == tenues
+
+    assert client.get("/api/v1/statistiques/cbr/quantiles?metrique=wl").status_code == 400
+    assert client.get("/api/v1/statistiques/cbr/quantiles?projets=a").status_code == 400
+    assert client.get("/api/v1/statistiques/autre/quantiles").status_code == 404
@@ -0,0 +1,117 @@
+"""
+Tests pour le rate limiter à fenêtre glissante
+"""
+import asyncio
+import sqlite3
+import time
+
+import fakeredis.aioredis
+import pytest
+
+from app.middleware.rate_limit import RateLimiter
+from app.middleware.stockage_rate_limit import StockageRedis, StockageSQLite, creer_stockage
+
+
+def test_fenetre_glissante():
+    """Test: limite atteinte, fenêtre précédente pondérée, instant de libération"""
+    async def scenario():
+        limiter = RateLimiter()
+        debut = 600.0
+        acceptees = [(await limiter.is_allowed("ip_a", 10, 60, now=debut + i))[0] for i in range(12)]
+        assert acceptees == [True] * 10 + [False] * 2
+
+        # Fenêtre suivante : les 10 requêtes précédentes pèsent encore (10 × (1 - 6/60) = 9)
+        assert await limiter.is_allowed("ip_a", 10, 60, now=debut + 60) == (False, 0, 666)
+        assert (await limiter.is_allowed("ip_a", 10, 60, now=debut + 66.5))[0]
+        # Deux fenêtres plus tard, tout est expiré
+        assert await limiter.is_allowed("ip_a", 10, 60, now=debut + 180) == (True, 9, 840)
+
+    asyncio.run(scenario())
+
+
+def test_etat_borne_et_politiques():
+    """Test: état de taille fixe par clé, éviction LRU, préfixe le plus long"""
+    async def scenario():
+        limiter = RateLimiter(max_keys=2, politiques=[("/", 1000, 60), ("/api/v1/auth", 100, 60)])
+        for _ in range(5000):
+            await limiter.is_allowed("ip_a", 10 ** 6, 60, now=0.0)
+        assert limiter.stockage.compteurs["ip_a"] == [0, 5000, 0]
+
+        await limiter.is_allowed("ip_b", now=0.0)
+        await limiter.is_allowed("ip_a", now=0.0)
+        await limiter.is_allowed("ip_c", now=0.0)
+        assert list(limiter.stockage.compteurs) == ["ip_a", "ip_c"]
+
+    asyncio.run(scenario())
+
+    limiter = RateLimiter(politiques=[("/", 1000, 60), ("/api/v1/auth", 100, 60)])
+    assert limiter.politique("/api/v1/auth/login").max_requests == 100
+    assert limiter.politique("/api/v1/essais/").max_requests == 1000
+    assert RateLimiter().politique("/api/v1/essais/") is None
+
+
+def test_stockage_sqlite_partage(tmp_path):
+    """Test: deux limiters (deux workers) sur le même fichier partagent la limite"""
+    chemin = f"sqlite:///{tmp_path / 'rate_limit.db'}"
+
+    async def scenario():
+        workers = [RateLimiter(stockage=creer_stockage(chemin)) for _ in range(2)]
+        assert isinstance(workers[0].stockage, StockageSQLite)
+        acceptees = [
+            (await workers[i % 2].is_allowed("ip_a", 10, 60, now=600.0 + i))[0] for i in range(12)
+        ]
+        assert acceptees == [True] * 10 + [False] * 2
+        # Les refus ne sont pas comptés : même résultat que le stockage en mémoire
+        assert await workers[1].is_allowed("ip_a", 10, 60, now=660.0) == (False, 0, 666)
+        assert await workers[0].is_allowed("ip_a", 10, 60, now=780.0) == (True, 9, 840)
+
+    asyncio.run(scenario())
+
+
+def test_stockage_sqlite_verrouille(tmp_path):
+    """Test: fichier verrouillé par un autre worker : erreur rapide, boucle d'événements libre"""
+    chemin = str(tmp_path / "rate_limit.db")
+    stockage = StockageSQLite(chemin)
+    autre = sqlite3.connect(chemin, isolation_level=None)
+    autre.execute("BEGIN IMMEDIATE")
+
+    async def scenario():
+        battements = 0
+
+        async def battre():
+            nonlocal battements
+            while True:
+                battements += 1
+                await asyncio.sleep(0.001)
+
+        battement = asyncio.create_task(battre())
+        debut = time.perf_counter()
+        with pytest.raises(sqlite3.OperationalError):
+            await stockage.compter("ip_a", 10, 60)
+        assert time.perf_counter() - debut < 1
+        battement.cancel()
+        assert battements > 1
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        autre.execute("ROLLBACK")
+        autre.close()
+
+
+def test_stockage_redis():
+    """Test: compteurs partagés dans un serveur Redis (fakeredis), expiration posée"""
+    async def scenario():
+        client = fakeredis.aioredis.FakeRedis()
+        workers = [RateLimiter(stockage=StockageRedis(client=client)) for _ in range(2)]
+        acceptees = await asyncio.gather(*(
+            workers[i % 2].is_allowed("ip_a", 10, 60, now=600.0) for i in range(15)
+        ))
+        assert [acceptee for acceptee, _, _ in acceptees].count(True) == 10
+        assert int(await client.get("rate_limit:ip_a:10")) == 10
+        assert 0 < await client.ttl("rate_limit:ip_a:10") <= 120
+
+        # La fenêtre précédente est relue depuis Redis
+        assert await workers[0].is_allowed("ip_a", 10, 60, now=660.0) == (False, 0, 666)
+
+    asyncio.run(scenario())
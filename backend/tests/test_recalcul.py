@@ -0,0 +1,122 @@
+"""
+Tests pour le recalcul en masse des essais
+"""
+import pytest
+from pydantic import ValidationError
+from sqlalchemy.orm import sessionmaker
+from app.api.v1.endpoints import recalcul as routes_recalcul
+from app.models.essai import Essai, EssaiCBR, TypeEssai
+from app.models.recalcul import StatutRecalcul
+from app.models.user import User, UserRole
+from app.schemas.recalcul import RecalculJobCreate
+from app.services import registre
+from app.services.recalcul import creer_recalcul, executer_recalcul
+
+
+def _creer_essais_cbr(db, nombre):
+    """Crée des essais CBR dont les résultats stockés sont périmés"""
+    user = User(email="admin@example.com", username="admin", hashed_password="x", role=UserRole.ADMIN)
+    db.add(user)
+    db.flush()
+    for i in range(nombre):
+        essai = Essai(
+            numero_essai=f"CBR-{i}",
+            type_essai=TypeEssai.CBR,
+            operateur_id=user.id,
+            resultats={"cbr_final": 0.0, "_validation_warnings": ["ancien"]},
+        )
+        db.add(essai)
+        db.flush()
+        db.add(EssaiCBR(essai_id=essai.id, force_25mm=6.62 + i, cbr_final=0.0, classe_portance="?"))
+    db.commit()
+
+
+def test_recalcul_met_a_jour_colonnes_et_resultats(db):
+    """Test: les colonnes calculées et Essai.resultats sont rafraîchis"""
+    _creer_essais_cbr(db, 5)
+    job = creer_recalcul(db, type_essai="cbr")
+
+    executer_recalcul(job.id, session_factory=sessionmaker(bind=db.get_bind()), taille_lot=2, processus=1)
+
+    db.expire_all()
+    assert job.statut == StatutRecalcul.TERMINE
+    assert job.total == 5 and job.traites == 5
+    cbr = db.query(EssaiCBR).order_by(EssaiCBR.id).first()
+    assert cbr.cbr_final == 50.0
+    assert cbr.classe_portance == "C5 - Très bonne"
+    essai = db.query(Essai).filter(Essai.id == cbr.essai_id).first()
+    assert essai.resultats["cbr_final"] == 50.0
+    assert essai.resultats["_validation_warnings"] == ["ancien"]
+
+
+def test_recalcul_reprend_apres_le_curseur(db):
+    """Test: une reprise ne retraite pas les lots déjà écrits"""
+    _creer_essais_cbr(db, 4)
+    job = creer_recalcul(db, type_essai="cbr")
+    premiers = db.query(EssaiCBR).order_by(EssaiCBR.id).limit(2).all()
+    # Simule un arrêt après le premier lot
+    job.statut = StatutRecalcul.ECHOUE
+    job.type_courant = "cbr"
+    job.dernier_id = premiers[-1].id
+    job.traites = 2
+    job.total = 4
+    job.started_at = job.created_at
+    db.commit()
+
+    executer_recalcul(job.id, session_factory=sessionmaker(bind=db.get_bind()), taille_lot=2, processus=1)
+
+    db.expire_all()
+    assert job.statut == StatutRecalcul.TERMINE
+    assert job.traites == 4
+    cbrs = db.query(EssaiCBR).order_by(EssaiCBR.id).all()
+    assert [c.cbr_final for c in cbrs[:2]] == [0.0, 0.0]
+    assert all(c.cbr_final > 0 for c in cbrs[2:])
+
+
+def test_recalcul_saute_les_essais_a_jour(db):
+    """Test: une empreinte à jour évite de recalculer l'essai"""
+    _creer_essais_cbr(db, 2)
+    session_factory = sessionmaker(bind=db.get_bind())
+    executer_recalcul(creer_recalcul(db, type_essai="cbr").id, session_factory=session_factory, processus=1)
+
+    db.expire_all()
+    cbr = db.query(EssaiCBR).order_by(EssaiCBR.id).first()
+    assert cbr.hash_calcul is not None
+    cbr.classe_portance = "inchangée"
+    db.commit()
+
+    job = creer_recalcul(db, type_essai="cbr")
+    executer_recalcul(job.id, session_factory=session_factory, processus=1)
+
+    db.expire_all()
+    assert job.traites == 2
+    assert db.query(EssaiCBR).order_by(EssaiCBR.id).first().classe_portance == "inchangée"
+
+
+def test_echec_en_tache_de_fond_journalise(db, monkeypatch, caplog):
+    """Test: une erreur avant le parcours (pool, base) est journalisée et le travail passe en échec"""
+    _creer_essais_cbr(db, 1)
+    job = creer_recalcul(db, type_essai="cbr")
+
+    def echouer(job_id, session_factory, processus):
+        assert processus == 1
+        raise OSError("pool indisponible")
+
+    monkeypatch.setattr(routes_recalcul, "executer_recalcul", echouer)
+    routes_recalcul._executer_en_tache_de_fond(job.id, session_factory=sessionmaker(bind=db.get_bind()))
+
+    db.expire_all()
+    assert job.statut == StatutRecalcul.ECHOUE
+    assert job.erreur == "pool indisponible"
+    assert f"Échec du recalcul {job.id}" in caplog.text
+
+
+def test_perimetre_valide_selon_les_moteurs_enregistres(monkeypatch):
+    """Test: les types acceptés suivent le registre, y compris les moteurs ajoutés"""
+    for type_essai in ("cbrr", "autre"):
+        with pytest.raises(ValidationError):
+            RecalculJobCreate(type_essai=type_essai)
+
+    moteur_cbr = registre.obtenir_moteur("cbr")
+    monkeypatch.setitem(registre._MOTEURS, "pressiometre", moteur_cbr._replace(type_essai="pressiometre"))
+    assert RecalculJobCreate(type_essai="pressiometre").type_essai == "pressiometre"
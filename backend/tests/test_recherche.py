@@ -0,0 +1,46 @@
+"""
+Tests pour l'index de recherche des essais
+"""
+from app.models.essai import Essai, TypeEssai
+from app.models.projet import Projet
+from app.models.user import User, UserRole
+from app.services.recherche import filtrer_recherche
+
+
+def _rechercher(db, terme):
+    query, pertinence = filtrer_recherche(db.query(Essai), terme)
+    return sorted(essai.numero_essai for essai in query.order_by(pertinence.desc()).all())
+
+
+def test_index_tenu_a_jour_a_l_ecriture(db):
+    """Test: création, renommage du projet, modification et suppression mettent l'index à jour"""
+    user = User(email="admin@example.com", username="admin", hashed_password="x", role=UserRole.ADMIN)
+    db.add(user)
+    db.flush()
+    projet = Projet(nom="Barrage du Lac", code_projet="BDL-01", created_by_id=user.id)
+    db.add(projet)
+    db.flush()
+    db.add_all([
+        Essai(numero_essai="E-1", type_essai=TypeEssai.CBR, operateur_id=user.id, projet_id=projet.id),
+        Essai(numero_essai="E-2", type_essai=TypeEssai.CBR, operateur_id=user.id, observations="Argile sableuse"),
+        Essai(numero_essai="E-3", type_essai=TypeEssai.CBR, operateur_id=user.id, echantillon="SC"),
+    ])
+    db.commit()
+
+    assert _rechercher(db, "bdl-01") == ["E-1"]
+    assert _rechercher(db, "argile") == ["E-2"]
+    assert _rechercher(db, "sc") == ["E-3"]  # terme court : hors index trigrammes
+
+    projet.nom = "Digue nord"
+    db.commit()
+    assert _rechercher(db, "Lac") == []
+    assert _rechercher(db, "digue") == ["E-1"]
+
+    essai = db.query(Essai).filter(Essai.numero_essai == "E-2").one()
+    essai.observations = "Limon"
+    db.commit()
+    assert _rechercher(db, "argile") == []
+
+    db.delete(essai)
+    db.commit()
+    assert _rechercher(db, "limon") == []
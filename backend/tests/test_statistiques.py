@@ -0,0 +1,82 @@
+"""
+Tests pour les statistiques par type d'essai (agrégats calculés en SQL)
+"""
+from datetime import datetime
+from statistics import mean, median, stdev
+
+import numpy as np
+
+import pytest
+
+from app.core.deps import get_current_active_user
+from app.main import app
+from app.models.essai import Essai, EssaiProctor, StatutEssai, TypeEssai
+from app.models.user import User, UserRole
+
+DENSITES = [1.92, 2.05, 1.88, 2.11, 1.97, 2.02, 1.85]
+
+
+@pytest.fixture
+def essais_proctor(db):
+    """Essais Proctor sur deux mois, dont un sans résultat calculé"""
+    user = User(email="stats@example.com", username="stats", hashed_password="x", role=UserRole.ADMIN)
+    db.add(user)
+    db.flush()
+    for i, densite in enumerate(DENSITES + [None]):
+        essai = Essai(
+            numero_essai=f"PR-{i}", type_essai=TypeEssai.PROCTOR, operateur_id=user.id,
+            statut=StatutEssai.VALIDE if i % 2 else StatutEssai.BROUILLON,
+            date_essai=datetime(2024, 3 + i % 2, 10),
+        )
+        db.add(essai)
+        db.flush()
+        db.add(EssaiProctor(essai_id=essai.id, densite_seche_max=densite))
+    db.commit()
+    app.dependency_overrides[get_current_active_user] = lambda: user
+    return user
+
+
+def test_statistiques_agregees_par_la_base(client, essais_proctor, compter_requetes):
+    """Test: mêmes valeurs que le calcul en Python, sans charger les essais"""
+    with compter_requetes(4):
+        reponse = client.get("/api/v1/statistiques/proctor")
+    assert reponse.status_code == 200
+    stats = reponse.json()
+    assert stats["nombre_total"] == 8
+    assert stats["nombre_valides"] == 4
+    assert stats["densite_min"] == min(DENSITES)
+    assert stats["densite_max"] == max(DENSITES)
+    assert stats["densite_moyenne"] == pytest.approx(mean(DENSITES))
+    assert stats["densite_mediane"] == pytest.approx(median(DENSITES))
+    assert stats["densite_ecart_type"] == pytest.approx(stdev(DENSITES))
+    assert [nombre for _, nombre in stats["tendances"]] == [4, 4]
+
+    # Nombre pair de valeurs : moyenne des deux valeurs centrales
+    reponse = client.get("/api/v1/statistiques/proctor?date_fin=2024-03-31")
+    pairs = [densite for i, densite in enumerate(DENSITES) if i % 2 == 0]
+    assert reponse.json()["densite_mediane"] == pytest.approx(median(pairs))
+
+    assert client.get("/api/v1/statistiques/cbr").status_code == 404
+
+
+def test_distribution_et_percentiles(client, essais_proctor):
+    """Test: histogramme (nombre de classes ou bornes) et bandes P5 à P95 des résultats"""
+    stats = client.get("/api/v1/statistiques/proctor?classes=4").json()
+    densites = stats["distributions"]["densite_seche_max"]
+    assert densites["nombre"] == len(DENSITES)
+    assert densites["bornes"] == pytest.approx(np.linspace(min(DENSITES), max(DENSITES), 5).tolist())
+    assert sum(densites["effectifs"]) == len(DENSITES)
+    assert densites["percentiles"]["p50"] == pytest.approx(median(DENSITES))
+    assert densites["percentiles"]["p5"] == pytest.approx(np.percentile(DENSITES, 5))
+    assert densites["percentiles"]["p95"] == pytest.approx(np.percentile(DENSITES, 95))
+    assert [classe["count"] for classe in stats["distribution"]] == densites["effectifs"]
+    assert sum(classe["percentage"] for classe in stats["distribution"]) == pytest.approx(1)
+
+    # Bornes données : valeurs hors bornes non comptées
+    stats = client.get("/api/v1/statistiques/proctor?bornes=1.8,1.9,2.0,2.1").json()
+    densites = stats["distributions"]["densite_seche_max"]
+    assert densites["bornes"] == [1.8, 1.9, 2.0, 2.1]
+    assert densites["effectifs"] == [2, 2, 2]
+
+    assert client.get("/api/v1/statistiques/proctor?bornes=2,1").status_code == 400
+    assert client.get("/api/v1/statistiques/proctor?bornes=1,x").status_code == 400
@@ -0,0 +1,55 @@
+"""
+Tests pour la validation par règles compilées
+"""
+import app.main  # noqa: F401 - configure tous les mappers
+from app.models.essai import EssaiAtterberg, EssaiCBR, EssaiProctor, EssaiGranulometrie
+from app.services.validation import validate_essai, validate_many
+
+
+def test_validate_many_identique_a_la_validation_unitaire():
+    """Test: un lot validé en une passe donne les mêmes messages, essai par essai"""
+    atterbergs = [
+        EssaiAtterberg(wl_nombre_coups_1=12, wl_teneur_eau_1=250.0, wp_teneur_eau_1=22.0),
+        EssaiAtterberg(wl_nombre_coups_1=25, wl_teneur_eau_1=48.0, wl=30.0, wp=35.0),
+        EssaiAtterberg(wl_teneur_eau_1=0.0, ip=120.0),
+    ]
+    resultats = validate_many("atterberg", atterbergs)
+    assert resultats == [validate_essai("atterberg", essai) for essai in atterbergs]
+
+    assert resultats[0]["valid"] is False
+    assert resultats[0]["warnings"] == ["Nombre de coups essai 1 (12) hors de la plage recommandée (15-35)"]
+    assert resultats[0]["errors"] == ["Teneur en eau invalide: 250.0% (doit être entre 0 et 200%)"]
+    assert resultats[1]["errors"] == [
+        "La limite de liquidité (30.0%) doit être supérieure à la limite de plasticité (35.0%)"
+    ]
+    assert resultats[2] == {"valid": True, "warnings": ["Indice de plasticité très élevé: 120.0%"], "errors": []}
+
+
+def test_regles_sur_les_points_et_sommes():
+    """Test: contrôles sur les points de mesure, somme des tamisats et valeurs non numériques"""
+    cbr = EssaiCBR(points_penetration=[
+        {"penetration_mm": 2.5, "force_kn": 60.0},
+        {"penetration_mm": 14.0, "force_kn": 10.0},
+    ])
+    resultat = validate_many("cbr", [cbr])[0]
+    assert resultat["errors"] == ["Pénétration invalide: 14.0mm (doit être entre 0 et 12.5mm)"]
+    assert resultat["warnings"] == ["Force élevée: 60.0kN (vérifier la cohérence)"]
+
+    proctor = EssaiProctor(points_mesure=[{"teneur_eau": "abc", "densite_seche": 1.8}], opm=60.0)
+    assert validate_many("proctor", [proctor])[0]["errors"] == [
+        "points_mesure[].teneur_eau: valeur non numérique (abc)",
+        "OPM invalide: 60.0%",
+    ]
+
+    granulometries = [
+        EssaiGranulometrie(masse_totale_seche=50.0, points_tamisage=[
+            {"tamis": "2mm", "pourcentage_retenu": 40.0}, {"tamis": "0.08mm", "pourcentage_cumule": 47.5},
+        ]),
+        EssaiGranulometrie(masse_totale_seche=-1.0),
+    ]
+    premier, second = validate_many("granulometrie", granulometries)
+    assert premier["warnings"] == [
+        "Masse totale très faible, vérifier la précision",
+        "La somme des pourcentages (87.5%) s'écarte significativement de 100%",
+    ]
+    assert second == {"valid": False, "warnings": [], "errors": ["La masse totale sèche doit être positive"]}
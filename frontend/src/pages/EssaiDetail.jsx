@@ -46,6 +46,11 @@ function EssaiDetail() {
         const response = await api.get(endpoints[currentEssai.type_essai])
         const data = response.data.find(item => item.essai_id === parseInt(id))
         if (data) {
+          // La courbe Proctor est régénérée à la demande depuis l'ajustement stocké
+          if (currentEssai.type_essai === 'proctor') {
+            const courbe = await api.get(`/essais/proctor/${data.id}/courbe`, { params: { points: 100 } })
+            data.courbe_proctor = courbe.data
+          }
           setSpecificData(data)
         }
       }